@@ -0,0 +1,156 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Optional binary framing for microphone audio sent by the client.
+
+JSON clients send each audio chunk as a realtimeInput message with base64 PCM,
+which costs a third more on the wire plus a JSON decode and re-encode per
+chunk on the server. A client can instead ask for binary framing in its setup
+message:
+
+    {"setup": {"run_id": ..., "user_id": ..., "audio_framing": "binary"}}
+
+The server answers with {"audioFraming": {"mode": "binary", "version": 1}}
+(or mode "json" if it cannot honour the request), after which the client may
+send audio as binary websocket messages: a 4 byte header followed by raw
+16-bit little-endian mono PCM.
+
+    offset  size  field
+    0       1     version (1)
+    1       1     kind (1 = PCM audio)
+    2       2     sample rate in Hz, little-endian
+
+Everything else (text, video, turn control, setup) stays JSON, and clients
+that never ask for binary framing are unaffected. Binary chunks are kept as
+raw PCM while queued, so coalescing a backlog is a byte append, and are only
+base64-encoded once, into a reused buffer, when sent to Gemini.
+"""
+
+import binascii
+import struct
+from dataclasses import dataclass
+from typing import Any
+
+FRAMING_VERSION = 1
+KIND_AUDIO = 1
+HEADER = struct.Struct("<BBH")
+
+JSON = "json"
+BINARY = "binary"
+
+# Enough for 100 ms of 48 kHz audio with the message envelope.
+_INITIAL_CAPACITY = 16384
+_SUFFIX = b'"}]}}'
+
+
+class FramingError(ValueError):
+    """Raised for binary frames that do not follow the protocol."""
+
+
+@dataclass
+class AudioChunk:
+    """Raw PCM received in a binary frame, not yet encoded for Gemini."""
+
+    sample_rate: int
+    pcm: bytearray
+
+    @property
+    def mime_type(self) -> str:
+        return f"audio/pcm;rate={self.sample_rate}"
+
+
+def negotiate(setup: dict[str, Any]) -> str | None:
+    """Framing mode granted for a setup message, None if it did not ask."""
+    requested = setup.get("audio_framing")
+    if requested is None:
+        return None
+    return BINARY if requested == BINARY else JSON
+
+
+def framing_ack(mode: str) -> dict[str, Any]:
+    """Server reply confirming the negotiated framing mode."""
+    return {"audioFraming": {"mode": mode, "version": FRAMING_VERSION}}
+
+
+def encode_frame(pcm: bytes, sample_rate: int) -> bytes:
+    """Binary frame for a PCM chunk, as a client would send it."""
+    return HEADER.pack(FRAMING_VERSION, KIND_AUDIO, sample_rate) + pcm
+
+
+def parse_frame(frame: bytes) -> AudioChunk:
+    """Validate a binary frame and copy its PCM payload out of it."""
+    if len(frame) <= HEADER.size:
+        raise FramingError(f"frame of {len(frame)} bytes has no payload")
+    version, kind, sample_rate = HEADER.unpack_from(frame)
+    if version != FRAMING_VERSION:
+        raise FramingError(f"unsupported framing version {version}")
+    if kind != KIND_AUDIO:
+        raise FramingError(f"unsupported frame kind {kind}")
+    if not sample_rate:
+        raise FramingError("sample rate is zero")
+    payload = memoryview(frame)[HEADER.size :]
+    if len(payload) % 2:
+        raise FramingError("PCM payload is not 16-bit aligned")
+    return AudioChunk(sample_rate, bytearray(payload))
+
+
+def coalesce_chunks(last: AudioChunk, chunk: AudioChunk) -> bool:
+    """Appends chunk's PCM to last if both have the same sample rate."""
+    if last.sample_rate != chunk.sample_rate:
+        return False
+    last.pcm += chunk.pcm
+    return True
+
+
+def encoded_size(chunk: AudioChunk) -> int:
+    """Size of the chunk's base64 payload once encoded."""
+    return (len(chunk.pcm) + 2) // 3 * 4
+
+
+class RealtimeInputEncoder:
+    """Turns AudioChunks into realtimeInput messages for the Live API.
+
+    The message envelope is prebuilt per sample rate and every message is
+    assembled in one buffer owned by the encoder, so a steady stream of
+    chunks does not allocate beyond the base64 pass and the final string.
+    """
+
+    def __init__(self, capacity: int = _INITIAL_CAPACITY) -> None:
+        self._buffer = bytearray(capacity)
+        self._prefixes: dict[int, bytes] = {}
+
+    def _prefix(self, chunk: AudioChunk) -> bytes:
+        prefix = self._prefixes.get(chunk.sample_rate)
+        if prefix is None:
+            prefix = (
+                '{"realtimeInput": {"mediaChunks": '
+                f'[{{"mimeType": "{chunk.mime_type}", "data": "'
+            ).encode()
+            self._prefixes[chunk.sample_rate] = prefix
+        return prefix
+
+    def encode(self, chunk: AudioChunk) -> str:
+        """JSON text of the realtimeInput message carrying chunk."""
+        prefix = self._prefix(chunk)
+        data = binascii.b2a_base64(chunk.pcm, newline=False)
+        start = len(prefix)
+        middle = start + len(data)
+        end = middle + len(_SUFFIX)
+        if len(self._buffer) < end:
+            self._buffer = bytearray(max(end, 2 * len(self._buffer)))
+        buffer = self._buffer
+        buffer[:start] = prefix
+        buffer[start:middle] = data
+        buffer[middle:end] = _SUFFIX
+        return str(memoryview(buffer)[:end], "ascii")
@@ -0,0 +1,119 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Classifies Live API server frames without decoding audio payloads.
+
+A BidiGenerateContentServerMessage carries exactly one of setupComplete,
+serverContent, toolCall, toolCallCancellation, goAway or
+sessionResumptionUpdate, and the server writes that field first. Most frames
+are serverContent with a base64 audio chunk that the server only relays to the
+client, so the first key is read from a bounded prefix of the frame and only
+tool call and control frames are JSON-decoded. Frames whose first key cannot
+be found in the prefix, or is not a known message type, are fully decoded.
+usageMetadata is a field that can accompany any message type, so a frame
+that starts with it is classified from the decoded message; so is every
+control frame, which is decoded anyway.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any
+
+# Bytes scanned for the first key; covers leading whitespace and the key itself.
+PREFIX_SCAN_BYTES = 64
+# Bytes scanned for an audio part: {"serverContent": {"modelTurn": {"parts": [{"inlineData": {"mimeType": "audio/...
+AUDIO_SCAN_BYTES = 192
+
+FORWARD = "forward"
+TOOL_CALL = "toolCall"
+TOOL_CALL_CANCELLATION = "toolCallCancellation"
+CONTROL = "control"
+
+_FORWARD_KEYS = frozenset({"serverContent"})
+_CONTROL_KEYS = frozenset({"setupComplete", "goAway", "sessionResumptionUpdate"})
+_WHITESPACE = b" \t\r\n"
+
+
+@dataclass
+class RoutedFrame:
+    """A classified frame; message is only set for frames that were decoded."""
+
+    kind: str
+    message: dict[str, Any] | None = None
+
+
+def first_key(frame: bytes | str, limit: int = PREFIX_SCAN_BYTES) -> str | None:
+    """First top-level key of a JSON object frame, read from at most limit bytes."""
+    prefix = frame[:limit]
+    if isinstance(prefix, str):
+        prefix = prefix.encode()
+    start = 0
+    end = len(prefix)
+    while start < end and prefix[start] in _WHITESPACE:
+        start += 1
+    if start == end or prefix[start] != ord("{"):
+        return None
+    start += 1
+    while start < end and prefix[start] in _WHITESPACE:
+        start += 1
+    if start == end or prefix[start] != ord('"'):
+        return None
+    close = prefix.find(b'"', start + 1)
+    if close < 0:
+        return None
+    return prefix[start + 1 : close].decode("ascii", "replace")
+
+
+def _kind(key: str) -> str | None:
+    if key in _FORWARD_KEYS:
+        return FORWARD
+    if key == TOOL_CALL or key == TOOL_CALL_CANCELLATION:
+        return key
+    if key in _CONTROL_KEYS:
+        return CONTROL
+    return None
+
+
+def is_audio_frame(frame: bytes | str) -> bool:
+    """serverContent frames carrying inline audio, judged from a bounded prefix."""
+    prefix = frame[:AUDIO_SCAN_BYTES]
+    if isinstance(prefix, str):
+        prefix = prefix.encode()
+    return (
+        first_key(prefix) == "serverContent"
+        and b'"inlineData"' in prefix
+        and b'"audio/' in prefix
+    )
+
+
+def route_frame(frame: bytes | str) -> RoutedFrame:
+    """Classify a frame, decoding it only when it has to be acted on."""
+    key = first_key(frame)
+    kind = _kind(key) if key is not None else None
+    if kind == FORWARD:
+        return RoutedFrame(FORWARD)
+
+    message = json.loads(frame)
+    if kind is None or kind == CONTROL:
+        # Unexpected layout, or a first key that does not rule out a tool
+        # call: classify from the decoded message instead.
+        if TOOL_CALL in message:
+            kind = TOOL_CALL
+        elif TOOL_CALL_CANCELLATION in message:
+            kind = TOOL_CALL_CANCELLATION
+        elif "serverContent" in message:
+            kind = FORWARD
+        else:
+            kind = CONTROL
+    return RoutedFrame(kind, message)
@@ -0,0 +1,284 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bounded, backpressure-aware relay queues between the two websockets.
+
+Each direction of a session has its own RelayQueue, drained by its own sender
+task, so a slow browser never stalls the Gemini reader and a slow Gemini link
+never stalls microphone input. A queue is bounded by item count and by bytes,
+which keeps memory flat per connection and latency bounded:
+
+  * Media frames (microphone audio and video going to Gemini, model audio
+    going to the browser) are droppable. When the queue is over its limits the
+    oldest media frames are dropped first, because stale audio is worth less
+    than fresh audio.
+  * Adjacent queued microphone chunks are coalesced into one realtimeInput
+    message, so a backlog costs one send rather than one per chunk. Chunks
+    from binary-framed clients (AudioChunk) are coalesced as raw PCM.
+  * Control, text and tool frames are never dropped. When only such frames
+    fill the queue, put() waits for the sender: that is the backpressure.
+
+Queue depth, bytes, drops and coalesced frames are exported in Prometheus
+text format by render_metrics() (served on /metrics by the server).
+"""
+
+import asyncio
+import os
+import weakref
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from app.audio_framing import AudioChunk, coalesce_chunks, encoded_size
+from app.frame_router import is_audio_frame
+
+RELAY_MAX_ITEMS = int(os.getenv("RELAY_MAX_ITEMS", "256"))
+# About 4 s of 16 kHz microphone audio and 4 s of 24 kHz model audio, base64.
+RELAY_TO_GEMINI_MAX_BYTES = int(os.getenv("RELAY_TO_GEMINI_MAX_BYTES", "176000"))
+RELAY_TO_CLIENT_MAX_BYTES = int(os.getenv("RELAY_TO_CLIENT_MAX_BYTES", "262144"))
+
+TO_GEMINI = "to_gemini"
+TO_CLIENT = "to_client"
+
+_queues: "weakref.WeakSet[RelayQueue]" = weakref.WeakSet()
+_totals: dict[tuple[str, str], int] = {}
+
+
+def _count(direction: str, name: str, value: int = 1) -> None:
+    key = (direction, name)
+    _totals[key] = _totals.get(key, 0) + value
+
+
+class QueueClosed(Exception):
+    """Raised by put() once the queue is closed."""
+
+
+class RelayQueue:
+    """Bounded FIFO that drops or coalesces media frames and blocks on the rest."""
+
+    def __init__(
+        self,
+        direction: str,
+        max_items: int,
+        max_bytes: int,
+        size_of: Callable[[Any], int],
+        is_droppable: Callable[[Any], bool],
+        coalesce: Callable[[Any, Any], bool] | None = None,
+    ) -> None:
+        """Initialize the queue.
+
+        Args:
+            direction: Label for metrics, TO_GEMINI or TO_CLIENT
+            max_items: Maximum number of queued frames
+            max_bytes: Maximum total size of queued frames
+            size_of: Size of a frame in bytes
+            is_droppable: Whether a frame may be dropped under pressure
+            coalesce: Merges a new frame into the last queued one, returning
+                True if it did
+        """
+        self.direction = direction
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self.is_droppable = is_droppable
+        self.coalesce = coalesce
+        self.bytes = 0
+        self.high_water = 0
+        self._items: deque[tuple[Any, int, bool]] = deque()
+        self._changed = asyncio.Condition()
+        self._closed = False
+        _queues.add(self)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _over_limit(self) -> bool:
+        return len(self._items) > self.max_items or self.bytes > self.max_bytes
+
+    def _drop_oldest_media(self) -> bool:
+        for index, (_, size, droppable) in enumerate(self._items):
+            if droppable:
+                del self._items[index]
+                self.bytes -= size
+                _count(self.direction, "dropped")
+                return True
+        return False
+
+    async def put(self, item: Any) -> None:
+        """Queue a frame, dropping stale media or waiting for room as needed."""
+        async with self._changed:
+            if self._closed:
+                raise QueueClosed(self.direction)
+            droppable = self.is_droppable(item)
+            if droppable and self.coalesce and self._items:
+                last, last_size, last_droppable = self._items[-1]
+                if last_droppable and self.coalesce(last, item):
+                    size = self.size_of(item)
+                    self._items[-1] = (last, last_size + size, True)
+                    self.bytes += size
+                    _count(self.direction, "coalesced")
+                    while self._over_limit() and self._drop_oldest_media():
+                        pass
+                    self._changed.notify_all()
+                    return
+
+            size = self.size_of(item)
+            if not droppable:
+                # Make room by dropping media, then wait for the sender.
+                while len(self._items) >= self.max_items or (
+                    self._items and self.bytes + size > self.max_bytes
+                ):
+                    if not self._drop_oldest_media():
+                        await self._changed.wait()
+                        if self._closed:
+                            raise QueueClosed(self.direction)
+            self._items.append((item, size, droppable))
+            self.bytes += size
+            _count(self.direction, "enqueued")
+            while self._over_limit() and self._drop_oldest_media():
+                pass
+            self.high_water = max(self.high_water, len(self._items))
+            self._changed.notify_all()
+
+    async def get(self) -> Any | None:
+        """Next frame, or None once the queue is closed and drained."""
+        async with self._changed:
+            while not self._items:
+                if self._closed:
+                    return None
+                await self._changed.wait()
+            item, size, _ = self._items.popleft()
+            self.bytes -= size
+            self._changed.notify_all()
+            return item
+
+    async def close(self) -> None:
+        """Stop accepting frames; get() drains what is queued, then returns None."""
+        async with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+
+# --- client -> Gemini -----------------------------------------------------------
+
+
+def _media_chunks(message: dict[str, Any]) -> list[dict[str, Any]] | None:
+    realtime_input = message.get("realtimeInput")
+    if len(message) != 1 or not isinstance(realtime_input, dict):
+        return None
+    chunks = realtime_input.get("mediaChunks")
+    if len(realtime_input) != 1 or not isinstance(chunks, list):
+        return None
+    return chunks
+
+
+def client_message_size(message: dict[str, Any] | AudioChunk) -> int:
+    """Approximate size of a client message: its media payload plus overhead."""
+    if isinstance(message, AudioChunk):
+        return 64 + encoded_size(message)
+    chunks = _media_chunks(message) or []
+    return 64 + sum(len(chunk.get("data") or "") for chunk in chunks)
+
+
+def is_media_input(message: dict[str, Any] | AudioChunk) -> bool:
+    """realtimeInput messages that only carry audio/video chunks."""
+    if isinstance(message, AudioChunk):
+        return True
+    return bool(_media_chunks(message))
+
+
+def coalesce_audio_input(
+    last: dict[str, Any] | AudioChunk, message: dict[str, Any] | AudioChunk
+) -> bool:
+    """Appends message's audio chunks to last if both are audio of the same type."""
+    if isinstance(last, AudioChunk) or isinstance(message, AudioChunk):
+        if isinstance(last, AudioChunk) and isinstance(message, AudioChunk):
+            return coalesce_chunks(last, message)
+        return False
+    last_chunks = _media_chunks(last)
+    chunks = _media_chunks(message)
+    if not last_chunks or not chunks:
+        return False
+    mime_types = {chunk.get("mimeType") for chunk in last_chunks + chunks}
+    if len(mime_types) != 1 or not str(next(iter(mime_types))).startswith("audio/"):
+        return False
+    last_chunks.extend(chunks)
+    return True
+
+
+def client_to_gemini_queue(
+    max_items: int = RELAY_MAX_ITEMS, max_bytes: int = RELAY_TO_GEMINI_MAX_BYTES
+) -> RelayQueue:
+    """Queue for messages from the browser to Gemini."""
+    return RelayQueue(
+        TO_GEMINI,
+        max_items,
+        max_bytes,
+        size_of=client_message_size,
+        is_droppable=is_media_input,
+        coalesce=coalesce_audio_input,
+    )
+
+
+def gemini_to_client_queue(
+    max_items: int = RELAY_MAX_ITEMS, max_bytes: int = RELAY_TO_CLIENT_MAX_BYTES
+) -> RelayQueue:
+    """Queue for raw frames from Gemini to the browser."""
+    return RelayQueue(
+        TO_CLIENT, max_items, max_bytes, size_of=len, is_droppable=is_audio_frame
+    )
+
+
+# --- metrics --------------------------------------------------------------------
+
+
+def render_metrics() -> str:
+    """Relay queue metrics in Prometheus text format."""
+    depth: dict[str, int] = {TO_GEMINI: 0, TO_CLIENT: 0}
+    queued_bytes: dict[str, int] = {TO_GEMINI: 0, TO_CLIENT: 0}
+    high_water: dict[str, int] = {TO_GEMINI: 0, TO_CLIENT: 0}
+    connections: dict[str, int] = {TO_GEMINI: 0, TO_CLIENT: 0}
+    for queue in list(_queues):
+        if queue._closed:
+            continue
+        depth[queue.direction] = depth.get(queue.direction, 0) + len(queue)
+        queued_bytes[queue.direction] = (
+            queued_bytes.get(queue.direction, 0) + queue.bytes
+        )
+        high_water[queue.direction] = max(
+            high_water.get(queue.direction, 0), queue.high_water
+        )
+        connections[queue.direction] = connections.get(queue.direction, 0) + 1
+
+    lines = []
+    gauges = [
+        ("relay_queues", "Open relay queues.", connections),
+        ("relay_queue_depth", "Frames queued across open queues.", depth),
+        ("relay_queue_bytes", "Bytes queued across open queues.", queued_bytes),
+        (
+            "relay_queue_high_water",
+            "Highest depth reached by an open queue.",
+            high_water,
+        ),
+    ]
+    for name, help_text, values in gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        lines += [f'{name}{{direction="{d}"}} {v}' for d, v in sorted(values.items())]
+    for counter in ("enqueued", "dropped", "coalesced"):
+        name = f"relay_frames_{counter}_total"
+        lines += [f"# HELP {name} Frames {counter}.", f"# TYPE {name} counter"]
+        for direction in (TO_CLIENT, TO_GEMINI):
+            value = _totals.get((direction, counter), 0)
+            lines.append(f'{name}{{direction="{direction}"}} {value}')
+    return "\n".join(lines) + "\n"
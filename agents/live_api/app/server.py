@@ -15,12 +15,14 @@
 import asyncio
 import json
 import logging
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
 from typing import Any, Literal
 
 import backoff
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from google.cloud import logging as google_cloud_logging
 from google.genai import types
 from google.genai.types import LiveServerToolCall
@@ -28,8 +30,40 @@ from pydantic import BaseModel
 from websockets.exceptions import ConnectionClosedError
 
 from app.agent import MODEL_ID, genai_client, live_connect_config, tool_functions
+from app.audio_framing import (
+    BINARY,
+    AudioChunk,
+    FramingError,
+    RealtimeInputEncoder,
+    framing_ack,
+    negotiate,
+    parse_frame,
+)
+from app.frame_router import TOOL_CALL, TOOL_CALL_CANCELLATION, route_frame
+from app.relay import (
+    QueueClosed,
+    client_to_gemini_queue,
+    gemini_to_client_queue,
+    render_metrics,
+)
+from app.session_pool import LiveSessionPool
+from app.tool_executor import ToolExecutor
+
+# Pre-established Live sessions handed out on connect (see session_pool.py).
+session_pool = LiveSessionPool(
+    lambda: genai_client.aio.live.connect(model=MODEL_ID, config=live_connect_config)
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Keep the Live session pool warm while the server runs."""
+    await session_pool.start()
+    yield
+    await session_pool.stop()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -60,84 +94,136 @@ class GeminiSession:
         self.run_id = "n/a"
         self.user_id = "n/a"
         self.tool_functions = tool_functions
+        self.tool_executor = ToolExecutor(tool_functions)
+        # Bounded per-direction buffers, each drained by its own sender (see relay.py).
+        self.to_gemini = client_to_gemini_queue()
+        self.to_client = gemini_to_client_queue()
+        # Binary audio frames are accepted once negotiated in setup (see audio_framing.py).
+        self.audio_framing: str | None = None
+        self.audio_encoder = RealtimeInputEncoder()
 
     async def receive_from_client(self) -> None:
         """Listen for and process messages from the client.
 
-        Continuously receives messages and forwards audio data to Gemini.
+        Continuously receives messages and queues audio data for Gemini.
         Handles connection errors gracefully.
         """
         while True:
             try:
-                data = await self.websocket.receive_json()
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    logging.info(f"Client {self.user_id} disconnected")
+                    break
+                if message.get("bytes") is not None:
+                    await self._receive_audio_frame(message["bytes"])
+                    continue
+                data = json.loads(message["text"])
 
                 if isinstance(data, dict) and (
                     "realtimeInput" in data or "clientContent" in data
                 ):
-                    await self.session._ws.send(json.dumps(data))
+                    await self.to_gemini.put(data)
                 elif "setup" in data:
                     self.run_id = data["setup"]["run_id"]
                     self.user_id = data["setup"]["user_id"]
                     logger.log_struct(
                         {**data["setup"], "type": "setup"}, severity="INFO"
                     )
+                    mode = negotiate(data["setup"])
+                    if mode is not None:
+                        self.audio_framing = mode
+                        ack = json.dumps(framing_ack(mode)).encode()
+                        await self.to_client.put(ack)
                 else:
                     logging.warning(f"Received unexpected input from client: {data}")
+            except QueueClosed:
+                break
             except ConnectionClosedError as e:
                 logging.warning(f"Client {self.user_id} closed connection: {e}")
                 break
             except Exception as e:
                 logging.error(f"Error receiving from client {self.user_id}: {e!s}")
                 break
+        await self.to_gemini.close()
 
-    def _get_func(self, action_label: str | None) -> Callable | None:
-        """Get the tool function for a given action label."""
-        if action_label is None or action_label == "":
-            return None
-        return self.tool_functions.get(action_label)
+    async def _receive_audio_frame(self, frame: bytes) -> None:
+        """Queue a binary audio frame, ignoring it unless binary framing was agreed."""
+        if self.audio_framing != BINARY:
+            logging.warning(
+                f"Client {self.user_id} sent a binary frame without negotiating it"
+            )
+            return
+        try:
+            chunk = parse_frame(frame)
+        except FramingError as e:
+            logging.warning(f"Dropping malformed audio frame from {self.user_id}: {e}")
+            return
+        await self.to_gemini.put(chunk)
+
+    async def send_to_gemini(self) -> None:
+        """Drain the client queue into the Gemini connection."""
+        while (data := await self.to_gemini.get()) is not None:
+            if isinstance(data, AudioChunk):
+                await self.session._ws.send(self.audio_encoder.encode(data))
+            else:
+                await self.session._ws.send(json.dumps(data))
 
     async def _handle_tool_call(
         self, session: Any, tool_call: LiveServerToolCall
     ) -> None:
-        """Process tool calls from Gemini and send back responses."""
-        if tool_call.function_calls is None:
+        """Run all function calls concurrently and send back one batched response."""
+        if not tool_call.function_calls:
             logging.debug("No function calls in tool_call")
             return
 
-        for fc in tool_call.function_calls:
-            logging.debug(f"Calling tool function: {fc.name} with args: {fc.args}")
-            func = self._get_func(fc.name)
-            if func is None:
-                logging.error(f"Function {fc.name} not found")
-                continue
-            args = fc.args if fc.args is not None else {}
-
-            # Handle both async and sync functions appropriately
-            if asyncio.iscoroutinefunction(func):
-                # Function is already async
-                response = await func(**args)
-            else:
-                # Run sync function in a thread pool to avoid blocking
-                response = await asyncio.to_thread(func, **args)
-
-            tool_response = types.LiveClientToolResponse(
-                function_responses=[
-                    types.FunctionResponse(name=fc.name, id=fc.id, response=response)
-                ]
-            )
-            logging.debug(f"Tool response: {tool_response}")
-            await session.send(input=tool_response)
+        results = await self.tool_executor.run(tool_call.function_calls)
+        if not results:
+            return
+        tool_response = types.LiveClientToolResponse(
+            function_responses=[
+                types.FunctionResponse(name=r.name, id=r.id, response=r.response)
+                for r in results
+            ]
+        )
+        logging.debug(f"Tool response: {tool_response}")
+        await session.send(input=tool_response)
 
     async def receive_from_gemini(self) -> None:
         """Listen for and process messages from Gemini without blocking."""
-        while result := await self.session._ws.recv(decode=False):
+        try:
+            while result := await self.session._ws.recv(decode=False):
+                await self._route_from_gemini(result)
+        finally:
+            await self.to_client.close()
+
+    async def _route_from_gemini(self, result: bytes) -> None:
+        # Audio frames are relayed as-is; only tool call and control
+        # frames are decoded (see frame_router.py).
+        frame = route_frame(result)
+        raw_message = frame.message or {}
+        if frame.kind == TOOL_CALL:
+            message = types.LiveServerMessage.model_validate(raw_message)
+            tool_call = LiveServerToolCall.model_validate(message.tool_call)
+            # Handle the tool call in a tracked task without blocking
+            self.tool_executor.spawn(self._handle_tool_call(self.session, tool_call))
+        elif frame.kind == TOOL_CALL_CANCELLATION:
+            ids = raw_message["toolCallCancellation"].get("ids") or []
+            self.tool_executor.cancel(ids)
+        elif "goAway" in raw_message:
+            logging.warning(f"Gemini is closing the session: {raw_message['goAway']}")
+        # Tools are dispatched first so a slow browser cannot delay them.
+        await self.to_client.put(result)
+
+    async def send_to_client(self) -> None:
+        """Drain the Gemini queue into the client websocket."""
+        while (result := await self.to_client.get()) is not None:
             await self.websocket.send_bytes(result)
-            raw_message = json.loads(result)
-            if "toolCall" in raw_message:
-                message = types.LiveServerMessage.model_validate(raw_message)
-                tool_call = LiveServerToolCall.model_validate(message.tool_call)
-                # Create a separate task to handle the tool call without blocking
-                asyncio.create_task(self._handle_tool_call(self.session, tool_call))
+
+    async def close(self) -> None:
+        """Cancel tool calls still running and release the relay queues."""
+        await self.to_gemini.close()
+        await self.to_client.close()
+        await self.tool_executor.aclose()
 
 
 def get_connect_and_run_callable(websocket: WebSocket) -> Callable:
@@ -161,18 +247,21 @@ def get_connect_and_run_callable(websocket: WebSocket) -> Callable:
         backoff.expo, ConnectionClosedError, max_tries=10, on_backoff=on_backoff
     )
     async def connect_and_run() -> None:
-        async with genai_client.aio.live.connect(
-            model=MODEL_ID, config=live_connect_config
-        ) as session:
+        async with session_pool.acquire() as session:
             await websocket.send_json({"status": "Backend is ready for conversation"})
             gemini_session = GeminiSession(
                 session=session, websocket=websocket, tool_functions=tool_functions
             )
             logging.info("Starting bidirectional communication")
-            await asyncio.gather(
-                gemini_session.receive_from_client(),
-                gemini_session.receive_from_gemini(),
-            )
+            try:
+                await asyncio.gather(
+                    gemini_session.receive_from_client(),
+                    gemini_session.send_to_gemini(),
+                    gemini_session.receive_from_gemini(),
+                    gemini_session.send_to_client(),
+                )
+            finally:
+                await gemini_session.close()
 
     return connect_and_run
 
@@ -185,6 +274,12 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
     await connect_and_run()
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    """Relay queue and session pool metrics in Prometheus text format."""
+    return render_metrics() + session_pool.render_metrics()
+
+
 class Feedback(BaseModel):
     """Represents feedback for a conversation."""
 
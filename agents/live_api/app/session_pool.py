@@ -0,0 +1,261 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Warm pool of pre-established Gemini Live sessions.
+
+Opening a Live session (websocket handshake plus the setup round trip) is the
+bulk of a client's wait for "Backend is ready for conversation". The pool keeps
+sessions that have already completed setup and hands one out per connection.
+
+A Live session carries a conversation, so it is used once: the caller closes
+it and the pool opens a replacement in the background. The number of idle
+sessions kept warm adapts between LIVE_POOL_MIN_SIZE and LIVE_POOL_MAX_SIZE:
+every connection that finds the pool empty raises the target by one, and
+every session that expires unused lowers it again. A maintenance loop
+closes sessions idle for longer than LIVE_POOL_MAX_IDLE_SECONDS, pings the rest
+every LIVE_POOL_PROBE_INTERVAL_SECONDS and drops those that do not answer.
+
+When the pool is not started, or is empty, acquire() connects on demand.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any
+
+LIVE_POOL_MIN_SIZE = int(os.getenv("LIVE_POOL_MIN_SIZE", "1"))
+LIVE_POOL_MAX_SIZE = int(os.getenv("LIVE_POOL_MAX_SIZE", "4"))
+LIVE_POOL_MAX_IDLE_SECONDS = float(os.getenv("LIVE_POOL_MAX_IDLE_SECONDS", "120"))
+LIVE_POOL_PROBE_INTERVAL_SECONDS = float(
+    os.getenv("LIVE_POOL_PROBE_INTERVAL_SECONDS", "15")
+)
+LIVE_POOL_PROBE_TIMEOUT_SECONDS = float(
+    os.getenv("LIVE_POOL_PROBE_TIMEOUT_SECONDS", "5")
+)
+
+Connect = Callable[[], AbstractAsyncContextManager[Any]]
+
+
+@dataclass
+class _WarmSession:
+    context: AbstractAsyncContextManager[Any]
+    session: Any
+    created: float = field(default_factory=time.monotonic)
+
+
+def _is_open(session: Any) -> bool:
+    """Whether the session's websocket still looks open, without a round trip."""
+    ws = getattr(session, "_ws", None)
+    if ws is None:
+        return True
+    state = getattr(ws, "state", None)
+    if state is not None:
+        return getattr(state, "name", str(state)) == "OPEN"
+    return not getattr(ws, "closed", False)
+
+
+class LiveSessionPool:
+    """Keeps pre-established Live sessions ready for new connections."""
+
+    def __init__(
+        self,
+        connect: Connect,
+        min_size: int = LIVE_POOL_MIN_SIZE,
+        max_size: int = LIVE_POOL_MAX_SIZE,
+        max_idle_seconds: float = LIVE_POOL_MAX_IDLE_SECONDS,
+        probe_interval_seconds: float = LIVE_POOL_PROBE_INTERVAL_SECONDS,
+        probe_timeout_seconds: float = LIVE_POOL_PROBE_TIMEOUT_SECONDS,
+    ) -> None:
+        """Initialize the pool.
+
+        Args:
+            connect: Returns the async context manager that opens a session
+            min_size: Idle sessions always kept warm
+            max_size: Most idle sessions kept warm after bursts
+            max_idle_seconds: Idle sessions older than this are closed
+            probe_interval_seconds: Interval between health probes
+            probe_timeout_seconds: Time a probe may take before the session is dropped
+        """
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.max_idle_seconds = max_idle_seconds
+        self.probe_interval_seconds = probe_interval_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self.target = min_size
+        self.stats: dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "probe_failures": 0,
+            "connect_failures": 0,
+        }
+        self._idle: deque[_WarmSession] = deque()
+        self._connecting: set[asyncio.Task] = set()
+        self._closing: set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+        self._running = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    async def start(self) -> None:
+        """Start filling the pool and maintaining it in the background."""
+        self._running = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._maintain(), name="live-session-pool")
+
+    async def stop(self) -> None:
+        """Stop maintenance and close every idle session."""
+        # The flag also ends the loop if a wait_for() swallows the cancellation.
+        self._running = False
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        for pending in list(self._connecting):
+            pending.cancel()
+        await asyncio.gather(*self._connecting, return_exceptions=True)
+        while self._idle:
+            await self._close(self._idle.pop().context)
+
+    def _take(self) -> _WarmSession | None:
+        # Newest first: it has the most time left before idle expiry.
+        while self._idle:
+            warm = self._idle.pop()
+            if _is_open(warm.session):
+                return warm
+            self.stats["probe_failures"] += 1
+            closing = asyncio.create_task(self._close(warm.context))
+            self._closing.add(closing)
+            closing.add_done_callback(self._closing.discard)
+        return None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """A ready session, warm if one is available; closed when the block exits."""
+        warm = self._take() if self._task is not None else None
+        if warm is not None:
+            self.stats["hits"] += 1
+            context, session = warm.context, warm.session
+        else:
+            if self._task is not None:
+                self.stats["misses"] += 1
+                self.target = min(self.target + 1, self.max_size)
+            context = self.connect()
+            session = await context.__aenter__()
+        self._wake.set()
+        try:
+            yield session
+        except BaseException as e:
+            await context.__aexit__(type(e), e, e.__traceback__)
+            raise
+        else:
+            await context.__aexit__(None, None, None)
+
+    async def _close(self, context: AbstractAsyncContextManager[Any]) -> None:
+        try:
+            await context.__aexit__(None, None, None)
+        except Exception as e:
+            logging.debug(f"Error closing pooled live session: {e!r}")
+
+    async def _open_one(self) -> None:
+        context = self.connect()
+        try:
+            session = await context.__aenter__()
+        except Exception as e:
+            self.stats["connect_failures"] += 1
+            logging.warning(f"Could not pre-establish a live session: {e!r}")
+            # Back off before the next attempt instead of retrying in a tight loop.
+            await asyncio.sleep(min(self.probe_interval_seconds, 5))
+            return
+        self._idle.append(_WarmSession(context, session))
+
+    def _fill(self) -> None:
+        missing = self.target - len(self._idle) - len(self._connecting)
+        for _ in range(max(0, missing)):
+            task = asyncio.create_task(self._open_one())
+            self._connecting.add(task)
+            task.add_done_callback(self._connected)
+
+    def _connected(self, task: asyncio.Task) -> None:
+        self._connecting.discard(task)
+        self._wake.set()
+
+    async def _probe(self, warm: _WarmSession) -> bool:
+        ws = getattr(warm.session, "_ws", None)
+        if not _is_open(warm.session):
+            return False
+        if ws is None or not hasattr(ws, "ping"):
+            return True
+        try:
+            pong = await ws.ping()
+            await asyncio.wait_for(pong, self.probe_timeout_seconds)
+        except Exception:
+            return False
+        return True
+
+    async def _check(self) -> None:
+        now = time.monotonic()
+        for warm in list(self._idle):
+            expired = now - warm.created > self.max_idle_seconds
+            if not expired and await self._probe(warm):
+                continue
+            if warm not in self._idle:
+                continue  # Handed out while it was being probed.
+            self._idle.remove(warm)
+            if expired:
+                self.stats["expired"] += 1
+                self.target = max(self.target - 1, self.min_size)
+            else:
+                self.stats["probe_failures"] += 1
+            await self._close(warm.context)
+
+    async def _maintain(self) -> None:
+        next_check = time.monotonic() + self.probe_interval_seconds
+        while self._running:
+            self._fill()
+            timeout = max(0.0, next_check - time.monotonic())
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            self._wake.clear()
+            if time.monotonic() >= next_check:
+                try:
+                    await self._check()
+                except Exception as e:
+                    logging.warning(f"Live session pool check failed: {e!r}")
+                next_check = time.monotonic() + self.probe_interval_seconds
+
+    def render_metrics(self) -> str:
+        """Pool size and hit/miss counters in Prometheus text format."""
+        lines = [
+            "# HELP live_pool_idle_sessions Warm sessions ready to hand out.",
+            "# TYPE live_pool_idle_sessions gauge",
+            f"live_pool_idle_sessions {len(self._idle)}",
+            "# HELP live_pool_target_sessions Warm sessions the pool aims to keep.",
+            "# TYPE live_pool_target_sessions gauge",
+            f"live_pool_target_sessions {self.target}",
+        ]
+        for name, value in self.stats.items():
+            metric = f"live_pool_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
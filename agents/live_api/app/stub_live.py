@@ -0,0 +1,143 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local stand-in for the Gemini Live endpoint, for offline benchmarks.
+
+StubLiveEndpoint.connect() mirrors genai_client.aio.live.connect(): entering
+the returned context manager takes the configured setup latency (handshake
+plus setup round trip), and the yielded session exposes the parts of the
+real session the server uses: _ws.send / _ws.recv(decode=False) / _ws.ping
+and send(input=...). Each audio chunk sent is answered with one model audio
+frame, and turnComplete ends the turn.
+"""
+
+import asyncio
+import json
+import random
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import Any
+
+
+class State(Enum):
+    """Connection state, named like the websockets library's."""
+
+    OPEN = 1
+    CLOSED = 3
+
+
+class StubLiveConnection:
+    """The websocket half of a stub session."""
+
+    def __init__(self, rtt_seconds: float) -> None:
+        self.rtt_seconds = rtt_seconds
+        self.state = State.OPEN
+        self.sent: list[str] = []
+        self._frames: asyncio.Queue[bytes | None] = asyncio.Queue()
+
+    async def send(self, data: str) -> None:
+        self.sent.append(data)
+        message = json.loads(data)
+        for chunk in message.get("realtimeInput", {}).get("mediaChunks", []):
+            reply = {
+                "serverContent": {
+                    "modelTurn": {
+                        "parts": [
+                            {
+                                "inlineData": {
+                                    "mimeType": "audio/pcm;rate=24000",
+                                    "data": chunk.get("data", ""),
+                                }
+                            }
+                        ]
+                    }
+                }
+            }
+            self._frames.put_nowait(json.dumps(reply).encode())
+        if message.get("clientContent", {}).get("turnComplete"):
+            done = {"serverContent": {"turnComplete": True}}
+            self._frames.put_nowait(json.dumps(done).encode())
+
+    async def recv(self, decode: bool = True) -> bytes | str | None:
+        frame = await self._frames.get()
+        if frame is None or decode is False:
+            return frame
+        return frame.decode()
+
+    async def ping(self) -> "asyncio.Future[float]":
+        pong: asyncio.Future[float] = asyncio.get_running_loop().create_future()
+
+        def answer() -> None:
+            if not pong.done():
+                pong.set_result(self.rtt_seconds)
+
+        if self.state is State.OPEN:
+            asyncio.get_running_loop().call_later(self.rtt_seconds, answer)
+        return pong
+
+    def close(self) -> None:
+        self.state = State.CLOSED
+        self._frames.put_nowait(None)
+
+
+class StubLiveSession:
+    """The session object yielded by StubLiveEndpoint.connect()."""
+
+    def __init__(self, rtt_seconds: float) -> None:
+        self._ws = StubLiveConnection(rtt_seconds)
+        self.tool_responses: list[Any] = []
+
+    async def send(self, input: Any) -> None:
+        self.tool_responses.append(input)
+
+
+class StubLiveEndpoint:
+    """Opens stub sessions with a configurable setup latency."""
+
+    def __init__(
+        self,
+        setup_ms: float = 400.0,
+        jitter_ms: float = 100.0,
+        rtt_ms: float = 20.0,
+        seed: int | None = None,
+    ) -> None:
+        """Initialize the endpoint.
+
+        Args:
+            setup_ms: Mean time to open a session and complete setup
+            jitter_ms: Standard deviation of the setup time
+            rtt_ms: Round trip time answered by ping()
+            seed: Seed for the setup time jitter
+        """
+        self.setup_ms = setup_ms
+        self.jitter_ms = jitter_ms
+        self.rtt_ms = rtt_ms
+        self.opened = 0
+        self.open_sessions = 0
+        self._rng = random.Random(seed)
+
+    @asynccontextmanager
+    async def connect(self, **_: Any) -> AsyncIterator[StubLiveSession]:
+        """Stand-in for genai_client.aio.live.connect(model=..., config=...)."""
+        delay = max(0.0, self._rng.gauss(self.setup_ms, self.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        session = StubLiveSession(self.rtt_ms / 1000)
+        self.opened += 1
+        self.open_sessions += 1
+        try:
+            yield session
+        finally:
+            session._ws.close()
+            self.open_sessions -= 1
@@ -0,0 +1,150 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-session execution of Live API tool calls.
+
+All function calls of a tool call message run concurrently, bounded by a
+per-session concurrency cap, each under its own timeout, so a multi-tool turn
+takes as long as its slowest tool rather than the sum of all of them. Tasks are
+tracked so the model can cancel individual calls (toolCallCancellation) and a
+disconnect cancels everything still running.
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import Callable, Coroutine, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "8"))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "30"))
+
+
+@dataclass
+class ToolResult:
+    """Outcome of one function call, ready to become a FunctionResponse."""
+
+    name: str
+    id: str | None
+    response: dict[str, Any]
+
+
+class ToolExecutor:
+    """Runs tool calls for one Live API session."""
+
+    def __init__(
+        self,
+        tool_functions: dict[str, Callable],
+        max_concurrency: int = TOOL_MAX_CONCURRENCY,
+        timeout: float | None = TOOL_TIMEOUT_SECONDS,
+        timeouts: dict[str, float] | None = None,
+    ) -> None:
+        """Initialize the executor.
+
+        Args:
+            tool_functions: Dictionary of available tool functions
+            max_concurrency: Maximum number of tool calls running at once
+            timeout: Default timeout per call in seconds, None for no timeout
+            timeouts: Per-tool timeouts overriding the default
+        """
+        self.tool_functions = tool_functions
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._calls: dict[str, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def timeout_for(self, name: str) -> float | None:
+        """Timeout in seconds for the named tool."""
+        return self.timeouts.get(name, self.timeout)
+
+    async def _call(self, name: str, args: dict[str, Any]) -> dict[str, Any]:
+        func = self.tool_functions.get(name) if name else None
+        if func is None:
+            logging.error(f"Function {name} not found")
+            return {"error": f"Function {name} not found"}
+
+        timeout = self.timeout_for(name)
+        async with self._semaphore:
+            logging.debug(f"Calling tool function: {name} with args: {args}")
+            # Sync functions run in a thread pool to avoid blocking the loop. A
+            # thread cannot be interrupted, so on timeout it finishes in the
+            # background and its result is discarded.
+            if asyncio.iscoroutinefunction(func):
+                pending = func(**args)
+            else:
+                pending = asyncio.to_thread(func, **args)
+            try:
+                result = await asyncio.wait_for(pending, timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"Tool function {name} timed out after {timeout}s")
+                return {"error": f"{name} timed out after {timeout} seconds"}
+            except Exception as e:
+                logging.exception(f"Tool function {name} failed")
+                return {"error": f"{type(e).__name__}: {e}"}
+        return result if isinstance(result, dict) else {"output": result}
+
+    async def run(self, function_calls: Iterable[Any]) -> list[ToolResult]:
+        """Run function calls concurrently; calls cancelled by id are left out."""
+        calls = [
+            (fc, asyncio.ensure_future(self._call(fc.name, fc.args or {})))
+            for fc in function_calls
+        ]
+        if not calls:
+            return []
+        for fc, task in calls:
+            if fc.id:
+                self._calls[fc.id] = task
+        try:
+            await asyncio.wait([task for _, task in calls])
+        except asyncio.CancelledError:
+            for _, task in calls:
+                task.cancel()
+            raise
+        finally:
+            for fc, _ in calls:
+                self._calls.pop(fc.id, None)
+        return [
+            ToolResult(name=fc.name, id=fc.id, response=task.result())
+            for fc, task in calls
+            if not task.cancelled()
+        ]
+
+    def spawn(self, coro: Coroutine[Any, Any, None]) -> asyncio.Task:
+        """Run coro as a tracked background task, cancelled by aclose()."""
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Tool call task failed: {task.exception()!r}")
+
+    def cancel(self, ids: Iterable[str]) -> None:
+        """Cancel running calls by function call id."""
+        for call_id in ids:
+            task = self._calls.get(call_id)
+            if task is not None:
+                logging.info(f"Cancelling tool call {call_id}")
+                task.cancel()
+
+    async def aclose(self) -> None:
+        """Cancel every tracked task and wait for them to finish."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Micro-benchmark: microphone chunks handled per second, JSON vs binary framing.
+
+The JSON path is what the server does for a JSON client: decode the
+realtimeInput text message and re-encode it for Gemini. The binary path parses
+a binary frame and encodes it with RealtimeInputEncoder. Wire size is what the
+client sends per chunk.
+
+    PYTHONPATH=. python tests/load_test/bench_audio_framing.py --chunk-ms 20
+"""
+
+import argparse
+import base64
+import json
+import os
+import time
+from collections.abc import Callable
+from typing import TypeVar
+
+from app.audio_framing import RealtimeInputEncoder, encode_frame, parse_frame
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2
+
+
+Frame = TypeVar("Frame")
+
+
+def _measure(handle: Callable[[Frame], object], frames: list[Frame]) -> float:
+    start = time.process_time()
+    for frame in frames:
+        handle(frame)
+    return len(frames) / (time.process_time() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--frames", type=int, default=50_000)
+    parser.add_argument("--chunk-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    pcm = os.urandom(SAMPLE_RATE * BYTES_PER_SAMPLE * args.chunk_ms // 1000)
+    text = json.dumps(
+        {
+            "realtimeInput": {
+                "mediaChunks": [
+                    {
+                        "mimeType": f"audio/pcm;rate={SAMPLE_RATE}",
+                        "data": base64.b64encode(pcm).decode(),
+                    }
+                ]
+            }
+        }
+    )
+    binary = encode_frame(pcm, SAMPLE_RATE)
+    encoder = RealtimeInputEncoder()
+
+    json_rate = _measure(lambda f: json.dumps(json.loads(f)), [text] * args.frames)
+    binary_rate = _measure(
+        lambda f: encoder.encode(parse_frame(f)), [binary] * args.frames
+    )
+    print(f"chunk={args.chunk_ms} ms PCM={len(pcm)} B")
+    print(f"json    wire={len(text.encode()):6} B  {json_rate:12,.0f} chunks/s/core")
+    print(
+        f"binary  wire={len(binary):6} B  {binary_rate:12,.0f} chunks/s/core"
+        f"  ({binary_rate / json_rate:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
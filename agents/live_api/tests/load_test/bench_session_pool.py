@@ -0,0 +1,94 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark: time-to-ready with and without the warm Live session pool.
+
+Connections arrive as a Poisson process against the local stub Live endpoint
+(app.stub_live), each holds its session for a conversation, and the time from
+arrival until a session is ready is recorded. Runs offline; no API key needed.
+
+    PYTHONPATH=. python tests/load_test/bench_session_pool.py --rate 4 --setup-ms 400
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.session_pool import LiveSessionPool
+from app.stub_live import StubLiveEndpoint
+
+
+async def _run(args: argparse.Namespace, pooled: bool) -> tuple[list[float], str]:
+    endpoint = StubLiveEndpoint(args.setup_ms, args.jitter_ms, seed=args.seed)
+    pool = LiveSessionPool(
+        endpoint.connect, min_size=args.min_size, max_size=args.max_size
+    )
+    if pooled:
+        await pool.start()
+        await asyncio.sleep(args.setup_ms * 3 / 1000)
+
+    rng = random.Random(args.seed)
+    ready: list[float] = []
+
+    async def connection() -> None:
+        arrived = time.perf_counter()
+        async with pool.acquire():
+            ready.append((time.perf_counter() - arrived) * 1000)
+            await asyncio.sleep(rng.expovariate(1 / args.hold_s))
+
+    tasks = []
+    for _ in range(args.connections):
+        tasks.append(asyncio.create_task(connection()))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    await pool.stop()
+    summary = f"hits={pool.stats['hits']} misses={pool.stats['misses']}"
+    return ready, summary
+
+
+def _report(label: str, ready: list[float], summary: str) -> None:
+    ready.sort()
+    p95 = ready[int(0.95 * (len(ready) - 1))]
+    print(
+        f"{label:7} p50={statistics.median(ready):7.1f} ms  p95={p95:7.1f} ms  "
+        f"max={ready[-1]:7.1f} ms  {summary}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=4.0, help="arrivals per second")
+    parser.add_argument("--hold-s", type=float, default=1.0, help="mean session length")
+    parser.add_argument("--setup-ms", type=float, default=400.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--min-size", type=int, default=1)
+    parser.add_argument("--max-size", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(
+        f"connections={args.connections} rate={args.rate}/s "
+        f"setup={args.setup_ms:.0f}±{args.jitter_ms:.0f} ms"
+    )
+    for label, pooled in (("cold", False), ("pooled", True)):
+        _report(label, *asyncio.run(_run(args, pooled)))
+
+
+if __name__ == "__main__":
+    main()
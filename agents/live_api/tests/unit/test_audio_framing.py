@@ -0,0 +1,93 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import json
+
+import pytest
+
+from app.audio_framing import (
+    BINARY,
+    JSON,
+    FramingError,
+    RealtimeInputEncoder,
+    encode_frame,
+    negotiate,
+    parse_frame,
+)
+from app.relay import client_to_gemini_queue
+
+
+def test_binary_frame_becomes_the_same_message_as_json_input() -> None:
+    """Test that a binary audio frame encodes to the realtimeInput a JSON client sends."""
+    pcm = bytes(range(256)) * 5
+    encoder = RealtimeInputEncoder(capacity=16)
+    for _ in range(2):
+        message = json.loads(encoder.encode(parse_frame(encode_frame(pcm, 16000))))
+        assert message == {
+            "realtimeInput": {
+                "mediaChunks": [
+                    {
+                        "mimeType": "audio/pcm;rate=16000",
+                        "data": base64.b64encode(pcm).decode(),
+                    }
+                ]
+            }
+        }
+    short = json.loads(encoder.encode(parse_frame(encode_frame(b"\x01\x00", 24000))))
+    assert short["realtimeInput"]["mediaChunks"][0] == {
+        "mimeType": "audio/pcm;rate=24000",
+        "data": "AQA=",
+    }
+
+
+@pytest.mark.parametrize(
+    "frame",
+    [
+        b"\x01\x01\x80\x3e",  # header only
+        b"\x02\x01\x80\x3e\x00\x00",  # unknown version
+        b"\x01\x07\x80\x3e\x00\x00",  # unknown kind
+        b"\x01\x01\x00\x00\x00\x00",  # zero sample rate
+        b"\x01\x01\x80\x3e\x00",  # odd PCM length
+    ],
+)
+def test_malformed_frames_are_rejected(frame: bytes) -> None:
+    """Test that frames breaking the protocol raise FramingError."""
+    with pytest.raises(FramingError):
+        parse_frame(frame)
+
+
+def test_negotiation() -> None:
+    """Test that only clients asking for binary framing get it."""
+    assert negotiate({"run_id": "r", "user_id": "u"}) is None
+    assert negotiate({"audio_framing": "binary"}) == BINARY
+    assert negotiate({"audio_framing": "opus"}) == JSON
+
+
+@pytest.mark.asyncio
+async def test_queued_binary_chunks_are_coalesced_as_pcm() -> None:
+    """Test that queued binary chunks merge by sample rate and never with JSON input."""
+    queue = client_to_gemini_queue()
+    for pcm in (b"\x01\x00", b"\x02\x00"):
+        await queue.put(parse_frame(encode_frame(pcm, 16000)))
+    await queue.put(parse_frame(encode_frame(b"\x03\x00", 24000)))
+    await queue.put(
+        {"realtimeInput": {"mediaChunks": [{"mimeType": "audio/pcm", "data": "BAA="}]}}
+    )
+
+    first = await queue.get()
+    assert (first.sample_rate, bytes(first.pcm)) == (16000, b"\x01\x00\x02\x00")
+    assert (await queue.get()).sample_rate == 24000
+    assert "realtimeInput" in await queue.get()
+    assert len(queue) == 0 and queue.bytes == 0
@@ -0,0 +1,90 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import json
+
+from app.frame_router import (
+    CONTROL,
+    FORWARD,
+    TOOL_CALL,
+    TOOL_CALL_CANCELLATION,
+    first_key,
+    route_frame,
+)
+
+
+def _audio_frame() -> bytes:
+    chunk = base64.b64encode(bytes(4800)).decode()
+    return json.dumps(
+        {
+            "serverContent": {
+                "modelTurn": {
+                    "parts": [{"inlineData": {"mimeType": "audio/pcm", "data": chunk}}]
+                }
+            }
+        }
+    ).encode()
+
+
+def test_audio_frames_are_forwarded_without_decoding() -> None:
+    """Test that serverContent frames are classified from the prefix alone."""
+    frame = _audio_frame()
+    assert first_key(frame) == "serverContent"
+    # A frame truncated after the key still routes: the body is never parsed.
+    routed = route_frame(frame[:40])
+    assert routed.kind == FORWARD
+    assert routed.message is None
+
+
+def test_tool_call_and_control_frames_are_decoded() -> None:
+    """Test that tool call, cancellation and control frames are fully parsed."""
+    tool_call = {"toolCall": {"functionCalls": [{"name": "get_weather", "id": "1"}]}}
+    routed = route_frame(json.dumps(tool_call, indent=2).encode())
+    assert routed.kind == TOOL_CALL
+    assert routed.message == tool_call
+
+    cancellation = route_frame(b'{"toolCallCancellation": {"ids": ["1"]}}')
+    assert cancellation.kind == TOOL_CALL_CANCELLATION
+
+    go_away = route_frame('{"goAway": {"timeLeft": "10s"}}')
+    assert go_away.kind == CONTROL
+    assert go_away.message == {"goAway": {"timeLeft": "10s"}}
+
+
+def test_unrecognized_prefix_falls_back_to_full_parse() -> None:
+    """Test that frames with an unknown or unreadable first key are parsed."""
+    padded = b" " * 100 + b'{"toolCall": {"functionCalls": []}}'
+    assert first_key(padded) is None
+    assert route_frame(padded).kind == TOOL_CALL
+
+    unknown_first = b'{"newField": 1, "toolCall": {"functionCalls": []}}'
+    assert route_frame(unknown_first).kind == TOOL_CALL
+    assert route_frame(b'{"newField": 1}').kind == CONTROL
+
+
+def test_usage_metadata_first_does_not_hide_a_tool_call() -> None:
+    """Test that a leading usageMetadata field is not taken as the message type."""
+    frame = {
+        "usageMetadata": {"totalTokenCount": 12},
+        "toolCall": {"functionCalls": [{"name": "get_weather", "id": "1"}]},
+    }
+    routed = route_frame(json.dumps(frame).encode())
+    assert routed.kind == TOOL_CALL
+    assert routed.message == frame
+
+    usage_only = route_frame(b'{"usageMetadata": {"totalTokenCount": 12}}')
+    assert usage_only.kind == CONTROL
+    setup = route_frame(b'{"setupComplete": {}, "toolCallCancellation": {"ids": []}}')
+    assert setup.kind == TOOL_CALL_CANCELLATION
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+
+import pytest
+
+from app.relay import (
+    RelayQueue,
+    client_to_gemini_queue,
+    gemini_to_client_queue,
+    render_metrics,
+)
+
+
+def _mic(data: str, mime_type: str = "audio/pcm;rate=16000") -> dict:
+    return {"realtimeInput": {"mediaChunks": [{"mimeType": mime_type, "data": data}]}}
+
+
+def _audio_out(data: str) -> bytes:
+    part = {"inlineData": {"mimeType": "audio/pcm;rate=24000", "data": data}}
+    return json.dumps({"serverContent": {"modelTurn": {"parts": [part]}}}).encode()
+
+
+@pytest.mark.asyncio
+async def test_queued_microphone_chunks_are_coalesced() -> None:
+    """Test that audio chunks arriving while one is queued merge into one message."""
+    queue = client_to_gemini_queue()
+    for data in ("a", "b", "c"):
+        await queue.put(_mic(data))
+    await queue.put(_mic("frame", mime_type="image/jpeg"))
+    await queue.put({"clientContent": {"turnComplete": True}})
+
+    first = await queue.get()
+    chunks = first["realtimeInput"]["mediaChunks"]
+    assert [chunk["data"] for chunk in chunks] == ["a", "b", "c"]
+    assert (await queue.get())["realtimeInput"]["mediaChunks"][0]["data"] == "frame"
+    assert "clientContent" in await queue.get()
+    assert len(queue) == 0 and queue.bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_stale_audio_is_dropped_but_control_frames_are_kept() -> None:
+    """Test that the oldest audio is dropped under pressure and control frames survive."""
+    queue = gemini_to_client_queue(max_items=4, max_bytes=10_000)
+    await queue.put(b'{"setupComplete": {}}')
+    for index in range(10):
+        await queue.put(_audio_out(str(index) * 1000))
+    await queue.put(b'{"toolCall": {"functionCalls": []}}')
+
+    frames = []
+    await queue.close()
+    while (frame := await queue.get()) is not None:
+        frames.append(frame)
+    assert frames[0] == b'{"setupComplete": {}}'
+    assert frames[-1] == b'{"toolCall": {"functionCalls": []}}'
+    # Only the newest audio is left.
+    parts = [json.loads(f)["serverContent"]["modelTurn"]["parts"] for f in frames[1:-1]]
+    assert [p[0]["inlineData"]["data"][0] for p in parts] == ["8", "9"]
+    assert 'relay_frames_dropped_total{direction="to_client"}' in render_metrics()
+
+
+@pytest.mark.asyncio
+async def test_control_frames_wait_for_room() -> None:
+    """Test that put() blocks on a queue full of undroppable frames until the sender drains it."""
+    queue = RelayQueue("test", 2, 1_000, size_of=len, is_droppable=lambda _: False)
+    await queue.put(b"one")
+    await queue.put(b"two")
+    blocked = asyncio.ensure_future(queue.put(b"three"))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    assert await queue.get() == b"one"
+    await asyncio.wait_for(blocked, 1)
+    assert len(queue) == 2 and queue.high_water == 2
@@ -0,0 +1,115 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from collections.abc import Callable
+
+import pytest
+
+from app.session_pool import LiveSessionPool
+from app.stub_live import State, StubLiveEndpoint
+
+
+async def _wait_for(condition: Callable[[], bool], timeout: float = 1.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_warm_session_is_handed_out_and_replaced() -> None:
+    """Test that acquire() returns a pre-established session and the pool refills."""
+    endpoint = StubLiveEndpoint(setup_ms=50, jitter_ms=0)
+    pool = LiveSessionPool(endpoint.connect, min_size=1, max_size=2)
+    await pool.start()
+    await _wait_for(lambda: pool.idle == 1)
+
+    start = time.monotonic()
+    async with pool.acquire() as session:
+        assert time.monotonic() - start < 0.02
+        assert session._ws.state is State.OPEN
+    assert session._ws.state is State.CLOSED
+    assert pool.stats["hits"] == 1 and pool.stats["misses"] == 0
+
+    await _wait_for(lambda: pool.idle == 1)
+    assert endpoint.opened == 2
+    await pool.stop()
+    assert endpoint.open_sessions == 0
+
+
+@pytest.mark.asyncio
+async def test_misses_grow_the_pool_and_expiry_shrinks_it() -> None:
+    """Test that an empty pool raises its target up to max and idle expiry lowers it."""
+    endpoint = StubLiveEndpoint(setup_ms=30, jitter_ms=0)
+    pool = LiveSessionPool(
+        endpoint.connect,
+        min_size=1,
+        max_size=2,
+        max_idle_seconds=0.2,
+        probe_interval_seconds=0.05,
+    )
+    await pool.start()
+    # Three connections arrive before the first warm session is ready.
+
+    async def connection() -> None:
+        async with pool.acquire():
+            pass
+
+    await asyncio.gather(connection(), connection(), connection())
+    assert pool.stats["misses"] == 3
+    assert pool.target == 2
+    await _wait_for(lambda: pool.idle == 2)
+
+    await _wait_for(lambda: pool.stats["expired"] >= 1)
+    assert pool.target == 1
+    await pool.stop()
+    assert endpoint.open_sessions == 0
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_sessions_are_dropped() -> None:
+    """Test that closed or unresponsive sessions are never handed out."""
+    endpoint = StubLiveEndpoint(setup_ms=10, jitter_ms=0, rtt_ms=500)
+    pool = LiveSessionPool(
+        endpoint.connect,
+        min_size=1,
+        max_size=1,
+        probe_interval_seconds=0.05,
+        probe_timeout_seconds=0.05,
+    )
+    await pool.start()
+    await _wait_for(lambda: pool.stats["probe_failures"] >= 1)
+
+    endpoint.rtt_ms = 0
+    await _wait_for(lambda: pool.idle == 1)
+    pool._idle[-1].session._ws.close()
+    async with pool.acquire() as session:
+        assert session._ws.state is State.OPEN
+    assert pool.stats["probe_failures"] >= 2
+    await pool.stop()
+    assert endpoint.open_sessions == 0
+
+
+@pytest.mark.asyncio
+async def test_acquire_without_start_connects_on_demand() -> None:
+    """Test that an unstarted pool opens a session per acquire() and keeps none."""
+    endpoint = StubLiveEndpoint(setup_ms=10, jitter_ms=0)
+    pool = LiveSessionPool(endpoint.connect)
+    async with pool.acquire() as session:
+        assert session._ws.state is State.OPEN
+    assert pool.idle == 0 and endpoint.open_sessions == 0
+    assert pool.stats["misses"] == 0
+    assert "live_pool_idle_sessions 0" in pool.render_metrics()
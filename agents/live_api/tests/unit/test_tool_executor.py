@@ -0,0 +1,106 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.tool_executor import ToolExecutor
+
+
+def _call(name: str, call_id: str, **args: object) -> SimpleNamespace:
+    return SimpleNamespace(name=name, id=call_id, args=args)
+
+
+async def _slow(delay: float) -> dict:
+    await asyncio.sleep(delay)
+    return {"delay": delay}
+
+
+def _sync_tool(value: int) -> int:
+    return value * 2
+
+
+@pytest.mark.asyncio
+async def test_calls_run_concurrently_and_keep_order() -> None:
+    """Test that a multi-tool turn costs the slowest call, not the sum."""
+    executor = ToolExecutor({"slow": _slow, "sync": _sync_tool})
+    calls = [_call("slow", f"c{i}", delay=0.2) for i in range(4)]
+    calls.append(_call("sync", "s", value=21))
+
+    start = time.perf_counter()
+    results = await executor.run(calls)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.6
+    assert [r.id for r in results] == ["c0", "c1", "c2", "c3", "s"]
+    assert results[-1].response == {"output": 42}
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_timeouts_and_errors() -> None:
+    """Test the concurrency cap, per-tool timeouts and error results."""
+    running = 0
+    peak = 0
+
+    async def tracked() -> dict:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return {}
+
+    def broken() -> dict:
+        raise ValueError("bad input")
+
+    executor = ToolExecutor(
+        {"tracked": tracked, "slow": _slow, "broken": broken},
+        max_concurrency=2,
+        timeouts={"slow": 0.05},
+    )
+    calls = [_call("tracked", f"t{i}") for i in range(6)]
+    calls += [
+        _call("slow", "slow", delay=1),
+        _call("broken", "b"),
+        _call("missing", "m"),
+    ]
+    results = {r.id: r.response for r in await executor.run(calls)}
+
+    assert peak == 2
+    assert "timed out" in results["slow"]["error"]
+    assert results["b"] == {"error": "ValueError: bad input"}
+    assert results["m"] == {"error": "Function missing not found"}
+
+
+@pytest.mark.asyncio
+async def test_cancel_by_id_and_on_close() -> None:
+    """Test that cancelled calls are dropped and aclose cancels tracked tasks."""
+    executor = ToolExecutor({"slow": _slow})
+    run = asyncio.ensure_future(
+        executor.run(
+            [_call("slow", "keep", delay=0.05), _call("slow", "drop", delay=5)]
+        )
+    )
+    await asyncio.sleep(0.01)
+    executor.cancel(["drop"])
+    results = await run
+    assert [r.id for r in results] == ["keep"]
+
+    task = executor.spawn(executor.run([_call("slow", "long", delay=5)]))
+    await asyncio.sleep(0.01)
+    await executor.aclose()
+    assert task.cancelled()
@@ -1,24 +1,15 @@
 # tools.py for HomeownerAgent
 import os
 import uuid
-from supabase import create_client, Client as SupabaseClient
 from google.adk.tools import ToolContext
 import base64
 import re # Import re for regex operations
 from typing import Optional, List, Callable
 
-# Initialize Supabase client (similar to agent.py, consider refactoring to a shared client later)
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY") # For storage, service_role key might be needed for more privileged operations
-supabase_client: SupabaseClient | None = None
-if SUPABASE_URL and SUPABASE_ANON_KEY:
-    try:
-        supabase_client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-        print(f"[{__file__}] Supabase client initialized for tools.", flush=True)
-    except Exception as e:
-        print(f"[{__file__}] Error initializing Supabase client for tools: {e}", flush=True)
-else:
-    print(f"[{__file__}] SUPABASE_URL or SUPABASE_ANON_KEY not found. Supabase tools may fail.", flush=True)
+from src.db.supabase_client import get_supabase_client
+from src.tools.image_dedup import ImageUploadError, get_image_deduplicator
+
+# Supabase client is shared with the other tools (src/db/supabase_client.py).
 
 IMAGE_BUCKET_NAME = "project_images"
 
@@ -51,13 +42,14 @@ async def upload_image_to_supabase(
 ) -> str:
     """
     Uploads an image to Supabase Storage in the 'project_images' bucket and returns its public URL.
-    The image will be named using the current_project_scope_id if available, or a new UUID.
+    The image is stored under the SHA-256 of its bytes, so repeat uploads are skipped.
     The file extension is derived from the mime_type.
     Arguments:
         image_base64: The base64 encoded string of the image to upload.
         mime_type: The MIME type of the image (e.g., 'image/jpeg', 'image/png').
     """
     print(f"[Tool: upload_image_to_supabase] Attempting to upload image with mime_type: {mime_type}...", flush=True)
+    supabase_client = await get_supabase_client()
     if not supabase_client:
         msg = "Supabase client not initialized. Cannot upload image."
         print(f"[Tool: upload_image_to_supabase] {msg}", flush=True)
@@ -69,15 +61,6 @@ async def upload_image_to_supabase(
         print(f"[Tool: upload_image_to_supabase] {error_message}", flush=True)
         return f"Error: {error_message}"
 
-    project_scope_id = tool_context.state.get('current_project_scope_id')
-    if project_scope_id:
-        file_name = f"{project_scope_id}.{file_extension}"
-    else:
-        # If no project scope ID yet, generate a unique name (e.g., if image is uploaded before title)
-        file_name = f"{uuid.uuid4()}.{file_extension}"
-    
-    file_path_in_bucket = f"{file_name}" # Can add subdirectories like public/{file_name} if desired
-
     try:
         # Pre-process the base64 string
         processed_base64 = _strip_base64_prefix(image_base64)
@@ -91,35 +74,22 @@ async def upload_image_to_supabase(
             print(f"[Tool: upload_image_to_supabase] {error_message}", flush=True)
             return f"Error: {error_message}"
 
-        # Simplistic approach: write bytes to a temporary file then upload
-        # This is a common workaround if the library expects a file path.
-        temp_file_path = f"temp_image_for_upload_{uuid.uuid4()}.{file_extension}"
-        with open(temp_file_path, 'wb') as f:
-            f.write(image_bytes)
-
-        print(f"[Tool: upload_image_to_supabase] Uploading {temp_file_path} to bucket {IMAGE_BUCKET_NAME} as {file_path_in_bucket}", flush=True)
-        response = supabase_client.storage.from_(IMAGE_BUCKET_NAME).upload(
-            path=file_path_in_bucket,
-            file=temp_file_path, # Path to the temporary file
-            file_options={"cache-control": "3600", "upsert": "true"} # Upsert to overwrite if same name
-        )
-        os.remove(temp_file_path) # Clean up temporary file
-
-        if response.status_code == 200:
-            # Get public URL
-            public_url_response = supabase_client.storage.from_(IMAGE_BUCKET_NAME).get_public_url(file_path_in_bucket)
-            image_db_url = public_url_response
-            print(f"[Tool: upload_image_to_supabase] Upload successful. Public URL: {image_db_url}", flush=True)
-            
-            # Save this URL to the project_scopes table using submit_scope_fact
-            # This assumes submit_scope_fact is available in this context or we call it from the agent
-            # For now, let's return the URL and let the agent handle saving it via submit_scope_fact.
-            return image_db_url
-        else:
-            error_message = f"Error uploading image: {response.json() if hasattr(response, 'json') else response.text}"
+        # Stored under the SHA-256 of the bytes; a photo that was already
+        # uploaded is answered from the dedup index without a transfer.
+        print(f"[Tool: upload_image_to_supabase] Uploading {len(image_bytes)} bytes to bucket {IMAGE_BUCKET_NAME}", flush=True)
+        try:
+            image_db_url, reused = await get_image_deduplicator().upload(
+                supabase_client, IMAGE_BUCKET_NAME, image_bytes, mime_type, file_extension
+            )
+        except ImageUploadError as e:
+            error_message = f"Error uploading image: {e}"
             print(f"[Tool: upload_image_to_supabase] {error_message}", flush=True)
             return f"Error: {error_message}"
 
+        print(f"[Tool: upload_image_to_supabase] {'Already stored' if reused else 'Upload successful'}. Public URL: {image_db_url}", flush=True)
+        # The agent saves this URL to the project scope via submit_scope_fact.
+        return image_db_url
+
     except Exception as e:
         error_message = f"An unexpected error occurred during image upload: {e}"
         print(f"[Tool: upload_image_to_supabase] {error_message}", flush=True)
@@ -144,6 +114,7 @@ async def submit_scope_fact(
         project_scope_id: Optional. The ID of the project scope to update. If None, uses current_project_scope_id from state or creates a new one.
     """
     print(f"[Tool: submit_scope_fact] Called with fact_name: {fact_name}, fact_value: {fact_value}, project_scope_id: {project_scope_id}", flush=True)
+    supabase_client = await get_supabase_client()
     if not supabase_client:
         msg = "Supabase client not initialized. Cannot submit fact."
         print(f"[Tool: submit_scope_fact] {msg}", flush=True)
@@ -184,7 +155,7 @@ async def submit_scope_fact(
                 'homeowner_id': current_homeowner_id
             }
             
-            response = supabase_client.table("project_scopes").insert(new_scope_data).execute()
+            response = await supabase_client.table("project_scopes").insert(new_scope_data).execute()
             # After insert, the ID we set is the one to use.
             current_project_scope_id = new_project_scope_uuid
             tool_context.state['current_project_scope_id'] = current_project_scope_id # Update state
@@ -194,7 +165,7 @@ async def submit_scope_fact(
         else:
             print(f"[Tool: submit_scope_fact] Updating project_scope ID: {current_project_scope_id} (homeowner_id: {current_homeowner_id}) with {fact_name}: {value_to_save}", flush=True)
             update_data = {fact_name: value_to_save} # Use the potentially converted value
-            response = supabase_client.table("project_scopes").update(update_data).eq("id", current_project_scope_id).execute()
+            response = await supabase_client.table("project_scopes").update(update_data).eq("id", current_project_scope_id).execute()
             print(f"[Tool: submit_scope_fact] Update operation completed for project_scope ID: {current_project_scope_id}. Response status: {getattr(response, 'status_code', 'N/A')}, data: {getattr(response, 'data', 'N/A')}", flush=True)
             return f"Successfully updated {fact_name} for project ID {current_project_scope_id}.{generated_new_homeowner_id_message_suffix}"
 
@@ -5,6 +5,7 @@ import os
 from google.adk.agents import Agent
 from .instruction import INSTRUCTION
 from .tools import tool_set
+from src.observability.tool_metrics import serve_metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,6 +26,8 @@ root_agent = Agent(
     model=MODEL_NAME,
     instruction=INSTRUCTION,
     tools=tool_set,
+    # Per-tool metrics on /metrics when TOOL_METRICS_PORT is set (see tool_metrics.py).
+    before_agent_callback=serve_metrics,
     description="Agent responsible for creating, presenting, and finalizing bid cards."
 )
 
@@ -22,5 +22,6 @@ INSTRUCTION = (
     "   - Format this information into a bid card.\n"
     "   - Present the bid card to the homeowner, clearly showing all details and any images. Ask for their confirmation (e.g., 'Is this information correct and ready to be shared with contractors?').\n"
     "5. If the tool returns no project details, inform the homeowner (e.g., 'I couldn't find any project details matching your IDs. Please double-check them, or perhaps we need to create a project first.').\n"
-    "6. If the homeowner confirms the bid card, you will then signal that the bid card is finalized and ready for contractor bidding."
+    "6. If the homeowner confirms the bid card, you will then signal that the bid card is finalized and ready for contractor bidding.\n"
+    "7. If you need an overview of several projects (e.g., all projects of a homeowner, or a list of Project IDs), use the 'list_bid_cards' tool instead of calling 'get_project_details_for_bid_card' once per project. It returns one page of compact bid cards; pass its 'next_cursor' back as 'cursor' to get the next page. Use its 'min_budget', 'max_budget' (dollars) and 'starts_by' (YYYY-MM-DD) arguments to filter by budget or start date instead of reading every card."
 )
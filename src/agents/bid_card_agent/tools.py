@@ -1,46 +1,57 @@
-import asyncio
+import base64
+import datetime
+import json
 import logging
 from typing import Dict, Any, List, Optional
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from supabase.lib.client_options import ClientOptions
 from google.adk.tools import FunctionTool
 
+from src.db.cache import TTLCache
+from src.db.supabase_client import get_supabase_client
+from src.observability.tool_metrics import instrument_tool
+from src.tools import scope_events
+from src.tools.bid_card_materializer import (
+    assemble_document,
+    bid_card_materializer,
+    build_details_section,
+    build_images_section,
+    build_project_section,
+)
+from src.tools.scope_events import ScopeChange
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Supabase client initialization
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") # Ensure this matches your .env file
+# Supabase access goes through the shared pooled async client
+# (src/db/supabase_client.py), so no per-module client is created here.
 
-supabase_client: Optional[Client] = None
-if supabase_url and supabase_key:
-    try:
-        options = ClientOptions(postgrest_client_timeout=10) # Example option, adjust as needed
-        supabase_client = create_client(supabase_url, supabase_key, options=options)
-        logger.info("Supabase client initialized successfully for BidCardAgent.")
-    except Exception as e:
-        logger.error(f"Error initializing Supabase client for BidCardAgent: {e}")
-else:
-    logger.error(
-        "Supabase URL or Service Role Key not found in environment variables for BidCardAgent."
-    )
+LATEST = "latest"
+
+# (homeowner_id, project_id or "latest") -> project scope row with images.
+# Concurrent misses for the same key share one query; writes made through the
+# homeowner scope tools invalidate the homeowner's entries (see
+# scope_events.py), and the TTL bounds staleness from writes made elsewhere.
+_bid_card_cache: TTLCache = TTLCache(
+    maxsize=int(os.getenv("BID_CARD_CACHE_MAX_ENTRIES", 1024)),
+    ttl=float(os.getenv("BID_CARD_CACHE_TTL_SECONDS", 60)),
+)
 
 
-# ──────────────────────────────────────────────────────────────
-# Helper to run blocking Supabase calls in a thread
-# ──────────────────────────────────────────────────────────────
-def _query_latest_scope_blocking(sb, homeowner_id: str) -> Dict[str, Any] | None:
+@scope_events.subscribe
+def _invalidate_bid_cards(change: ScopeChange) -> None:
+    _bid_card_cache.invalidate_where(lambda key: key[0] == change.homeowner_id)
+
+
+async def _query_latest_scope(sb, homeowner_id: str) -> Dict[str, Any] | None:
     """
     Returns the newest project_scope row (with joined project_images) or None.
-    Executed in a thread because supabase-py is sync.
     """
-    logger.debug("Supabase: _query_latest_scope_blocking for homeowner_id=%s", homeowner_id)
+    logger.debug("Supabase: _query_latest_scope for homeowner_id=%s", homeowner_id)
 
-    resp = (
+    resp = await (
         sb.table("project_scopes")
         .select("*,project_images(*)")
         .eq("homeowner_id", homeowner_id)
@@ -48,8 +59,8 @@ def _query_latest_scope_blocking(sb, homeowner_id: str) -> Dict[str, Any] | None
         .limit(1)
         .execute()
     )
-    logger.debug("Supabase HTTP status (_query_latest_scope_blocking): %s", getattr(resp, "status_code", "N/A"))
-    logger.debug("Supabase raw data (_query_latest_scope_blocking): %s", getattr(resp, "data", None))
+    logger.debug("Supabase HTTP status (_query_latest_scope): %s", getattr(resp, "status_code", "N/A"))
+    logger.debug("Supabase raw data (_query_latest_scope): %s", getattr(resp, "data", None))
 
     if resp and isinstance(resp.data, list) and resp.data:
         return resp.data[0]  # newest row
@@ -61,25 +72,74 @@ async def get_project_details_for_bid_card(
     project_id: str = "",
 ) -> Dict[str, Any] | None:
     """
-    Fetch a single project scope (and its images) for a homeowner.
+    Fetch the bid card of a single project scope for a homeowner.
 
     Args:
         homeowner_id: UUID of the homeowner.
         project_id:   UUID of the specific project.  Empty string = latest project.
 
     Returns:
-        Dict with project & images, or None if nothing found.
+        Dict with the render-ready bid card (project, details and images sections),
+        or None if nothing found.
     """
+    cache_key = (homeowner_id, project_id or LATEST)
+    return await _bid_card_cache.get_or_load(cache_key, lambda: _fetch_project_details(homeowner_id, project_id))
+
+
+async def _fetch_project_details(homeowner_id: str, project_id: str) -> Dict[str, Any] | None:
+    supabase_client = await get_supabase_client()
     if not supabase_client:
         logger.error("Supabase client not initialised in get_project_details_for_bid_card")
         return None
 
+    try:
+        # Render-ready snapshot kept up to date by the bid card materializer.
+        if project_id:
+            snapshot = await bid_card_materializer.latest_snapshot(project_id, homeowner_id=homeowner_id)
+        else:
+            snapshot = await bid_card_materializer.latest_snapshot_for_homeowner(homeowner_id)
+        if snapshot is not None:
+            return snapshot
+    except Exception as exc:
+        logger.warning(f"Bid card snapshot lookup failed, falling back to project_scopes (homeowner_id: {homeowner_id}, project_id: '{project_id}'): {exc}")
+
+    # No snapshot yet (scope written before snapshots existed): build the same document
+    # from the rows and materialize it for next time.
+    row = await _fetch_project_rows(supabase_client, homeowner_id, project_id)
+    if not row:
+        return None
+    bid_card_materializer.schedule(row["id"], homeowner_id)
+    return await _document_from_rows(supabase_client, row, homeowner_id)
+
+
+async def _document_from_rows(supabase_client, row: Dict[str, Any], homeowner_id: str) -> Dict[str, Any] | None:
+    """Bid card in the snapshot format, built from a project_scopes row with embedded project_images. Version 0: not stored."""
+    try:
+        facts = await (
+            supabase_client.table("project_scope_facts")
+            .select("fact_name,fact_value")
+            .eq("project_scope_id", row["id"])
+            .execute()
+        )
+    except Exception as exc:
+        logger.exception(f"Supabase query for project_scope_facts failed in get_project_details_for_bid_card (project_id: '{row['id']}'): {exc}")
+        return None
+    images = sorted(row.get("project_images") or [], key=lambda image: image.get("created_at") or "")
+    sections = {
+        "project": build_project_section(row),
+        "details": build_details_section(facts.data or []),
+        "images": build_images_section(images),
+    }
+    return assemble_document(row["id"], homeowner_id, 0, sections, {})
+
+
+async def _fetch_project_rows(supabase_client, homeowner_id: str, project_id: str) -> Dict[str, Any] | None:
     try:
         if project_id:
             # direct lookup by project_id AND homeowner_id
             logger.info(f"Supabase: get_project_details_for_bid_card querying for specific project_id: {project_id} AND homeowner_id: {homeowner_id}")
-            resp = await asyncio.to_thread(
-                lambda: supabase_client.table("project_scopes")
+            resp = await (
+                supabase_client.table("project_scopes")
                 .select("*,project_images(*)")
                 .eq("id", project_id)
                 .eq("homeowner_id", homeowner_id) # Crucial: ensure project belongs to the homeowner
@@ -92,7 +152,7 @@ async def get_project_details_for_bid_card(
 
         # else: latest project for homeowner
         logger.info(f"Supabase: get_project_details_for_bid_card querying for latest project for homeowner_id: {homeowner_id}")
-        row = await asyncio.to_thread(_query_latest_scope_blocking, supabase_client, homeowner_id)
+        row = await _query_latest_scope(supabase_client, homeowner_id)
         return row
 
     except Exception as exc:
@@ -101,9 +161,121 @@ async def get_project_details_for_bid_card(
         logger.exception(f"Supabase query failed in get_project_details_for_bid_card (homeowner_id: {homeowner_id}, project_id: '{project_id}'): {exc}")
         return None
 
+
+# Columns a bid card renders; list_bid_cards never selects anything else.
+BID_CARD_COLUMNS = (
+    "id,homeowner_id,project_title,project_description,conversation_summary,"
+    "budget_range,timeline,zip_code,status,image_url,group_bidding_preference,created_at,"
+    "budget_min_cents,budget_max_cents,timeline_start,timeline_end"
+)
+BID_CARD_IMAGE_COLUMNS = "image_url,thumbnail_url"
+MAX_PAGE_SIZE = 100
+MAX_PROJECT_IDS = 200
+MAX_IMAGES_PER_CARD = 20
+
+
+def _encode_cursor(row: Dict[str, Any]) -> str:
+    payload = json.dumps({"created_at": row["created_at"], "id": row["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Dict[str, str]:
+    payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return {"created_at": str(payload["created_at"]), "id": str(payload["id"])}
+
+
+async def list_bid_cards(
+    homeowner_id: str = "",
+    project_ids: Optional[List[str]] = None,
+    limit: int = 20,
+    cursor: str = "",
+    images_per_card: int = 3,
+    include_image_count: bool = True,
+    min_budget: int = 0,
+    max_budget: int = 0,
+    starts_by: str = "",
+) -> Dict[str, Any]:
+    """
+    List bid cards (newest first) for a homeowner and/or a set of projects, one page at a time.
+
+    Args:
+        homeowner_id: UUID of the homeowner whose projects to list. Optional if project_ids is given.
+        project_ids:  Specific project UUIDs to list (at most 200). Optional if homeowner_id is given.
+        limit:        Bid cards per page (1-100).
+        cursor:       The 'next_cursor' from the previous page. Empty string = first page.
+        images_per_card: How many image references to include per bid card (0 for none).
+        include_image_count: Whether to include the total number of images per project.
+        min_budget:   Only projects whose budget reaches at least this many dollars (0 = no filter).
+        max_budget:   Only projects whose budget starts at or below this many dollars (0 = no filter).
+        starts_by:    Only projects whose timeline starts on or before this date (YYYY-MM-DD, empty = no filter).
+        Budget and date filters skip projects whose budget or timeline could not be parsed.
+
+    Returns:
+        Dict with 'bid_cards' (list), 'next_cursor' (None on the last page) and, on failure, 'error'.
+    """
+    if not homeowner_id and not project_ids:
+        return {"bid_cards": [], "next_cursor": None, "error": "Provide homeowner_id or project_ids."}
+    if project_ids and len(project_ids) > MAX_PROJECT_IDS:
+        return {"bid_cards": [], "next_cursor": None, "error": f"At most {MAX_PROJECT_IDS} project_ids per call."}
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    images_per_card = max(0, min(int(images_per_card), MAX_IMAGES_PER_CARD))
+
+    supabase_client = await get_supabase_client()
+    if not supabase_client:
+        logger.error("Supabase client not initialised in list_bid_cards")
+        return {"bid_cards": [], "next_cursor": None, "error": "Database unavailable."}
+
+    columns = BID_CARD_COLUMNS
+    if images_per_card:
+        columns += f",images:project_images({BID_CARD_IMAGE_COLUMNS})"
+    if include_image_count:
+        columns += ",image_count:project_images(count)"
+
+    try:
+        query = supabase_client.table("project_scopes").select(columns)
+        if homeowner_id:
+            query = query.eq("homeowner_id", homeowner_id)
+        if project_ids:
+            query = query.in_("id", list(project_ids))
+        # Range filters use the indexed columns written by scope_normalize.py.
+        if min_budget:
+            query = query.gte("budget_max_cents", int(min_budget) * 100)
+        if max_budget:
+            query = query.lte("budget_min_cents", int(max_budget) * 100)
+        if starts_by:
+            query = query.lte("timeline_start", datetime.date.fromisoformat(starts_by).isoformat())
+        if cursor:
+            # Keyset pagination: rows strictly after the last row of the previous page.
+            last = _decode_cursor(cursor)
+            query = query.or_(
+                f'created_at.lt."{last["created_at"]}",'
+                f'and(created_at.eq."{last["created_at"]}",id.lt.{last["id"]})'
+            )
+        if images_per_card:
+            query = query.order("created_at", foreign_table="images").limit(images_per_card, foreign_table="images")
+        # One extra row tells whether another page exists.
+        resp = await query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()
+    except (ValueError, KeyError) as exc:
+        return {"bid_cards": [], "next_cursor": None, "error": f"Invalid cursor or filter: {exc}"}
+    except Exception as exc:
+        logger.exception(f"Supabase query failed in list_bid_cards (homeowner_id: {homeowner_id}, project_ids: {project_ids}): {exc}")
+        return {"bid_cards": [], "next_cursor": None, "error": "Query failed."}
+
+    rows = list(resp.data or []) if resp else []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    for row in rows:
+        if include_image_count:
+            counts = row.pop("image_count", None) or [{}]
+            row["image_count"] = counts[0].get("count", 0)
+    return {"bid_cards": rows, "next_cursor": _encode_cursor(rows[-1]) if has_more and rows else None}
+
 # Create the tool instance and the tool_set
 get_project_details_tool = FunctionTool(
-    func=get_project_details_for_bid_card,
+    func=instrument_tool(get_project_details_for_bid_card),
+)
+list_bid_cards_tool = FunctionTool(
+    func=instrument_tool(list_bid_cards),
 )
 
-tool_set = [get_project_details_tool]
+tool_set = [get_project_details_tool, list_bid_cards_tool]
@@ -11,26 +11,32 @@ from google.genai.types import Content, Part # For FunctionCall, FunctionRespons
 from google.adk.tools.tool_context import ToolContext # Corrected path
 
 import logging
-import base64
 import uuid
 
 # Assuming tools and session service are structured under 'src' like other project modules
 # If 'instabids' is a top-level package in PYTHONPATH, the original paths are fine.
-from src.tools.vision import describe_image_tool
-from src.tools.supabase_tools import upsert_project_scope_tool, upload_image_to_storage_tool
+from src.tools.supabase_tools import upsert_project_scope_tool
+from src.agents.homeowner_live.image_ingest import describe_image_tool, image_ingest, upload_image_to_storage_tool
 from src.session.supabase_session import SupabaseSessionService
+from src.tools.scope_write_buffer import scope_write_buffer, session_key_from_state
+from src.tools.blob_store import queue_pending_image
+from src.observability.log import log_sampled, redacted
+from src.observability.tool_metrics import serve_metrics
+from google.adk.agents.callback_context import CallbackContext
+
+logger = logging.getLogger(__name__)
 
 instruction = """You are the InstaBids Homeowner Helper: friendly, highly observant, efficient, and focused on accurately capturing project needs for bids.
 
 
     "# PHASE 1: IMAGE UPLOAD PROTOCOL (IF APPLICABLE)\n"
-    "**IF the user's message contains an `inline_data` part (this is where the system places image information):**\n"
-    "1.  When `inline_data` is present, the system automatically stores its `data` (base64 image) into `tool_context.state['pending_image_data']` and its `mime_type` into `tool_context.state['pending_image_mime_type']`. You do not need to handle this data directly.\n"
-    "2.  **IMMEDIATE FIRST ACTION (if image present): NO GREETING, NO OTHER QUESTIONS.** Your response **MUST BE A CALL** to the `describe_image_tool`. Call it simply as `describe_image_tool()` or `describe_image_tool(process_pending_image=True)`. The tool will automatically use the image data from the agent's state.\n"
-    "3.  **SECOND ACTION (after describe_image_tool successfully returns a description):** Your response **MUST BE A CALL** to the `upload_image_to_storage_tool`. You can call it as `upload_image_to_storage_tool()` or `upload_image_to_storage_tool(process_pending_image=True)`. If you want to suggest a filename, you can pass it as `file_name` (e.g., `upload_image_to_storage_tool(file_name='project_photo.jpg')`). The tool will use the image data from the agent's state.\n"
+    "**IF the user's message contains one or more `inline_data` parts (this is where the system places image information; homeowners often send several photos at once):**\n"
+    "1.  When `inline_data` is present, the system automatically stores the bytes of every image and queues a handle per image in `tool_context.state['pending_image_handles']`. You do not need to handle this data directly.\n"
+    "2.  **IMMEDIATE FIRST ACTION (if images present): NO GREETING, NO OTHER QUESTIONS.** Your response **MUST BE A SINGLE CALL** to the `describe_image` tool, however many images were sent. Call it simply as `describe_image()` or `describe_image(process_pending_image=True)`. The tool describes all queued images at once.\n"
+    "3.  The system starts uploading the images to storage as soon as they arrive, so `describe_image` returns a description and the stored `image_url` for each image (as 'Image 1', 'Image 2', ...). Do NOT call `upload_image` after a successful description; only call it if `describe_image` reports that an upload failed.\n"
     "4.  Do NOT ask the user for `mime_type` or image data if `inline_data` was present; the system handles storing it for the tools.\n"
-    "5.  After both `describe_image_tool` and `upload_image_to_storage_tool` calls are processed, use the image description and the `image_url` (returned by `upload_image_to_storage_tool`) to inform your understanding. Include this `image_url` in the `details` dictionary when calling `upsert_project_scope_tool`. Continue the conversation by asking clarifying questions about the project or the image content.\n"
-    "6.  The `upload_image_to_storage_tool` will attempt to clear the `pending_image_data` and `pending_image_mime_type` from the state after a successful upload. If an image was present but you decide not to upload it, you should make a plan to clear these state variables (though specific tools for this are not yet defined, so proceed with caution or note it for future improvement).\n\n"
+    "5.  After `describe_image` returns, use the image descriptions to inform your understanding. Every stored image is recorded against the project automatically; include the `image_url` of the image that best shows the project in the `details` dictionary when calling `upsert_project_scope_tool`. Continue the conversation by asking clarifying questions about the project or the image content.\n"
+    "6.  Once the images are described and stored, the tools clear them from `pending_image_handles`.\n\n"
     "# PHASE 2: CORE GOAL: Collect Project Details & Save via `upsert_project_scope_tool`\n"
     "-   Your main goal is to gather details for a 'project_scope'. This includes understanding the project type, specific work needed, budget, timeline, and location.\n"
     "-   Ask clarifying questions to fill these details. Encourage the user to describe their project thoroughly.\n"
@@ -46,7 +52,7 @@ instruction = """You are the InstaBids Homeowner Helper: friendly, highly observ
     "    *   If an image is provided at any point, immediately follow the IMAGE UPLOAD PROTOCOL above.\n"
     "2.  **Information Gathering:**\n"
     "    *   Ask open-ended and specific questions to understand the project (e.g., 'What kind of renovation are you planning?', 'Can you describe the current state?', 'What are your goals for this space?').\n"
-    "    *   If an image was described by the `describe_image_tool`, use that information to ask more targeted questions.\n"
+    "    *   If an image was described by the `describe_image` tool, use that information to ask more targeted questions.\n"
     "3.  **Saving Scope:**\n"
     "    *   Periodically, or when the user indicates a section is complete, use the `upsert_project_scope_tool` to save the gathered details.\n"
     "4.  **User Guidance:**\n"
@@ -56,7 +62,16 @@ instruction = """You are the InstaBids Homeowner Helper: friendly, highly observ
     *   If the project timeline is flexible (e.g., user mentions a 1-3 month window or similar, rather than an immediate rush), and the project type is suitable (e.g., roofing, siding, windows, painting), ask the user if they are interested in group bidding to potentially save costs. For example: 'Since your timeline for the roof is within the next couple of months, would you be interested in exploring a group bid with other homeowners in your area? This can sometimes lead to cost savings.'
     *   If they express interest, capture this preference (e.g., `group_bidding_preference: true`) when you next save the project scope with `upsert_project_scope_tool`.
 
-# GENERAL FLOW:   "Remember, if an image is present, dealing with it via `describe_image_tool` is your TOP PRIORITY for that turn."""
+# GENERAL FLOW:   "Remember, if an image is present, dealing with it via `describe_image` is your TOP PRIORITY for that turn."""
+
+async def flush_scope_writes(callback_context: CallbackContext) -> None:
+    """after_agent_callback: flushes staged project_scope writes at the end of each turn."""
+    session_key = session_key_from_state(callback_context.state)
+    if session_key and scope_write_buffer.has_pending(session_key):
+        if not await scope_write_buffer.flush_session(session_key):
+            # Retried in the background; upsert_project_scope_tool reports it on its next call.
+            logger.warning("Turn-end flush of project_scope writes failed for session %s.", session_key)
+    return None
 
 class HomeownerLiveAgent(Agent):
     """Converses by voice & chat, analyses images, writes BidCard rows."""
@@ -67,69 +82,46 @@ class HomeownerLiveAgent(Agent):
             name="homeowner_live",
             model="gemini-2.5-flash-preview-05-20",  # Updated model
             instruction=instruction,
-            tools=[describe_image_tool, upsert_project_scope_tool, upload_image_to_storage_tool]
+            tools=[describe_image_tool, upsert_project_scope_tool, upload_image_to_storage_tool],
+            # Per-tool metrics on /metrics when TOOL_METRICS_PORT is set (see tool_metrics.py).
+            before_agent_callback=serve_metrics,
+            after_agent_callback=flush_scope_writes,
         )
         # self.slots is now initialized by Pydantic via Field(default_factory=dict)
 
     async def async_on_message(self, tool_context: ToolContext) -> Event | None:
-        logger = logging.getLogger(__name__)
-        # !!!!! VERY IMPORTANT DIAGNOSTIC LOG !!!!!
-        logger.critical("!!!!!!!! ASYNC_ON_MESSAGE CALLED FOR HOMEOWNER_LIVE !!!!!!!!")
-        logger.info(f"[{self.name}] Raw tool_context.message: {tool_context.message}")
-        if hasattr(tool_context.message, '__dict__'):
-            logger.info(f"[{self.name}] Raw tool_context.message.__dict__: {tool_context.message.__dict__}")
-        else:
-            logger.info(f"[{self.name}] Raw tool_context.message has no __dict__.")
-
-        logger.info(f"[{self.name}] State BEFORE super().async_on_message AND manual processing: {tool_context.state}")
-
-        # Original detailed logging for parts processing
-        logger.info(f"[{self.name}] Entering async_on_message for message (second log).") # Differentiate from first entry log
-        logger.debug(f"[{self.name}] tool_context.message type: {type(tool_context.message)}")
-        if hasattr(tool_context.message, 'parts'):
-            logger.debug(f"[{self.name}] tool_context.message.parts: {tool_context.message.parts}")
-        else:
-            logger.debug(f"[{self.name}] tool_context.message has no 'parts' attribute.")
-
-        image_data_processed_from_parts = False
+        # Message and state can hold megabytes of image data: log them through
+        # redacted() so they are size-bounded and only rendered when DEBUG is on.
+        log_sampled(logger, logging.INFO, "homeowner_live.on_message", "[%s] async_on_message called.", self.name)
+        logger.debug("[%s] Message: %s", self.name, redacted(tool_context.message))
+        logger.debug("[%s] State before processing: %s", self.name, redacted(tool_context.state))
+
+        images_queued = 0
         if tool_context.message and hasattr(tool_context.message, 'parts') and tool_context.message.parts:
             for part_idx, part in enumerate(tool_context.message.parts):
-                logger.debug(f"[{self.name}] Examining part #{part_idx}: {type(part)}")
                 if hasattr(part, 'inline_data') and part.inline_data and hasattr(part.inline_data, 'data'):
-                    logger.info(f"[{self.name}] Found inline_data in message part #{part_idx}.")
-                    logger.debug(f"[{self.name}] part.inline_data type: {type(part.inline_data)}")
-                    logger.debug(f"[{self.name}] part.inline_data.mime_type: {part.inline_data.mime_type}")
-                    
                     image_bytes = part.inline_data.data
-                    logger.debug(f"[{self.name}] part.inline_data.data type: {type(image_bytes)}")
-                    
                     if image_bytes:
-                        logger.info(f"[{self.name}] part.inline_data.data is present. Length (bytes): {len(image_bytes)}")
-                        image_data_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                        tool_context.state['pending_image_data'] = image_data_base64
-                        tool_context.state['pending_image_mime_type'] = part.inline_data.mime_type
-                        image_data_processed_from_parts = True
-                        logger.info(f"[{self.name}] Successfully processed and stored base64 image data and mime_type from part #{part_idx} into state.")
-                        # It's generally safer to process only the first image found.
-                        # If multiple images in one message need different handling, the logic would need to be more complex.
-                        break 
+                        # Raw bytes go to the blob store once; state only carries the queued handles.
+                        handle = queue_pending_image(tool_context.state, image_bytes, part.inline_data.mime_type)
+                        # Upload in the background while the model describes the images.
+                        image_ingest.start(handle)
+                        images_queued += 1
+                        logger.info("[%s] Stored %d-byte %s image from part #%d in the blob store as %s.",
+                                    self.name, len(image_bytes), part.inline_data.mime_type, part_idx, handle)
                     else:
-                        logger.warning(f"[{self.name}] part.inline_data.data is present but empty (falsey).")
+                        logger.warning("[%s] part #%d has inline_data with no data.", self.name, part_idx)
                 else:
-                    logger.debug(f"[{self.name}] Part #{part_idx} does not have usable inline_data. Has inline_data: {hasattr(part, 'inline_data')}")
-                    if hasattr(part, 'inline_data') and part.inline_data:
-                         logger.debug(f"[{self.name}] Part #{part_idx} inline_data content: {part.inline_data}")
+                    logger.debug("[%s] Part #%d has no usable inline_data: %s", self.name, part_idx, redacted(part))
 
-        if not image_data_processed_from_parts:
-            logger.info(f"[{self.name}] No image data was processed from message parts.")
+        if images_queued:
+            logger.info("[%s] Queued %d image(s) from this message.", self.name, images_queued)
 
-        logger.info(f"[{self.name}] State AFTER manual processing, BEFORE super().async_on_message: {tool_context.state}")
         if "session_id" not in tool_context.state:
             tool_context.state["session_id"] = str(uuid.uuid4())
-            logger.info(f"[{self.name}] New session_id generated and saved to state: {tool_context.state['session_id']}")
-        
-        logger.debug(f"[{self.name}] State after async_on_message custom logic: {tool_context.state.get('pending_image_mime_type', 'No image mime type in state')}, Image data present: {'pending_image_data' in tool_context.state}")
-        logger.info(f"[{self.name}] Exiting async_on_message.")
+            logger.info("[%s] New session_id generated and saved to state: %s", self.name, tool_context.state["session_id"])
+
+        logger.debug("[%s] State after processing: %s", self.name, redacted(tool_context.state))
         return await super().async_on_message(tool_context)
 
     async def async_on_stream(self, event_stream: AsyncIterator[Event]) -> AsyncIterator[Event]: # Changed return type annotation
@@ -0,0 +1,244 @@
+# src/agents/homeowner_live/image_ingest.py
+"""
+Background image ingest for the homeowner agent.
+
+async_on_message queues every inline_data part of a message in the blob store
+(state['pending_image_handles']) and calls ImageIngest.start() for each, which
+begins preprocessing and uploading the image in a background task. At most
+IMAGE_UPLOAD_CONCURRENCY uploads run at once.
+
+The describe tool sends all queued images to the vision model in one batched
+request while those uploads are in flight, then awaits the upload futures
+(usually finished by then) and returns every description with its image URL.
+The model needs one tool turn per message rather than two per image, and each
+stored URL is recorded against the project scope in project_images.
+
+Uploads are tracked per blob handle on the event loop that started them. The
+concurrency limit is a semaphore per event loop, created on first use (like
+the pooled clients in src/db/supabase_client.py), so importing this module
+does not bind it to a loop.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from google.adk.tools import FunctionTool, ToolContext
+
+from src.observability.tool_metrics import instrument_tool, queue_wait, timed_acquire
+from src.tools.blob_store import clear_pending_image, get_blob_store, pending_image_handles
+from src.tools.image_preprocess import image_variants, pending_image_variants
+from src.tools.scope_write_buffer import scope_write_buffer, session_key_from_state
+from src.tools.supabase_tools import upload_image_variants
+from src.tools.vision import describe_images_bytes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TRACKED = 256
+DEFAULT_UPLOAD_CONCURRENCY = 4
+
+
+@dataclass
+class IngestResult:
+    image_url: str
+    thumbnail_url: Optional[str] = None
+
+
+class ImageIngest:
+    def __init__(
+        self,
+        bucket_name: Optional[str] = None,
+        max_tracked: int = DEFAULT_MAX_TRACKED,
+        upload_concurrency: Optional[int] = None,
+    ):
+        if upload_concurrency is None:
+            upload_concurrency = int(os.getenv("IMAGE_UPLOAD_CONCURRENCY", DEFAULT_UPLOAD_CONCURRENCY))
+        self.bucket_name = bucket_name or os.getenv("IMAGE_BUCKET_NAME", "project-images")
+        self.max_tracked = max_tracked
+        self.upload_concurrency = upload_concurrency
+        self._uploads: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+        self._slots: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+    def start(self, handle: str) -> "asyncio.Future[IngestResult]":
+        """Starts (or returns the already running) background upload for the blob."""
+        loop = asyncio.get_running_loop()
+        task = self._uploads.get(handle)
+        if (
+            task is not None
+            and task.get_loop() is loop
+            and not (task.done() and (task.cancelled() or task.exception() is not None))
+        ):
+            return task
+        task = loop.create_task(self._upload(handle), name=f"image-ingest:{handle}")
+        task.add_done_callback(self._log_failure)
+        self._uploads[handle] = task
+        self._trim()
+        return task
+
+    def upload_future(self, handle: str) -> "Optional[asyncio.Future[IngestResult]]":
+        return self._uploads.get(handle)
+
+    def forget(self, handle: str) -> None:
+        self._uploads.pop(handle, None)
+
+    def _upload_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            for closed in [other for other in self._slots if other.is_closed()]:
+                del self._slots[closed]
+            slots = self._slots[loop] = asyncio.Semaphore(self.upload_concurrency)
+        return slots
+
+    async def _upload(self, handle: str) -> IngestResult:
+        async with timed_acquire(self._upload_slots(), "image_upload_slot"):
+            variants = await image_variants(handle)
+            if variants is None:
+                raise LookupError(f"Blob {handle} is no longer in the store.")
+            image_url, thumbnail_url = await upload_image_variants(variants, self.bucket_name)
+        return IngestResult(image_url=image_url, thumbnail_url=thumbnail_url)
+
+    def _log_failure(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background image upload %s failed: %s", task.get_name(), task.exception())
+
+    def _trim(self) -> None:
+        # Forget the oldest finished uploads whose images were never consumed by a tool.
+        while len(self._uploads) > self.max_tracked:
+            handle, task = next(iter(self._uploads.items()))
+            if not task.done():
+                break
+            del self._uploads[handle]
+
+
+image_ingest = ImageIngest()
+
+
+def _record_scope_images(tool_context: ToolContext, rows: List[Dict[str, Any]]) -> None:
+    """Stages project_images rows for the current scope, or keeps them until the scope is created."""
+    if not rows:
+        return
+    state = tool_context.state
+    project_scope_id = state.get("current_project_scope_id")
+    homeowner_id = state.get("current_homeowner_id")
+    session_key = session_key_from_state(state)
+    if project_scope_id and homeowner_id and session_key:
+        scope_write_buffer.stage(session_key, project_scope_id, homeowner_id, {}, images=rows)
+    else:
+        # upsert_project_scope_tool attaches these when it creates the scope.
+        state["unrecorded_scope_images"] = [*(state.get("unrecorded_scope_images") or []), *rows]
+
+
+def _finish(tool_context: ToolContext, handle: str, result: IngestResult, description: Optional[str] = None) -> None:
+    image_ingest.forget(handle)
+    clear_pending_image(tool_context.state, handle)
+    row = {"image_url": result.image_url, "thumbnail_url": result.thumbnail_url}
+    if description:
+        row["description"] = description
+    _record_scope_images(tool_context, [row])
+    tool_context.state["last_image_url"] = result.image_url
+    if result.thumbnail_url:
+        tool_context.state["last_image_thumbnail_url"] = result.thumbnail_url
+
+
+async def _prepare_pending(tool_context: ToolContext) -> List[str]:
+    # Converts legacy base64 state to a queued blob handle.
+    await pending_image_variants(tool_context.state)
+    return pending_image_handles(tool_context.state)
+
+
+async def describe_image(tool_context: ToolContext, process_pending_image: bool = True) -> str:
+    """Describes every image the homeowner just sent (in one vision request) and returns each description
+    together with its stored image_url. Uploads to storage already run in the background; no separate
+    upload call is needed.
+    Args:
+        tool_context: The context providing access to agent state.
+        process_pending_image: Flag to confirm processing the images from state. Defaults to True.
+    """
+    if not process_pending_image:
+        return "Image processing not requested by the agent for this call."
+
+    try:
+        handles = await _prepare_pending(tool_context)
+    except Exception as e:
+        logger.error(f"Could not prepare the pending images: {e}")
+        return "Error: No image data found in agent state to describe."
+    if not handles:
+        return "Error: No image data found in agent state to describe."
+
+    uploads = [image_ingest.start(handle) for handle in handles]
+    # Preprocessing is shared with the uploads (single-flight per handle).
+    all_variants = await asyncio.gather(*(image_variants(handle) for handle in handles), return_exceptions=True)
+
+    store = get_blob_store()
+    batch, batch_handles = [], []
+    for handle, variants in zip(handles, all_variants):
+        view = store.get(variants.model) if variants is not None and not isinstance(variants, BaseException) else None
+        if view is not None:
+            batch.append((view, variants.mime_type(variants.model)))
+            batch_handles.append(handle)
+
+    descriptions: Dict[str, str] = {}
+    if batch:
+        try:
+            for handle, description in zip(batch_handles, await describe_images_bytes(batch)):
+                descriptions[handle] = description
+        except Exception as e:
+            logger.error(f"Unexpected error describing {len(batch)} image(s): {e}")
+        finally:
+            del batch
+
+    with queue_wait("image_upload"):
+        results = await asyncio.gather(*uploads, return_exceptions=True)
+
+    lines = []
+    for index, (handle, result) in enumerate(zip(handles, results), start=1):
+        description = descriptions.get(handle, "Error: An unexpected error occurred while processing the image.")
+        if isinstance(result, BaseException):
+            # Keep the image pending so upload_image can retry it.
+            logger.error(f"Upload of image {handle} failed: {result}")
+            image_ingest.forget(handle)
+            lines.append(f"Image {index}: {description}\nimage_url: unavailable (upload failed: {result}). Call upload_image to retry.")
+            continue
+        _finish(tool_context, handle, result, descriptions.get(handle))
+        lines.append(f"Image {index}: {description}\nimage_url: {result.image_url}")
+    return "\n\n".join(lines)
+
+
+async def upload_image(tool_context: ToolContext, process_pending_image: bool = True) -> str:
+    """Returns the public URLs of the pending images, waiting for their background uploads (or retrying them) if needed.
+    Args:
+        tool_context: The context providing access to agent state.
+        process_pending_image: Flag to confirm processing the images from state. Defaults to True.
+    Returns:
+        The public URL(s) of the uploaded images, one per line, or an error message string.
+    """
+    if not process_pending_image:
+        return "Image processing not requested by the agent for this call."
+    try:
+        handles = await _prepare_pending(tool_context)
+    except Exception as e:
+        logger.error(f"Could not prepare the pending images: {e}")
+        return "Error: No image data found in agent state to upload."
+    if not handles:
+        last_url = tool_context.state.get("last_image_url")
+        return last_url or "Error: No image data found in agent state to upload."
+
+    with queue_wait("image_upload"):
+        results = await asyncio.gather(*(image_ingest.start(handle) for handle in handles), return_exceptions=True)
+    lines = []
+    for handle, result in zip(handles, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Upload of image {handle} failed: {result}")
+            image_ingest.forget(handle)
+            lines.append(f"Error uploading image: {result}")
+            continue
+        _finish(tool_context, handle, result)
+        lines.append(result.image_url)
+    return "\n".join(lines)
+
+
+describe_image_tool = FunctionTool(instrument_tool(describe_image))
+upload_image_to_storage_tool = FunctionTool(instrument_tool(upload_image))
@@ -0,0 +1 @@
+# This file makes src/benchmarks a Python package
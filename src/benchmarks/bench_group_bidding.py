@@ -0,0 +1,114 @@
+# src/benchmarks/bench_group_bidding.py
+"""
+Clustering time and memory for the group-bidding engine at scale.
+
+Builds a synthetic zip centroid table (zips scattered around metro areas in
+the continental US) and a synthetic population of opted-in scopes, then
+reports:
+
+    bulk      full clustering of all scopes (GroupBiddingEngine.add_many)
+    memory    bytes held by the engine after the bulk build (tracemalloc)
+    add       per-scope latency of incremental add() into the built engine
+    rebuild   what the same incremental batch would cost as a full recompute
+
+No network or database is needed:
+
+    python -m src.benchmarks.bench_group_bidding --scopes 1000000
+"""
+import argparse
+import datetime
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+from typing import List
+
+from src.tools.group_bidding import PROJECT_TYPE_KEYWORDS, GroupBiddingEngine, GroupScope, ZipCentroids
+
+
+def _synthetic_centroids(zips: int, metros: int, rng: random.Random) -> ZipCentroids:
+    centers = [(rng.uniform(26.0, 48.0), rng.uniform(-123.0, -71.0)) for _ in range(metros)]
+    codes = rng.sample(range(1000, 99999), zips)
+    rows = []
+    for code in codes:
+        lat, lon = rng.choice(centers)
+        rows.append((code, lat + rng.gauss(0, 0.6), lon + rng.gauss(0, 0.8)))
+    return ZipCentroids.from_pairs(rows)
+
+
+def _synthetic_scopes(count: int, zip_codes: List[str], first_id: int, rng: random.Random) -> List[GroupScope]:
+    types = [project_type for project_type, _ in PROJECT_TYPE_KEYWORDS]
+    # A few trades dominate demand, as they do in practice.
+    weights = [1.0 / (rank + 1) for rank in range(len(types))]
+    today = datetime.date.today().toordinal()
+    picked_types = rng.choices(types, weights, k=count)
+    picked_zips = rng.choices(zip_codes, k=count)
+    return [
+        GroupScope(first_id + i, picked_zips[i], picked_types[i], today + rng.randrange(180))
+        for i in range(count)
+    ]
+
+
+def _build(centroids: ZipCentroids, scopes: List[GroupScope], args: argparse.Namespace) -> GroupBiddingEngine:
+    engine = GroupBiddingEngine(centroids, args.radius, args.window_days, args.max_group_size)
+    engine.add_many(scopes)
+    return engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scopes", type=int, default=1_000_000)
+    parser.add_argument("--incremental", type=int, default=10_000, help="Scopes added one at a time after the bulk build.")
+    parser.add_argument("--zips", type=int, default=33_000)
+    parser.add_argument("--metros", type=int, default=400)
+    parser.add_argument("--radius", type=float, default=25.0)
+    parser.add_argument("--window-days", type=int, default=30)
+    parser.add_argument("--max-group-size", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    centroids = _synthetic_centroids(args.zips, args.metros, rng)
+    zip_codes = [f"{code:05d}" for code in centroids._zips]
+    scopes = _synthetic_scopes(args.scopes, zip_codes, 0, rng)
+    extra = _synthetic_scopes(args.incremental, zip_codes, args.scopes, rng)
+
+    gc.collect()
+    start = time.perf_counter()
+    engine = _build(centroids, scopes, args)
+    bulk = time.perf_counter() - start
+
+    latencies = []
+    for scope in extra:
+        start = time.perf_counter()
+        engine.add(scope)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+
+    start = time.perf_counter()
+    engine.rebuild(scopes + extra)
+    rebuild = time.perf_counter() - start
+
+    # Memory is measured on a separate build: tracing slows allocation down.
+    del engine
+    gc.collect()
+    tracemalloc.start()
+    engine = _build(centroids, scopes, args)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sizes = [len(group.members) for group in engine.groups()]
+    grouped = sum(sizes)
+    print(f"scopes={args.scopes} zips={len(centroids)} radius={args.radius}mi window={args.window_days}d max_group={args.max_group_size}")
+    print(f"zip table     {len(centroids) * 12 / 1024:8.1f} KiB")
+    print(f"bulk          {bulk:8.2f} s   ({bulk / args.scopes * 1e6:.2f} us/scope)")
+    print(f"memory        {held / 2**20:8.1f} MiB held, {peak / 2**20:.1f} MiB peak ({held / args.scopes:.0f} B/scope)")
+    print(f"add           p50 {statistics.median(latencies):.1f} us   p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f} us   ({args.incremental} scopes)")
+    print(f"rebuild       {rebuild:8.2f} s   for the same {args.incremental} new scopes")
+    print(f"groups        {len(sizes)} candidate groups, {grouped} scopes grouped ({grouped / len(engine):.0%}), "
+          f"median size {statistics.median(sizes) if sizes else 0}, unlocated {engine.unlocated}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# src/benchmarks/bench_image_preprocess.py
+"""
+Bytes transferred and wall time per image for the photo preprocessing stage.
+
+Generates phone-sized JPEGs (default 4032x3024 with an EXIF orientation tag
+and GPS block), then compares what leaves the process per image:
+
+    before  the untouched upload goes to the vision model and to storage
+    after   the model rendition goes to the vision model; the stripped
+            original plus the thumbnail go to storage
+
+and times preprocessing inline (one image at a time, on the loop) against the
+process pool (all images submitted concurrently), including how long the
+event loop is stalled in each case. Needs Pillow, no network:
+
+    python -m src.benchmarks.bench_image_preprocess --images 8 --workers 4
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+from typing import List, Tuple
+
+from src.tools.image_preprocess import (
+    PreprocessConfig,
+    preprocess_image,
+    preprocess_image_bytes,
+    shutdown_pool,
+)
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def _synthetic_photo(width: int, height: int, seed: int) -> bytes:
+    """Noisy gradient: compresses like a real photo rather than a flat test card."""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.frombytes("L", (width, height), os.urandom(width * height))
+    base = Image.merge("RGB", (gradient, Image.blend(gradient, noise, 0.35), noise.rotate(seed % 360)))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees, as most portrait phone shots are
+    exif[0x8825] = {1: "N", 2: (40.0, 44.0, 54.36), 3: "W", 4: (73.0, 59.0, 8.5)}  # GPS
+    buffer = io.BytesIO()
+    base.save(buffer, "JPEG", quality=92, exif=exif)
+    return buffer.getvalue()
+
+
+def _mib(n: float) -> str:
+    return f"{n / (1024 * 1024):7.2f} MiB"
+
+
+async def _max_loop_lag(done: asyncio.Event, interval: float = 0.005) -> float:
+    """Longest the event loop went without running a 5 ms ticker, in ms."""
+    worst = 0.0
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst * 1000
+
+
+async def _pool_run(photos: List[bytes], config: PreprocessConfig) -> Tuple[float, float]:
+    # Warm the pool so worker start-up is not billed to the first image.
+    await preprocess_image(photos[0], "image/jpeg", config)
+    done = asyncio.Event()
+    lag = asyncio.create_task(_max_loop_lag(done))
+    start = time.perf_counter()
+    await asyncio.gather(*(preprocess_image(photo, "image/jpeg", config) for photo in photos))
+    wall = (time.perf_counter() - start) * 1000
+    done.set()
+    return wall, await lag
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--workers", type=int, default=None, help="Overrides IMAGE_PREPROCESS_WORKERS.")
+    args = parser.parse_args()
+
+    if Image is None:
+        raise SystemExit("Pillow is required for this benchmark (pip install pillow).")
+    if args.workers:
+        os.environ["IMAGE_PREPROCESS_WORKERS"] = str(args.workers)
+
+    config = PreprocessConfig.from_env()
+    photos = [_synthetic_photo(args.width, args.height, seed) for seed in range(args.images)]
+
+    inline_times = []
+    results = []
+    for photo in photos:
+        start = time.perf_counter()
+        results.append(preprocess_image_bytes(photo, "image/jpeg", config))
+        inline_times.append((time.perf_counter() - start) * 1000)
+
+    pool_wall, pool_lag = asyncio.run(_pool_run(photos, config))
+    shutdown_pool()
+
+    source = statistics.fmean(len(photo) for photo in photos)
+    to_model = statistics.fmean(len(r.model.data) for r in results)
+    to_storage = statistics.fmean(len(r.original.data) + len(r.thumbnail.data) for r in results)
+    print(f"images={args.images} size={args.width}x{args.height} max_edge={config.max_edge} format={config.model_format}")
+    print(f"per image      before         after")
+    print(f"vision model  {_mib(source)}   {_mib(to_model)}   ({source / to_model:.1f}x fewer bytes)")
+    print(f"storage       {_mib(source)}   {_mib(to_storage)}   (original + thumbnail)")
+    print(f"total         {_mib(2 * source)}   {_mib(to_model + to_storage)}")
+    print(f"wall   inline {sum(inline_times) / args.images:8.1f} ms/image  (event loop blocked up to {max(inline_times):.0f} ms)")
+    print(f"wall   pool   {pool_wall / args.images:8.1f} ms/image  (event loop blocked up to {pool_lag:.0f} ms, cpus={os.cpu_count()})")
+
+
+if __name__ == "__main__":
+    main()
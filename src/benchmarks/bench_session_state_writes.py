@@ -0,0 +1,90 @@
+# src/benchmarks/bench_session_state_writes.py
+"""
+Bytes written per turn to adk_sessions: full-state upserts vs delta merges.
+
+Simulates a homeowner conversation whose state carries a few large values
+(an inline photo, a growing conversation summary, tool results) and a handful
+of small keys touched every turn through an ADK State, the way tools and
+callbacks change it. For each turn it measures the request body that
+SupabaseSessionService.append_event would send in both modes. No network needed:
+
+    python -m src.benchmarks.bench_session_state_writes --turns 40 --image-kb 2048
+"""
+import argparse
+import base64
+import os
+import statistics
+import time
+import uuid
+
+from google.adk.sessions import State
+
+from src.session.state_tracking import clear_key, payload_size, persistable, split_delta
+
+
+def _full_payload(session_id: str, items: dict) -> int:
+    return payload_size({"session_id": session_id, "state_data": items})
+
+
+def _delta_payload(session_id: str, to_set: dict, to_delete: set) -> int:
+    return payload_size({"p_session_id": session_id, "p_set": to_set, "p_unset": sorted(to_delete)})
+
+
+def _initial_state(image_kb: int) -> dict:
+    return {
+        "session_id": str(uuid.uuid4()),
+        "current_homeowner_id": str(uuid.uuid4()),
+        "current_project_scope_id": str(uuid.uuid4()),
+        "pending_image_data": base64.b64encode(os.urandom(image_kb * 1024)).decode(),
+        "pending_image_mime_type": "image/jpeg",
+        "conversation_summary": "Kitchen remodel. " * 50,
+        "last_tool_results": [{"tool": "describe_image", "result": "x" * 2000}],
+    }
+
+
+def _simulate_turn(state: State, turn: int) -> None:
+    state["turn"] = turn
+    state["last_user_utterance"] = f"Turn {turn}: the budget is about ${20 + turn}k."
+    state["conversation_summary"] = state["conversation_summary"] + f" Turn {turn} detail."
+    if turn == 3:
+        # Image uploaded: the big transient value goes away.
+        clear_key(state, "pending_image_data")
+        state["last_image_url"] = "https://example.supabase.co/storage/v1/object/public/project-images/x.jpg"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--image-kb", type=int, default=2048, help="Size of the inline photo kept in state until turn 3.")
+    args = parser.parse_args()
+
+    session_id = str(uuid.uuid4())
+    session_state = _initial_state(args.image_kb)
+
+    # First write is always a full write in both modes.
+    first = _full_payload(session_id, session_state)
+
+    full_sizes, delta_sizes, delta_times = [], [], []
+    for turn in range(1, args.turns + 1):
+        # As in ADK: the State writes through to the session and records the event's state_delta.
+        state_delta: dict = {}
+        _simulate_turn(State(value=session_state, delta=state_delta), turn)
+        session_state = persistable(session_state)
+        full_sizes.append(_full_payload(session_id, session_state))
+
+        start = time.perf_counter()
+        to_set, to_delete = split_delta(state_delta)
+        delta_sizes.append(_delta_payload(session_id, to_set, to_delete))
+        delta_times.append((time.perf_counter() - start) * 1e6)
+
+    total_full = first + sum(full_sizes)
+    total_delta = first + sum(delta_sizes)
+    print(f"turns={args.turns} first_write={first / 1024:.1f} KiB")
+    print(f"full   : mean {statistics.fmean(full_sizes) / 1024:10.1f} KiB/turn  total {total_full / 1024:12.1f} KiB")
+    print(f"delta  : mean {statistics.fmean(delta_sizes) / 1024:10.1f} KiB/turn  total {total_delta / 1024:12.1f} KiB")
+    print(f"ratio  : {total_full / total_delta:.1f}x fewer bytes with deltas")
+    print(f"change collection: p50 {statistics.median(delta_times):.1f} us/turn")
+
+
+if __name__ == "__main__":
+    main()
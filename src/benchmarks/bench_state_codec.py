@@ -0,0 +1,132 @@
+# src/benchmarks/bench_state_codec.py
+"""
+Encode/decode time and stored bytes for adk_sessions state codecs.
+
+Builds homeowner session states at three points of a conversation and runs
+each available encoding over them:
+
+    fresh       ids and a couple of queued image handles
+    described   after several photos were described and recorded: image URLs,
+                descriptions, a growing summary and scope fields
+    legacy      a described session that still carries an inline photo as
+                base64 in pending_image_data (rows written before the blob store)
+
+Encodings: stdlib json (what the service used to do), orjson, and the packed
+formats of CompressedStateCodec (json+zlib always, msgpack+zstd when msgpack
+and zstandard are installed). "stored" is the size of state_data as sent in
+the request body, i.e. including the base64 envelope for packed formats.
+No network needed:
+
+    python -m src.benchmarks.bench_state_codec --images 6 --image-kb 1536
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.session import state_codec
+from src.session.state_codec import FORMAT_JSON_ZLIB, FORMAT_MSGPACK_ZSTD, CompressedStateCodec, decode_state
+
+_DESCRIPTION = (
+    "The photo shows a {room} with {detail}. Visible damage includes water staining near the "
+    "baseboard and peeling paint on the lower wall. Fixtures appear to be from the 1990s."
+)
+_ROOMS = ["kitchen", "bathroom", "roof", "deck", "basement", "living room"]
+_DETAILS = ["oak cabinets and laminate counters", "a cast iron tub", "missing shingles", "rotted boards"]
+
+
+def _fresh(images: int) -> Dict[str, Any]:
+    return {
+        "session_id": str(uuid.uuid4()),
+        "user_id": str(uuid.uuid4()),
+        "current_homeowner_id": str(uuid.uuid4()),
+        "pending_image_handles": [f"blob:{uuid.uuid4().hex}" for _ in range(min(images, 2))],
+        "pending_image_mime_type": "image/jpeg",
+    }
+
+
+def _described(images: int) -> Dict[str, Any]:
+    state = _fresh(images)
+    scope_id = str(uuid.uuid4())
+    urls = [f"https://example.supabase.co/storage/v1/object/public/project-images/{scope_id}/{uuid.uuid4().hex}.jpg" for _ in range(images)]
+    state.update({
+        "pending_image_handles": [],
+        "current_project_scope_id": scope_id,
+        "last_image_url": urls[-1],
+        "last_image_thumbnail_url": urls[-1].replace(".jpg", "_thumb.webp"),
+        "unrecorded_scope_images": [{"image_url": url, "sha256": uuid.uuid4().hex * 2} for url in urls[:2]],
+        "image_descriptions": [
+            {"image_url": url, "description": _DESCRIPTION.format(room=_ROOMS[i % len(_ROOMS)], detail=_DETAILS[i % len(_DETAILS)])}
+            for i, url in enumerate(urls)
+        ],
+        "conversation_summary": " ".join(f"Turn {turn}: homeowner described the {_ROOMS[turn % len(_ROOMS)]} work." for turn in range(30)),
+        "scope_fields": {
+            "project_title": "Kitchen and bath refresh",
+            "budget_range": "$20k-$25k",
+            "timeline": "within 3 months",
+            "zip_code": "78704",
+            "group_bidding_preference": True,
+        },
+        "gcs_uris_to_be_sent": [],
+    })
+    return state
+
+
+def _legacy(images: int, image_kb: int) -> Dict[str, Any]:
+    state = _described(images)
+    state["pending_image_data"] = base64.b64encode(os.urandom(image_kb * 1024)).decode()
+    return state
+
+
+def _encodings() -> List[Tuple[str, Callable[[Dict[str, Any]], Any], Callable[[Any], Dict[str, Any]]]]:
+    stdlib = ("stdlib json", lambda state: json.dumps(state, separators=(",", ":")), json.loads)
+    encodings = [stdlib]
+    if state_codec.orjson is not None:
+        encodings.append(("orjson", lambda state: state_codec.dumps(state), decode_state))
+    formats = [FORMAT_JSON_ZLIB] + ([FORMAT_MSGPACK_ZSTD] if state_codec.msgpack is not None else [])
+    for packed_format in formats:
+        codec = CompressedStateCodec(threshold=0, format=packed_format)
+        encodings.append((packed_format, lambda state, codec=codec: state_codec.dumps(codec.encode(state)), decode_state))
+    return encodings
+
+
+def _time(func: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=6, help="Photos described in the session.")
+    parser.add_argument("--image-kb", type=int, default=1536, help="Size of the inline photo in the legacy state.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    states = [
+        ("fresh", _fresh(args.images)),
+        ("described", _described(args.images)),
+        ("legacy", _legacy(args.images, args.image_kb)),
+    ]
+    print(f"{'state':<10} {'encoding':<14} {'encode us':>12} {'decode us':>12} {'stored':>12} {'ratio':>7}")
+    for label, state in states:
+        baseline = None
+        for name, encode, decode in _encodings():
+            encoded = encode(state)
+            assert decode(encoded) == state, name
+            stored = len(encoded if isinstance(encoded, bytes) else encoded.encode())
+            baseline = baseline or stored
+            encode_us = _time(lambda: encode(state), args.repeat)
+            decode_us = _time(lambda: decode(encoded), args.repeat)
+            print(f"{label:<10} {name:<14} {encode_us:12.1f} {decode_us:12.1f} {stored / 1024:9.1f} KiB {stored / baseline:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
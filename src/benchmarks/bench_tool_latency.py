@@ -0,0 +1,120 @@
+# src/benchmarks/bench_tool_latency.py
+"""
+Tool-call latency under concurrent sessions: per-module sync clients vs the
+shared pooled async client.
+
+Each simulated session issues the same lightweight PostgREST query that the
+bid card and scope tools issue on every call. The "legacy" mode reproduces the
+previous behaviour (a sync client created at import time, called directly on
+the event loop); the "pooled" mode uses src/db/supabase_client.py.
+
+Requires SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY. Run from the repo root:
+
+    python -m src.benchmarks.bench_tool_latency --sessions 50 --calls 20
+
+With --backend local the pooled mode runs against the offline stand-in
+(src/db/local_backend.py) with the given injected latency instead:
+
+    python -m src.benchmarks.bench_tool_latency --backend local --latency-ms 25 --jitter-ms 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _run_sessions(call: Callable[[], Awaitable[None]], sessions: int, calls: int) -> List[float]:
+    latencies: List[float] = []
+
+    async def session() -> None:
+        for _ in range(calls):
+            start = time.perf_counter()
+            # Yield once so time spent waiting on a stalled loop counts
+            # towards the call, as it would for a real tool invocation.
+            await asyncio.sleep(0)
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    return latencies
+
+
+async def bench_legacy(sessions: int, calls: int, table: str) -> List[float]:
+    from supabase import create_client
+
+    sync_client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+
+    async def call() -> None:
+        # Blocking request on the event loop, as the tools used to do.
+        sync_client.table(table).select("id").limit(1).execute()
+
+    return await _run_sessions(call, sessions, calls)
+
+
+async def bench_pooled(sessions: int, calls: int, table: str) -> List[float]:
+    from src.db.supabase_client import close_supabase_client, get_supabase_client
+
+    async def call() -> None:
+        sb = await get_supabase_client()
+        await sb.table(table).select("id").limit(1).execute()
+
+    try:
+        return await _run_sessions(call, sessions, calls)
+    finally:
+        await close_supabase_client()
+
+
+def _report(label: str, latencies: List[float], elapsed: float) -> None:
+    print(
+        f"{label:<8} calls={len(latencies):<6} "
+        f"p50={_percentile(latencies, 50):8.1f}ms  "
+        f"p99={_percentile(latencies, 99):8.1f}ms  "
+        f"mean={statistics.fmean(latencies):8.1f}ms  "
+        f"throughput={len(latencies) / elapsed:8.1f} calls/s"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent sessions.")
+    parser.add_argument("--calls", type=int, default=20, help="Tool calls per session.")
+    parser.add_argument("--table", default="project_scopes", help="Table to query.")
+    parser.add_argument("--mode", choices=["legacy", "pooled", "both"], default="both")
+    parser.add_argument("--backend", choices=["supabase", "local"], default=os.getenv("SUPABASE_BACKEND") or "supabase")
+    parser.add_argument("--latency-ms", type=float, default=None, help="Injected latency for --backend local.")
+    parser.add_argument("--jitter-ms", type=float, default=None, help="Latency standard deviation for --backend local.")
+    args = parser.parse_args()
+
+    if args.backend == "local":
+        os.environ["SUPABASE_BACKEND"] = "local"
+        if args.latency_ms is not None:
+            os.environ["SUPABASE_LOCAL_LATENCY_MS"] = str(args.latency_ms)
+        if args.jitter_ms is not None:
+            os.environ["SUPABASE_LOCAL_JITTER_MS"] = str(args.jitter_ms)
+        # The legacy sync client cannot talk to the stand-in.
+        modes = ["pooled"]
+    elif not os.getenv("SUPABASE_URL") or not os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
+        raise SystemExit("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set.")
+    else:
+        modes = ["legacy", "pooled"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        bench = bench_legacy if mode == "legacy" else bench_pooled
+        start = time.perf_counter()
+        latencies = await bench(args.sessions, args.calls, args.table)
+        _report(mode, latencies, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1 @@
+# This file makes src/db a Python package
@@ -0,0 +1,179 @@
+# src/db/cache.py
+"""
+In-process LRU cache with a TTL, a size bound and single-flight loading.
+
+Used in front of Supabase reads that are repeated within a conversation.
+Concurrent get_or_load() calls for the same key on the same event loop share
+one load. The cache is thread-safe, so it can also be read from other
+threads without going through the event loop.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class _Flight:
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+    stale: bool = False
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+
+
+class TTLCache(Generic[K, V]):
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        cache_none: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cache_none = cache_none
+        self._clock = clock
+        self._entries: "OrderedDict[K, _Entry]" = OrderedDict()
+        self._inflight: Dict[K, _Flight] = {}
+        self._lock = threading.RLock()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return self._lookup(key, count=False) is not _MISSING
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        if value is None and not self.cache_none:
+            self.invalidate(key)
+            return
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            # A write is newer than whatever an in-flight load will return.
+            flight = self._inflight.get(key)
+            if flight is not None:
+                flight.stale = True
+            self._entries[key] = _Entry(value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        """Drops the entry and makes any in-flight load for the key discard its result."""
+        with self._lock:
+            self._entries.pop(key, None)
+            flight = self._inflight.get(key)
+            if flight is not None:
+                flight.stale = True
+
+    def invalidate_where(self, predicate: Callable[[K], bool]) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            for key, flight in self._inflight.items():
+                if predicate(key):
+                    flight.stale = True
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for flight in self._inflight.values():
+                flight.stale = True
+
+    async def get_or_load(self, key: K, loader: Callable[[], Awaitable[V]], ttl: Optional[float] = None) -> V:
+        """Returns the cached value or loads it, sharing one load between concurrent callers."""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None and flight.loop is loop:
+                self.stats.coalesced += 1
+                joined: Optional[_Flight] = flight
+            else:
+                joined = None
+                flight = _Flight(loop=loop, future=loop.create_future())
+                self._inflight[key] = flight
+
+        if joined is not None:
+            return await asyncio.shield(joined.future)
+
+        try:
+            self.stats.loads += 1
+            value = await loader()
+        except asyncio.CancelledError:
+            self._finish(key, flight)
+            flight.future.cancel()
+            raise
+        except Exception as e:
+            self._finish(key, flight)
+            if not flight.future.done():
+                flight.future.set_exception(e)
+                # Retrieve it so a flight without followers does not log
+                # "exception was never retrieved".
+                flight.future.exception()
+            raise
+
+        self._finish(key, flight)
+        if not flight.stale:
+            self.set(key, value, ttl=ttl)
+        if not flight.future.done():
+            flight.future.set_result(value)
+        return value
+
+    def _finish(self, key: K, flight: _Flight) -> None:
+        with self._lock:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+
+    def _lookup(self, key: K, count: bool = True) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > self._clock():
+                self._entries.move_to_end(key)
+                if count:
+                    self.stats.hits += 1
+                return entry.value
+            if entry is not None:
+                del self._entries[key]
+            if count:
+                self.stats.misses += 1
+            return _MISSING
+
+    def snapshot(self) -> Tuple[int, CacheStats]:
+        with self._lock:
+            return len(self._entries), CacheStats(**vars(self.stats))
@@ -0,0 +1,762 @@
+# src/db/local_backend.py
+"""
+Offline stand-in for the Supabase client, for tests and benchmarks.
+
+Implements the part of the supabase-py async API the tools and the session
+service use, against rows held in memory (optionally written through to a
+SQLite file so data survives restarts):
+
+    table()/from_() .select/insert/update/upsert/delete
+                    .eq/neq/gt/gte/lt/lte/in_/is_/like/ilike/or_
+                    .order/limit/range/single/maybe_single -> await .execute()
+    rpc(name, params).execute()           (adk_sessions_merge_state and the sweeper functions built in)
+    storage.from_(bucket).upload/get_public_url/download/remove
+
+Embedded resources in select ("*,project_images(*)",
+"images:project_images(image_url)", "image_count:project_images(count)") are
+resolved through the child's <parent>_id column, e.g. project_scope_id.
+Unique keys per table (TABLE_KEYS) drive upsert conflicts and raise the same
+duplicate-key error (code 23505) Postgres does.
+
+Every execute() first sleeps for the injected latency, so concurrency and
+pooling behave as they would against a remote database; each request is
+counted in src/observability/tool_metrics.py like a real one. Select it with
+SUPABASE_BACKEND=local; get_supabase_client() then returns the shared
+instance configured from:
+
+    SUPABASE_LOCAL_PATH          SQLite file (default: in memory only)
+    SUPABASE_LOCAL_LATENCY_MS    mean latency per request (default 0)
+    SUPABASE_LOCAL_JITTER_MS     standard deviation of the latency (default 0)
+    SUPABASE_LOCAL_URL           base of public storage URLs (default http://localhost:54321)
+"""
+import asyncio
+import copy
+import datetime
+import fnmatch
+import json
+import operator
+import os
+import random
+import re
+import sqlite3
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.observability.tool_metrics import record_db_round_trip
+
+DEFAULT_URL = "http://localhost:54321"
+
+# Unique key of each table; anything else is keyed on "id".
+TABLE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "adk_sessions": ("session_id",),
+    "adk_session_events": ("session_id", "id"),
+    "project_scope_facts": ("project_scope_id", "fact_name"),
+    "project_images": ("project_scope_id", "image_url"),
+    "bid_card_snapshots": ("project_scope_id", "version"),
+}
+
+
+class APIError(Exception):
+    """Mirrors postgrest's APIError: message, code, details."""
+
+    def __init__(self, message: str, code: Optional[str] = None, details: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.details = details
+
+    def __str__(self) -> str:
+        return str({"message": self.message, "code": self.code, "details": self.details})
+
+
+@dataclass
+class APIResponse:
+    data: Any
+    count: Optional[int] = None
+    error: Any = None
+    status_code: int = 200
+
+
+@dataclass
+class LatencyModel:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    seed: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        self._random = random.Random(self.seed)
+
+    @classmethod
+    def from_env(cls) -> "LatencyModel":
+        return cls(
+            latency_ms=float(os.getenv("SUPABASE_LOCAL_LATENCY_MS", 0)),
+            jitter_ms=float(os.getenv("SUPABASE_LOCAL_JITTER_MS", 0)),
+        )
+
+    def sample(self) -> float:
+        """Seconds to wait for one request."""
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        return max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    async def wait(self) -> None:
+        delay = self.sample()
+        # Always yield, as a network round trip would.
+        await asyncio.sleep(delay)
+
+
+def _json_size(value: Any) -> int:
+    """Approximate wire size of a JSON body."""
+    if not value:
+        return 0
+    return len(json.dumps(value, default=str, separators=(",", ":")))
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class LocalDatabase:
+    """Rows per table in insertion order, keyed by the table's unique key, optionally mirrored to SQLite."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._tables: Dict[str, Dict[Tuple, Dict[str, Any]]] = {}
+        self._objects: Dict[Tuple[str, str], Tuple[bytes, str]] = {}
+        self._sqlite: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        if path:
+            self._open(path)
+
+    # --- rows ----------------------------------------------------------------
+    def key_columns(self, table: str) -> Tuple[str, ...]:
+        return TABLE_KEYS.get(table, ("id",))
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        return list(self._tables.get(table, {}).values())
+
+    def get(self, table: str, key: Tuple) -> Optional[Dict[str, Any]]:
+        return self._tables.get(table, {}).get(key)
+
+    def insert(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = copy.deepcopy(row)
+        columns = self.key_columns(table)
+        if columns == ("id",):
+            row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", _now())
+        key = tuple(row.get(column) for column in columns)
+        rows = self._tables.setdefault(table, {})
+        if key in rows:
+            raise APIError(
+                f'duplicate key value violates unique constraint "{table}_pkey"',
+                code="23505",
+                details=f"Key ({', '.join(columns)})=({', '.join(map(str, key))}) already exists.",
+            )
+        rows[key] = row
+        self._persist_row(table, key, row)
+        return row
+
+    def replace(self, table: str, old_key: Tuple, row: Dict[str, Any]) -> Dict[str, Any]:
+        rows = self._tables[table]
+        new_key = tuple(row.get(column) for column in self.key_columns(table))
+        if new_key != old_key:
+            if new_key in rows:
+                raise APIError(f'duplicate key value violates unique constraint "{table}_pkey"', code="23505")
+            del rows[old_key]
+            self._delete_row(table, old_key)
+        rows[new_key] = row
+        self._persist_row(table, new_key, row)
+        return row
+
+    def delete(self, table: str, key: Tuple) -> None:
+        self._tables.get(table, {}).pop(key, None)
+        self._delete_row(table, key)
+
+    def key_of(self, table: str, row: Dict[str, Any]) -> Tuple:
+        return tuple(row.get(column) for column in self.key_columns(table))
+
+    # --- storage objects --------------------------------------------------------
+    def get_object(self, bucket: str, path: str) -> Optional[Tuple[bytes, str]]:
+        return self._objects.get((bucket, path))
+
+    def put_object(self, bucket: str, path: str, data: bytes, content_type: str) -> None:
+        self._objects[(bucket, path)] = (data, content_type)
+        if self._sqlite is not None:
+            with self._lock, self._sqlite:
+                self._sqlite.execute(
+                    "INSERT OR REPLACE INTO objects (bucket, path, content_type, data) VALUES (?, ?, ?, ?)",
+                    (bucket, path, content_type, data),
+                )
+
+    def delete_object(self, bucket: str, path: str) -> bool:
+        existed = self._objects.pop((bucket, path), None) is not None
+        if self._sqlite is not None:
+            with self._lock, self._sqlite:
+                self._sqlite.execute("DELETE FROM objects WHERE bucket = ? AND path = ?", (bucket, path))
+        return existed
+
+    def list_objects(self, bucket: str) -> List[str]:
+        return [path for (name, path) in self._objects if name == bucket]
+
+    # --- SQLite mirror ------------------------------------------------------------
+    def _open(self, path: str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._sqlite = sqlite3.connect(path, check_same_thread=False)
+        with self._sqlite:
+            self._sqlite.execute("PRAGMA journal_mode=WAL")
+            self._sqlite.execute("CREATE TABLE IF NOT EXISTS rows (tbl TEXT, key TEXT, data TEXT, PRIMARY KEY (tbl, key))")
+            self._sqlite.execute(
+                "CREATE TABLE IF NOT EXISTS objects (bucket TEXT, path TEXT, content_type TEXT, data BLOB, PRIMARY KEY (bucket, path))"
+            )
+        for table, key, data in self._sqlite.execute("SELECT tbl, key, data FROM rows ORDER BY rowid"):
+            self._tables.setdefault(table, {})[tuple(json.loads(key))] = json.loads(data)
+        for bucket, path, content_type, data in self._sqlite.execute("SELECT bucket, path, content_type, data FROM objects"):
+            self._objects[(bucket, path)] = (bytes(data), content_type)
+
+    def _persist_row(self, table: str, key: Tuple, row: Dict[str, Any]) -> None:
+        if self._sqlite is None:
+            return
+        with self._lock, self._sqlite:
+            self._sqlite.execute(
+                "INSERT OR REPLACE INTO rows (tbl, key, data) VALUES (?, ?, ?)",
+                (table, json.dumps(key, default=str), json.dumps(row, default=str)),
+            )
+
+    def _delete_row(self, table: str, key: Tuple) -> None:
+        if self._sqlite is None:
+            return
+        with self._lock, self._sqlite:
+            self._sqlite.execute("DELETE FROM rows WHERE tbl = ? AND key = ?", (table, json.dumps(key, default=str)))
+
+    def close(self) -> None:
+        if self._sqlite is not None:
+            self._sqlite.close()
+            self._sqlite = None
+
+
+# --- filters ------------------------------------------------------------------------
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+def _coerce(row_value: Any, value: Any) -> Tuple[Any, Any]:
+    """Brings a filter value (often text from a query string) to the row value's type."""
+    if isinstance(value, str):
+        value = value.strip('"')
+        if isinstance(row_value, bool):
+            return row_value, value.lower() == "true"
+        if isinstance(row_value, (int, float)):
+            try:
+                return row_value, float(value)
+            except ValueError:
+                return str(row_value), value
+    if isinstance(row_value, (int, float)) and not isinstance(row_value, bool) and isinstance(value, (int, float)):
+        return row_value, value
+    return str(row_value) if not isinstance(row_value, str) else row_value, str(value)
+
+
+def _like(pattern: str, case_insensitive: bool) -> Callable[[Any], bool]:
+    translated = fnmatch.translate(pattern.strip('"').replace("%", "*").replace("_", "?"))
+    regex = re.compile(translated, re.IGNORECASE if case_insensitive else 0)
+    return lambda value: value is not None and regex.match(str(value)) is not None
+
+
+_OPERATORS = {
+    "eq": operator.eq, "neq": operator.ne, "gt": operator.gt,
+    "gte": operator.ge, "lt": operator.lt, "lte": operator.le,
+}
+_IS_VALUES = {"null": None, "true": True, "false": False}
+
+
+def _compare(op: str, column: str, value: Any) -> Predicate:
+    if op == "is":
+        wanted = _IS_VALUES.get(str(value).lower(), value)
+        return lambda row: row.get(column) is wanted
+    if op == "in":
+        values = value
+        if isinstance(value, str):
+            values = [item.strip().strip('"') for item in value.strip("()").split(",") if item.strip()]
+        return lambda row: row.get(column) is not None and any(
+            left == right for left, right in (_coerce(row.get(column), item) for item in values)
+        )
+    if op in ("like", "ilike"):
+        matches = _like(str(value), op == "ilike")
+        return lambda row: matches(row.get(column))
+
+    compare = _OPERATORS[op]
+
+    def predicate(row: Dict[str, Any]) -> bool:
+        row_value = row.get(column)
+        if row_value is None:
+            return False
+        return compare(*_coerce(row_value, value))
+
+    return predicate
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_logic_tree(text: str, combine: str = "or") -> Predicate:
+    """Parses a PostgREST logic filter such as 'a.lt.1,and(a.eq.1,id.lt.x)'."""
+    conditions = []
+    for part in _split_top_level(text):
+        negate = part.startswith("not.")
+        if negate:
+            part = part[4:]
+        group = re.match(r"^(and|or)\((.*)\)$", part, re.DOTALL)
+        if group:
+            condition = parse_logic_tree(group.group(2), group.group(1))
+        else:
+            column, rest = part.split(".", 1)
+            if rest.startswith("not."):
+                negate, rest = not negate, rest[4:]
+            op, value = rest.split(".", 1)
+            condition = _compare(op, column, value)
+        conditions.append((lambda c: (lambda row: not c(row)))(condition) if negate else condition)
+    if combine == "and":
+        return lambda row: all(condition(row) for condition in conditions)
+    return lambda row: any(condition(row) for condition in conditions)
+
+
+# --- select parsing -----------------------------------------------------------------------
+
+@dataclass
+class _Embed:
+    name: str  # alias, or the table name when not aliased
+    table: str
+    columns: List[str]
+
+
+def _parse_columns(columns: str) -> Tuple[List[str], List[_Embed]]:
+    plain, embeds = [], []
+    for part in _split_top_level(re.sub(r"\s+", "", columns or "*")):
+        match = re.match(r"^(?:(\w+):)?(\w+)(?:!\w+)?\((.*)\)$", part)
+        if match:
+            alias, table, inner = match.groups()
+            embeds.append(_Embed(alias or table, table, _split_top_level(inner) or ["*"]))
+        else:
+            plain.append(part.split(":", 1)[-1] if ":" in part else part)
+    return plain, embeds
+
+
+def _project(row: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+    if not columns or "*" in columns:
+        return copy.deepcopy(row)
+    return {column: copy.deepcopy(row.get(column)) for column in columns}
+
+
+def _foreign_key(parent_table: str) -> str:
+    singular = parent_table[:-1] if parent_table.endswith("s") else parent_table
+    return f"{singular}_id"
+
+
+def _sort(rows: List[Dict[str, Any]], orders: List[Tuple[str, bool]]) -> List[Dict[str, Any]]:
+    # Postgres puts NULLs last ascending and first descending.
+    for column, desc in reversed(orders):
+        present = [row for row in rows if row.get(column) is not None]
+        missing = [row for row in rows if row.get(column) is None]
+        present.sort(key=lambda row: row[column], reverse=desc)
+        rows = missing + present if desc else present + missing
+    return rows
+
+
+# --- query builder --------------------------------------------------------------------------
+
+class QueryBuilder:
+    def __init__(self, client: "LocalSupabaseClient", table: str):
+        self._client = client
+        self._db = client.db
+        self._table = table
+        self._action = "select"
+        self._columns = "*"
+        self._count: Optional[str] = None
+        self._payload: Any = None
+        self._on_conflict: Optional[str] = None
+        self._ignore_duplicates = False
+        self._filters: List[Predicate] = []
+        self._orders: Dict[Optional[str], List[Tuple[str, bool]]] = {}
+        self._limits: Dict[Optional[str], int] = {}
+        self._offset = 0
+        self._single: Optional[str] = None
+
+    # --- actions ---------------------------------------------------------------------
+    def select(self, *columns: str, count: Optional[str] = None) -> "QueryBuilder":
+        if self._action == "select":
+            self._columns = ",".join(columns) or "*"
+        self._count = count
+        return self
+
+    def insert(self, rows: Any, count: Optional[str] = None, **_: Any) -> "QueryBuilder":
+        self._action, self._payload, self._count = "insert", rows, count
+        return self
+
+    def upsert(self, rows: Any, on_conflict: str = "", ignore_duplicates: bool = False, count: Optional[str] = None, **_: Any) -> "QueryBuilder":
+        self._action, self._payload, self._count = "upsert", rows, count
+        self._on_conflict = on_conflict or None
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values: Dict[str, Any], count: Optional[str] = None, **_: Any) -> "QueryBuilder":
+        self._action, self._payload, self._count = "update", values, count
+        return self
+
+    def delete(self, count: Optional[str] = None, **_: Any) -> "QueryBuilder":
+        self._action, self._count = "delete", count
+        return self
+
+    # --- filters ---------------------------------------------------------------------
+    def _filter(self, op: str, column: str, value: Any) -> "QueryBuilder":
+        self._filters.append(_compare(op, column, value))
+        return self
+
+    def eq(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter("eq", column, value)
+
+    def neq(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter("neq", column, value)
+
+    def gt(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter("gt", column, value)
+
+    def gte(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter("gte", column, value)
+
+    def lt(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter("lt", column, value)
+
+    def lte(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter("lte", column, value)
+
+    def in_(self, column: str, values: Iterable[Any]) -> "QueryBuilder":
+        return self._filter("in", column, list(values))
+
+    def is_(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter("is", column, "null" if value is None else value)
+
+    def like(self, column: str, pattern: str) -> "QueryBuilder":
+        return self._filter("like", column, pattern)
+
+    def ilike(self, column: str, pattern: str) -> "QueryBuilder":
+        return self._filter("ilike", column, pattern)
+
+    def or_(self, filters: str, reference_table: Optional[str] = None) -> "QueryBuilder":
+        self._filters.append(parse_logic_tree(filters))
+        return self
+
+    # --- modifiers -----------------------------------------------------------------------
+    def order(self, column: str, desc: bool = False, nullsfirst: bool = False, foreign_table: Optional[str] = None) -> "QueryBuilder":
+        self._orders.setdefault(foreign_table, []).append((column, desc))
+        return self
+
+    def limit(self, size: int, foreign_table: Optional[str] = None) -> "QueryBuilder":
+        self._limits[foreign_table] = size
+        return self
+
+    def range(self, start: int, end: int) -> "QueryBuilder":
+        self._offset = start
+        self._limits[None] = end - start + 1
+        return self
+
+    def single(self) -> "QueryBuilder":
+        self._single = "single"
+        return self
+
+    def maybe_single(self) -> "QueryBuilder":
+        self._single = "maybe"
+        return self
+
+    # --- execution -------------------------------------------------------------------------
+    async def execute(self) -> APIResponse:
+        await self._client.latency.wait()
+        rows: List[Dict[str, Any]] = []
+        try:
+            rows, count = getattr(self, f"_run_{self._action}")()
+        finally:
+            self._client.count_round_trip(_json_size(self._payload), _json_size(rows))
+        if self._single is None:
+            return APIResponse(data=rows, count=count)
+        if len(rows) == 1:
+            return APIResponse(data=rows[0], count=count)
+        if not rows and self._single == "maybe":
+            return APIResponse(data=None, count=count)
+        raise APIError(
+            "JSON object requested, multiple (or no) rows returned",
+            code="PGRST116",
+            details=f"The result contains {len(rows)} rows",
+        )
+
+    def _matching(self) -> List[Dict[str, Any]]:
+        return [row for row in self._db.rows(self._table) if all(check(row) for check in self._filters)]
+
+    def _shape(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        plain, embeds = _parse_columns(self._columns)
+        shaped = []
+        for row in rows:
+            result = _project(row, plain)
+            for embed in embeds:
+                foreign_key = _foreign_key(self._table)
+                children = [child for child in self._db.rows(embed.table) if child.get(foreign_key) == row.get("id")]
+                if embed.columns == ["count"]:
+                    result[embed.name] = [{"count": len(children)}]
+                    continue
+                children = _sort(children, self._orders.get(embed.name, []))
+                if embed.name in self._limits:
+                    children = children[: self._limits[embed.name]]
+                result[embed.name] = [_project(child, embed.columns) for child in children]
+            shaped.append(result)
+        return shaped
+
+    def _run_select(self) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        rows = _sort(self._matching(), self._orders.get(None, []))
+        count = len(rows) if self._count else None
+        rows = rows[self._offset:]
+        if None in self._limits:
+            rows = rows[: self._limits[None]]
+        return self._shape(rows), count
+
+    def _payload_rows(self) -> List[Dict[str, Any]]:
+        return [self._payload] if isinstance(self._payload, dict) else list(self._payload or [])
+
+    def _run_insert(self) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        inserted = [self._db.insert(self._table, row) for row in self._payload_rows()]
+        return [copy.deepcopy(row) for row in inserted], len(inserted) if self._count else None
+
+    def _run_upsert(self) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        columns = tuple(c.strip() for c in self._on_conflict.split(",")) if self._on_conflict else self._db.key_columns(self._table)
+        written = []
+        by_key = columns == self._db.key_columns(self._table)
+        for row in self._payload_rows():
+            if by_key:
+                existing = self._db.get(self._table, tuple(row.get(column) for column in columns))
+            else:
+                existing = next(
+                    (current for current in self._db.rows(self._table)
+                     if all(current.get(column) == row.get(column) for column in columns)),
+                    None,
+                )
+            if existing is None:
+                written.append(self._db.insert(self._table, row))
+            elif not self._ignore_duplicates:
+                old_key = self._db.key_of(self._table, existing)
+                written.append(self._db.replace(self._table, old_key, {**existing, **copy.deepcopy(row)}))
+        return [copy.deepcopy(row) for row in written], len(written) if self._count else None
+
+    def _run_update(self) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        updated = []
+        for row in self._matching():
+            old_key = self._db.key_of(self._table, row)
+            updated.append(self._db.replace(self._table, old_key, {**row, **copy.deepcopy(self._payload)}))
+        return [copy.deepcopy(row) for row in updated], len(updated) if self._count else None
+
+    def _run_delete(self) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        deleted = self._matching()
+        for row in deleted:
+            self._db.delete(self._table, self._db.key_of(self._table, row))
+        return deleted, len(deleted) if self._count else None
+
+
+class _RpcCall:
+    def __init__(self, client: "LocalSupabaseClient", name: str, params: Dict[str, Any]):
+        self._client = client
+        self._name = name
+        self._params = params
+
+    async def execute(self) -> APIResponse:
+        await self._client.latency.wait()
+        self._client.count_round_trip(_json_size(self._params))
+        function = self._client.functions.get(self._name)
+        if function is None:
+            raise APIError(f"Could not find the function public.{self._name}", code="PGRST202")
+        return APIResponse(data=function(self._client.db, **self._params))
+
+
+def adk_sessions_merge_state(db: LocalDatabase, p_session_id: str, p_set: Dict[str, Any], p_unset: List[str]) -> Optional[bool]:
+    """Same contract as the SQL function documented in src/session/supabase_session.py."""
+    key = (p_session_id,)
+    row = db.get("adk_sessions", key)
+    if row is None or "__state_codec__" in (row.get("state_data") or {}):
+        return None
+    state = {**(row.get("state_data") or {}), **copy.deepcopy(p_set)}
+    for name in p_unset:
+        state.pop(name, None)
+    db.replace("adk_sessions", key, {**row, "state_data": state, "last_updated_at": _now()})
+    return True
+
+
+def adk_sessions_sweep(db: LocalDatabase, p_idle_before: str, p_limit: int) -> List[Dict[str, Any]]:
+    """Same contract as the SQL function documented in src/session/sweeper.py."""
+    idle = [row for row in db.rows("adk_sessions") if row.get("last_updated_at") and row["last_updated_at"] < p_idle_before]
+    idle.sort(key=lambda row: row["last_updated_at"])
+    swept = []
+    for row in idle[:p_limit]:
+        db.delete("adk_sessions", db.key_of("adk_sessions", row))
+        # on delete cascade
+        for event in db.rows("adk_session_events"):
+            if event.get("session_id") == row["session_id"]:
+                db.delete("adk_session_events", db.key_of("adk_session_events", event))
+        swept.append({"session_id": row["session_id"], "state_bytes": _json_size(row.get("state_data"))})
+    return swept
+
+
+def adk_sessions_strip_transient(db: LocalDatabase, p_idle_before: str, p_limit: int) -> List[Dict[str, Any]]:
+    """Same contract as the SQL function documented in src/session/sweeper.py."""
+    from src.session.sweeper import TRANSIENT_STATE_KEYS
+
+    stripped = []
+    for row in db.rows("adk_sessions"):
+        if len(stripped) >= p_limit:
+            break
+        state = row.get("state_data") or {}
+        if not (row.get("last_updated_at") and row["last_updated_at"] < p_idle_before):
+            continue
+        if not any(name in state for name in TRANSIENT_STATE_KEYS):
+            continue
+        compacted = {name: value for name, value in state.items() if name not in TRANSIENT_STATE_KEYS}
+        db.replace("adk_sessions", db.key_of("adk_sessions", row), {**row, "state_data": compacted})
+        stripped.append({"session_id": row["session_id"], "state_bytes": _json_size(state) - _json_size(compacted)})
+    return stripped
+
+
+# --- storage ----------------------------------------------------------------------------------
+
+@dataclass
+class _UploadResponse:
+    path: str
+    full_path: str
+    status_code: int = 200
+
+    def json(self) -> Dict[str, Any]:
+        return {"Key": self.full_path}
+
+
+class _Bucket:
+    def __init__(self, client: "LocalSupabaseClient", bucket: str):
+        self._client = client
+        self._bucket = bucket
+
+    async def upload(self, path: str, file: Any, file_options: Optional[Dict[str, str]] = None) -> _UploadResponse:
+        await self._client.latency.wait()
+        options = file_options or {}
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "rb") as f:
+                data = f.read()
+        else:
+            data = bytes(file)
+        self._client.count_round_trip(len(data))
+        upsert = str(options.get("upsert", options.get("x-upsert", "false"))).lower() == "true"
+        if not upsert and self._client.db.get_object(self._bucket, path) is not None:
+            raise APIError("The resource already exists", code="409", details="Duplicate")
+        content_type = options.get("content-type", options.get("contentType", "text/plain;charset=UTF-8"))
+        self._client.db.put_object(self._bucket, path, data, content_type)
+        return _UploadResponse(path=path, full_path=f"{self._bucket}/{path}")
+
+    async def download(self, path: str) -> bytes:
+        await self._client.latency.wait()
+        stored = self._client.db.get_object(self._bucket, path)
+        self._client.count_round_trip(0, len(stored[0]) if stored else 0)
+        if stored is None:
+            raise APIError("Object not found", code="404")
+        return stored[0]
+
+    async def remove(self, paths: List[str]) -> List[Dict[str, Any]]:
+        await self._client.latency.wait()
+        self._client.count_round_trip(_json_size(paths))
+        return [{"name": path} for path in paths if self._client.db.delete_object(self._bucket, path)]
+
+    async def list(self, path: str = "") -> List[Dict[str, Any]]:
+        await self._client.latency.wait()
+        self._client.count_round_trip()
+        return [{"name": name} for name in self._client.db.list_objects(self._bucket) if name.startswith(path)]
+
+    async def get_public_url(self, path: str, options: Optional[Dict[str, Any]] = None) -> str:
+        return f"{self._client.url}/storage/v1/object/public/{self._bucket}/{path.lstrip('/')}"
+
+
+class _Storage:
+    def __init__(self, client: "LocalSupabaseClient"):
+        self._client = client
+
+    def from_(self, bucket: str) -> _Bucket:
+        return _Bucket(self._client, bucket)
+
+
+class LocalSupabaseClient:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        latency: Optional[LatencyModel] = None,
+        url: str = DEFAULT_URL,
+    ):
+        self.db = LocalDatabase(path)
+        self.latency = latency or LatencyModel()
+        self.url = url.rstrip("/")
+        self.storage = _Storage(self)
+        self.functions: Dict[str, Callable[..., Any]] = {
+            "adk_sessions_merge_state": adk_sessions_merge_state,
+            "adk_sessions_sweep": adk_sessions_sweep,
+            "adk_sessions_strip_transient": adk_sessions_strip_transient,
+        }
+        # Round trips issued, for benchmarks.
+        self.requests = 0
+
+    def table(self, name: str) -> QueryBuilder:
+        return QueryBuilder(self, name)
+
+    def count_round_trip(self, bytes_sent: int = 0, bytes_received: int = 0) -> None:
+        self.requests += 1
+        record_db_round_trip(bytes_sent, bytes_received)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _RpcCall:
+        return _RpcCall(self, name, params or {})
+
+    def register_function(self, name: str, function: Callable[..., Any]) -> None:
+        """Adds an RPC: function(db, **params) -> data."""
+        self.functions[name] = function
+
+    def close(self) -> None:
+        self.db.close()
+
+
+_local_client: Optional[LocalSupabaseClient] = None
+
+
+def get_local_client() -> LocalSupabaseClient:
+    """The shared stand-in returned by get_supabase_client() when SUPABASE_BACKEND=local."""
+    global _local_client
+    if _local_client is None:
+        _local_client = LocalSupabaseClient(
+            path=os.getenv("SUPABASE_LOCAL_PATH") or None,
+            latency=LatencyModel.from_env(),
+            url=os.getenv("SUPABASE_LOCAL_URL", DEFAULT_URL),
+        )
+    return _local_client
+
+
+def reset_local_client() -> None:
+    """Drops the shared stand-in (tests)."""
+    global _local_client
+    if _local_client is not None:
+        _local_client.close()
+    _local_client = None
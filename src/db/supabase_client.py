@@ -0,0 +1,238 @@
+# src/db/supabase_client.py
+"""
+Shared async Supabase client for every tool and the session service.
+
+All PostgREST and Storage traffic goes through one HTTP/2 connection pool
+per event loop instead of one sync client per module. Pool limits and
+timeouts come from the environment:
+
+    SUPABASE_POOL_MAX_CONNECTIONS      (default 20)
+    SUPABASE_POOL_MAX_KEEPALIVE        (default 10)
+    SUPABASE_POOL_KEEPALIVE_EXPIRY     (seconds, default 30)
+    SUPABASE_CONNECT_TIMEOUT           (seconds, default 5)
+    SUPABASE_REQUEST_TIMEOUT           (seconds, default 10)
+    SUPABASE_HEALTH_CHECK_INTERVAL     (seconds, default 30)
+    SUPABASE_HTTP2                     ("true"/"false", default true)
+
+SUPABASE_BACKEND=local swaps in the offline stand-in from
+src/db/local_backend.py (in-memory/SQLite, with injected latency).
+
+Usage:
+    sb = await get_supabase_client()
+    if sb:
+        resp = await sb.table("project_scopes").select("id").limit(1).execute()
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+from supabase import AsyncClient, acreate_client
+from supabase.lib.client_options import AsyncClientOptions
+
+from src.observability.tool_metrics import record_db_round_trip
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Invalid value for %s: %r. Using default %s.", name, value, default)
+        return default
+
+
+@dataclass(frozen=True)
+class SupabasePoolConfig:
+    """Connection pool and timeout settings for the shared client."""
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 5.0
+    request_timeout: float = 10.0
+    health_check_interval: float = 30.0
+    http2: bool = True
+
+    @classmethod
+    def from_env(cls) -> "SupabasePoolConfig":
+        return cls(
+            max_connections=int(_env_float("SUPABASE_POOL_MAX_CONNECTIONS", cls.max_connections)),
+            max_keepalive_connections=int(_env_float("SUPABASE_POOL_MAX_KEEPALIVE", cls.max_keepalive_connections)),
+            keepalive_expiry=_env_float("SUPABASE_POOL_KEEPALIVE_EXPIRY", cls.keepalive_expiry),
+            connect_timeout=_env_float("SUPABASE_CONNECT_TIMEOUT", cls.connect_timeout),
+            request_timeout=_env_float("SUPABASE_REQUEST_TIMEOUT", cls.request_timeout),
+            health_check_interval=_env_float("SUPABASE_HEALTH_CHECK_INTERVAL", cls.health_check_interval),
+            http2=os.getenv("SUPABASE_HTTP2", "true").lower() == "true",
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.request_timeout, connect=self.connect_timeout)
+
+
+@dataclass
+class _PooledClient:
+    client: AsyncClient
+    transport: httpx.AsyncHTTPTransport
+    last_checked: float
+
+
+async def _count_round_trip(response: httpx.Response) -> None:
+    """Reports every PostgREST/Storage response to the per-tool metrics."""
+    sent = int(response.request.headers.get("content-length") or 0)
+    received = int(response.headers.get("content-length") or 0)
+    record_db_round_trip(sent, received)
+
+
+class SupabaseClientProvider:
+    """
+    Hands out one pooled AsyncClient per event loop.
+
+    httpx connections are bound to the loop that opened them, so the pool is
+    keyed by loop. A client whose last health check is older than the check
+    interval is probed before it is handed out again, and rebuilt if the
+    probe fails at the transport level.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        key: Optional[str] = None,
+        config: Optional[SupabasePoolConfig] = None,
+    ):
+        self.url = url
+        self.key = key
+        self.config = config or SupabasePoolConfig.from_env()
+        self._clients: Dict[asyncio.AbstractEventLoop, _PooledClient] = {}
+        self._locks: Dict[asyncio.AbstractEventLoop, asyncio.Lock] = {}
+
+    @property
+    def configured(self) -> bool:
+        # Resolved lazily so modules that call load_dotenv() after importing
+        # this one still get their configuration.
+        self.url = self.url or os.getenv("SUPABASE_URL")
+        self.key = self.key or os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        return bool(self.url and self.key)
+
+    async def get(self) -> Optional[AsyncClient]:
+        if not self.configured:
+            logger.error("Supabase URL or Service Role Key not found in environment variables.")
+            return None
+
+        loop = asyncio.get_running_loop()
+        pooled = self._clients.get(loop)
+        if pooled and time.monotonic() - pooled.last_checked < self.config.health_check_interval:
+            return pooled.client
+
+        lock = self._locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            pooled = self._clients.get(loop)
+            if pooled is not None:
+                if await self._is_healthy(pooled):
+                    pooled.last_checked = time.monotonic()
+                    return pooled.client
+                logger.warning("Pooled Supabase client failed its health check. Rebuilding.")
+                await self._close(pooled)
+                self._clients.pop(loop, None)
+
+            self._forget_closed_loops()
+            pooled = await self._build()
+            self._clients[loop] = pooled
+            return pooled.client
+
+    async def aclose(self) -> None:
+        """Close the client belonging to the running loop."""
+        loop = asyncio.get_running_loop()
+        pooled = self._clients.pop(loop, None)
+        self._locks.pop(loop, None)
+        if pooled:
+            await self._close(pooled)
+
+    async def _build(self) -> _PooledClient:
+        options = AsyncClientOptions(
+            postgrest_client_timeout=self.config.request_timeout,
+            storage_client_timeout=self.config.request_timeout,
+        )
+        client = await acreate_client(self.url, self.key, options=options)
+
+        # One transport (and so one connection pool) shared by PostgREST and
+        # Storage instead of the separate pools supabase-py creates for each.
+        transport = httpx.AsyncHTTPTransport(http2=self.config.http2, limits=self.config.limits())
+        client.postgrest.session = await self._adopt(client.postgrest.session, transport)
+        storage = client.storage
+        if isinstance(getattr(storage, "_client", None), httpx.AsyncClient):
+            storage._client = await self._adopt(storage._client, transport)
+
+        logger.info(
+            "Created pooled Supabase client (http2=%s, max_connections=%s, keepalive=%s).",
+            self.config.http2, self.config.max_connections, self.config.max_keepalive_connections,
+        )
+        return _PooledClient(client=client, transport=transport, last_checked=time.monotonic())
+
+    async def _adopt(self, session: httpx.AsyncClient, transport: httpx.AsyncHTTPTransport) -> httpx.AsyncClient:
+        pooled_session = httpx.AsyncClient(
+            base_url=session.base_url,
+            headers=session.headers,
+            timeout=self.config.timeout(),
+            follow_redirects=True,
+            transport=transport,
+            event_hooks={"response": [_count_round_trip]},
+        )
+        await session.aclose()
+        return pooled_session
+
+    async def _is_healthy(self, pooled: _PooledClient) -> bool:
+        """Any HTTP response means the pool can still reach Supabase."""
+        try:
+            await pooled.client.postgrest.session.head("/", timeout=self.config.connect_timeout)
+            return True
+        except httpx.TransportError as e:
+            logger.warning("Supabase health check failed: %s", e)
+            return False
+
+    async def _close(self, pooled: _PooledClient) -> None:
+        try:
+            await pooled.transport.aclose()
+        except Exception as e:
+            logger.warning("Error closing pooled Supabase transport: %s", e)
+
+    def _forget_closed_loops(self) -> None:
+        for loop in [loop for loop in self._clients if loop.is_closed()]:
+            self._clients.pop(loop, None)
+            self._locks.pop(loop, None)
+
+
+_provider = SupabaseClientProvider()
+
+
+def _use_local_backend() -> bool:
+    return os.getenv("SUPABASE_BACKEND", "").lower() == "local"
+
+
+async def get_supabase_client() -> Optional[AsyncClient]:
+    """Returns the shared pooled client, or None if Supabase is not configured."""
+    if _use_local_backend():
+        from src.db.local_backend import get_local_client
+
+        return get_local_client()
+    return await _provider.get()
+
+
+async def close_supabase_client() -> None:
+    """Closes the shared client for the running loop (e.g. on app shutdown)."""
+    if _use_local_backend():
+        return
+    await _provider.aclose()
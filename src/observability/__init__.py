@@ -0,0 +1 @@
+# This file makes src/observability a Python package
@@ -0,0 +1,184 @@
+# src/observability/log.py
+"""
+Size-bounded, lazily rendered log arguments and sampling for hot log paths.
+
+Agent state and ADK messages can carry megabytes (inline image bytes, base64
+payloads, long transcripts). Interpolating them with f-strings formats the
+whole value on every call, whether or not the record is emitted. Instead,
+pass them through redacted() as a %-style argument:
+
+    logger.debug("[%s] state: %s", self.name, redacted(tool_context.state))
+
+The value is only walked when a handler actually formats the record, and the
+rendering is bounded:
+
+  * bytes and base64-looking strings become "<bytes N>" / "<base64 N chars>"
+  * values under sensitive keys (tokens, keys, passwords, inline data) become
+    "<redacted ...>"
+  * other strings longer than LOG_MAX_FIELD_CHARS are truncated
+  * containers show at most LOG_MAX_ITEMS entries, LOG_MAX_DEPTH levels deep
+  * the whole rendering is capped at LOG_MAX_TOTAL_CHARS
+
+High-frequency events (one per message, part or chunk) go through
+log_sampled(), which emits the first LOG_SAMPLE_FIRST occurrences of an event
+and then one in LOG_SAMPLE_EVERY, noting how many were suppressed.
+"""
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "256"))
+LOG_MAX_TOTAL_CHARS = int(os.getenv("LOG_MAX_TOTAL_CHARS", "4096"))
+LOG_MAX_ITEMS = int(os.getenv("LOG_MAX_ITEMS", "50"))
+LOG_MAX_DEPTH = int(os.getenv("LOG_MAX_DEPTH", "4"))
+LOG_SAMPLE_FIRST = int(os.getenv("LOG_SAMPLE_FIRST", "10"))
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+
+# Keys whose values never reach the logs, whatever their size.
+_SENSITIVE_KEY = re.compile(
+    r"(password|secret|token|api_?key|authorization|cookie|inline_data|image_data|image_bytes|base64)",
+    re.IGNORECASE,
+)
+_BASE64 = re.compile(r"[A-Za-z0-9+/_-]+={0,2}")
+_DATA_URI = re.compile(r"data:([\w/+.-]+);base64,", re.IGNORECASE)
+# Strings shorter than this are shown as-is even if they look like base64 (ids, hashes).
+_BASE64_MIN_CHARS = 128
+
+
+def _render_str(text: str, max_field: int) -> str:
+    uri = _DATA_URI.match(text)
+    if uri:
+        return f"<base64 {uri.group(1)} {len(text) - uri.end()} chars>"
+    if len(text) >= _BASE64_MIN_CHARS and _BASE64.fullmatch(text[:1024]):
+        return f"<base64 {len(text)} chars>"
+    if len(text) > max_field:
+        return repr(text[:max_field]) + f"...(+{len(text) - max_field} chars)"
+    return repr(text)
+
+
+def _as_mapping(value: Any) -> Optional[Dict[str, Any]]:
+    """Dict view of state-like and model objects (ADK State, pydantic models, plain objects)."""
+    to_dict = getattr(value, "to_dict", None)
+    if callable(to_dict):
+        try:
+            return dict(to_dict())
+        except Exception:
+            pass
+    attributes = getattr(value, "__dict__", None)
+    if isinstance(attributes, dict):
+        return {name: item for name, item in attributes.items() if not name.startswith("_")}
+    return None
+
+
+def _render(value: Any, depth: int, max_field: int) -> str:
+    if value is None or isinstance(value, (bool, int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return _render_str(value, max_field)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<bytes {len(value)}>"
+    if depth >= LOG_MAX_DEPTH:
+        return f"<{type(value).__name__}>"
+
+    if isinstance(value, dict):
+        items = list(value.items())
+        prefix, suffix = "{", "}"
+    else:
+        mapping = None if isinstance(value, (list, tuple, set, frozenset)) else _as_mapping(value)
+        if mapping is None:
+            if not isinstance(value, (list, tuple, set, frozenset)):
+                return _render_str(str(value), max_field)
+            shown = [_render(item, depth + 1, max_field) for item in list(value)[:LOG_MAX_ITEMS]]
+            if len(value) > LOG_MAX_ITEMS:
+                shown.append(f"...(+{len(value) - LOG_MAX_ITEMS} items)")
+            return "[" + ", ".join(shown) + "]"
+        items = list(mapping.items())
+        prefix, suffix = f"{type(value).__name__}(", ")"
+
+    shown = []
+    for key, item in items[:LOG_MAX_ITEMS]:
+        if item is not None and _SENSITIVE_KEY.search(str(key)):
+            size = f" {len(item)}" if hasattr(item, "__len__") else ""
+            shown.append(f"{key!r}: <redacted {type(item).__name__}{size}>")
+        else:
+            shown.append(f"{key!r}: {_render(item, depth + 1, max_field)}")
+    if len(items) > LOG_MAX_ITEMS:
+        shown.append(f"...(+{len(items) - LOG_MAX_ITEMS} keys)")
+    return prefix + ", ".join(shown) + suffix
+
+
+def summarize(value: Any, max_field: Optional[int] = None, max_total: Optional[int] = None) -> str:
+    """Bounded, redacted rendering of value for logs."""
+    text = _render(value, 0, max_field or LOG_MAX_FIELD_CHARS)
+    max_total = max_total or LOG_MAX_TOTAL_CHARS
+    if len(text) > max_total:
+        return text[:max_total] + f"...(+{len(text) - max_total} chars)"
+    return text
+
+
+class LazySummary:
+    """Log argument that renders summarize(value) when the record is first formatted, once for all handlers."""
+
+    __slots__ = ("value", "max_field", "max_total", "_text")
+
+    def __init__(self, value: Any, max_field: Optional[int] = None, max_total: Optional[int] = None):
+        self.value = value
+        self.max_field = max_field
+        self.max_total = max_total
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = summarize(self.value, self.max_field, self.max_total)
+        return self._text
+
+    __repr__ = __str__
+
+
+def redacted(value: Any, max_field: Optional[int] = None, max_total: Optional[int] = None) -> LazySummary:
+    """Wraps value for use as a %-style logging argument."""
+    return LazySummary(value, max_field, max_total)
+
+
+class LogSampler:
+    """Per-event counter: lets the first `first` occurrences through, then one in `every`."""
+
+    def __init__(self, first: int = LOG_SAMPLE_FIRST, every: int = LOG_SAMPLE_EVERY):
+        self.first = first
+        self.every = max(1, every)
+        self._counts: Dict[str, int] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, event: str) -> Optional[int]:
+        """Returns the number of occurrences suppressed since the last allowed one, or None to drop this one."""
+        with self._lock:
+            count = self._counts.get(event, 0) + 1
+            self._counts[event] = count
+            if count <= self.first or (count - self.first) % self.every == 0:
+                return self._suppressed.pop(event, 0)
+            self._suppressed[event] = self._suppressed.get(event, 0) + 1
+            return None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._suppressed.clear()
+
+
+sampler = LogSampler()
+
+
+def log_sampled(logger: logging.Logger, level: int, event: str, msg: str, *args: Any) -> None:
+    """logger.log(level, msg, *args) for a high-frequency event, sampled per event name."""
+    if not logger.isEnabledFor(level):
+        return
+    suppressed = sampler.allow(event)
+    if suppressed is None:
+        return
+    if suppressed:
+        msg = f"{msg} (%d similar suppressed)"
+        args = (*args, suppressed)
+    logger.log(level, msg, *args, stacklevel=2)
@@ -0,0 +1,416 @@
+# src/observability/tool_metrics.py
+"""
+Per-tool latency and payload instrumentation for ADK FunctionTools.
+
+Wrap a tool function before handing it to FunctionTool:
+
+    upsert_project_scope_tool = FunctionTool(instrument_tool(upsert_project_scope_implementation))
+
+functools.wraps keeps the signature and docstring ADK builds the declaration
+from. Every call then:
+
+  * runs inside an OpenTelemetry span "tool <name>" carrying the measurements
+    below as attributes. Spans go to whatever tracer provider the process
+    installed, e.g. the CloudTraceLoggingSpanExporter the Cloud Run server
+    registers. Without opentelemetry this is skipped.
+  * feeds in-process histograms and counters, which are served in Prometheus
+    text format on /metrics (start_metrics_server; agents start it on their
+    first run through serve_metrics) and mirrored to OpenTelemetry metric
+    instruments.
+
+Measured per call: duration, outcome (ok / error_result / error), argument and
+result bytes, database round trips and bytes (reported by the Supabase client
+and the local backend through record_db_round_trip), and time spent waiting
+on queues, locks or background work (queue_wait). Round trips and waits
+outside a tool call are attributed to tool="".
+"""
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from opentelemetry import metrics as otel_metrics
+    from opentelemetry import trace
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:
+    otel_metrics = None
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "instabids_tool"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+# Arguments that are framework plumbing rather than payload.
+_CONTEXT_ARGS = ("tool_context", "callback_context")
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, Prometheus style."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf if beyond the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[_Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[_Labels, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...], help_text: str = "", **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+            self._help.setdefault(name, help_text)
+
+    def inc(self, name: str, value: float = 1, help_text: str = "", **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            self._help.setdefault(name, help_text)
+
+    def histogram(self, name: str, **labels: str) -> Optional[Histogram]:
+        return self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines += [f"# HELP {name} {self._help.get(name, '')}", f"# TYPE {name} counter"]
+                lines += [f"{name}{_format_labels(labels)} {_number(value)}" for labels, value in sorted(series.items())]
+            for name, series in sorted(self._histograms.items()):
+                lines += [f"# HELP {name} {self._help.get(name, '')}", f"# TYPE {name} histogram"]
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                        cumulative += count
+                        bucket_labels = labels + (("le", bound if bound == "+Inf" else _number(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels: _Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+# --- per-call state ---------------------------------------------------------------
+
+@dataclass
+class ToolCall:
+    tool: str
+    request_bytes: int = 0
+    response_bytes: int = 0
+    db_round_trips: int = 0
+    db_bytes_sent: int = 0
+    db_bytes_received: int = 0
+    queue_wait_seconds: Dict[str, float] = field(default_factory=dict)
+    outcome: str = "ok"
+
+
+_current_call: contextvars.ContextVar[Optional[ToolCall]] = contextvars.ContextVar("instabids_tool_call", default=None)
+
+
+def current_tool_call() -> Optional[ToolCall]:
+    return _current_call.get()
+
+
+def record_db_round_trip(bytes_sent: int = 0, bytes_received: int = 0) -> None:
+    """Called by the database clients once per request/response."""
+    call = _current_call.get()
+    tool = call.tool if call else ""
+    if call:
+        call.db_round_trips += 1
+        call.db_bytes_sent += bytes_sent
+        call.db_bytes_received += bytes_received
+    registry.inc(f"{PREFIX}_db_round_trips_total", help_text="Database round trips.", tool=tool)
+    registry.inc(f"{PREFIX}_db_bytes_sent_total", bytes_sent, help_text="Bytes sent to the database.", tool=tool)
+    registry.inc(f"{PREFIX}_db_bytes_received_total", bytes_received, help_text="Bytes received from the database.", tool=tool)
+
+
+@contextlib.contextmanager
+def queue_wait(queue: str) -> Iterator[None]:
+    """Times a wait for a queue, lock or background result: `with queue_wait("image_upload"): await ...`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        waited = time.perf_counter() - start
+        call = _current_call.get()
+        if call:
+            call.queue_wait_seconds[queue] = call.queue_wait_seconds.get(queue, 0.0) + waited
+        registry.observe(
+            f"{PREFIX}_queue_wait_seconds", waited, DURATION_BUCKETS,
+            help_text="Time spent waiting on queues, locks and background work.",
+            tool=call.tool if call else "", queue=queue,
+        )
+
+
+@contextlib.asynccontextmanager
+async def timed_acquire(lock: Any, queue: str) -> AsyncIterator[None]:
+    """`async with lock`, recording the time spent acquiring it as a queue wait."""
+    with queue_wait(queue):
+        await lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+# --- OpenTelemetry ------------------------------------------------------------------
+
+_tracer = trace.get_tracer(__name__) if trace else None
+_otel_instruments: Dict[str, Any] = {}
+
+
+def _otel_histogram(name: str, unit: str, description: str) -> Any:
+    if otel_metrics is None:
+        return None
+    instrument = _otel_instruments.get(name)
+    if instrument is None:
+        meter = otel_metrics.get_meter(__name__)
+        instrument = _otel_instruments[name] = meter.create_histogram(name, unit=unit, description=description)
+    return instrument
+
+
+def _payload_bytes(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return memoryview(value).nbytes
+    if isinstance(value, str):
+        return len(value.encode("utf-8", "replace"))
+    try:
+        return len(json.dumps(value, default=str, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+def _outcome(result: Any) -> str:
+    """Tools report most failures as a returned message rather than an exception."""
+    if isinstance(result, str) and result.startswith("Error"):
+        return "error_result"
+    if isinstance(result, dict) and result.get("error"):
+        return "error_result"
+    return "ok"
+
+
+def _finish(call: ToolCall, duration: float, outcome: str, span: Any, error: Optional[BaseException]) -> None:
+    tool = call.tool
+    registry.inc(f"{PREFIX}_calls_total", help_text="Tool calls by outcome.", tool=tool, outcome=outcome)
+    if error is not None:
+        registry.inc(f"{PREFIX}_errors_total", help_text="Tool calls that raised.", tool=tool, error=type(error).__name__)
+    registry.observe(f"{PREFIX}_duration_seconds", duration, DURATION_BUCKETS, help_text="Tool call duration.", tool=tool)
+    registry.observe(f"{PREFIX}_db_round_trips", call.db_round_trips, COUNT_BUCKETS, help_text="Database round trips per call.", tool=tool)
+    registry.observe(f"{PREFIX}_request_bytes", call.request_bytes, BYTES_BUCKETS, help_text="Tool argument bytes.", tool=tool)
+    registry.observe(f"{PREFIX}_response_bytes", call.response_bytes, BYTES_BUCKETS, help_text="Tool result bytes.", tool=tool)
+
+    attributes = {"tool.name": tool, "tool.outcome": outcome}
+    for instrument, value in (
+        (_otel_histogram("instabids.tool.duration", "s", "Tool call duration."), duration),
+        (_otel_histogram("instabids.tool.db_round_trips", "{request}", "Database round trips per call."), call.db_round_trips),
+    ):
+        if instrument is not None:
+            instrument.record(value, attributes)
+
+    if span is not None:
+        span.set_attributes({
+            "tool.outcome": outcome,
+            "tool.duration_ms": duration * 1000,
+            "tool.request_bytes": call.request_bytes,
+            "tool.response_bytes": call.response_bytes,
+            "tool.db.round_trips": call.db_round_trips,
+            "tool.db.bytes_sent": call.db_bytes_sent,
+            "tool.db.bytes_received": call.db_bytes_received,
+            **{f"tool.queue_wait_ms.{queue}": seconds * 1000 for queue, seconds in call.queue_wait_seconds.items()},
+        })
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(Status(StatusCode.ERROR, str(error)))
+        elif outcome != "ok":
+            span.set_status(Status(StatusCode.ERROR, "tool returned an error"))
+
+
+@contextlib.contextmanager
+def _tool_call(tool: str, arguments: Dict[str, Any]) -> Iterator[ToolCall]:
+    call = ToolCall(tool=tool, request_bytes=_payload_bytes(
+        {name: value for name, value in arguments.items() if name not in _CONTEXT_ARGS}
+    ))
+    token = _current_call.set(call)
+    span_context = _tracer.start_as_current_span(f"tool {tool}", attributes={"tool.name": tool}) if _tracer else contextlib.nullcontext()
+    start = time.perf_counter()
+    with span_context as span:
+        try:
+            yield call
+        except BaseException as error:
+            _finish(call, time.perf_counter() - start, "error", span, error)
+            raise
+        else:
+            _finish(call, time.perf_counter() - start, call.outcome, span, None)
+        finally:
+            _current_call.reset(token)
+
+
+def instrument_tool(func: Optional[Callable] = None, *, name: Optional[str] = None) -> Callable:
+    """Wraps a tool function (sync or async) with spans and metrics. Usable as a decorator."""
+    if func is None:
+        return lambda f: instrument_tool(f, name=name)
+    if getattr(func, "__instrumented_tool__", False):
+        return func
+    tool = name or func.__name__
+    signature = inspect.signature(func)
+
+    def arguments(args: tuple, kwargs: dict) -> Dict[str, Any]:
+        try:
+            return dict(signature.bind_partial(*args, **kwargs).arguments)
+        except TypeError:
+            return dict(kwargs)
+
+    def settle(call: ToolCall, result: Any) -> Any:
+        call.response_bytes = _payload_bytes(result)
+        call.outcome = _outcome(result)
+        return result
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with _tool_call(tool, arguments(args, kwargs)) as call:
+                return settle(call, await func(*args, **kwargs))
+    else:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with _tool_call(tool, arguments(args, kwargs)) as call:
+                return settle(call, func(*args, **kwargs))
+
+    wrapper.__instrumented_tool__ = True
+    return wrapper
+
+
+# --- /metrics ------------------------------------------------------------------------
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("metrics: " + format, *args)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_failed = False
+
+
+def start_metrics_server(port: Optional[int] = None, host: Optional[str] = None) -> Optional[ThreadingHTTPServer]:
+    """Serves /metrics on a daemon thread. Idempotent; does nothing unless a port is given or TOOL_METRICS_PORT is set."""
+    global _server
+    if _server is not None:
+        return _server
+    if port is None:
+        if not os.getenv("TOOL_METRICS_PORT"):
+            return None
+        port = int(os.getenv("TOOL_METRICS_PORT"))
+    host = host or os.getenv("TOOL_METRICS_HOST", "0.0.0.0")
+    _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="tool-metrics", daemon=True).start()
+    logger.info("Serving tool metrics on http://%s:%s/metrics", host, _server.server_address[1])
+    return _server
+
+
+def stop_metrics_server() -> None:
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+
+
+def serve_metrics(callback_context: Any = None) -> None:
+    """
+    before_agent_callback: starts the /metrics server when the agent first
+    runs, not when its module is imported, so importing an agent never binds
+    a port. A port that cannot be bound is logged once and not retried.
+    """
+    global _server_failed
+    if _server is not None or _server_failed:
+        return None
+    try:
+        start_metrics_server()
+    except OSError as e:
+        _server_failed = True
+        logger.warning("Could not start the tool metrics server: %s", e)
+    return None
@@ -0,0 +1,198 @@
+# src/session/state_codec.py
+"""
+Encoding of session state for adk_sessions.state_data.
+
+State is stored as plain JSONB by default, which keeps delta merges
+(adk_sessions_merge_state) and ad-hoc SQL on state keys working. States whose
+JSON encoding is larger than SESSION_STATE_COMPRESS_THRESHOLD can instead be
+stored packed, as a versioned envelope inside the same JSONB column:
+
+    {"__state_codec__": 1, "format": "msgpack+zstd", "data": "<base64>"}
+
+Readers accept every format regardless of the codec configured for writing,
+so switching codecs (or rolling back) never strands existing rows:
+
+    plain object      legacy / JsonStateCodec rows, also returned as text
+    msgpack+zstd      needs msgpack and zstandard
+    json+zlib         stdlib fallback when those are not installed
+
+A packed row cannot be merged key by key; SupabaseSessionService writes the
+full state for those sessions, and the merge function skips them.
+
+JSON goes through orjson when it is installed, and the stdlib otherwise.
+
+    SESSION_STATE_CODEC                 json (default) or compressed
+    SESSION_STATE_COMPRESS_THRESHOLD    bytes of JSON above which state is packed (default 32768)
+    SESSION_STATE_ZSTD_LEVEL            zstd level (default 3)
+"""
+import base64
+import json
+import os
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+    import zstandard
+except ImportError:
+    msgpack = None
+    zstandard = None
+
+ENVELOPE_KEY = "__state_codec__"
+ENVELOPE_VERSION = 1
+FORMAT_MSGPACK_ZSTD = "msgpack+zstd"
+FORMAT_JSON_ZLIB = "json+zlib"
+
+SESSION_STATE_CODEC = os.getenv("SESSION_STATE_CODEC", "json")
+SESSION_STATE_COMPRESS_THRESHOLD = int(os.getenv("SESSION_STATE_COMPRESS_THRESHOLD", "32768"))
+SESSION_STATE_ZSTD_LEVEL = int(os.getenv("SESSION_STATE_ZSTD_LEVEL", "3"))
+ZLIB_LEVEL = 6
+
+
+class StateCodecError(ValueError):
+    """Raised when stored state_data cannot be decoded."""
+
+
+def dumps(value: Any, sort_keys: bool = False) -> bytes:
+    """Compact JSON bytes; non-JSON values are stringified."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(value, default=str, option=option)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib handles them.
+    return json.dumps(value, sort_keys=sort_keys, separators=(",", ":"), default=str).encode()
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+_local = threading.local()
+
+
+def _zstd_compressor(level: int) -> "zstandard.ZstdCompressor":
+    # zstandard contexts are not thread-safe, and the codec may be used from
+    # more than one thread (e.g. benchmarks running in a pool).
+    compressors = getattr(_local, "compressors", None)
+    if compressors is None:
+        compressors = _local.compressors = {}
+    if level not in compressors:
+        compressors[level] = zstandard.ZstdCompressor(level=level)
+    return compressors[level]
+
+
+def _zstd_decompressor() -> "zstandard.ZstdDecompressor":
+    decompressor = getattr(_local, "decompressor", None)
+    if decompressor is None:
+        decompressor = _local.decompressor = zstandard.ZstdDecompressor()
+    return decompressor
+
+
+def _pack(state: Dict[str, Any], format: str, level: int, encoded: Optional[bytes] = None) -> bytes:
+    if format == FORMAT_MSGPACK_ZSTD:
+        return _zstd_compressor(level).compress(msgpack.packb(state, default=str, use_bin_type=True))
+    if format == FORMAT_JSON_ZLIB:
+        return zlib.compress(encoded if encoded is not None else dumps(state), ZLIB_LEVEL)
+    raise StateCodecError(f"Unknown state format: {format}")
+
+
+def _unpack(payload: bytes, format: str) -> Any:
+    if format == FORMAT_MSGPACK_ZSTD:
+        if msgpack is None:
+            raise StateCodecError("state_data is msgpack+zstd but msgpack/zstandard are not installed.")
+        return msgpack.unpackb(_zstd_decompressor().decompress(payload), raw=False, strict_map_key=False)
+    if format == FORMAT_JSON_ZLIB:
+        return loads(zlib.decompress(payload))
+    raise StateCodecError(f"Unknown state format: {format}")
+
+
+def is_packed(stored: Any) -> bool:
+    """True if stored state_data is a packed envelope rather than the state itself."""
+    return isinstance(stored, dict) and ENVELOPE_KEY in stored
+
+
+def decode_state(stored: Any) -> Dict[str, Any]:
+    """Decodes state_data as read from adk_sessions (dict, JSON text or envelope) into a state dict."""
+    if isinstance(stored, (str, bytes, bytearray, memoryview)):
+        try:
+            stored = loads(bytes(stored) if isinstance(stored, memoryview) else stored)
+        except ValueError as e:
+            raise StateCodecError(f"state_data is not valid JSON: {e}") from e
+    if not isinstance(stored, dict):
+        raise StateCodecError(f"Unexpected type for state_data: {type(stored).__name__}")
+    if ENVELOPE_KEY not in stored:
+        return stored
+
+    version = stored.get(ENVELOPE_KEY)
+    if version != ENVELOPE_VERSION:
+        raise StateCodecError(f"Unsupported state_data envelope version: {version!r}")
+    try:
+        state = _unpack(base64.b64decode(stored["data"]), stored.get("format"))
+    except StateCodecError:
+        raise
+    except Exception as e:
+        raise StateCodecError(f"Corrupt {stored.get('format')} state_data: {e}") from e
+    if not isinstance(state, dict):
+        raise StateCodecError(f"Packed state_data decoded to {type(state).__name__}, not an object.")
+    return state
+
+
+class JsonStateCodec:
+    """Stores state as plain JSONB."""
+
+    name = "json"
+
+    def encode(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Value to store in state_data for state."""
+        return state
+
+    def decode(self, stored: Any) -> Dict[str, Any]:
+        return decode_state(stored)
+
+
+class CompressedStateCodec(JsonStateCodec):
+    """Packs states whose JSON is larger than threshold bytes; smaller states stay plain JSONB."""
+
+    name = "compressed"
+
+    def __init__(
+        self,
+        threshold: int = SESSION_STATE_COMPRESS_THRESHOLD,
+        level: int = SESSION_STATE_ZSTD_LEVEL,
+        format: Optional[str] = None,
+    ):
+        self.threshold = threshold
+        self.level = level
+        self.format = format or (FORMAT_MSGPACK_ZSTD if msgpack is not None else FORMAT_JSON_ZLIB)
+        if self.format == FORMAT_MSGPACK_ZSTD and msgpack is None:
+            raise RuntimeError("msgpack and zstandard are required for the msgpack+zstd state format.")
+
+    def encode(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        encoded = dumps(state)
+        if len(encoded) <= self.threshold:
+            return state
+        payload = _pack(state, self.format, self.level, encoded)
+        return {
+            ENVELOPE_KEY: ENVELOPE_VERSION,
+            "format": self.format,
+            "data": base64.b64encode(payload).decode("ascii"),
+        }
+
+
+def get_state_codec(name: Optional[str] = None) -> JsonStateCodec:
+    """The codec selected by name or SESSION_STATE_CODEC."""
+    name = name or SESSION_STATE_CODEC
+    if name == JsonStateCodec.name:
+        return JsonStateCodec()
+    if name == CompressedStateCodec.name:
+        return CompressedStateCodec()
+    raise ValueError(f"Unknown SESSION_STATE_CODEC: {name!r} (expected 'json' or 'compressed').")
@@ -0,0 +1,94 @@
+# src/session/state_tracking.py
+"""
+Turns ADK session state changes into adk_sessions writes.
+
+ADK records every change made through a State (tool_context.state,
+callback_context.state) in the event's actions.state_delta, and
+BaseSessionService.append_event applies that delta to Session.state.
+SupabaseSessionService persists only the changed keys through the
+adk_sessions_merge_state RPC instead of rewriting the whole state_data JSONB
+on every event.
+
+ADK's State has no deletion: a key is cleared by setting it to None
+(clear_key), and None values are removed from the row rather than stored.
+
+Mutating a nested dict/list in place does not go through State.__setitem__
+and never reaches state_delta. When the service still holds the persisted
+state for a session, it diffs Session.state against that copy instead
+(diff_items), comparing mutable values by fingerprint. The persisted copy is
+decoded from the cache for every diff, so it never shares nested objects with
+the live state.
+"""
+import hashlib
+from typing import Any, Dict, Mapping, Set, Tuple
+
+from google.adk.sessions import State
+
+from src.session.state_codec import dumps
+
+_MUTABLE_TYPES = (dict, list)
+
+
+def _fingerprint(value: Any) -> bytes:
+    encoded = dumps(value, sort_keys=True)
+    return hashlib.blake2b(encoded, digest_size=16).digest()
+
+
+def is_persisted_key(key: str) -> bool:
+    """temp: keys live for one invocation and are never written."""
+    return not key.startswith(State.TEMP_PREFIX)
+
+
+def persistable(state: Mapping[str, Any]) -> Dict[str, Any]:
+    """The part of a state dict that is stored: no temp: keys, no None values."""
+    return {key: value for key, value in state.items() if value is not None and is_persisted_key(key)}
+
+
+def split_delta(state_delta: Mapping[str, Any]) -> Tuple[Dict[str, Any], Set[str]]:
+    """Splits an ADK state delta into ({key: value} to set, {keys} to delete)."""
+    to_set: Dict[str, Any] = {}
+    to_delete: Set[str] = set()
+    for key, value in state_delta.items():
+        if not is_persisted_key(key):
+            continue
+        if value is None:
+            to_delete.add(key)
+        else:
+            to_set[key] = value
+    return to_set, to_delete
+
+
+def diff_items(previous: Mapping[str, Any], current: Mapping[str, Any]) -> Tuple[Dict[str, Any], Set[str]]:
+    """
+    Changes from previous (the persisted state) to current.
+
+    Scalars are compared by equality; dicts and lists by fingerprint, so an
+    unchanged large value is not sent again. previous must not share nested
+    objects with current, or in-place mutations would go unnoticed.
+    """
+    to_set: Dict[str, Any] = {}
+    for key, value in current.items():
+        if value is None or not is_persisted_key(key):
+            continue
+        if key not in previous:
+            to_set[key] = value
+            continue
+        old = previous[key]
+        if isinstance(value, _MUTABLE_TYPES) or isinstance(old, _MUTABLE_TYPES):
+            if type(old) is not type(value) or _fingerprint(old) != _fingerprint(value):
+                to_set[key] = value
+        elif old != value:
+            to_set[key] = value
+    to_delete = {key for key in previous if current.get(key) is None}
+    return to_set, to_delete
+
+
+def clear_key(state: Any, key: str) -> None:
+    """Removes a key from session state the way ADK can record it: by setting None."""
+    if state.get(key) is not None:
+        state[key] = None
+
+
+def payload_size(value: Any) -> int:
+    """Approximate bytes on the wire for a JSON request body."""
+    return len(dumps(value))
@@ -1,126 +1,420 @@
 # src/session/supabase_session.py
 print(f"[{__file__}] Attempting to load src.session.supabase_session", flush=True)
-from google.adk.sessions import BaseSessionService, State
-from supabase import create_client, Client as SupabaseClient
+import datetime
 import os
-import json
-from typing import Dict, Any, Optional
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from google.adk.events.event import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+from src.db.cache import TTLCache
+from src.db.supabase_client import get_supabase_client
+from src.observability.log import summarize
+from src.session.state_codec import JsonStateCodec, StateCodecError, dumps, get_state_codec, is_packed, loads
+from src.session.state_tracking import diff_items, persistable, split_delta
+from src.session.sweeper import SESSION_SWEEP_INTERVAL_SECONDS, SessionSweeper
+from src.tools.scope_write_buffer import scope_write_buffer, session_key_from_state
+
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "300"))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "1000"))
+
+
+@dataclass(frozen=True)
+class _CachedSession:
+    """
+    What the read-through cache keeps for a session. State and events are
+    held encoded, so every hit decodes a private copy: nothing a caller does
+    to the Session it was handed can reach the cache.
+    """
+    app_name: str
+    user_id: str
+    state: bytes
+    events: List[bytes] = field(default_factory=list)
+    last_update_time: float = 0.0
+
+    def to_session(self, session_id: str) -> Session:
+        return Session(
+            id=session_id,
+            app_name=self.app_name,
+            user_id=self.user_id,
+            state=loads(self.state),
+            events=[Event.model_validate_json(event) for event in self.events],
+            last_update_time=self.last_update_time,
+        )
+
+
+def _timestamp(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).isoformat()
+
+
+def _encode_event(event: Event) -> bytes:
+    return event.model_dump_json(exclude_none=True).encode()
+
+
+def _apply_config(session: Session, config: Optional[GetSessionConfig]) -> Session:
+    if config is None:
+        return session
+    if config.after_timestamp:
+        session.events = [event for event in session.events if event.timestamp >= config.after_timestamp]
+    if config.num_recent_events:
+        session.events = session.events[-config.num_recent_events:]
+    return session
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
 class SupabaseSessionService(BaseSessionService):
-    def __init__(self):
-        if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
-            print(f"[{__name__}] ERROR: Supabase URL or Service Role Key not configured for SessionService.")
-            self.supabase_client = None
-            # Consider raising an ImportError or a custom configuration error.
-            # For now, operations will fail if the client is None.
-        else:
-            self.supabase_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-        print(f"[{__name__}] SupabaseSessionService initialized. Client: {'OK' if self.supabase_client else 'Not Configured'}")
+    """
+    ADK session service backed by Supabase: one adk_sessions row per session
+    (state) and one adk_session_events row per event.
 
-    async def async_get_session_state(self, session_id: str) -> Optional[State]:
-        if not self.supabase_client:
-            print(f"[{__name__}] Supabase client not initialized in SessionService. Cannot get state for session: {session_id}")
-            # According to SessionService ABC, should probably raise an error or return None if unrecoverable.
-            return None 
+    app: and user: prefixed keys are stored with the session they were set
+    in; they are not shared across sessions the way InMemorySessionService
+    shares them. temp: keys are never persisted, and keys set to None are
+    removed from the row (see state_tracking.py).
+    """
 
-        print(f"[{__name__}] Attempting to get session state for session_id: {session_id}")
-        try:
-            response = await self.supabase_client.table("adk_sessions").select("state_data").eq("session_id", session_id).maybe_single().execute()
-            if response.data and response.data.get("state_data") is not None:
-                state_data_from_db = response.data["state_data"]
-                # state_data could be a dict if Supabase auto-parses JSONB, or string if TEXT
-                state_dict = {}
-                if isinstance(state_data_from_db, str):
-                    try:
-                        state_dict = json.loads(state_data_from_db)
-                    except json.JSONDecodeError:
-                        print(f"[{__name__}] Error decoding JSON state_data for {session_id}: {state_data_from_db}")
-                        return None # Or handle corrupted state
-                elif isinstance(state_data_from_db, dict):
-                    state_dict = state_data_from_db
-                else:
-                    print(f"[{__name__}] Unexpected type for state_data for {session_id}: {type(state_data_from_db)}")
-                    return None
+    def __init__(self, codec: Optional[JsonStateCodec] = None, sweep_interval_seconds: float = SESSION_SWEEP_INTERVAL_SECONDS):
+        # The pooled async client is shared with the tools and created lazily
+        # on first use (see src/db/supabase_client.py).
+        # Sessions are cached in-process (LRU + TTL) and written through on
+        # every append, so the get_session the Runner issues each turn skips
+        # the database.
+        self._sessions: TTLCache[str, _CachedSession] = TTLCache(
+            maxsize=SESSION_CACHE_MAX_ENTRIES, ttl=SESSION_CACHE_TTL_SECONDS
+        )
+        # How state_data is encoded on write (see state_codec.py). Every format
+        # is readable whichever codec is configured.
+        self._codec = codec or get_state_codec()
+        # Sessions whose row holds a packed envelope; those get full writes
+        # because the merge function cannot patch them.
+        self._packed_sessions: Set[str] = set()
+        # Expires idle sessions in the background once the service is in use
+        # (see sweeper.py); an interval of 0 leaves that to a scheduled job.
+        self._sweeper = SessionSweeper(self, interval_seconds=sweep_interval_seconds)
+        print(f"[{__name__}] SupabaseSessionService initialized (session cache: {SESSION_CACHE_MAX_ENTRIES} entries, {SESSION_CACHE_TTL_SECONDS}s TTL, {self._codec.name} codec).")
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        self._sweeper.start()
+        supabase_client = await get_supabase_client()
+        if not supabase_client:
+            raise RuntimeError("Supabase client not initialized in SessionService. Cannot create a session.")
+
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        session = Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=dict(state or {}),
+            last_update_time=time.time(),
+        )
+        state_data = self._codec.encode(persistable(session.state))
+        # Raises APIError (code 23505) if the session id is taken.
+        await supabase_client.table("adk_sessions").insert({
+            "session_id": session_id,
+            "app_name": app_name,
+            "user_id": user_id,
+            "state_data": state_data,
+            "last_updated_at": _isoformat(session.last_update_time),
+        }).execute()
+        self._note_packed(session_id, state_data)
+        self._remember(session)
+        print(f"[{__name__}] Created session {session_id} for user {user_id} ({app_name}).")
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        self._sweeper.start()
+        # Concurrent gets for the same session share one load.
+        cached = await self._sessions.get_or_load(session_id, lambda: self._load_session(session_id))
+        if cached is None or cached.app_name != app_name or cached.user_id != user_id:
+            return None
+        return _apply_config(cached.to_session(session_id), config)
+
+    async def _load_session(self, session_id: str) -> Optional[_CachedSession]:
+        supabase_client = await get_supabase_client()
+        if not supabase_client:
+            print(f"[{__name__}] Supabase client not initialized in SessionService. Cannot get session: {session_id}")
+            return None
 
-                print(f"[{__name__}] Session state found and parsed for {session_id}")
-                return State(session_id=session_id, items=state_dict)
-            elif response.error:
-                print(f"[{__name__}] Supabase error getting session state for {session_id}: {response.error.message}")
+        print(f"[{__name__}] Attempting to load session: {session_id}")
+        try:
+            response = await supabase_client.table("adk_sessions").select(
+                "app_name,user_id,state_data,last_updated_at"
+            ).eq("session_id", session_id).maybe_single().execute()
+            row = getattr(response, "data", None) if response is not None else None
+            if not row:
+                print(f"[{__name__}] No session found for session_id: {session_id}.")
                 return None
-            else: # No data and no error means session not found
-                print(f"[{__name__}] No session state found for session_id: {session_id}.")
+            stored = row.get("state_data")
+            # state_data could be a dict if Supabase auto-parses JSONB, a
+            # string if TEXT, or a packed envelope (see state_codec.py).
+            try:
+                state = self._codec.decode(stored) if stored is not None else {}
+            except StateCodecError as e:
+                print(f"[{__name__}] Error decoding state_data for {session_id}: {e}: {summarize(stored)}")
                 return None
+            self._note_packed(session_id, stored)
+
+            events_response = await supabase_client.table("adk_session_events").select(
+                "event_data"
+            ).eq("session_id", session_id).order("timestamp").execute()
+            events = [
+                event_data.encode() if isinstance(event_data, str) else dumps(event_data)
+                for event_data in (event_row["event_data"] for event_row in events_response.data or [])
+            ]
         except Exception as e:
-            print(f"[{__name__}] Exception getting session state for {session_id}: {e}")
+            print(f"[{__name__}] Exception loading session {session_id}: {e}")
             return None
 
-    async def async_set_session_state(self, session_id: str, state: State) -> None:
-        if not self.supabase_client:
-            print(f"[{__name__}] Supabase client not initialized in SessionService. Cannot set state for session: {session_id}")
-            # Consider raising an error as this is a critical failure.
+        print(f"[{__name__}] Session {session_id} loaded ({len(state)} state keys, {len(events)} events).")
+        return _CachedSession(
+            app_name=row.get("app_name") or "",
+            user_id=row.get("user_id") or "",
+            state=dumps(state),
+            events=events,
+            last_update_time=_timestamp(row.get("last_updated_at")),
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        supabase_client = await get_supabase_client()
+        if not supabase_client:
+            print(f"[{__name__}] Supabase client not initialized in SessionService. Cannot list sessions for user: {user_id}")
+            return ListSessionsResponse()
+
+        try:
+            response = await supabase_client.table("adk_sessions").select(
+                "session_id,last_updated_at"
+            ).eq("app_name", app_name).eq("user_id", user_id).execute()
+        except Exception as e:
+            print(f"[{__name__}] Exception listing sessions for user {user_id}: {e}")
+            return ListSessionsResponse()
+
+        # Like the other ADK services, listed sessions carry no state or events.
+        return ListSessionsResponse(sessions=[
+            Session(
+                id=row["session_id"],
+                app_name=app_name,
+                user_id=user_id,
+                last_update_time=_timestamp(row.get("last_updated_at")),
+            )
+            for row in response.data or []
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        # Session close: write out any project_scope updates still buffered.
+        # The tools stage them under the key derived from the session's state.
+        cached = await self._sessions.get_or_load(session_id, lambda: self._load_session(session_id))
+        session_key = session_key_from_state(loads(cached.state)) if cached is not None else None
+        if session_key:
+            await scope_write_buffer.close_session(session_key)
+        self.forget_session(session_id)
+
+        supabase_client = await get_supabase_client()
+        if not supabase_client:
+            print(f"[{__name__}] Supabase client not initialized in SessionService. Cannot delete session: {session_id}")
             return
 
-        state_data_json = json.dumps(state.items)
-        print(f"[{__name__}] Attempting to set session state for session_id: {session_id} with data items: {state.items}")
+        print(f"[{__name__}] Attempting to delete session: {session_id}")
         try:
-            response = await self.supabase_client.table("adk_sessions").upsert({
-                "session_id": session_id,
-                "state_data": state.items # Store as JSONB directly if column type is JSONB
-            }).execute()
-            
+            response = await supabase_client.table("adk_sessions").delete().eq(
+                "session_id", session_id
+            ).eq("app_name", app_name).eq("user_id", user_id).execute()
             if response.data:
-                 print(f"[{__name__}] Successfully set session state for {session_id}")
-            elif response.error:
-                 print(f"[{__name__}] Supabase error setting session state for {session_id}: {response.error.message}")
-                 # Consider raising an error
-            else:
-                 print(f"[{__name__}] Failed to set session state for {session_id} (no data/error): {response}")
-                 # Consider raising an error
-
+                await supabase_client.table("adk_session_events").delete().eq("session_id", session_id).execute()
+            print(f"[{__name__}] Session {session_id} deleted (if existed).")
         except Exception as e:
-            print(f"[{__name__}] Exception setting session state for {session_id}: {e}")
-            # Consider raising an error
+            print(f"[{__name__}] Exception deleting session {session_id}: {e}")
 
-    async def async_delete_session_state(self, session_id: str) -> None:
-        if not self.supabase_client:
-            print(f"[{__name__}] Supabase client not initialized in SessionService. Cannot delete state for session: {session_id}")
-            return
+    async def append_event(self, session: Session, event: Event) -> Event:
+        """Applies the event to the session, then stores the event and the new state."""
+        if event.partial:
+            return event
+        await super().append_event(session, event)
+        session.last_update_time = event.timestamp
 
-        print(f"[{__name__}] Attempting to delete session state for session_id: {session_id}")
+        supabase_client = await get_supabase_client()
+        if not supabase_client:
+            print(f"[{__name__}] Supabase client not initialized in SessionService. Event not stored for session: {session.id}")
+            self.forget_session(session.id)
+            return event
+
+        encoded_event = _encode_event(event)
         try:
-            response = await self.supabase_client.table("adk_sessions").delete().eq("session_id", session_id).execute()
-            if response.error:
-                print(f"[{__name__}] Supabase error deleting session state for {session_id}: {response.error.message}")
-            else:
-                print(f"[{__name__}] Session state for {session_id} deleted (if existed).")
+            await supabase_client.table("adk_session_events").insert({
+                "id": event.id,
+                "session_id": session.id,
+                "invocation_id": event.invocation_id,
+                "author": event.author,
+                "timestamp": event.timestamp,
+                "event_data": loads(encoded_event),
+            }).execute()
+            cached = self._sessions.get(session.id)
+            persisted = loads(cached.state) if cached is not None else None
+            to_set, to_delete = self._state_changes(persisted, session, event)
+            if to_set or to_delete:
+                persisted = await self._write_state(supabase_client, session, persisted, to_set, to_delete)
         except Exception as e:
-            print(f"[{__name__}] Exception deleting session state for {session_id}: {e}")
+            print(f"[{__name__}] Exception storing event {event.id} for session {session.id}: {e}")
+            # The database may or may not hold the event; force a re-read.
+            self.forget_session(session.id)
+            return event
 
-    # Required synchronous methods by BaseSessionService
-    def create_session(self, user_id: str, session = None) -> State: # type: ignore
-        # TODO: Implement synchronous session creation or bridge to async
-        print(f"[{__name__}] Synchronous create_session called but not implemented.")
-        raise NotImplementedError("Synchronous create_session is not implemented.")
+        # Write-through: the next get_session is served from memory.
+        if cached is not None and persisted is not None:
+            self._sessions.set(session.id, _CachedSession(
+                app_name=cached.app_name,
+                user_id=cached.user_id,
+                state=dumps(persisted),
+                events=[*cached.events, encoded_event],
+                last_update_time=session.last_update_time,
+            ))
+        else:
+            self._sessions.invalidate(session.id)
+        return event
 
-    def get_session(self, session_id: str) -> Optional[State]:
-        # TODO: Implement synchronous session retrieval or bridge to async
-        print(f"[{__name__}] Synchronous get_session called but not implemented.")
-        raise NotImplementedError("Synchronous get_session is not implemented.")
+    def _state_changes(
+        self, persisted: Optional[Dict[str, Any]], session: Session, event: Event
+    ) -> Tuple[Dict[str, Any], Set[str]]:
+        """Keys to set and delete in the row after event."""
+        state_delta = event.actions.state_delta if event.actions else {}
+        if persisted is None:
+            return split_delta(state_delta)
+        # Only events that carry a delta or tool results can have changed the
+        # state; diffing against the persisted copy also catches values a tool
+        # mutated in place, which never reach state_delta.
+        if not state_delta and not event.get_function_responses():
+            return {}, set()
+        return diff_items(persisted, session.state)
 
-    def list_sessions(self, user_id: str) -> list[State]: # type: ignore
-        # TODO: Implement synchronous session listing or bridge to async
-        print(f"[{__name__}] Synchronous list_sessions called but not implemented.")
-        raise NotImplementedError("Synchronous list_sessions is not implemented.")
+    async def _write_state(
+        self,
+        supabase_client: Any,
+        session: Session,
+        persisted: Optional[Dict[str, Any]],
+        to_set: Dict[str, Any],
+        to_delete: Set[str],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Sends the changed keys through adk_sessions_merge_state, or the whole
+        state when the row is packed, is about to be packed or is missing.
+        Returns the state the row now holds, if known.
+        """
+        state = persistable(session.state)
+        # Encoded on every write so a session that grows past the codec's
+        # threshold switches from merges to a packed full write.
+        state_data = self._codec.encode(state)
+        if session.id not in self._packed_sessions and not is_packed(state_data):
+            print(f"[{__name__}] Persisting state delta for session {session.id}: {len(to_set)} set, {len(to_delete)} deleted.")
+            response = await supabase_client.rpc("adk_sessions_merge_state", {
+                "p_session_id": session.id,
+                "p_set": to_set,
+                "p_unset": sorted(to_delete),
+            }).execute()
+            if response.data:
+                if persisted is None:
+                    return None
+                merged = {**persisted, **to_set}
+                for key in to_delete:
+                    merged.pop(key, None)
+                return merged
+            # The row is gone (deleted or swept); fall back to a full write.
+            print(f"[{__name__}] No adk_sessions row for {session.id} to merge into. Writing full state.")
 
-    def delete_session(self, session_id: str) -> None:
-        # TODO: Implement synchronous session deletion or bridge to async
-        print(f"[{__name__}] Synchronous delete_session called but not implemented.")
-        raise NotImplementedError("Synchronous delete_session is not implemented.")
+        print(f"[{__name__}] Writing full state for session {session.id} ({len(state)} keys{', packed' if is_packed(state_data) else ''}).")
+        await supabase_client.table("adk_sessions").upsert({
+            "session_id": session.id,
+            "app_name": session.app_name,
+            "user_id": session.user_id,
+            "state_data": state_data,
+            # Upserts do not apply column defaults on update; the sweeper expires by this.
+            "last_updated_at": _isoformat(session.last_update_time),
+        }).execute()
+        self._note_packed(session.id, state_data)
+        return state
+
+    def _remember(self, session: Session) -> None:
+        self._sessions.set(session.id, _CachedSession(
+            app_name=session.app_name,
+            user_id=session.user_id,
+            state=dumps(persistable(session.state)),
+            events=[_encode_event(event) for event in session.events],
+            last_update_time=session.last_update_time,
+        ))
+
+    async def close(self) -> None:
+        """Stops the background sweeper; call on server shutdown."""
+        await self._sweeper.stop()
+
+    def forget_session(self, session_id: str) -> None:
+        """Drops the cached copy of a session changed outside the service (see sweeper.py)."""
+        self._sessions.invalidate(session_id)
+        self._packed_sessions.discard(session_id)
+
+    def _note_packed(self, session_id: str, state_data: Any) -> None:
+        if is_packed(state_data):
+            self._packed_sessions.add(session_id)
+        else:
+            self._packed_sessions.discard(session_id)
 
 # Note: The 'adk_sessions' table needs to exist in Supabase with at least:
 # - session_id (text, primary key)
+# - app_name (text), user_id (text); indexed together for list_sessions
 # - state_data (jsonb is recommended)
-# - last_updated_at (timestamptz, optional, defaults to now())
+# - last_updated_at (timestamptz, defaults to now(); set on every write, indexed
+#   for the TTL sweep in src/session/sweeper.py)
+#
+# and events go to:
+#
+#   create table adk_session_events (
+#       session_id    text not null references adk_sessions (session_id) on delete cascade,
+#       id            text not null,
+#       invocation_id text,
+#       author        text,
+#       timestamp     double precision not null,
+#       event_data    jsonb not null,
+#       primary key (session_id, id)
+#   );
+#   create index adk_session_events_session_ts_idx on adk_session_events (session_id, timestamp);
+#
+# The cascade removes a session's events when the sweeper deletes its row.
+#
+# Delta writes go through this function:
+#
+#   create or replace function adk_sessions_merge_state(
+#       p_session_id text, p_set jsonb, p_unset text[]
+#   ) returns boolean language sql as $$
+#       update adk_sessions
+#          set state_data = (coalesce(state_data, '{}'::jsonb) || p_set) - p_unset,
+#              last_updated_at = now()
+#        where session_id = p_session_id
+#          and not (coalesce(state_data, '{}'::jsonb) ? '__state_codec__')
+#       returning true;
+#   $$;
+#
+# The __state_codec__ guard leaves packed rows (see state_codec.py) alone: the
+# function returns null and the service falls back to a full write.
@@ -0,0 +1,245 @@
+# src/session/sweeper.py
+"""
+Background expiry and compaction for adk_sessions.
+
+Each sweep makes two passes, in chunks of SESSION_SWEEP_BATCH_SIZE rows per
+round trip so no statement holds locks on a large slice of the table:
+
+  * expire: deletes sessions idle (last_updated_at) for longer than
+    SESSION_TTL_SECONDS, through adk_sessions_sweep()
+  * strip: removes transient keys (TRANSIENT_STATE_KEYS, e.g. the legacy
+    base64 pending_image_data left behind by failed uploads) from sessions
+    idle for longer than SESSION_TRANSIENT_TTL_SECONDS, through
+    adk_sessions_strip_transient(). Stripping does not touch
+    last_updated_at, so it never extends a session's life.
+
+Both functions are SQL (see the note at the end of this module) so a chunk is
+one round trip and the reclaimed size is measured in the database. The
+sweep is driven by indexes rather than table scans, and point lookups by
+session_id stay on the primary key however large the table gets.
+
+SupabaseSessionService runs one in-process: it starts its sweeper the first
+time it is used on a running event loop and sweeps every
+SESSION_SWEEP_INTERVAL_SECONDS (first sweep one interval after start, so
+restarts do not stampede the table). Replicas sweeping at once is fine; the
+functions skip rows another sweeper has locked.
+
+To sweep from a scheduled job instead (Cloud Scheduler, cron), set
+SESSION_SWEEP_INTERVAL_SECONDS=0 on the servers and run:
+
+    make sweep-sessions      # python -m src.session.sweeper
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+from src.observability.tool_metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+SESSION_TRANSIENT_TTL_SECONDS = float(os.getenv("SESSION_TRANSIENT_TTL_SECONDS", "3600"))
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "900"))
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "500"))
+# Upper bound on chunks per pass, so one sweep cannot run unbounded after a backlog builds up.
+SESSION_SWEEP_MAX_BATCHES = int(os.getenv("SESSION_SWEEP_MAX_BATCHES", "200"))
+
+# Keys that are only meaningful while a turn is in progress. Blob handles point
+# into the in-process blob store and do not survive a restart either.
+# Must match the array in adk_sessions_strip_transient() and its index below.
+TRANSIENT_STATE_KEYS = (
+    "pending_image_data",
+    "pending_image_mime_type",
+    "pending_image_handle",
+    "pending_image_handles",
+)
+
+METRIC_PREFIX = "instabids_session_sweep"
+
+
+@dataclass
+class SweepReport:
+    expired_sessions: int = 0
+    expired_bytes: int = 0
+    stripped_sessions: int = 0
+    stripped_bytes: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (f"expired {self.expired_sessions} session(s) ({self.expired_bytes / 1024:.1f} KiB), "
+                f"stripped transient keys from {self.stripped_sessions} ({self.stripped_bytes / 1024:.1f} KiB) "
+                f"in {self.seconds:.2f}s")
+
+
+def _cutoff(seconds: float) -> str:
+    return (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=seconds)).isoformat()
+
+
+class SessionSweeper:
+    """Expires idle sessions and strips stale transient keys, in chunks."""
+
+    def __init__(
+        self,
+        service: Optional[Any] = None,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        transient_ttl_seconds: float = SESSION_TRANSIENT_TTL_SECONDS,
+        interval_seconds: float = SESSION_SWEEP_INTERVAL_SECONDS,
+        batch_size: int = SESSION_SWEEP_BATCH_SIZE,
+        max_batches: int = SESSION_SWEEP_MAX_BATCHES,
+        client: Optional[Any] = None,
+    ):
+        # service: a SupabaseSessionService whose cache should forget swept sessions.
+        self.service = service
+        self.ttl_seconds = ttl_seconds
+        self.transient_ttl_seconds = transient_ttl_seconds
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self._client = client
+        self._task: Optional[asyncio.Task] = None
+
+    async def _get_client(self) -> Any:
+        if self._client is not None:
+            return self._client
+        from src.db.supabase_client import get_supabase_client
+        return await get_supabase_client()
+
+    async def _run_chunks(self, client: Any, function: str, params: dict) -> List[dict]:
+        rows: List[dict] = []
+        for _ in range(self.max_batches):
+            response = await client.rpc(function, {**params, "p_limit": self.batch_size}).execute()
+            chunk = response.data or []
+            rows.extend(chunk)
+            self._forget([row["session_id"] for row in chunk])
+            if len(chunk) < self.batch_size:
+                break
+        return rows
+
+    def _forget(self, session_ids: Sequence[str]) -> None:
+        if self.service is not None:
+            for session_id in session_ids:
+                self.service.forget_session(session_id)
+
+    async def sweep_once(self) -> SweepReport:
+        """Runs both passes once and returns what was reclaimed."""
+        client = await self._get_client()
+        if not client:
+            raise RuntimeError("Supabase client not initialized.")
+        start = time.perf_counter()
+        report = SweepReport()
+
+        expired = await self._run_chunks(client, "adk_sessions_sweep", {"p_idle_before": _cutoff(self.ttl_seconds)})
+        report.expired_sessions = len(expired)
+        report.expired_bytes = sum(row.get("state_bytes") or 0 for row in expired)
+
+        stripped = await self._run_chunks(
+            client, "adk_sessions_strip_transient", {"p_idle_before": _cutoff(self.transient_ttl_seconds)}
+        )
+        report.stripped_sessions = len(stripped)
+        report.stripped_bytes = sum(row.get("state_bytes") or 0 for row in stripped)
+
+        report.seconds = time.perf_counter() - start
+        registry.inc(f"{METRIC_PREFIX}_sessions_total", report.expired_sessions, help_text="Sessions reclaimed by the sweeper.", action="expired")
+        registry.inc(f"{METRIC_PREFIX}_sessions_total", report.stripped_sessions, help_text="Sessions reclaimed by the sweeper.", action="stripped")
+        registry.inc(f"{METRIC_PREFIX}_bytes_total", report.expired_bytes, help_text="state_data bytes reclaimed by the sweeper.", action="expired")
+        registry.inc(f"{METRIC_PREFIX}_bytes_total", report.stripped_bytes, help_text="state_data bytes reclaimed by the sweeper.", action="stripped")
+        logger.info("Session sweep: %s", report)
+        return report
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_seconds > 0
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Sweeps every interval_seconds on the running loop until stop(). Does nothing when interval_seconds is 0."""
+        if not self.enabled:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run(), name="session-sweeper")
+        return self._task
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                # A failed sweep is retried at the next interval.
+                logger.warning("Session sweep failed: %s", e)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Expire idle adk_sessions rows and strip stale transient state keys.")
+    parser.add_argument("--ttl-seconds", type=float, default=SESSION_TTL_SECONDS)
+    parser.add_argument("--transient-ttl-seconds", type=float, default=SESSION_TRANSIENT_TTL_SECONDS)
+    parser.add_argument("--batch-size", type=int, default=SESSION_SWEEP_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    sweeper = SessionSweeper(ttl_seconds=args.ttl_seconds, transient_ttl_seconds=args.transient_ttl_seconds, batch_size=args.batch_size)
+    print(asyncio.run(sweeper.sweep_once()))
+
+
+if __name__ == "__main__":
+    main()
+
+# Note: the sweep needs these on 'adk_sessions' (see also supabase_session.py):
+#
+#   create index adk_sessions_last_updated_at_idx on adk_sessions (last_updated_at);
+#   -- Only rows still holding transient keys are in this index, so the strip
+#   -- pass never revisits rows it already compacted.
+#   create index adk_sessions_transient_idx on adk_sessions (last_updated_at)
+#    where state_data ?| array['pending_image_data', 'pending_image_mime_type',
+#                              'pending_image_handle', 'pending_image_handles'];
+#   -- Chunked deletes leave dead tuples; vacuum this table sooner than the default.
+#   alter table adk_sessions set (autovacuum_vacuum_scale_factor = 0.02);
+#
+#   create or replace function adk_sessions_sweep(p_idle_before timestamptz, p_limit int)
+#   returns table(session_id text, state_bytes int) language sql as $$
+#       with doomed as (
+#           select s.session_id from adk_sessions s
+#            where s.last_updated_at < p_idle_before
+#            order by s.last_updated_at
+#            limit p_limit
+#              for update skip locked
+#       )
+#       delete from adk_sessions a using doomed d
+#        where a.session_id = d.session_id
+#       returning a.session_id, pg_column_size(a.state_data);
+#   $$;
+#
+#   create or replace function adk_sessions_strip_transient(p_idle_before timestamptz, p_limit int)
+#   returns table(session_id text, state_bytes int) language sql as $$
+#       with stale as (
+#           select s.session_id, pg_column_size(s.state_data) as before_bytes from adk_sessions s
+#            where s.last_updated_at < p_idle_before
+#              and s.state_data ?| array['pending_image_data', 'pending_image_mime_type',
+#                                        'pending_image_handle', 'pending_image_handles']
+#            limit p_limit
+#              for update skip locked
+#       )
+#       update adk_sessions a
+#          set state_data = a.state_data - array['pending_image_data', 'pending_image_mime_type',
+#                                                'pending_image_handle', 'pending_image_handles']
+#         from stale t
+#        where a.session_id = t.session_id
+#       returning a.session_id, t.before_bytes - pg_column_size(a.state_data);
+#   $$;
+#
+# Packed rows (state_codec.py) have no top-level state keys, so the strip pass
+# skips them; they are still expired by TTL.
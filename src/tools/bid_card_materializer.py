@@ -0,0 +1,287 @@
+# src/tools/bid_card_materializer.py
+"""
+Materialized, render-ready bid cards.
+
+Instead of letting the bid card agent assemble a card from raw project_scopes
++ project_images rows on every run, a compact document is built whenever a
+scope changes and stored as a versioned snapshot in bid_card_snapshots.
+
+The materializer listens to src/tools/scope_events.py. Each ScopeChange says
+which parts of the scope were written, and only the matching sections are
+re-read and rebuilt:
+
+    fields -> "project"  (title, summary, budget, timeline, location, ...)
+    facts  -> "details"  (miscellaneous facts, with display labels)
+    images -> "images"   (stored photos, primary image, count)
+
+The other sections are carried over from the previous snapshot. Changes that
+arrive while a rebuild is running are merged into one follow-up rebuild. After
+a snapshot is stored, a ScopeChange with section "snapshot" is published so
+read caches can drop the old card, and versions older than the last
+BID_CARD_SNAPSHOT_KEEP (default 5) are deleted.
+"""
+import asyncio
+import datetime
+import logging
+import os
+from typing import Any, Dict, Iterable, Optional, Set
+
+from src.db.supabase_client import get_supabase_client
+from src.tools import scope_events
+from src.tools.scope_events import ScopeChange
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TABLE = "bid_card_snapshots"
+SECTIONS = ("project", "details", "images")
+SNAPSHOT_SECTION = "snapshot"
+# Versions kept per scope; older ones are pruned after each rebuild.
+SNAPSHOT_KEEP = max(1, int(os.getenv("BID_CARD_SNAPSHOT_KEEP", 5)))
+_SECTIONS_BY_WRITE = {"fields": "project", "facts": "details", "images": "images"}
+
+PROJECT_COLUMNS = (
+    "id,homeowner_id,project_title,project_description,conversation_summary,budget_range,"
+    "timeline,zip_code,status,image_url,group_bidding_preference,contractor_notes,created_at,"
+    "budget_min_cents,budget_max_cents,timeline_start,timeline_end"
+)
+
+
+def _label(name: str) -> str:
+    return name.replace("_", " ").strip().capitalize()
+
+
+def build_project_section(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": row.get("project_title") or "Untitled project",
+        "summary": row.get("conversation_summary"),
+        "description": row.get("project_description"),
+        "budget": row.get("budget_range"),
+        "budget_min_cents": row.get("budget_min_cents"),
+        "budget_max_cents": row.get("budget_max_cents"),
+        "timeline": row.get("timeline"),
+        "timeline_start": row.get("timeline_start"),
+        "timeline_end": row.get("timeline_end"),
+        "zip_code": row.get("zip_code"),
+        "status": row.get("status"),
+        "group_bidding": bool(row.get("group_bidding_preference")),
+        "contractor_notes": row.get("contractor_notes"),
+        "primary_image_url": row.get("image_url"),
+        "created_at": row.get("created_at"),
+    }
+
+
+def build_details_section(fact_rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "items": [
+            {"name": row["fact_name"], "label": _label(row["fact_name"]), "value": row.get("fact_value")}
+            for row in sorted(fact_rows, key=lambda fact: fact["fact_name"])
+        ]
+    }
+
+
+def build_images_section(image_rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    images = [
+        {
+            "url": row["image_url"],
+            "thumbnail_url": row.get("thumbnail_url"),
+            "description": row.get("description"),
+        }
+        for row in image_rows
+    ]
+    return {"count": len(images), "items": images}
+
+
+def assemble_document(
+    project_scope_id: str,
+    homeowner_id: str,
+    version: int,
+    sections: Dict[str, Any],
+    section_versions: Dict[str, int],
+) -> Dict[str, Any]:
+    project = sections.get("project") or {}
+    images = sections.get("images") or {"count": 0, "items": []}
+    if not project.get("primary_image_url") and images["items"]:
+        project = {**project, "primary_image_url": images["items"][0]["url"]}
+    return {
+        "project_id": project_scope_id,
+        "homeowner_id": homeowner_id,
+        "version": version,
+        "project": project,
+        "details": sections.get("details") or {"items": []},
+        "images": images,
+        # Snapshot version in which each section was last rebuilt.
+        "section_versions": section_versions,
+    }
+
+
+class BidCardMaterializer:
+    def __init__(self) -> None:
+        # project_scope_id -> sections still to rebuild / the rebuild in progress.
+        self._pending: Dict[str, Set[str]] = {}
+        self._homeowners: Dict[str, str] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self.snapshots_written = 0
+
+    def on_scope_change(self, change: ScopeChange) -> None:
+        if SNAPSHOT_SECTION in change.sections:
+            return
+        sections = {_SECTIONS_BY_WRITE[written] for written in change.sections if written in _SECTIONS_BY_WRITE}
+        if change.is_new or not sections:
+            sections = set(SECTIONS)
+        self.schedule(change.project_scope_id, change.homeowner_id, sections)
+
+    def schedule(self, project_scope_id: str, homeowner_id: str, sections: Iterable[str] = SECTIONS) -> None:
+        """Queues a rebuild of the given sections; merges with a rebuild already queued for the scope."""
+        self._pending.setdefault(project_scope_id, set()).update(sections)
+        self._homeowners[project_scope_id] = homeowner_id
+        if project_scope_id not in self._running:
+            task = asyncio.get_running_loop().create_task(self._drain(project_scope_id))
+            self._running[project_scope_id] = task
+
+    async def wait_idle(self) -> None:
+        """Waits for all queued rebuilds (used by tests and at shutdown)."""
+        while self._running:
+            await asyncio.gather(*list(self._running.values()), return_exceptions=True)
+
+    async def _drain(self, project_scope_id: str) -> None:
+        try:
+            while self._pending.get(project_scope_id):
+                sections = self._pending.pop(project_scope_id)
+                homeowner_id = self._homeowners[project_scope_id]
+                try:
+                    await self.rebuild(project_scope_id, homeowner_id, sections)
+                except Exception as e:
+                    logger.error("Bid card rebuild for %s failed: %s", project_scope_id, e)
+                    # Put the sections back for the next change to pick up.
+                    self._pending.setdefault(project_scope_id, set()).update(sections)
+                    break
+        finally:
+            self._running.pop(project_scope_id, None)
+            if not self._pending.get(project_scope_id):
+                self._homeowners.pop(project_scope_id, None)
+
+    async def rebuild(self, project_scope_id: str, homeowner_id: str, sections: Iterable[str] = SECTIONS) -> Optional[Dict[str, Any]]:
+        """Rebuilds the given sections on top of the latest snapshot and stores the next version."""
+        try:
+            return await self._rebuild_once(project_scope_id, homeowner_id, set(sections))
+        except Exception as e:
+            if "duplicate" not in str(e).lower() and "23505" not in str(e):
+                raise
+            # Another process stored this version first; rebuild everything on top of it.
+            logger.info("Bid card snapshot version conflict for %s; rebuilding.", project_scope_id)
+            return await self._rebuild_once(project_scope_id, homeowner_id, set(SECTIONS))
+
+    async def _rebuild_once(self, project_scope_id: str, homeowner_id: str, rebuild: Set[str]) -> Optional[Dict[str, Any]]:
+        supabase_client = await get_supabase_client()
+        if not supabase_client:
+            raise RuntimeError("Supabase client not initialized.")
+
+        previous = await self.latest_snapshot(project_scope_id)
+        if previous is None:
+            rebuild = set(SECTIONS)
+        version = (previous["version"] if previous else 0) + 1
+        built = {name: previous[name] for name in SECTIONS if previous and name not in rebuild}
+        section_versions = dict(previous.get("section_versions", {})) if previous else {}
+
+        loaders = {
+            "project": self._load_project,
+            "details": self._load_details,
+            "images": self._load_images,
+        }
+        names = [name for name in SECTIONS if name in rebuild]
+        results = await asyncio.gather(*(loaders[name](supabase_client, project_scope_id) for name in names))
+        for name, section in zip(names, results):
+            built[name] = section
+            section_versions[name] = version
+        if built.get("project") is None:
+            logger.warning("Scope %s not found; no bid card snapshot written.", project_scope_id)
+            return None
+
+        document = assemble_document(project_scope_id, homeowner_id, version, built, section_versions)
+        await supabase_client.table(SNAPSHOT_TABLE).insert({
+            "project_scope_id": project_scope_id,
+            "homeowner_id": homeowner_id,
+            "version": version,
+            "project_created_at": built["project"].get("created_at"),
+            "document": document,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }).execute()
+        self.snapshots_written += 1
+        logger.debug("Stored bid card snapshot %s v%s (rebuilt: %s).", project_scope_id, version, names)
+        await self._prune(supabase_client, project_scope_id, version)
+        scope_events.publish(ScopeChange(homeowner_id, project_scope_id, sections=frozenset({SNAPSHOT_SECTION})))
+        return document
+
+    @staticmethod
+    async def _prune(sb: Any, project_scope_id: str, version: int) -> None:
+        """Deletes versions older than the last SNAPSHOT_KEEP. A failure only leaves extra rows behind."""
+        if version <= SNAPSHOT_KEEP:
+            return
+        try:
+            await (
+                sb.table(SNAPSHOT_TABLE)
+                .delete()
+                .eq("project_scope_id", project_scope_id)
+                .lte("version", version - SNAPSHOT_KEEP)
+                .execute()
+            )
+        except Exception as e:
+            logger.warning("Pruning bid card snapshots for %s failed: %s", project_scope_id, e)
+
+    async def latest_snapshot(self, project_scope_id: str, homeowner_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        supabase_client = await get_supabase_client()
+        if not supabase_client:
+            return None
+        query = supabase_client.table(SNAPSHOT_TABLE).select("document").eq("project_scope_id", project_scope_id)
+        if homeowner_id:
+            query = query.eq("homeowner_id", homeowner_id)
+        resp = await query.order("version", desc=True).limit(1).execute()
+        return resp.data[0]["document"] if resp and resp.data else None
+
+    async def latest_snapshot_for_homeowner(self, homeowner_id: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of the homeowner's newest project."""
+        supabase_client = await get_supabase_client()
+        if not supabase_client:
+            return None
+        resp = await (
+            supabase_client.table(SNAPSHOT_TABLE)
+            .select("document")
+            .eq("homeowner_id", homeowner_id)
+            .order("project_created_at", desc=True)
+            .order("version", desc=True)
+            .limit(1)
+            .execute()
+        )
+        return resp.data[0]["document"] if resp and resp.data else None
+
+    @staticmethod
+    async def _load_project(sb: Any, project_scope_id: str) -> Optional[Dict[str, Any]]:
+        resp = await sb.table("project_scopes").select(PROJECT_COLUMNS).eq("id", project_scope_id).limit(1).execute()
+        return build_project_section(resp.data[0]) if resp and resp.data else None
+
+    @staticmethod
+    async def _load_details(sb: Any, project_scope_id: str) -> Dict[str, Any]:
+        resp = await sb.table("project_scope_facts").select("fact_name,fact_value").eq("project_scope_id", project_scope_id).execute()
+        return build_details_section(resp.data or [])
+
+    @staticmethod
+    async def _load_images(sb: Any, project_scope_id: str) -> Dict[str, Any]:
+        resp = await (
+            sb.table("project_images")
+            .select("image_url,thumbnail_url,description")
+            .eq("project_scope_id", project_scope_id)
+            .order("created_at")
+            .execute()
+        )
+        return build_images_section(resp.data or [])
+
+
+bid_card_materializer = BidCardMaterializer()
+scope_events.subscribe(bid_card_materializer.on_scope_change)
+
+# Note: 'bid_card_snapshots' keeps the last SNAPSHOT_KEEP versions of a scope's bid card:
+# - project_scope_id (uuid, references project_scopes.id)
+# - version (integer); primary key (project_scope_id, version)
+# - homeowner_id (uuid), project_created_at (timestamptz)
+# - document (jsonb), created_at (timestamptz)
+# - index on (homeowner_id, project_created_at desc, version desc)
@@ -0,0 +1,269 @@
+# src/tools/blob_store.py
+"""
+Side store for image bytes received in chat messages.
+
+The homeowner agent used to base64-encode every inline image into session
+state, and each image tool decoded it again. Raw bytes now live here exactly
+once; state only carries short handles (state['pending_image_handles'], one
+per image in arrival order), and tools read the bytes as a zero-copy memoryview.
+
+Backends (IMAGE_BLOB_STORE):
+    memory (default)  in-process, LRU eviction once IMAGE_BLOB_BUDGET_BYTES is exceeded
+    disk              files under IMAGE_BLOB_DIR, read back through mmap
+"""
+import base64
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+from src.session.state_tracking import clear_key
+
+logger = logging.getLogger(__name__)
+
+HANDLE_PREFIX = "blob:"
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+@dataclass
+class BlobInfo:
+    size: int
+    mime_type: Optional[str]
+
+
+def new_handle() -> str:
+    return f"{HANDLE_PREFIX}{uuid.uuid4().hex}"
+
+
+def is_handle(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(HANDLE_PREFIX)
+
+
+# Derived renditions of a pending image (see src/tools/image_preprocess.py).
+IMAGE_VARIANTS = ("model", "thumbnail")
+
+
+def variant_handle(handle: str, variant: str) -> str:
+    return f"{handle}.{variant}"
+
+
+class BlobStore(ABC):
+    """Stores raw bytes under opaque handles that are small enough for session state."""
+
+    def __init__(self, budget_bytes: int = DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self._info: "OrderedDict[str, BlobInfo]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def put(self, data: BytesLike, mime_type: Optional[str] = None, handle: Optional[str] = None) -> str:
+        handle = handle or new_handle()
+        size = memoryview(data).nbytes
+        if size > self.budget_bytes:
+            raise ValueError(f"Blob of {size} bytes exceeds the store budget of {self.budget_bytes} bytes.")
+        with self._lock:
+            replaced = self._info.pop(handle, None)
+            if replaced is not None:
+                self.used_bytes -= replaced.size
+                self._remove(handle)
+            self._evict_for(size)
+            self._write(handle, data)
+            self._info[handle] = BlobInfo(size=size, mime_type=mime_type)
+            self.used_bytes += size
+        return handle
+
+    def get(self, handle: str) -> Optional[memoryview]:
+        """Zero-copy, read-only view of the blob, or None if unknown/evicted."""
+        with self._lock:
+            if handle not in self._info:
+                return None
+            self._info.move_to_end(handle)
+            return self._read(handle)
+
+    def info(self, handle: str) -> Optional[BlobInfo]:
+        with self._lock:
+            return self._info.get(handle)
+
+    def delete(self, handle: str) -> None:
+        with self._lock:
+            info = self._info.pop(handle, None)
+            if info is not None:
+                self.used_bytes -= info.size
+                self._remove(handle)
+
+    def __contains__(self, handle: str) -> bool:
+        with self._lock:
+            return handle in self._info
+
+    def _evict_for(self, incoming: int) -> None:
+        while self._info and self.used_bytes + incoming > self.budget_bytes:
+            handle, info = self._info.popitem(last=False)
+            self.used_bytes -= info.size
+            self._remove(handle)
+            logger.warning("Evicted blob %s (%s bytes) to stay within the %s byte budget.", handle, info.size, self.budget_bytes)
+
+    @abstractmethod
+    def _write(self, handle: str, data: BytesLike) -> None: ...
+
+    @abstractmethod
+    def _read(self, handle: str) -> memoryview: ...
+
+    @abstractmethod
+    def _remove(self, handle: str) -> None: ...
+
+
+class MemoryBlobStore(BlobStore):
+    def __init__(self, budget_bytes: int = DEFAULT_BUDGET_BYTES):
+        super().__init__(budget_bytes)
+        self._data: Dict[str, bytes] = {}
+
+    def _write(self, handle: str, data: BytesLike) -> None:
+        # bytes are immutable, so keep the caller's object rather than a copy.
+        self._data[handle] = data if isinstance(data, bytes) else bytes(data)
+
+    def _read(self, handle: str) -> memoryview:
+        return memoryview(self._data[handle])
+
+    def _remove(self, handle: str) -> None:
+        self._data.pop(handle, None)
+
+
+class DiskBlobStore(BlobStore):
+    """One file per blob; reads are mmap-backed so nothing is copied into the heap."""
+
+    def __init__(self, directory: Optional[str] = None, budget_bytes: int = DEFAULT_BUDGET_BYTES):
+        super().__init__(budget_bytes)
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "instabids-blobs")
+        os.makedirs(self.directory, exist_ok=True)
+        self._maps: Dict[str, mmap.mmap] = {}
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.directory, handle[len(HANDLE_PREFIX):] if is_handle(handle) else handle)
+
+    def _write(self, handle: str, data: BytesLike) -> None:
+        with open(self._path(handle), "wb") as f:
+            f.write(data)
+
+    def _read(self, handle: str) -> memoryview:
+        mapped = self._maps.get(handle)
+        if mapped is None:
+            if self._info[handle].size == 0:
+                return memoryview(b"")
+            with open(self._path(handle), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[handle] = mapped
+        return memoryview(mapped)
+
+    def _remove(self, handle: str) -> None:
+        mapped = self._maps.pop(handle, None)
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # A caller still holds a view; the mapping is released with it.
+                pass
+        try:
+            os.remove(self._path(handle))
+        except FileNotFoundError:
+            pass
+
+
+def upload_body(view: memoryview) -> bytes:
+    """
+    bytes for storage3's upload(), which only accepts bytes, a path or a file.
+    The memory store's original bytes object is returned as-is; other views
+    (mmap) are copied once here, at the network boundary.
+    """
+    if isinstance(view.obj, bytes) and view.nbytes == len(view.obj):
+        return view.obj
+    return view.tobytes()
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            budget = int(os.getenv("IMAGE_BLOB_BUDGET_BYTES", DEFAULT_BUDGET_BYTES))
+            backend = os.getenv("IMAGE_BLOB_STORE", "memory").lower()
+            if backend == "disk":
+                _store = DiskBlobStore(os.getenv("IMAGE_BLOB_DIR"), budget_bytes=budget)
+            else:
+                _store = MemoryBlobStore(budget_bytes=budget)
+            logger.info("Using %s for image blobs (budget %s bytes).", type(_store).__name__, budget)
+        return _store
+
+
+def pending_image_handles(state: Mapping[str, Any]) -> List[str]:
+    """
+    Queue of images waiting to be described/uploaded, oldest first.
+    Includes the single 'pending_image_handle' written before messages could carry several images.
+    """
+    handles = [handle for handle in state.get("pending_image_handles") or () if is_handle(handle)]
+    single = state.get("pending_image_handle")
+    if is_handle(single) and single not in handles:
+        handles.insert(0, single)
+    return handles
+
+
+def queue_pending_image(state: Any, data: BytesLike, mime_type: Optional[str]) -> str:
+    """Stores the bytes and appends their handle to the pending queue."""
+    handle = get_blob_store().put(data, mime_type)
+    # Assign a new list so state change tracking sees the update.
+    state["pending_image_handles"] = [*pending_image_handles(state), handle]
+    clear_key(state, "pending_image_handle")
+    return handle
+
+
+def pending_image_view(state: Mapping[str, Any]) -> Optional[memoryview]:
+    """
+    Bytes of the oldest image waiting in state, or None.
+
+    Sessions written before the blob store existed still carry base64 in
+    'pending_image_data'; those are decoded once here.
+    """
+    handles = pending_image_handles(state)
+    if handles:
+        return get_blob_store().get(handles[0])
+    legacy = state.get("pending_image_data")
+    if legacy:
+        return memoryview(base64.b64decode(legacy))
+    return None
+
+
+def release_image(handle: str) -> None:
+    """Deletes the blob and its derived variants."""
+    store = get_blob_store()
+    store.delete(handle)
+    for variant in IMAGE_VARIANTS:
+        store.delete(variant_handle(handle, variant))
+
+
+def clear_pending_image(state: Any, handle: Optional[str] = None) -> None:
+    """
+    Drops one pending image (or, without a handle, all of them) from state
+    and releases the blobs.
+    """
+    queued = pending_image_handles(state)
+    released = queued if handle is None else [handle]
+    for released_handle in released:
+        release_image(released_handle)
+    remaining = [queued_handle for queued_handle in queued if queued_handle not in released]
+
+    clear_key(state, "pending_image_handle")
+    if remaining:
+        state["pending_image_handles"] = remaining
+        return
+    for key in ("pending_image_handles", "pending_image_data", "pending_image_mime_type"):
+        clear_key(state, key)
@@ -0,0 +1,402 @@
+# src/tools/group_bidding.py
+"""
+Group-bidding matching engine.
+
+Homeowners who opt in (project_scopes.group_bidding_preference) can be
+bundled with nearby homeowners who need the same kind of work in the same
+time window. The engine indexes opted-in scopes by:
+
+  * location: zip code -> centroid (ZipCentroids), bucketed into a grid of
+    radius-sized cells so a lookup only inspects the 3x3 neighbouring cells;
+  * normalized project type (normalize_project_type);
+  * timeline window: window_days-wide buckets of the scope's start date.
+
+Clustering is greedy leader clustering: a scope joins the first open group
+with the same type and window whose seed lies within radius_miles, or seeds a
+new group. The same add() is used for the bulk build and for new scopes, so
+new scopes slot into existing groups without a recompute. Groups close at
+max_group_size; groups below min_group_size are not reported as candidates.
+
+Zip centroids are kept in a compact binary file (12 bytes per zip) at
+ZIP_CENTROIDS_PATH, default src/tools/data/zip_centroids.bin. The file is not
+committed; build it once from the Census ZCTA gazetteer
+(2023_Gaz_zcta_national.txt, published with the Census Gazetteer Files):
+
+    make zip-centroids GAZETTEER=2023_Gaz_zcta_national.txt
+
+The engine is a library for batch matching jobs (load_opted_in_scopes +
+GroupBiddingEngine.rebuild). The homeowner agent only records
+group_bidding_preference on the scope; nothing in the conversation path
+builds groups yet.
+"""
+import argparse
+import bisect
+import datetime
+import math
+import os
+import re
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_CENTROIDS_PATH = os.path.join(os.path.dirname(__file__), "data", "zip_centroids.bin")
+_MAGIC = b"ZIPC"
+_MILES_PER_DEGREE = 69.0
+
+# Canonical project types and the keywords that identify them, checked in
+# order: rooms before the materials and trades that appear inside them, then
+# most specific first. Keywords match whole words (plural -s/-es allowed); a
+# trailing * matches any word starting with the stem.
+PROJECT_TYPE_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("kitchen", ("kitchen", "cabinet", "countertop")),
+    ("bathroom", ("bath*", "shower", "toilet", "vanity")),
+    ("gutters", ("gutter", "downspout")),
+    ("roofing", ("roof*", "shingle", "reroof*")),
+    ("siding", ("siding", "cladding")),
+    ("windows", ("window",)),
+    ("doors", ("door", "doorway")),
+    ("solar", ("solar", "photovoltaic")),
+    ("hvac", ("hvac", "furnace", "air condition*", "heat pump", "ac", "a c")),
+    ("painting", ("paint*", "stain", "staining", "stained")),
+    ("fencing", ("fence", "fencing")),
+    ("decking", ("deck", "decking", "patio")),
+    ("concrete", ("concrete", "driveway", "sidewalk")),
+    ("landscaping", ("landscap*", "lawn", "yard", "backyard", "tree")),
+    ("insulation", ("insulat*", "attic")),
+    ("flooring", ("floor*", "carpet*", "tile", "tiling")),
+    ("plumbing", ("plumb*", "pipe", "water heater")),
+    ("electrical", ("electric*", "wiring", "panel")),
+)
+OTHER = "other"
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def _keyword_pattern(keyword: str) -> str:
+    words = []
+    for word in keyword.split():
+        if word.endswith("*"):
+            words.append(re.escape(word[:-1]) + r"[a-z0-9]*")
+        else:
+            words.append(re.escape(word) + "(?:e?s)?")
+    return r"\b" + " ".join(words) + r"\b"
+
+
+_PROJECT_TYPE_PATTERNS = tuple(
+    (project_type, re.compile("|".join(_keyword_pattern(keyword) for keyword in keywords)))
+    for project_type, keywords in PROJECT_TYPE_KEYWORDS
+)
+
+
+def normalize_project_type(*texts: Optional[str]) -> str:
+    """Maps free text (title, description, ...) to a canonical project type."""
+    haystack = _NON_ALNUM.sub(" ", " ".join(t for t in texts if t).lower())
+    for project_type, pattern in _PROJECT_TYPE_PATTERNS:
+        if pattern.search(haystack):
+            return project_type
+    return OTHER
+
+
+def _zip_int(zip_code) -> Optional[int]:
+    digits = str(zip_code).strip()[:5]
+    return int(digits) if digits.isdigit() and len(digits) == 5 else None
+
+
+class ZipCentroids:
+    """Sorted zip codes with float32 lat/lon, looked up by binary search."""
+
+    def __init__(self, zips: array, lats: array, lons: array):
+        self._zips = zips
+        self._lats = lats
+        self._lons = lons
+
+    def __len__(self) -> int:
+        return len(self._zips)
+
+    def get(self, zip_code) -> Optional[Tuple[float, float]]:
+        key = _zip_int(zip_code)
+        if key is None:
+            return None
+        index = bisect.bisect_left(self._zips, key)
+        if index < len(self._zips) and self._zips[index] == key:
+            return self._lats[index], self._lons[index]
+        return None
+
+    @classmethod
+    def from_pairs(cls, rows: Iterable[Tuple[int, float, float]]) -> "ZipCentroids":
+        ordered = sorted(rows)
+        return cls(
+            array("I", (row[0] for row in ordered)),
+            array("f", (row[1] for row in ordered)),
+            array("f", (row[2] for row in ordered)),
+        )
+
+    @classmethod
+    def from_gazetteer(cls, path: str) -> "ZipCentroids":
+        """Census ZCTA gazetteer (tab separated: GEOID ... INTPTLAT INTPTLONG)."""
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            header = [column.strip() for column in f.readline().split("\t")]
+            zip_col, lat_col, lon_col = header.index("GEOID"), header.index("INTPTLAT"), header.index("INTPTLONG")
+            for line in f:
+                columns = line.rstrip("\n").split("\t")
+                zip_code = _zip_int(columns[zip_col])
+                if zip_code is not None:
+                    rows.append((zip_code, float(columns[lat_col]), float(columns[lon_col])))
+        return cls.from_pairs(rows)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(_MAGIC + struct.pack("<I", len(self._zips)))
+            for column in (self._zips, self._lats, self._lons):
+                data = array(column.typecode, column)
+                if sys.byteorder != "little":
+                    data.byteswap()
+                f.write(data.tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> "ZipCentroids":
+        with open(path, "rb") as f:
+            if f.read(4) != _MAGIC:
+                raise ValueError(f"{path} is not a zip centroid table.")
+            (count,) = struct.unpack("<I", f.read(4))
+            columns = []
+            for typecode in ("I", "f", "f"):
+                column = array(typecode)
+                column.frombytes(f.read(4 * count))
+                if sys.byteorder != "little":
+                    column.byteswap()
+                columns.append(column)
+        return cls(*columns)
+
+
+_default_centroids: Optional[ZipCentroids] = None
+
+
+def get_zip_centroids() -> ZipCentroids:
+    global _default_centroids
+    if _default_centroids is None:
+        path = os.getenv("ZIP_CENTROIDS_PATH", DEFAULT_CENTROIDS_PATH)
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"Zip centroid table {path} not found. Build it from the Census ZCTA gazetteer with "
+                "'make zip-centroids GAZETTEER=<2023_Gaz_zcta_national.txt>', set ZIP_CENTROIDS_PATH, "
+                "or pass centroids= to GroupBiddingEngine."
+            )
+        _default_centroids = ZipCentroids.load(path)
+    return _default_centroids
+
+
+@dataclass(frozen=True, slots=True)
+class GroupScope:
+    scope_id: Hashable
+    zip_code: str
+    project_type: str
+    # Proleptic Gregorian ordinal (date.toordinal()) of the start of the work window.
+    window_start: int
+
+
+@dataclass(slots=True)
+class CandidateGroup:
+    group_id: int
+    project_type: str
+    window_bucket: int
+    lat: float
+    lon: float
+    members: List[Hashable] = field(default_factory=list)
+
+
+class GroupBiddingEngine:
+    def __init__(
+        self,
+        centroids: Optional[ZipCentroids] = None,
+        radius_miles: float = 25.0,
+        window_days: int = 30,
+        max_group_size: int = 25,
+        min_group_size: int = 2,
+    ):
+        self.centroids = centroids if centroids is not None else get_zip_centroids()
+        self.radius_miles = radius_miles
+        self.window_days = window_days
+        self.max_group_size = max_group_size
+        self.min_group_size = min_group_size
+        self._groups: List[Optional[CandidateGroup]] = []
+        self._group_of: Dict[Hashable, int] = {}
+        # (type, window bucket, cell x, cell y) -> ids of open groups seeded in that cell.
+        self._cells: Dict[Tuple[str, int, int, int], List[int]] = {}
+        # (type, window bucket) -> zip -> open group last joined from that zip: skips the cell search.
+        self._zip_hint: Dict[Tuple[str, int], Dict[str, int]] = {}
+        self.unlocated = 0
+
+    # --- public API -------------------------------------------------------
+    def add(self, scope: GroupScope) -> Optional[int]:
+        """Slots the scope into a group (seeding one if needed). Returns the group id, or None if the zip is unknown."""
+        if scope.scope_id in self._group_of:
+            self.remove(scope.scope_id)
+        bucket = scope.window_start // self.window_days
+        hints = self._zip_hint.get((scope.project_type, bucket))
+        if hints is None:
+            hints = self._zip_hint[(scope.project_type, bucket)] = {}
+
+        group_id = hints.get(scope.zip_code)
+        if group_id is not None and not self._is_open(group_id):
+            del hints[scope.zip_code]
+            group_id = None
+
+        if group_id is None:
+            location = self.centroids.get(scope.zip_code)
+            if location is None:
+                self.unlocated += 1
+                return None
+            lat, lon = location
+            group_id = self._nearest_open_group(scope.project_type, bucket, lat, lon)
+            if group_id is None:
+                group_id = self._seed(scope.project_type, bucket, lat, lon)
+            hints[scope.zip_code] = group_id
+
+        group = self._groups[group_id]
+        group.members.append(scope.scope_id)
+        self._group_of[scope.scope_id] = group_id
+        if len(group.members) >= self.max_group_size:
+            self._close(group_id)
+        return group_id
+
+    def add_many(self, scopes: Iterable[GroupScope]) -> int:
+        """Bulk build. Sorting by (type, window, zip) keeps the zip hint hot. Returns scopes placed."""
+        ordered = sorted(scopes, key=lambda s: (s.project_type, s.window_start // self.window_days, s.zip_code))
+        placed = 0
+        for scope in ordered:
+            if self.add(scope) is not None:
+                placed += 1
+        return placed
+
+    def rebuild(self, scopes: Iterable[GroupScope]) -> int:
+        """Full recompute from scratch."""
+        self.__init__(self.centroids, self.radius_miles, self.window_days, self.max_group_size, self.min_group_size)
+        return self.add_many(scopes)
+
+    def remove(self, scope_id: Hashable) -> None:
+        group_id = self._group_of.pop(scope_id, None)
+        if group_id is None:
+            return
+        group = self._groups[group_id]
+        group.members.remove(scope_id)
+        if not group.members:
+            self._close(group_id)
+            self._groups[group_id] = None
+        elif len(group.members) == self.max_group_size - 1:
+            # Full groups were closed; one free slot reopens it.
+            self._cells.setdefault(self._cell_key(group), []).append(group_id)
+
+    def group_of(self, scope_id: Hashable) -> Optional[CandidateGroup]:
+        group_id = self._group_of.get(scope_id)
+        return self._groups[group_id] if group_id is not None else None
+
+    def groups(self, min_size: Optional[int] = None) -> Iterator[CandidateGroup]:
+        """Candidate groups with at least min_size (default min_group_size) members."""
+        threshold = self.min_group_size if min_size is None else min_size
+        for group in self._groups:
+            if group is not None and len(group.members) >= threshold:
+                yield group
+
+    def __len__(self) -> int:
+        return len(self._group_of)
+
+    # --- internals -----------------------------------------------------------
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        y = lat * _MILES_PER_DEGREE
+        x = lon * _MILES_PER_DEGREE * math.cos(math.radians(lat))
+        return int(x // self.radius_miles), int(y // self.radius_miles)
+
+    def _cell_key(self, group: CandidateGroup) -> Tuple[str, int, int, int]:
+        cx, cy = self._cell(group.lat, group.lon)
+        return group.project_type, group.window_bucket, cx, cy
+
+    def _distance_miles(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        # Equirectangular approximation: accurate to well under 1% at these radii.
+        x = (lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+        return math.hypot(x, lat2 - lat1) * _MILES_PER_DEGREE
+
+    def _nearest_open_group(self, project_type: str, bucket: int, lat: float, lon: float) -> Optional[int]:
+        cx, cy = self._cell(lat, lon)
+        best, best_distance = None, self.radius_miles
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for group_id in self._cells.get((project_type, bucket, cx + dx, cy + dy), ()):
+                    group = self._groups[group_id]
+                    distance = self._distance_miles(lat, lon, group.lat, group.lon)
+                    if distance <= best_distance:
+                        best, best_distance = group_id, distance
+        return best
+
+    def _seed(self, project_type: str, bucket: int, lat: float, lon: float) -> int:
+        group_id = len(self._groups)
+        group = CandidateGroup(group_id, project_type, bucket, lat, lon)
+        self._groups.append(group)
+        self._cells.setdefault(self._cell_key(group), []).append(group_id)
+        return group_id
+
+    def _is_open(self, group_id: int) -> bool:
+        group = self._groups[group_id]
+        return group is not None and len(group.members) < self.max_group_size
+
+    def _close(self, group_id: int) -> None:
+        group = self._groups[group_id]
+        open_ids = self._cells.get(self._cell_key(group))
+        if open_ids and group_id in open_ids:
+            open_ids.remove(group_id)
+
+
+OPTED_IN_COLUMNS = "id,zip_code,project_title,project_description,created_at,timeline_start"
+
+
+def scope_from_row(row: Dict) -> GroupScope:
+    """GroupScope for a project_scopes row. Without a normalized timeline the window starts when the scope was created."""
+    start = row.get("timeline_start") or row.get("created_at")
+    start = datetime.date.fromisoformat(str(start)[:10]) if start else datetime.date.today()
+    return GroupScope(
+        scope_id=row["id"],
+        zip_code=str(row.get("zip_code") or "").strip()[:5],
+        project_type=normalize_project_type(row.get("project_title"), row.get("project_description")),
+        window_start=start.toordinal(),
+    )
+
+
+async def load_opted_in_scopes(page_size: int = 1000) -> List[GroupScope]:
+    """Reads every opted-in scope, paging by id."""
+    from src.db.supabase_client import get_supabase_client
+
+    supabase_client = await get_supabase_client()
+    if not supabase_client:
+        raise RuntimeError("Supabase client not initialized.")
+    scopes: List[GroupScope] = []
+    last_id = None
+    while True:
+        query = supabase_client.table("project_scopes").select(OPTED_IN_COLUMNS).eq("group_bidding_preference", True)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        resp = await query.order("id").limit(page_size).execute()
+        rows = resp.data or []
+        scopes.extend(scope_from_row(row) for row in rows if row.get("zip_code"))
+        if len(rows) < page_size:
+            return scopes
+        last_id = rows[-1]["id"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Group bidding utilities.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build-centroids", help="Build the compact zip centroid table from a Census ZCTA gazetteer file.")
+    build.add_argument("gazetteer")
+    build.add_argument("--output", default=os.getenv("ZIP_CENTROIDS_PATH", DEFAULT_CENTROIDS_PATH))
+    args = parser.parse_args()
+
+    centroids = ZipCentroids.from_gazetteer(args.gazetteer)
+    centroids.save(args.output)
+    print(f"Wrote {len(centroids)} zip centroids ({os.path.getsize(args.output)} bytes) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# src/tools/image_dedup.py
+"""
+Content-addressed image uploads.
+
+Homeowners often send the same photo more than once in a conversation (or
+across conversations). Objects are stored under the SHA-256 of their bytes,
+so the same photo always maps to the same path, and the hash -> public URL
+mapping is remembered in two places:
+
+  * an in-process LRU (IMAGE_DEDUP_CACHE_SIZE entries), checked first;
+  * a local SQLite index (IMAGE_DEDUP_INDEX_PATH), which survives restarts.
+
+A hit in either skips the upload entirely. On a miss the object is uploaded
+with upsert disabled; if storage reports that the path already exists (409 /
+"Duplicate": another process uploaded the same bytes), that is treated as
+success. Concurrent uploads of the same bytes within a process share one
+request. Index reads and writes run in a worker thread, off the event loop.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+
+from src.db.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 4096
+PATH_PREFIX = "sha256"
+# Content-addressed objects never change, so CDNs and browsers may keep them.
+IMMUTABLE_CACHE_CONTROL = "31536000"
+# hashlib releases the GIL for large inputs; hash those off the event loop.
+_HASH_IN_THREAD_BYTES = 1024 * 1024
+
+
+class ImageUploadError(Exception):
+    pass
+
+
+@dataclass
+class DedupStats:
+    memory_hits: int = 0
+    index_hits: int = 0
+    uploads: int = 0
+    already_stored: int = 0
+    bytes_skipped: int = 0
+
+
+def content_hash(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_path(digest: str, extension: str = "") -> str:
+    """'sha256/ab/abcdef....jpg' — the two-character fan-out keeps bucket listings small."""
+    if extension and not extension.startswith("."):
+        extension = f".{extension}"
+    return f"{PATH_PREFIX}/{digest[:2]}/{digest}{extension.lower()}"
+
+
+class _UploadIndex:
+    """SQLite table of (bucket, digest) -> path and public URL."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS image_uploads ("
+                " bucket TEXT NOT NULL,"
+                " digest TEXT NOT NULL,"
+                " path TEXT NOT NULL,"
+                " public_url TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " content_type TEXT,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (bucket, digest))"
+            )
+
+    def get(self, bucket: str, digest: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT public_url FROM image_uploads WHERE bucket = ? AND digest = ?", (bucket, digest)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, bucket: str, digest: str, path: str, public_url: str, size: int, content_type: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_uploads VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (bucket, digest, path, public_url, size, content_type, time.time()),
+            )
+
+    def delete(self, bucket: str, digest: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM image_uploads WHERE bucket = ? AND digest = ?", (bucket, digest))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_ALREADY_EXISTS_CODES = {"409", "duplicate"}
+_ERROR_CODE_FIELDS = ("statusCode", "status_code", "status", "code", "error")
+
+
+def _error_codes(error: Any) -> Set[str]:
+    """Status and error codes of a storage error: a response JSON dict or an exception carrying one."""
+    fields: Dict[str, Any] = {}
+    if isinstance(error, dict):
+        fields = error
+    elif isinstance(error, BaseException):
+        # storage3's StorageException is raised with the response JSON as its argument.
+        if error.args and isinstance(error.args[0], dict):
+            fields = dict(error.args[0])
+        for name in _ERROR_CODE_FIELDS:
+            value = getattr(error, name, None)
+            if value is not None:
+                fields[name] = value
+    return {str(fields[name]).lower() for name in _ERROR_CODE_FIELDS if fields.get(name) is not None}
+
+
+def _is_already_exists(error: Any) -> bool:
+    """Storage reports an existing object as statusCode 409 / error "Duplicate"; the message text is not checked."""
+    return bool(_error_codes(error) & _ALREADY_EXISTS_CODES)
+
+
+class ImageUploadDeduplicator:
+    def __init__(self, index_path: Optional[str] = None, cache_size: Optional[int] = None):
+        if index_path is None:
+            index_path = os.getenv(
+                "IMAGE_DEDUP_INDEX_PATH", os.path.join(tempfile.gettempdir(), "instabids-image-index.sqlite3")
+            )
+        if cache_size is None:
+            cache_size = int(os.getenv("IMAGE_DEDUP_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+        self._index = _UploadIndex(index_path)
+        # Public URLs of content-addressed objects do not expire.
+        self._urls: TTLCache[Tuple[str, str], str] = TTLCache(maxsize=cache_size, ttl=float("inf"))
+        self.stats = DedupStats()
+
+    async def upload(
+        self,
+        supabase_client: Any,
+        bucket: str,
+        data,
+        content_type: Optional[str],
+        extension: str = "",
+    ) -> Tuple[str, bool]:
+        """
+        Returns (public_url, reused). reused is True when no bytes were sent.
+        Raises ImageUploadError if the upload fails.
+        """
+        view = memoryview(data)
+        if view.nbytes >= _HASH_IN_THREAD_BYTES:
+            digest = await asyncio.to_thread(content_hash, view)
+        else:
+            digest = content_hash(view)
+        key = (bucket, digest)
+
+        cached = self._urls.get(key)
+        if cached is not None:
+            self.stats.memory_hits += 1
+            self.stats.bytes_skipped += view.nbytes
+            logger.debug("Image %s already uploaded (memory).", digest[:12])
+            return cached, True
+
+        uploaded = False
+
+        async def load() -> str:
+            nonlocal uploaded
+            url = await asyncio.to_thread(self._index.get, bucket, digest)
+            if url is not None:
+                self.stats.index_hits += 1
+                self.stats.bytes_skipped += view.nbytes
+                logger.debug("Image %s already uploaded (index).", digest[:12])
+                return url
+            url = await self._upload(supabase_client, bucket, digest, data, content_type, extension)
+            uploaded = True
+            return url
+
+        url = await self._urls.get_or_load(key, load)
+        return url, not uploaded
+
+    def forget(self, bucket: str, digest: str) -> None:
+        """Drops a mapping, e.g. after the object was deleted from storage."""
+        self._urls.invalidate((bucket, digest))
+        self._index.delete(bucket, digest)
+
+    async def _upload(
+        self, supabase_client: Any, bucket: str, digest: str, data, content_type: Optional[str], extension: str
+    ) -> str:
+        path = content_path(digest, extension)
+        storage = supabase_client.storage.from_(bucket)
+        file_options = {
+            "content-type": content_type or "application/octet-stream",
+            "cache-control": IMMUTABLE_CACHE_CONTROL,
+            "upsert": "false",
+        }
+        try:
+            response = await storage.upload(path=path, file=data, file_options=file_options)
+        except Exception as e:
+            if not _is_already_exists(e):
+                raise ImageUploadError(str(e)) from e
+            self.stats.already_stored += 1
+            logger.debug("Image %s already present in bucket %s.", digest[:12], bucket)
+        else:
+            status = getattr(response, "status_code", 200)
+            if status == 409:
+                self.stats.already_stored += 1
+            elif status >= 300:
+                try:
+                    error_content = response.json()
+                    message = error_content.get("message", str(error_content))
+                except ValueError:
+                    error_content, message = {}, response.text
+                if not _is_already_exists(error_content):
+                    raise ImageUploadError(f"{status} - {message}")
+                self.stats.already_stored += 1
+            else:
+                self.stats.uploads += 1
+
+        public_url = await storage.get_public_url(path)
+        size = memoryview(data).nbytes
+        await asyncio.to_thread(self._index.put, bucket, digest, path, public_url, size, content_type)
+        return public_url
+
+
+_deduplicator: Optional[ImageUploadDeduplicator] = None
+_deduplicator_lock = threading.Lock()
+
+
+def get_image_deduplicator() -> ImageUploadDeduplicator:
+    global _deduplicator
+    with _deduplicator_lock:
+        if _deduplicator is None:
+            _deduplicator = ImageUploadDeduplicator()
+        return _deduplicator
@@ -0,0 +1,319 @@
+# src/tools/image_preprocess.py
+"""
+Preprocessing for photos sent by homeowners.
+
+Phone photos arrive at full resolution (4-12 MB). Before they reach the
+vision model or storage, each image is decoded once in a worker process and
+turned into three renditions:
+
+    original   full resolution, metadata (EXIF/GPS, XMP, IPTC, comments)
+               stripped; stored in Supabase Storage. JPEGs are never
+               re-encoded: the metadata segments are cut out of the file and
+               only the EXIF orientation tag is written back, so viewers still
+               rotate the photo upright. Other formats with metadata are
+               re-encoded (PNG losslessly, WebP at IMAGE_ORIGINAL_QUALITY)
+    model      longest edge <= IMAGE_MAX_EDGE, re-encoded as
+               IMAGE_MODEL_FORMAT at IMAGE_MODEL_QUALITY; sent to the vision model
+    thumbnail  longest edge <= IMAGE_THUMBNAIL_EDGE; stored next to the original
+
+The renditions live in the blob store next to the pending image
+(variant_handle(handle, "model"), ...). Decoding and resizing are CPU bound,
+so they run in a ProcessPoolExecutor (IMAGE_PREPROCESS_WORKERS) rather than on
+the event loop.
+
+Pillow is optional (pip install pillow). Without it, or for bytes Pillow cannot
+decode, every rendition is the untouched upload and no thumbnail is produced.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+from src.db.cache import TTLCache
+from src.session.state_tracking import clear_key
+from src.tools.blob_store import (
+    get_blob_store,
+    pending_image_handles,
+    pending_image_view,
+    queue_pending_image,
+    upload_body,
+    variant_handle,
+)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; images are then passed through untouched.
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+# Metadata keys Pillow exposes in Image.info that must not reach storage.
+_PRIVATE_INFO_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+# JPEG segments dropped from the original: APP1 (EXIF, XMP), APP13 (IPTC), COM.
+_JPEG_PRIVATE_MARKERS = frozenset({0xE1, 0xED, 0xFE})
+_JPEG_SOS = 0xDA
+
+
+@dataclass(frozen=True)
+class PreprocessConfig:
+    max_edge: int = 1568
+    model_format: str = "WEBP"
+    model_quality: int = 80
+    thumbnail_edge: int = 320
+    thumbnail_quality: int = 70
+    original_quality: int = 95
+
+    @classmethod
+    def from_env(cls) -> "PreprocessConfig":
+        defaults = cls()
+        return cls(
+            max_edge=int(os.getenv("IMAGE_MAX_EDGE", defaults.max_edge)),
+            model_format=os.getenv("IMAGE_MODEL_FORMAT", defaults.model_format).upper(),
+            model_quality=int(os.getenv("IMAGE_MODEL_QUALITY", defaults.model_quality)),
+            thumbnail_edge=int(os.getenv("IMAGE_THUMBNAIL_EDGE", defaults.thumbnail_edge)),
+            thumbnail_quality=int(os.getenv("IMAGE_THUMBNAIL_QUALITY", defaults.thumbnail_quality)),
+            original_quality=int(os.getenv("IMAGE_ORIGINAL_QUALITY", defaults.original_quality)),
+        )
+
+
+@dataclass
+class Rendition:
+    data: bytes
+    mime_type: str
+    size: Tuple[int, int]
+
+
+@dataclass
+class PreprocessedImage:
+    original: Rendition
+    model: Rendition
+    thumbnail: Optional[Rendition]
+    source_bytes: int
+    # False when the upload had no metadata or rotation to remove and is kept byte for byte.
+    original_rewritten: bool = False
+
+
+@dataclass
+class ImageVariants:
+    """Blob store handles of the renditions of one pending image."""
+
+    original: str
+    model: str
+    thumbnail: Optional[str]
+
+    def mime_type(self, handle: Optional[str]) -> Optional[str]:
+        info = get_blob_store().info(handle) if handle else None
+        return info.mime_type if info else None
+
+
+# --- worker side (runs in the process pool) -----------------------------
+def _encode(image: "Image.Image", fmt: str, quality: int, icc_profile: Optional[bytes] = None) -> Rendition:
+    fmt = fmt.upper() if fmt.upper() in _FORMAT_MIME_TYPES else "JPEG"
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    options: dict = {}
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+    if fmt == "JPEG":
+        options.update(quality=quality, optimize=True, progressive=True)
+    elif fmt == "WEBP":
+        options.update(quality=quality, method=4)
+    else:
+        options.update(optimize=True)
+
+    buffer = io.BytesIO()
+    # No exif=/pnginfo= arguments: Pillow writes none of the source metadata.
+    image.save(buffer, fmt, **options)
+    return Rendition(buffer.getvalue(), _FORMAT_MIME_TYPES[fmt], image.size)
+
+
+def _orientation_segment(orientation: int) -> bytes:
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    payload = exif.tobytes()
+    return b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload
+
+
+def _strip_jpeg_metadata(data: bytes, orientation: int) -> Optional[bytes]:
+    """
+    Cuts the metadata segments out of a JPEG without touching the image data.
+
+    Keeps APP0 (JFIF), APP2 (ICC profile) and the coding segments; when the
+    photo is rotated, an EXIF segment holding only the orientation tag is
+    written back after the leading APP0. Returns None for a file it cannot
+    walk, so the caller re-encodes instead.
+    """
+    if data[:2] != b"\xff\xd8":
+        return None
+    kept = [b"\xff\xd8"]
+    position = 2
+    while True:
+        while data[position + 1 : position + 2] == b"\xff":
+            position += 1  # fill bytes before a marker
+        if position + 4 > len(data) or data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == _JPEG_SOS:
+            kept.append(data[position:])  # scan data and everything after it is copied verbatim
+            break
+        length = int.from_bytes(data[position + 2 : position + 4], "big")
+        end = position + 2 + length
+        if length < 2 or end > len(data):
+            return None
+        if marker not in _JPEG_PRIVATE_MARKERS:
+            kept.append(data[position:end])
+        position = end
+    if orientation != 1:
+        insert_at = 2 if len(kept) > 1 and kept[1][1] == 0xE0 else 1
+        kept.insert(insert_at, _orientation_segment(orientation))
+    return b"".join(kept)
+
+
+def _passthrough(data: bytes, mime_type: Optional[str]) -> PreprocessedImage:
+    rendition = Rendition(data, mime_type or "application/octet-stream", (0, 0))
+    return PreprocessedImage(original=rendition, model=rendition, thumbnail=None, source_bytes=len(data))
+
+
+def preprocess_image_bytes(data: bytes, mime_type: Optional[str], config: PreprocessConfig) -> PreprocessedImage:
+    """Decodes once and produces the original/model/thumbnail renditions. Safe to run in a worker process."""
+    if Image is None:
+        return _passthrough(data, mime_type)
+    try:
+        with Image.open(io.BytesIO(data)) as opened:
+            source_format = opened.format
+            has_private_metadata = any(key in opened.info for key in _PRIVATE_INFO_KEYS)
+            orientation = opened.getexif().get(0x0112, 1)
+            icc_profile = opened.info.get("icc_profile")
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+    except Exception:
+        # Not an image Pillow can read (e.g. HEIC without a plugin): keep the bytes as sent.
+        return _passthrough(data, mime_type)
+
+    rewrite = source_format not in _FORMAT_MIME_TYPES or has_private_metadata or orientation != 1
+    stripped = _strip_jpeg_metadata(data, orientation) if rewrite and source_format == "JPEG" else None
+    if stripped is not None:
+        original = Rendition(stripped, _FORMAT_MIME_TYPES["JPEG"], image.size)
+    elif rewrite:
+        original = _encode(image, source_format or "JPEG", config.original_quality, icc_profile)
+    else:
+        original = Rendition(data, _FORMAT_MIME_TYPES[source_format], image.size)
+
+    scaled = image.copy()
+    scaled.thumbnail((config.max_edge, config.max_edge), Image.LANCZOS)
+    model = _encode(scaled, config.model_format, config.model_quality, icc_profile)
+
+    scaled.thumbnail((config.thumbnail_edge, config.thumbnail_edge), Image.LANCZOS)
+    thumbnail = _encode(scaled, config.model_format, config.thumbnail_quality, icc_profile)
+
+    return PreprocessedImage(
+        original=original, model=model, thumbnail=thumbnail, source_bytes=len(data), original_rewritten=rewrite
+    )
+
+
+# --- event loop side ----------------------------------------------------
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# handle -> ImageVariants; single-flight, so concurrent tools preprocess once.
+_variants: TTLCache[str, ImageVariants] = TTLCache(maxsize=256, ttl=float(os.getenv("IMAGE_VARIANT_TTL_SECONDS", 1800)))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.getenv("IMAGE_PREPROCESS_WORKERS", max(1, min(4, (os.cpu_count() or 2) - 1))))
+            # spawn: the server process has live threads (session bridge, HTTP pool) that fork would copy.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            logger.info("Started image preprocessing pool with %s workers.", workers)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+async def preprocess_image(data: Any, mime_type: Optional[str], config: Optional[PreprocessConfig] = None) -> PreprocessedImage:
+    """Runs preprocess_image_bytes in the process pool (inline passthrough when Pillow is missing)."""
+    body = bytes(data) if not isinstance(data, bytes) else data
+    if Image is None:
+        return _passthrough(body, mime_type)
+    config = config or PreprocessConfig.from_env()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), preprocess_image_bytes, body, mime_type, config)
+
+
+def _variants_present(variants: ImageVariants) -> bool:
+    store = get_blob_store()
+    return all(handle in store for handle in (variants.original, variants.model, variants.thumbnail) if handle)
+
+
+async def image_variants(handle: str) -> Optional[ImageVariants]:
+    """
+    Handles of the original/model/thumbnail renditions of a stored image,
+    preprocessing it on first use. Returns None if the blob is gone.
+    """
+    store = get_blob_store()
+    cached = _variants.get(handle)
+    if cached is not None and _variants_present(cached):
+        return cached
+    info = store.info(handle)
+    if info is None:
+        return None
+    mime_type = info.mime_type
+
+    async def load() -> ImageVariants:
+        view = store.get(handle)
+        if view is None:
+            raise LookupError(f"Blob {handle} was evicted before preprocessing.")
+        result = await preprocess_image(upload_body(view), mime_type)
+        del view
+        if result.original_rewritten:
+            # Replace the raw upload with the metadata-free original.
+            store.put(result.original.data, result.original.mime_type, handle=handle)
+        model_handle = handle
+        thumbnail_handle = None
+        if result.thumbnail is not None:
+            model_handle = store.put(result.model.data, result.model.mime_type, handle=variant_handle(handle, "model"))
+            thumbnail_handle = store.put(
+                result.thumbnail.data, result.thumbnail.mime_type, handle=variant_handle(handle, "thumbnail")
+            )
+        logger.info(
+            "Preprocessed %s: %s bytes -> original %s, model %s, thumbnail %s.",
+            handle,
+            result.source_bytes,
+            len(result.original.data),
+            len(result.model.data),
+            len(result.thumbnail.data) if result.thumbnail else None,
+        )
+        return ImageVariants(original=handle, model=model_handle, thumbnail=thumbnail_handle)
+
+    if cached is not None:
+        _variants.invalidate(handle)
+    return await _variants.get_or_load(handle, load)
+
+
+async def pending_image_variants(state: Any) -> Optional[ImageVariants]:
+    """Renditions of the oldest pending image. Returns None if no image is pending."""
+    handles = pending_image_handles(state)
+    if not handles:
+        view = pending_image_view(state)  # legacy base64 in state
+        if view is None:
+            return None
+        handles = [queue_pending_image(state, upload_body(view), state.get("pending_image_mime_type"))]
+        clear_key(state, "pending_image_data")
+    return await image_variants(handles[0])
@@ -0,0 +1,48 @@
+# src/tools/scope_events.py
+"""
+In-process notifications for project scope changes.
+
+The scope write buffer publishes after it has written a scope (fields, facts
+or images) so read-side caches such as the bid card cache can drop their
+entries. Subscribers are plain callables and must be cheap and non-blocking;
+an exception in one subscriber is logged and does not affect the others.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, FrozenSet, List
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ScopeChange:
+    homeowner_id: str
+    project_scope_id: str
+    is_new: bool = False
+    # Which parts were written: any of "fields", "facts", "images".
+    sections: FrozenSet[str] = field(default_factory=frozenset)
+
+
+ScopeListener = Callable[[ScopeChange], None]
+
+_listeners: List[ScopeListener] = []
+
+
+def subscribe(listener: ScopeListener) -> ScopeListener:
+    """Registers a listener (usable as a decorator). Subscribing twice is a no-op."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+    return listener
+
+
+def unsubscribe(listener: ScopeListener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def publish(change: ScopeChange) -> None:
+    for listener in list(_listeners):
+        try:
+            listener(change)
+        except Exception:
+            logger.exception("Scope change listener %r failed for %s.", listener, change.project_scope_id)
@@ -0,0 +1,292 @@
+# src/tools/scope_normalize.py
+"""
+Numeric budget and date timeline columns for project scopes.
+
+budget_range and timeline are free text ("$20k-$25k", "3 months", "by June").
+When the scope tools write either field, normalized_scope_columns() parses it
+into indexed columns so that range filters are index lookups:
+
+    budget_range -> budget_min_cents, budget_max_cents   (bigint)
+    timeline     -> timeline_start, timeline_end          (date, ISO strings)
+
+Open-ended values leave one side NULL ("under $10k" has no minimum, "flexible"
+has no end). Text that does not parse clears both columns, so a stale range
+never outlives the text it came from. Relative timelines are resolved against
+the write date, or the row's created_at when backfilling.
+
+Existing rows are filled by backfill(), which reads project_scopes in keyset
+pages, parses each distinct text once per page and issues one UPDATE ... IN
+(ids) per distinct result:
+
+    python -m src.tools.scope_normalize backfill
+"""
+import argparse
+import asyncio
+import calendar
+import datetime
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BudgetRange = Tuple[Optional[int], Optional[int]]
+DateRange = Tuple[Optional[datetime.date], Optional[datetime.date]]
+
+NORMALIZED_COLUMNS = ("budget_min_cents", "budget_max_cents", "timeline_start", "timeline_end")
+
+# --- budget -------------------------------------------------------------------
+
+_AMOUNT = re.compile(r"(\d+(?:\.\d+)?)\s*(k|m|mm|thousand|grand|million)?(?![a-z])")
+# Without a "$", a bare number is only an amount after a budget word or before
+# a currency word; otherwise "3 rooms, budget 5k" would read as $3-$5,000.
+_BUDGET_WORD = re.compile(r"\b(budget|spend(ing)?|cost|price|pay|afford)\b[^0-9]{0,20}$")
+_CURRENCY_WORD = re.compile(r"\s*(dollars?|usd|bucks)\b")
+_RANGE_JOINER = re.compile(r"\s*(-|to|and)\s*")
+_MULTIPLIERS = {None: 1, "k": 1_000, "thousand": 1_000, "grand": 1_000, "m": 1_000_000, "mm": 1_000_000, "million": 1_000_000}
+_UPPER_BOUND = re.compile(r"\b(under|below|less than|up to|max(imum)?|no more than|at most|within)\b")
+_LOWER_BOUND = re.compile(r"\b(over|above|more than|at least|min(imum)?|starting at|from)\b|\+")
+_APPROXIMATE = re.compile(r"\b(around|about|approx(imately)?|roughly|ish)\b|~")
+APPROXIMATE_SPREAD = 0.1
+
+
+def parse_budget(text: Optional[str]) -> BudgetRange:
+    """'$20k-$25k' -> (2_000_000, 2_500_000) cents. Returns (None, None) if no amount is found."""
+    if not text:
+        return None, None
+    lowered = str(text).lower().replace(",", "")
+    matches = [match.groups() for match in _budget_amounts(lowered)][:2]
+    if not matches:
+        return None, None
+    amounts = [float(number) * _MULTIPLIERS[suffix or None] for number, suffix in matches]
+    if len(matches) == 2 and not matches[0][1] and matches[1][1] and float(matches[0][0]) < float(matches[1][0]):
+        # "10-15k": the suffix applies to both ends.
+        amounts[0] = float(matches[0][0]) * _MULTIPLIERS[matches[1][1]]
+    cents = [int(round(amount * 100)) for amount in amounts]
+
+    if len(cents) == 2:
+        return min(cents), max(cents)
+    (value,) = cents
+    if _UPPER_BOUND.search(lowered):
+        return None, value
+    if _LOWER_BOUND.search(lowered):
+        return value, None
+    if _APPROXIMATE.search(lowered):
+        return int(value * (1 - APPROXIMATE_SPREAD)), int(value * (1 + APPROXIMATE_SPREAD))
+    return value, value
+
+
+def _budget_amounts(lowered: str) -> List["re.Match[str]"]:
+    if "$" in lowered:
+        # Skip numbers before the first dollar amount ("3 windows, $2k-3k").
+        return list(_AMOUNT.finditer(lowered, lowered.index("$")))
+    matches = list(_AMOUNT.finditer(lowered))
+    if not re.search(r"[a-z]", lowered):
+        return matches  # nothing but numbers ("15000-20000")
+    money = [
+        bool(match.group(2))
+        or bool(_CURRENCY_WORD.match(lowered, match.end()))
+        or bool(_BUDGET_WORD.search(lowered, 0, match.start()))
+        for match in matches
+    ]
+    # The other end of a range counts too ("10-15k", "budget 5 to 8 thousand").
+    for index in range(len(matches) - 1):
+        joined = _RANGE_JOINER.fullmatch(lowered, matches[index].end(), matches[index + 1].start())
+        if joined and (money[index] or money[index + 1]):
+            money[index] = money[index + 1] = True
+    return [match for match, is_money in zip(matches, money) if is_money]
+
+
+# --- timeline -------------------------------------------------------------------
+
+_UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+_DURATION = re.compile(r"(\d+)(?:\s*(?:-|to)\s*(\d+))?\s*(day|week|month|year)s?")
+_WORD_NUMBERS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "couple": 2, "few": 3}
+_WORD_DURATION = re.compile(r"\b(" + "|".join(_WORD_NUMBERS) + r")\s+(?:of\s+)?(day|week|month|year)s?\b")
+_NEXT_UNIT = re.compile(r"\b(next|this)\s+(week|month|year)\b")
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_MONTHS = {name.lower(): index for index, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): index for index, name in enumerate(calendar.month_abbr) if name})
+_MONTHS["sept"] = 9
+# "may", "mar", "jan", ... are also ordinary words; they only count as a month
+# next to a date word before them or a day number / year after them.
+_AMBIGUOUS_MONTHS = {name for name in _MONTHS if len(name) <= 4 and name not in ("june", "july")}
+_MONTH = re.compile(
+    r"(?:\b(?P<context>in|by|before|until|around|early|mid|late|(?:start|end|beginning|middle) of)(?:\s+|-))?"
+    r"\b(?P<name>" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\b\.?"
+    r"(?:\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?\b)?(?:,?\s+(?P<year>\d{4})\b)?"
+)
+_SEASONS = {"spring": (3, 5), "summer": (6, 8), "fall": (9, 11), "autumn": (9, 11), "winter": (12, 2)}
+_SEASON = re.compile(r"\b(spring|summer|fall|autumn|winter)\b(?:\s+(\d{4}))?")
+_ASAP = re.compile(r"\b(asap|as soon as possible|immediately|urgent(ly)?|right away|emergency)\b")
+_OPEN_ENDED = re.compile(r"\b(flexible|no rush|whenever|no hurry|not sure|undecided)\b")
+_DEADLINE = re.compile(r"\b(by|before|no later than|until)\b")
+ASAP_DAYS = 14
+
+
+def _month_end(year: int, month: int) -> datetime.date:
+    return datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _upcoming_year(month: int, year: Optional[str], today: datetime.date) -> int:
+    if year:
+        return int(year)
+    return today.year if month >= today.month else today.year + 1
+
+
+def _find_month(lowered: str) -> Optional[re.Match]:
+    """First month mention; "may take a while" or "mar the floor" are not months."""
+    for match in _MONTH.finditer(lowered):
+        if match.group("name") not in _AMBIGUOUS_MONTHS or any(match.group(part) for part in ("context", "day", "year")):
+            return match
+    return None
+
+
+def parse_timeline(text: Optional[str], today: Optional[datetime.date] = None) -> DateRange:
+    """'3 months' -> (today, today + 90 days); 'June' -> the next June. Returns (None, None) if unrecognized."""
+    if not text:
+        return None, None
+    today = today or datetime.date.today()
+    lowered = str(text).lower()
+
+    dates = [datetime.date(int(y), int(m), int(d)) for y, m, d in _ISO_DATE.findall(lowered)[:2]]
+    if dates:
+        return (today if _DEADLINE.search(lowered) else min(dates)), max(dates)
+    if _ASAP.search(lowered):
+        return today, today + datetime.timedelta(days=ASAP_DAYS)
+
+    match = _NEXT_UNIT.search(lowered)
+    if match:
+        which, unit = match.groups()
+        if unit == "week":
+            start = today + datetime.timedelta(days=(7 - today.weekday()) if which == "next" else 0)
+            return start, start + datetime.timedelta(days=6 if which == "next" else 6 - today.weekday())
+        if unit == "month":
+            year, month = (today.year + today.month // 12, today.month % 12 + 1) if which == "next" else (today.year, today.month)
+            start = datetime.date(year, month, 1) if which == "next" else today
+            return start, _month_end(year, month)
+        year = today.year + 1 if which == "next" else today.year
+        return (datetime.date(year, 1, 1) if which == "next" else today), datetime.date(year, 12, 31)
+
+    match = _DURATION.search(lowered)
+    if match:
+        low, high, unit = match.groups()
+        return today, today + datetime.timedelta(days=int(high or low) * _UNIT_DAYS[unit])
+    match = _WORD_DURATION.search(lowered)
+    if match:
+        word, unit = match.groups()
+        return today, today + datetime.timedelta(days=_WORD_NUMBERS[word] * _UNIT_DAYS[unit])
+
+    match = _SEASON.search(lowered)
+    if match:
+        first, last = _SEASONS[match.group(1)]
+        year = _upcoming_year(last if first > last else first, match.group(2), today)
+        start = datetime.date(year - 1 if first > last else year, first, 1)
+        end = _month_end(year, last)
+        return (today if _DEADLINE.search(lowered) else max(start, today)), end
+
+    match = _find_month(lowered)
+    if match:
+        month = _MONTHS[match.group("name")]
+        year = _upcoming_year(month, match.group("year"), today)
+        start = datetime.date(year, month, 1)
+        return (today if _DEADLINE.search(lowered) else max(start, today)), _month_end(year, month)
+
+    if _OPEN_ENDED.search(lowered):
+        return today, None
+    return None, None
+
+
+# --- columns --------------------------------------------------------------------
+
+def normalized_scope_columns(fields: Dict[str, Any], today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """Normalized columns for whichever of budget_range / timeline is present in fields."""
+    columns: Dict[str, Any] = {}
+    if "budget_range" in fields:
+        columns["budget_min_cents"], columns["budget_max_cents"] = parse_budget(fields["budget_range"])
+    if "timeline" in fields:
+        start, end = parse_timeline(fields["timeline"], today)
+        columns["timeline_start"] = start.isoformat() if start else None
+        columns["timeline_end"] = end.isoformat() if end else None
+    return columns
+
+
+def _row_date(row: Dict[str, Any]) -> Optional[datetime.date]:
+    created_at = row.get("created_at")
+    if not created_at:
+        return None
+    try:
+        return datetime.date.fromisoformat(str(created_at)[:10])
+    except ValueError:
+        return None
+
+
+def plan_backfill(rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[Tuple[str, Any], ...], List[str]]:
+    """Groups row ids by their normalized columns, parsing each distinct (text, date) once."""
+    budgets: Dict[Any, BudgetRange] = {}
+    timelines: Dict[Any, Dict[str, Any]] = {}
+    groups: Dict[Tuple[Tuple[str, Any], ...], List[str]] = {}
+    for row in rows:
+        budget_text = row.get("budget_range")
+        if budget_text not in budgets:
+            budgets[budget_text] = parse_budget(budget_text)
+        timeline_key = (row.get("timeline"), _row_date(row))
+        if timeline_key not in timelines:
+            timelines[timeline_key] = normalized_scope_columns({"timeline": timeline_key[0]}, timeline_key[1])
+        budget_min, budget_max = budgets[budget_text]
+        values = (("budget_min_cents", budget_min), ("budget_max_cents", budget_max), *timelines[timeline_key].items())
+        groups.setdefault(values, []).append(row["id"])
+    return groups
+
+
+async def backfill(batch_size: int = 1000, only_missing: bool = True) -> int:
+    """Fills the normalized columns of existing project_scopes rows. Returns the number of rows updated."""
+    from src.db.supabase_client import get_supabase_client
+
+    supabase_client = await get_supabase_client()
+    if not supabase_client:
+        raise RuntimeError("Supabase client not initialized.")
+
+    updated = 0
+    last_id = None
+    while True:
+        query = supabase_client.table("project_scopes").select("id,budget_range,timeline,created_at")
+        if only_missing:
+            query = query.or_(
+                "and(budget_range.not.is.null,budget_min_cents.is.null,budget_max_cents.is.null),"
+                "and(timeline.not.is.null,timeline_start.is.null,timeline_end.is.null)"
+            )
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        resp = await query.order("id").limit(batch_size).execute()
+        rows = resp.data or []
+        for values, ids in plan_backfill(rows).items():
+            await supabase_client.table("project_scopes").update(dict(values)).in_("id", ids).execute()
+            updated += len(ids)
+        logger.info("Backfilled %d project_scopes rows so far.", updated)
+        if len(rows) < batch_size:
+            return updated
+        last_id = rows[-1]["id"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Project scope normalization utilities.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("backfill", help="Fill budget/timeline columns for existing project_scopes rows.")
+    run.add_argument("--batch-size", type=int, default=1000)
+    run.add_argument("--all", action="store_true", help="Re-normalize every row, not only rows missing values.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    updated = asyncio.run(backfill(args.batch_size, only_missing=not args.all))
+    print(f"Updated {updated} project_scopes rows.")
+
+
+if __name__ == "__main__":
+    main()
+
+# Note: normalized columns on 'project_scopes':
+# - budget_min_cents (bigint, nullable), budget_max_cents (bigint, nullable)
+# - timeline_start (date, nullable), timeline_end (date, nullable)
+# - index on (budget_min_cents), index on (budget_max_cents)
+# - index on (timeline_start, timeline_end)
@@ -0,0 +1,310 @@
+# src/tools/scope_write_buffer.py
+"""
+Per-session write-behind buffer for project_scopes writes.
+
+upsert_project_scope_tool is called many times per conversation. Instead of a
+round trip per call, the tool stages its fields here and returns right away.
+Successive updates for the same project_scope_id are merged (last value wins)
+and written as a single INSERT (new scope) or PATCH (existing scope), plus one
+multi-row upsert into project_scope_facts for any staged facts and one into
+project_images for any staged image URLs, when:
+
+  * the debounce timer fires (SCOPE_WRITE_DEBOUNCE_SECONDS, default 2.0),
+  * the agent turn ends (flush_session from the agent's after_agent_callback),
+  * the session closes (close_session).
+
+A failed flush puts its fields back under any newer staged values and retries
+them with exponential backoff (the debounce delay doubled per failure, capped
+at SCOPE_WRITE_MAX_BACKOFF_SECONDS). After SCOPE_WRITE_MAX_ATTEMPTS failures in
+a row the staged payload is logged at ERROR and dropped, and a closed session
+is freed. The failure is reported once through take_error, which the scope
+tool checks on its next call. Every write that reaches the database is
+announced on src/tools/scope_events.py so read caches can invalidate.
+"""
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+from src.db.supabase_client import get_supabase_client
+from src.observability.tool_metrics import timed_acquire
+from src.tools import scope_events
+from src.tools.scope_events import ScopeChange
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_MAX_BACKOFF_SECONDS = 60.0
+
+
+def session_key_from_state(state: Mapping[str, Any]) -> Optional[str]:
+    """Key used to group staged writes: the agent's session_id, else the scope id."""
+    return state.get("session_id") or state.get("current_project_scope_id")
+
+
+@dataclass
+class _PendingScope:
+    homeowner_id: str
+    is_new: bool
+    fields: Dict[str, Any] = field(default_factory=dict)
+    facts: Dict[str, str] = field(default_factory=dict)
+    # image_url -> project_images row
+    images: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def merge_older(self, older: "_PendingScope") -> None:
+        """Re-applies a failed flush underneath the values staged since."""
+        self.fields = {**older.fields, **self.fields}
+        self.facts = {**older.facts, **self.facts}
+        self.images = {**older.images, **self.images}
+        self.is_new = self.is_new or older.is_new
+
+    def payload(self) -> Dict[str, Any]:
+        return {"homeowner_id": self.homeowner_id, "is_new": self.is_new, "fields": self.fields, "facts": self.facts, "images": list(self.images)}
+
+
+@dataclass
+class _SessionWrites:
+    scopes: Dict[str, _PendingScope] = field(default_factory=dict)
+    timer: Optional[asyncio.TimerHandle] = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Flushes that failed in a row; reset by a successful flush.
+    failed_attempts: int = 0
+    closed: bool = False
+
+
+class ScopeWriteBuffer:
+    def __init__(
+        self,
+        debounce_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        max_backoff_seconds: Optional[float] = None,
+    ):
+        if debounce_seconds is None:
+            debounce_seconds = float(os.getenv("SCOPE_WRITE_DEBOUNCE_SECONDS", DEFAULT_DEBOUNCE_SECONDS))
+        if max_attempts is None:
+            max_attempts = int(os.getenv("SCOPE_WRITE_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+        if max_backoff_seconds is None:
+            max_backoff_seconds = float(os.getenv("SCOPE_WRITE_MAX_BACKOFF_SECONDS", DEFAULT_MAX_BACKOFF_SECONDS))
+        self.debounce_seconds = debounce_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.max_backoff_seconds = max_backoff_seconds
+        self._sessions: Dict[str, _SessionWrites] = {}
+        # session_key -> failure not yet reported to the agent.
+        self._errors: Dict[str, str] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.staged_calls = 0
+        self.writes_issued = 0
+        self.payloads_dropped = 0
+
+    def stage(
+        self,
+        session_key: str,
+        project_scope_id: str,
+        homeowner_id: str,
+        fields: Dict[str, Any],
+        is_new: bool = False,
+        facts: Optional[Dict[str, str]] = None,
+        images: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        Merges fields (and normalized facts, and project_images rows keyed by
+        image_url) into the pending write for project_scope_id and (re)arms the
+        debounce timer.
+        """
+        writes = self._sessions.setdefault(session_key, _SessionWrites())
+        writes.closed = False
+        pending = writes.scopes.get(project_scope_id)
+        if pending is None:
+            pending = writes.scopes[project_scope_id] = _PendingScope(homeowner_id=homeowner_id, is_new=is_new)
+        pending.is_new = pending.is_new or is_new
+        pending.fields.update(fields)
+        if facts:
+            pending.facts.update(facts)
+        for image in images or ():
+            pending.images[image["image_url"]] = image
+        self.staged_calls += 1
+        self._arm_timer(session_key, writes)
+
+    def has_pending(self, session_key: str) -> bool:
+        writes = self._sessions.get(session_key)
+        return bool(writes and writes.scopes)
+
+    def take_error(self, session_key: str) -> Optional[str]:
+        """The last flush failure for the session not yet reported, if any. Cleared once read."""
+        return self._errors.pop(session_key, None)
+
+    async def flush_session(self, session_key: str) -> bool:
+        """Writes everything staged for the session. Returns False if any write failed."""
+        writes = self._sessions.get(session_key)
+        if writes is None:
+            return True
+        if writes.timer:
+            writes.timer.cancel()
+            writes.timer = None
+
+        async with timed_acquire(writes.lock, "scope_flush_lock"):
+            pending, writes.scopes = writes.scopes, {}
+            if not pending:
+                self._release_if_closed(session_key, writes)
+                return True
+
+            failed: List[str] = []
+            for project_scope_id, scope in pending.items():
+                if not await self._write(project_scope_id, scope):
+                    failed.append(project_scope_id)
+                    newer = writes.scopes.get(project_scope_id)
+                    if newer is None:
+                        writes.scopes[project_scope_id] = scope
+                    else:
+                        newer.merge_older(scope)
+            if not failed:
+                writes.failed_attempts = 0
+                self._release_if_closed(session_key, writes)
+                return True
+
+            writes.failed_attempts += 1
+            if writes.failed_attempts >= self.max_attempts:
+                self._drop(session_key, writes, failed)
+            else:
+                self._errors[session_key] = (
+                    f"Saving project scope {', '.join(failed)} failed; "
+                    f"retrying (attempt {writes.failed_attempts} of {self.max_attempts})."
+                )
+                self._arm_timer(session_key, writes, self._backoff(writes.failed_attempts))
+            return False
+
+    async def close_session(self, session_key: str) -> bool:
+        """
+        Final flush for a session; forgets it once everything was written.
+        If the flush fails, retries continue in the background until they
+        succeed or the payload is dropped, and the session is freed then.
+        """
+        writes = self._sessions.get(session_key)
+        if writes is not None:
+            writes.closed = True
+        ok = await self.flush_session(session_key)
+        if ok:
+            self._sessions.pop(session_key, None)
+            self._errors.pop(session_key, None)
+        return ok
+
+    async def flush_all(self) -> bool:
+        results = await asyncio.gather(*(self.flush_session(key) for key in list(self._sessions)))
+        return all(results)
+
+    def _backoff(self, failed_attempts: int) -> float:
+        return min(self.debounce_seconds * 2 ** failed_attempts, self.max_backoff_seconds)
+
+    def _drop(self, session_key: str, writes: _SessionWrites, failed: List[str]) -> None:
+        """Gives up on the failed scopes after max_attempts; their payload only survives in the log."""
+        for project_scope_id in failed:
+            scope = writes.scopes.pop(project_scope_id)
+            self.payloads_dropped += 1
+            logger.error(
+                "Dropping staged writes for project_scope %s after %d failed attempts. Lost payload: %s",
+                project_scope_id, writes.failed_attempts, scope.payload(),
+            )
+        writes.failed_attempts = 0
+        if writes.closed:
+            self._errors.pop(session_key, None)
+        else:
+            self._errors[session_key] = (
+                f"Project scope {', '.join(failed)} could not be saved after {self.max_attempts} attempts; "
+                "the details staged since the last successful save were lost."
+            )
+        if writes.scopes:
+            self._arm_timer(session_key, writes)
+        else:
+            self._release_if_closed(session_key, writes)
+
+    def _release_if_closed(self, session_key: str, writes: _SessionWrites) -> None:
+        if writes.closed and not writes.scopes and self._sessions.get(session_key) is writes:
+            if writes.timer:
+                writes.timer.cancel()
+            del self._sessions[session_key]
+
+    def _arm_timer(self, session_key: str, writes: _SessionWrites, delay: Optional[float] = None) -> None:
+        if writes.timer:
+            writes.timer.cancel()
+        loop = asyncio.get_running_loop()
+        delay = self.debounce_seconds if delay is None else delay
+        writes.timer = loop.call_later(delay, self._on_timer, session_key)
+
+    def _on_timer(self, session_key: str) -> None:
+        writes = self._sessions.get(session_key)
+        if writes:
+            writes.timer = None
+        task = asyncio.get_running_loop().create_task(self.flush_session(session_key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, project_scope_id: str, scope: _PendingScope) -> bool:
+        supabase_client = await get_supabase_client()
+        if not supabase_client:
+            logger.error("Supabase client not initialized. Cannot flush project_scope %s.", project_scope_id)
+            return False
+
+        written: Set[str] = set()
+        was_new = scope.is_new
+        try:
+            if scope.is_new:
+                row = {"id": project_scope_id, "homeowner_id": scope.homeowner_id, **scope.fields}
+                if row.get("status") is None:
+                    row["status"] = "new"  # Default status for new scopes
+                await supabase_client.table("project_scopes").insert(row).execute()
+                self.writes_issued += 1
+                scope.is_new = False
+                scope.fields = {}
+                written.add("fields")
+            elif scope.fields:
+                await supabase_client.table("project_scopes").update(scope.fields).eq("id", project_scope_id).execute()
+                self.writes_issued += 1
+                scope.fields = {}
+                written.add("fields")
+
+            if scope.facts:
+                # One multi-row upsert for all facts, keyed on (project_scope_id, fact_name).
+                fact_rows = [
+                    {"project_scope_id": project_scope_id, "fact_name": name, "fact_value": value}
+                    for name, value in scope.facts.items()
+                ]
+                await supabase_client.table("project_scope_facts").upsert(
+                    fact_rows, on_conflict="project_scope_id,fact_name"
+                ).execute()
+                self.writes_issued += 1
+                scope.facts = {}
+                written.add("facts")
+
+            if scope.images:
+                image_rows = [{"project_scope_id": project_scope_id, **image} for image in scope.images.values()]
+                await supabase_client.table("project_images").upsert(
+                    image_rows, on_conflict="project_scope_id,image_url"
+                ).execute()
+                self.writes_issued += 1
+                scope.images = {}
+                written.add("images")
+        except Exception as e:
+            # Whatever was written has been cleared from `scope`, so a retry
+            # only repeats the part that failed.
+            logger.error("Error flushing project_scope %s: %s", project_scope_id, e)
+            return False
+        finally:
+            if written:
+                scope_events.publish(
+                    ScopeChange(scope.homeowner_id, project_scope_id, is_new=was_new, sections=frozenset(written))
+                )
+
+        logger.debug("Flushed project_scope %s.", project_scope_id)
+        return True
+
+
+# Shared by the scope tools, the homeowner agent and the session service.
+scope_write_buffer = ScopeWriteBuffer()
+
+# Note: 'project_images' holds one row per stored image of a scope:
+# - project_scope_id (uuid, references project_scopes.id)
+# - image_url (text), thumbnail_url (text, nullable), description (text, nullable)
+# - created_at (timestamptz, default now())
+# - unique (project_scope_id, image_url)
@@ -1,15 +1,26 @@
 # src/tools/supabase_tools.py
 print(f"[{__file__}] Attempting to load src.tools.supabase_tools", flush=True)
 from google.adk.tools import FunctionTool, ToolContext
-from supabase import create_client, Client as SupabaseClient
 from pydantic import BaseModel, Field
 import os
 import uuid # For generating IDs if needed
 import json # For handling potential JSON in fact_value
-from typing import Optional, Dict # Added Optional, ensured Dict is present if used elsewhere
+from typing import Optional, Dict, Tuple # Added Optional, ensured Dict is present if used elsewhere
 import logging
-import base64
 import mimetypes
+import re
+
+from src.db.supabase_client import get_supabase_client
+from src.observability.log import redacted
+from src.observability.tool_metrics import instrument_tool
+from src.session.state_tracking import clear_key
+from src.tools.blob_store import clear_pending_image, get_blob_store, upload_body
+from src.tools.image_dedup import ImageUploadError, get_image_deduplicator
+from src.tools.image_preprocess import ImageVariants, pending_image_variants
+from src.tools.scope_normalize import normalized_scope_columns
+from src.tools.scope_write_buffer import scope_write_buffer, session_key_from_state
+# Imported for its side effect: rebuilds bid card snapshots when scope writes land.
+import src.tools.bid_card_materializer  # noqa: F401
 
 logger = logging.getLogger(__name__)
 
@@ -21,33 +32,59 @@ class UpsertProjectScopeSchema(BaseModel):
     status: str | None = Field(default=None, description="Current status of the project (e.g., new, planning, active, completed). Defaults to 'new' if not provided for a new project.")
     image_url: str | None = Field(default=None, description="URL of the primary image associated with the project, if any.")
 
-# Initialize Supabase client - ensure .env variables are loaded
-# Best practice: ensure .env is loaded early in your application entry point.
-# For ADK, .env is typically loaded automatically if python-dotenv is installed.
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-
-if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
-    print(f"[{__name__}] WARNING: Supabase URL or Service Role Key not found in environment variables for supabase_tools.py.")
-    # This will cause errors if the tool is called without a client.
-    # Consider raising an ImportError or a custom configuration error.
-    supabase_client = None
-else:
-    supabase_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-
-def upsert_project_scope_implementation(tool_context: ToolContext, details: dict) -> str:
+# The Supabase client is shared with the other tools and the session service.
+# See src/db/supabase_client.py for pool limits and timeouts.
+
+MAX_FACT_NAME_LENGTH = 64
+_FACT_NAME_INVALID_CHARS = re.compile(r"[^a-z0-9]+")
+
+
+def _normalize_fact_name(name) -> str:
+    """'Prefers Morning Work' / 'prefers-morning-work' -> 'prefers_morning_work'."""
+    normalized = _FACT_NAME_INVALID_CHARS.sub("_", str(name).strip().lower()).strip("_")
+    return normalized[:MAX_FACT_NAME_LENGTH]
+
+
+def _normalize_fact_value(value) -> Optional[str]:
+    """Stores every fact_value as text. Returns None for empty values, which are skipped."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str) if value else None
+    text = str(value).strip()
+    if text.lower() in ("true", "false"):
+        return text.lower()
+    return text or None
+
+
+def normalize_scope_facts(details: dict) -> Dict[str, str]:
+    """Normalizes leftover 'details' items into {fact_name: fact_value} for project_scope_facts."""
+    facts: Dict[str, str] = {}
+    for raw_name, raw_value in details.items():
+        name = _normalize_fact_name(raw_name)
+        value = _normalize_fact_value(raw_value)
+        if name and value is not None:
+            facts[name] = value
+    return facts
+
+async def upsert_project_scope_implementation(tool_context: ToolContext, details: dict) -> str:
     """
     Upserts project scope data to Supabase using a single 'details' dictionary.
     Manages homeowner_id and project_scope_id from agent state.
     Extracts primary fields (project_summary, budget_range, etc.) from 'details'.
     Remaining items in 'details' are stored in project_scope_facts.
+    Writes are buffered per session, so this returns before they reach the database.
     """
-    if not supabase_client:
-        print(f"[{__name__}] ERROR: Supabase client not initialized in upsert_project_scope_tool.")
+    if not await get_supabase_client():
+        logger.error("Supabase client not initialized in upsert_project_scope_tool.")
         return "Error: Supabase client not initialized. Cannot save project scope."
 
-    print(f"[{__name__}] upsert_project_scope_tool called with: details={details}")
-    print(f"[{__name__}] Current agent state from tool_context: {tool_context.state}")
+    logger.debug("upsert_project_scope_tool called with details=%s", redacted(details))
+    logger.debug("Current agent state from tool_context: %s", redacted(tool_context.state))
 
     # Extract known fields from the details dictionary for project_scopes table
     # Map 'project_summary' from LLM to 'conversation_summary' in DB
@@ -64,15 +101,21 @@ def upsert_project_scope_implementation(tool_context: ToolContext, details: dict
     contractor_notes = details.pop("contractor_notes", None)
     group_bidding_preference = details.pop("group_bidding_preference", None)
 
-    # Known fields have been popped from 'details'. Any remaining items are ignored.
+    # Known fields have been popped from 'details'. Everything left is a
+    # miscellaneous fact for project_scope_facts.
+    facts = normalize_scope_facts(details)
 
     homeowner_id = tool_context.state.get("current_homeowner_id")
     if not homeowner_id:
         homeowner_id = str(uuid.uuid4())
         tool_context.state["current_homeowner_id"] = homeowner_id
-        print(f"[{__name__}] Generated new homeowner_id: {homeowner_id} and updated agent state.")
+        logger.info("Generated new homeowner_id: %s and updated agent state.", homeowner_id)
 
     project_scope_id = tool_context.state.get("current_project_scope_id")
+    # A staged write from an earlier call that failed since, reported once.
+    previous_session_key = session_key_from_state(tool_context.state)
+    write_error = scope_write_buffer.take_error(previous_session_key) if previous_session_key else None
+    warning = f" Warning: {write_error}" if write_error else ""
     
     scope_direct_data = {}
     if conversation_summary is not None: # Use the mapped variable
@@ -99,71 +142,117 @@ def upsert_project_scope_implementation(tool_context: ToolContext, details: dict
             scope_direct_data["group_bidding_preference"] = group_bidding_preference.lower() == 'true'
         else:
             scope_direct_data["group_bidding_preference"] = group_bidding_preference
+    # Indexed numeric/date columns parsed from budget_range and timeline (see scope_normalize.py).
+    scope_direct_data.update(normalized_scope_columns(scope_direct_data))
 
-    if not project_scope_id:
+    # Images stored before the scope existed are attached on its next write.
+    scope_images = tool_context.state.get("unrecorded_scope_images") or []
+
+    # Writes are staged in the per-session write-behind buffer and flushed on
+    # a debounce timer, at turn end or at session close (see scope_write_buffer.py).
+    is_new_scope = not project_scope_id
+    if is_new_scope:
         project_scope_id = str(uuid.uuid4())
         tool_context.state["current_project_scope_id"] = project_scope_id
-        print(f"[{__name__}] Generated new project_scope_id: {project_scope_id} and updated agent state.")
-        
-        scope_insert_data = {
-            "id": project_scope_id,
-            "homeowner_id": homeowner_id,
-            **scope_direct_data
-        }
-        if "status" not in scope_insert_data or scope_insert_data["status"] is None: # Check if status was provided or is None
-             scope_insert_data["status"] = "new" # Default status for new scopes
-
-        try:
-            print(f"[{__name__}] Attempting to insert new project_scope: {scope_insert_data}")
-            response = supabase_client.table("project_scopes").insert(scope_insert_data).execute()
-            if response.data:
-                print(f"[{__name__}] Successfully created new project_scope: {project_scope_id}")
-            elif response.error:
-                print(f"[{__name__}] Supabase error creating project_scope: {response.error.message}")
-                return f"Error creating project scope: {response.error.message}"
-            else:
-                print(f"[{__name__}] Failed to create project_scope (no data/error): {response}")
-                return "Failed to create project scope (no data/error from Supabase)."
-        except Exception as e:
-            print(f"[{__name__}] Exception creating project_scope: {str(e)}")
-            return f"Error creating project scope: {str(e)}"
-    elif scope_direct_data: # Existing project_scope_id and there's direct data to update
-        print(f"[{__name__}] Using existing project_scope_id: {project_scope_id}. Attempting to update with: {scope_direct_data}")
-        try:
-            response = supabase_client.table("project_scopes").update(scope_direct_data).eq("id", project_scope_id).execute()
-            if response.error:
-                print(f"[{__name__}] Supabase error updating project_scope: {response.error.message}")
-            else:
-                print(f"[{__name__}] Successfully updated project_scope: {project_scope_id}")
-        except Exception as e:
-            print(f"[{__name__}] Exception updating project_scope: {str(e)}")
-            # If update fails, we might still want to return a message indicating IDs
-            # but also the error.
-            return f"Error updating project scope for {project_scope_id}: {str(e)}. Homeowner ID: {homeowner_id}"
+        logger.info("Generated new project_scope_id: %s and updated agent state.", project_scope_id)
+    elif not scope_direct_data and not facts and not scope_images:
+        logger.info("No new direct data provided to update existing project_scope_id: %s.", project_scope_id)
+        return f"Project scope details processed. Homeowner ID: {homeowner_id}, Project Scope ID: {project_scope_id}{warning}"
 
-    if not scope_direct_data and not project_scope_id: # Only print if no data AND it was a new scope attempt that failed earlier
-        print(f"[{__name__}] No direct data was provided, and no existing project_scope_id was found or generated.")
-        return f"No project details to save and no existing project scope. Homeowner ID: {homeowner_id}"
-    elif not scope_direct_data:
-        print(f"[{__name__}] No new direct data provided to update existing project_scope_id: {project_scope_id}.")
+    session_key = session_key_from_state(tool_context.state)
+    scope_write_buffer.stage(
+        session_key,
+        project_scope_id,
+        homeowner_id,
+        scope_direct_data,
+        is_new=is_new_scope,
+        facts=facts,
+        images=scope_images,
+    )
+    if scope_images:
+        clear_key(tool_context.state, "unrecorded_scope_images")
+    logger.info("Staged %d field(s) and %d fact(s) for project_scope %s (new=%s).", len(scope_direct_data), len(facts), project_scope_id, is_new_scope)
 
-    return f"Project scope details processed. Homeowner ID: {homeowner_id}, Project Scope ID: {project_scope_id}"
+    return f"Project scope details processed. Homeowner ID: {homeowner_id}, Project Scope ID: {project_scope_id}{warning}"
 
 
 upsert_project_scope_tool = FunctionTool(
-    upsert_project_scope_implementation
+    instrument_tool(upsert_project_scope_implementation)
 )
 
+def _content_type_and_extension(file_name: Optional[str], mime_type: Optional[str]) -> Tuple[str, str]:
+    """Content type for the upload and the extension used in its content-addressed path."""
+    if mime_type:
+        # The stored bytes' own type wins over whatever the file name suggests.
+        content_type = mime_type
+    elif file_name:
+        content_type = mimetypes.guess_type(file_name)[0]
+        if not content_type:
+            logger.warning(f"Could not determine content type for explicitly provided file: '{file_name}'. Defaulting to application/octet-stream.")
+            content_type = "application/octet-stream"
+    else:
+        content_type = "image/png"  # Default to png
+    extension = mimetypes.guess_extension(content_type) or (os.path.splitext(file_name)[1] if file_name else ".dat")
+    return content_type, extension
+
+
+async def upload_image_variants(
+    variants: ImageVariants,
+    bucket_name: str = "project-images",
+    file_name: Optional[str] = None,
+) -> Tuple[str, Optional[str]]:
+    """
+    Uploads the original rendition (and its thumbnail, best effort) of a
+    preprocessed image. Returns (public_url, thumbnail_url).
+    Raises ImageUploadError or LookupError (blob no longer in the store).
+    """
+    supabase_client = await get_supabase_client()
+    if not supabase_client:
+        raise ImageUploadError("Supabase client not initialized. Cannot upload image.")
+
+    store = get_blob_store()
+    image_view = store.get(variants.original)
+    if image_view is None:
+        raise LookupError(f"Blob {variants.original} is no longer in the store.")
+
+    # Objects are stored under the SHA-256 of their bytes, so a photo that was
+    # already uploaded is answered from the dedup index without any transfer.
+    content_type, extension = _content_type_and_extension(file_name, variants.mime_type(variants.original))
+    logger.debug(f"Uploading to bucket {bucket_name}, Content-Type: {content_type}")
+    public_url, reused = await get_image_deduplicator().upload(
+        supabase_client, bucket_name, upload_body(image_view), content_type, extension
+    )
+    del image_view
+    logger.info(f"Image {'already stored' if reused else 'uploaded successfully'}. Public URL: {public_url}")
+
+    thumbnail_url = None
+    thumbnail_view = store.get(variants.thumbnail) if variants.thumbnail else None
+    if thumbnail_view is not None:
+        thumbnail_type = variants.mime_type(variants.thumbnail)
+        try:
+            thumbnail_url, _ = await get_image_deduplicator().upload(
+                supabase_client,
+                bucket_name,
+                upload_body(thumbnail_view),
+                thumbnail_type,
+                mimetypes.guess_extension(thumbnail_type or "") or "",
+            )
+        except Exception as e:
+            # The original is stored; a missing thumbnail is not worth failing the upload.
+            logger.warning(f"Thumbnail upload failed: {str(e)}")
+        del thumbnail_view
+    return public_url, thumbnail_url
+
+
 # New tool for uploading images to Supabase Storage
-def upload_image_to_storage_implementation(
+async def upload_image_to_storage_implementation(
     tool_context: ToolContext, 
     file_name: Optional[str] = None, # e.g., "photo.jpg"
     bucket_name: str = "project-images",
     process_pending_image: bool = True
 ) -> str:
-    """Uploads an image, previously stored in agent state (tool_context.state['pending_image_data']),
-    to Supabase Storage and returns its public URL. Uses tool_context.state['pending_image_mime_type']
-    to help determine file_name if not explicitly provided.
+    """Uploads the oldest pending image, previously stored in the blob store (handles in
+    tool_context.state['pending_image_handles']), to Supabase Storage and returns its public URL.
     
     Args:
         tool_context: The context providing access to agent state.
@@ -179,96 +268,48 @@ def upload_image_to_storage_implementation(
     if not process_pending_image:
         return "Image processing not requested by the agent for this call."
 
-    if not supabase_client:
-        logger.error("Supabase client not initialized in upload_image_to_storage_tool.")
-        return "Error: Supabase client not initialized. Cannot upload image."
-
-    image_data_base64 = tool_context.state.get("pending_image_data")
-    pending_mime_type = tool_context.state.get("pending_image_mime_type")
-
-    if not image_data_base64:
-        logger.error("No 'pending_image_data' found in agent state for upload_image_to_storage_tool.")
-        return "Error: No image data found in agent state to upload."
-
     try:
-        image_data = base64.b64decode(image_data_base64)
-        logger.debug("Image data successfully decoded from base64.")
+        # Upright, metadata-stripped original plus a thumbnail, preprocessed once per image.
+        variants = await pending_image_variants(tool_context.state)
+    except LookupError as e:
+        logger.error(f"Pending image is no longer available: {str(e)}")
+        return "Error: No image data found in agent state to upload."
     except Exception as e:
-        logger.error(f"Error decoding base64 image data: {str(e)}")
+        logger.error(f"Error decoding legacy base64 image data: {str(e)}")
         return f"Error decoding base64 image data: {str(e)}"
 
-    # Determine file extension and content type
-    actual_file_name = file_name
-    content_type = None
-
-    if not actual_file_name and pending_mime_type:
-        # Case 1: No file_name provided, but we have a mime_type from agent state
-        ext = mimetypes.guess_extension(pending_mime_type)
-        if ext:
-            actual_file_name = f"{uuid.uuid4()}{ext}"
-            content_type = pending_mime_type
-            logger.debug(f"Derived filename '{actual_file_name}' and content_type '{content_type}' from pending_mime_type '{pending_mime_type}'.")
-        else:
-            # Fallback if mime_type is unknown or doesn't give a common extension
-            actual_file_name = f"{uuid.uuid4()}.dat" # Use a generic extension
-            content_type = pending_mime_type # Still use the provided mime_type if possible
-            logger.debug(f"Could not guess extension for mime_type '{pending_mime_type}'. Using filename '{actual_file_name}' and content_type '{content_type}'.")
-    elif actual_file_name:
-        # Case 2: file_name IS provided
-        content_type, _ = mimetypes.guess_type(actual_file_name)
-        if not content_type:
-            # If file_name was provided but type couldn't be guessed, default to octet-stream
-            logger.warning(f"Could not determine content type for explicitly provided file: '{actual_file_name}'. Defaulting to application/octet-stream.")
-            content_type = "application/octet-stream"
-        else:
-            logger.debug(f"Using explicitly provided filename '{actual_file_name}' and guessed content_type '{content_type}'.")
-    else:
-        # Case 3: No file_name provided AND no pending_mime_type in state
-        actual_file_name = f"{uuid.uuid4()}.png" # Default to png
-        content_type = "image/png"
-        logger.debug(f"No filename or mime_type provided. Defaulting to filename '{actual_file_name}' and content_type '{content_type}'.")
-
-    # Create a unique path in the bucket to avoid overwriting
-    path_in_bucket = f"uploads/{uuid.uuid4()}_{actual_file_name.lstrip('/')}"
-    logger.debug(f"Target path in bucket: {path_in_bucket}, Content-Type: {content_type}")
+    if variants is None:
+        logger.error("No pending image found in agent state for upload_image_to_storage_tool.")
+        return "Error: No image data found in agent state to upload."
 
     try:
-        response = supabase_client.storage.from_(bucket_name).upload(
-            path=path_in_bucket,
-            file=image_data,
-            file_options={"content-type": content_type, "cache-control": "3600", "upsert": "false"}
-        )
-        logger.debug(f"Supabase storage upload response status: {response.status_code}")
-
-        if response.status_code == 200:
-            # Successfully uploaded, now get the public URL
-            public_url = supabase_client.storage.from_(bucket_name).get_public_url(path_in_bucket)
-            logger.info(f"Image uploaded successfully. Public URL: {public_url}")
-            
-            # Clear pending image data from state after successful upload
-            if 'pending_image_data' in tool_context.state:
-                del tool_context.state['pending_image_data']
-                logger.debug("Cleared 'pending_image_data' from agent state.")
-            if 'pending_image_mime_type' in tool_context.state:
-                del tool_context.state['pending_image_mime_type']
-                logger.debug("Cleared 'pending_image_mime_type' from agent state.")
-                
-            return public_url
-        else:
-            # Attempt to get error message from response
-            try:
-                error_content = response.json()
-                error_message = error_content.get("message", str(error_content))
-            except ValueError: # Not JSON
-                error_message = response.text
-            logger.error(f"Error uploading image to Supabase Storage: {response.status_code} - {error_message}")
-            return f"Error uploading image: {error_message}"
-
+        public_url, thumbnail_url = await upload_image_variants(variants, bucket_name, file_name)
+    except LookupError as e:
+        logger.error(f"Pending image is no longer available: {str(e)}")
+        return "Error: No image data found in agent state to upload."
+    except ImageUploadError as e:
+        logger.error(f"Error uploading image to Supabase Storage: {str(e)}")
+        return f"Error uploading image: {str(e)}"
     except Exception as e:
         logger.error(f"Exception during image upload: {str(e)}", exc_info=True)
         return f"Error during image upload: {str(e)}"
 
+    if thumbnail_url:
+        tool_context.state["last_image_thumbnail_url"] = thumbnail_url
+
+    # Clear the pending image from state (and the blob store) after successful upload
+    clear_pending_image(tool_context.state, variants.original)
+    logger.debug("Cleared pending image from agent state.")
+
+    return public_url
+
 # Instantiate the tool
 upload_image_to_storage_tool = FunctionTool(
-    upload_image_to_storage_implementation
+    instrument_tool(upload_image_to_storage_implementation)
 )
+
+# Note: 'project_scope_facts' needs a unique constraint for the bulk upsert:
+# - project_scope_id (uuid, references project_scopes.id)
+# - fact_name (text)
+# - fact_value (text)
+# - unique (project_scope_id, fact_name)
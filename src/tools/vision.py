@@ -1,37 +1,16 @@
 # src/tools/vision.py
 print(f"[{__file__}] Attempting to load src.tools.vision", flush=True)
-from google.adk.tools import FunctionTool, ToolContext
-import base64
-import os
+from typing import List, Optional, Sequence, Tuple
 
-# Placeholder for actual image description logic (e.g., using Vertex AI Gemini)
-def describe_image_implementation(tool_context: ToolContext, process_pending_image: bool = True) -> str:
-    """Describes an image that has been previously stored in the agent's state (tool_context.state['pending_image_data']).
-    Args:
-        tool_context: The context providing access to agent state.
-        process_pending_image: Flag to confirm processing the image from state. Defaults to True.
-    """
-    if not process_pending_image:
-        return "Image processing not requested by the agent for this call."
-
-    image_data_base64 = tool_context.state.get("pending_image_data")
-    if not image_data_base64:
-        print(f"[{__file__}] describe_image_tool called, but no 'pending_image_data' found in agent state.")
-        return "Error: No image data found in agent state to describe."
+# The agent's describe_image tool lives in src/agents/homeowner_live/image_ingest.py
+# and calls describe_images_bytes with the model-sized renditions.
 
-    try:
-        image_bytes = base64.b64decode(image_data_base64)
-        # In a real implementation, you would call Vertex AI or another vision API with image_bytes.
-        print(f"[{__file__}] describe_image_tool called with decoded image_bytes (len: {len(image_bytes) if image_bytes else 0}) from agent state.")
-        # This is a placeholder response.
-        return "A placeholder description of the image (from base64 input). (Tool needs full implementation)"
-    except base64.binascii.Error as e:
-        print(f"[{__file__}] Error decoding base64 string: {e}")
-        return "Error: Could not decode base64 image data."
-    except Exception as e:
-        print(f"[{__file__}] Unexpected error in describe_image_implementation: {e}")
-        return "Error: An unexpected error occurred while processing the image."
-
-describe_image_tool = FunctionTool(
-    describe_image_implementation
-)
+# Placeholder for actual image description logic (e.g., using Vertex AI Gemini)
+async def describe_images_bytes(images: Sequence[Tuple[memoryview, Optional[str]]]) -> List[str]:
+    """Describes several model-sized images in one vision request; returns one description per image, in order."""
+    # In a real implementation, send one multi-part request (an image part per
+    # entry, followed by the prompt) to Vertex AI or another vision API.
+    total_bytes = sum(image_bytes.nbytes for image_bytes, _ in images)
+    print(f"[{__file__}] Describing {len(images)} image(s) ({total_bytes} bytes) from the blob store in one request.")
+    # This is a placeholder response.
+    return ["A placeholder description of the image. (Tool needs full implementation)" for _ in images]
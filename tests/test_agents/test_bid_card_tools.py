@@ -0,0 +1,221 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from src.agents.bid_card_agent import tools
+from src.db.local_backend import (
+    LocalSupabaseClient,
+    get_local_client,
+    reset_local_client,
+)
+from src.tools.bid_card_materializer import SNAPSHOT_TABLE, bid_card_materializer
+from src.tools.scope_write_buffer import ScopeWriteBuffer
+
+
+@pytest.fixture
+def sb(monkeypatch: pytest.MonkeyPatch) -> Iterator[LocalSupabaseClient]:
+    monkeypatch.setenv("SUPABASE_BACKEND", "local")
+    reset_local_client()
+    tools._bid_card_cache.clear()
+    yield get_local_client()
+    tools._bid_card_cache.clear()
+    reset_local_client()
+
+
+async def _seed_project(sb: LocalSupabaseClient) -> None:
+    await (
+        sb.table("project_scopes")
+        .insert(
+            {
+                "id": "p1",
+                "homeowner_id": "h1",
+                "project_title": "Roof",
+                "budget_range": "$10k",
+                "created_at": "2026-01-01",
+            }
+        )
+        .execute()
+    )
+    await (
+        sb.table("project_scope_facts")
+        .insert(
+            {"project_scope_id": "p1", "fact_name": "roof_type", "fact_value": "tile"}
+        )
+        .execute()
+    )
+    await (
+        sb.table("project_images")
+        .insert(
+            [
+                {
+                    "project_scope_id": "p1",
+                    "image_url": "u2",
+                    "created_at": "2026-01-03",
+                },
+                {
+                    "project_scope_id": "p1",
+                    "image_url": "u1",
+                    "created_at": "2026-01-02",
+                },
+            ]
+        )
+        .execute()
+    )
+
+
+def _without_versions(document: dict[str, Any]) -> dict[str, Any]:
+    return {
+        key: value
+        for key, value in document.items()
+        if key not in ("version", "section_versions")
+    }
+
+
+def test_fallback_builds_the_snapshot_document(sb: LocalSupabaseClient) -> None:
+    """Test that a scope without a snapshot is served in the same shape as its materialized card"""
+
+    async def run() -> None:
+        await _seed_project(sb)
+        fallback = await tools.get_project_details_for_bid_card("h1", "p1")
+        await bid_card_materializer.wait_idle()
+        snapshots = await sb.table(SNAPSHOT_TABLE).select("document").execute()
+
+        assert fallback is not None and fallback["version"] == 0
+        assert len(snapshots.data) == 1
+        assert _without_versions(fallback) == _without_versions(
+            snapshots.data[0]["document"]
+        )
+        assert [image["url"] for image in fallback["images"]["items"]] == ["u1", "u2"]
+        assert fallback["details"]["items"][0]["value"] == "tile"
+
+    asyncio.run(run())
+
+
+def test_bid_card_is_cached_until_a_scope_write(sb: LocalSupabaseClient) -> None:
+    """Test that repeat calls are served from the cache and a scope write drops the entry"""
+
+    async def run() -> None:
+        await _seed_project(sb)
+        await bid_card_materializer.rebuild("p1", "h1")
+        first = await tools.get_project_details_for_bid_card("h1", "p1")
+        requests = sb.requests
+        again = await tools.get_project_details_for_bid_card("h1", "p1")
+        assert again is first
+        assert sb.requests == requests
+
+        buffer = ScopeWriteBuffer(debounce_seconds=60)
+        buffer.stage("s1", "p1", "h1", {"project_title": "New roof"})
+        assert await buffer.flush_session("s1")
+        await bid_card_materializer.wait_idle()
+
+        updated = await tools.get_project_details_for_bid_card("h1", "p1")
+        assert sb.requests > requests
+        assert updated is not None and updated["project"]["title"] == "New roof"
+
+    asyncio.run(run())
+
+
+async def _seed_listing(sb: LocalSupabaseClient) -> None:
+    await (
+        sb.table("project_scopes")
+        .insert(
+            [
+                {
+                    "id": f"p{index}",
+                    "homeowner_id": "h1",
+                    # p2 and p3 share a created_at; the id breaks the tie.
+                    "created_at": created_at,
+                    "budget_min_cents": budget * 100,
+                    "budget_max_cents": budget * 200,
+                    "timeline_start": start,
+                }
+                for index, created_at, budget, start in [
+                    (1, "2026-01-01", 5_000, "2026-03-01"),
+                    (2, "2026-01-02", 10_000, "2026-04-01"),
+                    (3, "2026-01-02", 20_000, "2026-05-01"),
+                    (4, "2026-01-03", 40_000, None),
+                    (5, "2026-01-04", 80_000, "2026-07-01"),
+                ]
+            ]
+        )
+        .execute()
+    )
+    await (
+        sb.table("project_images")
+        .insert(
+            [
+                {
+                    "project_scope_id": "p3",
+                    "image_url": f"u{index}",
+                    "created_at": f"2026-01-0{index}",
+                }
+                for index in range(1, 5)
+            ]
+        )
+        .execute()
+    )
+
+
+def test_list_bid_cards_pages_without_skips_or_repeats(sb: LocalSupabaseClient) -> None:
+    """Test that keyset pages cover every row once, including rows with equal created_at"""
+
+    async def run() -> list[list[str]]:
+        await _seed_listing(sb)
+        pages: list[list[str]] = []
+        cursor = ""
+        while True:
+            page = await tools.list_bid_cards("h1", limit=2, cursor=cursor)
+            assert "error" not in page
+            pages.append([card["id"] for card in page["bid_cards"]])
+            if not page["next_cursor"]:
+                return pages
+            cursor = page["next_cursor"]
+
+    assert asyncio.run(run()) == [["p5", "p4"], ["p3", "p2"], ["p1"]]
+
+
+def test_list_bid_cards_filters_and_image_embeds(sb: LocalSupabaseClient) -> None:
+    """Test the budget and start-date filters and the embedded images and image count"""
+
+    async def run() -> None:
+        await _seed_listing(sb)
+
+        async def ids(**filters: Any) -> list[str]:
+            page = await tools.list_bid_cards("h1", **filters)
+            return [card["id"] for card in page["bid_cards"]]
+
+        # Budgets span budget..2*budget dollars.
+        assert await ids(min_budget=30_000) == ["p5", "p4", "p3"]
+        assert await ids(max_budget=10_000) == ["p2", "p1"]
+        assert await ids(min_budget=15_000, max_budget=50_000) == ["p4", "p3", "p2"]
+        # Rows without a parsed timeline are skipped by the date filter.
+        assert await ids(starts_by="2026-04-15") == ["p2", "p1"]
+
+        page = await tools.list_bid_cards(
+            "h1", project_ids=["p3", "p1"], images_per_card=2
+        )
+        cards = {card["id"]: card for card in page["bid_cards"]}
+        assert cards["p3"]["image_count"] == 4 and cards["p1"]["image_count"] == 0
+        assert [image["image_url"] for image in cards["p3"]["images"]] == ["u1", "u2"]
+
+        invalid = await tools.list_bid_cards("h1", cursor="not-a-cursor")
+        assert invalid["bid_cards"] == [] and "error" in invalid
+
+    asyncio.run(run())
@@ -0,0 +1,96 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+from collections.abc import Sequence
+from types import SimpleNamespace
+from typing import Any, cast
+
+import pytest
+from google.adk.tools import ToolContext
+
+from src.agents.homeowner_live import image_ingest as ingest_module
+from src.agents.homeowner_live.image_ingest import ImageIngest, describe_image
+from src.tools.blob_store import pending_image_handles, queue_pending_image
+from src.tools.image_preprocess import ImageVariants
+
+
+def _fake_uploads(
+    monkeypatch: pytest.MonkeyPatch, delay: float = 0.0
+) -> dict[str, int]:
+    """Replaces the storage upload; returns live/peak concurrency counters."""
+    counters = {"running": 0, "peak": 0}
+
+    async def upload(variants: ImageVariants, bucket_name: str) -> tuple[str, None]:
+        counters["running"] += 1
+        counters["peak"] = max(counters["peak"], counters["running"])
+        await asyncio.sleep(delay)
+        counters["running"] -= 1
+        return f"https://storage.example/{variants.original}", None
+
+    monkeypatch.setattr(ingest_module, "upload_image_variants", upload)
+    return counters
+
+
+def test_describe_sends_all_pending_images_in_one_request(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that every queued image is described by one vision request"""
+    _fake_uploads(monkeypatch)
+    requests: list[int] = []
+
+    async def describe(images: Sequence[tuple[memoryview, str | None]]) -> list[str]:
+        requests.append(len(images))
+        return [f"photo of {bytes(view).decode()}" for view, _ in images]
+
+    monkeypatch.setattr(ingest_module, "describe_images_bytes", describe)
+    monkeypatch.setattr(ingest_module, "image_ingest", ImageIngest())
+
+    async def run() -> str:
+        state: dict[str, Any] = {}
+        for name in ("roof", "gutter", "porch"):
+            queue_pending_image(state, name.encode(), "image/jpeg")
+        context = cast(ToolContext, SimpleNamespace(state=state))
+        result = await describe_image(context)
+        assert pending_image_handles(state) == []
+        return result
+
+    result = asyncio.run(run())
+    assert requests == [3]
+    assert "Image 1: photo of roof" in result
+    assert "Image 3: photo of porch" in result
+    assert result.count("image_url: https://storage.example/") == 3
+
+
+def test_uploads_respect_the_concurrency_limit_on_each_loop(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that at most upload_concurrency uploads run at once, on any event loop"""
+    counters = _fake_uploads(monkeypatch, delay=0.02)
+    ingest = ImageIngest(upload_concurrency=2)
+
+    async def run() -> list[str]:
+        state: dict[str, Any] = {}
+        handles = [
+            queue_pending_image(state, f"image {index}".encode(), "image/jpeg")
+            for index in range(5)
+        ]
+        results = await asyncio.gather(*(ingest.start(handle) for handle in handles))
+        return [result.image_url for result in results]
+
+    # The module-level instance outlives any one loop; the limit must work on each.
+    for _ in range(2):
+        assert len(asyncio.run(run())) == 5
+    assert counters["peak"] == 2
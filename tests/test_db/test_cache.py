@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+from src.db.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl() -> None:
+    """Test that entries are served until their TTL passes"""
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(maxsize=4, ttl=10, clock=clock)
+    cache.set("a", 1)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+
+
+def test_lru_eviction_respects_recent_use() -> None:
+    """Test that the least recently used entry is evicted first"""
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.stats.evictions == 1
+
+
+def test_concurrent_loads_are_collapsed() -> None:
+    """Test that concurrent misses for one key share a single load"""
+    cache: TTLCache[str, str] = TTLCache(maxsize=4, ttl=60)
+    calls = 0
+
+    async def loader() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run() -> list[str]:
+        return await asyncio.gather(
+            *(cache.get_or_load("k", loader) for _ in range(10))
+        )
+
+    assert asyncio.run(run()) == ["value"] * 10
+    assert calls == 1
+    assert cache.stats.coalesced == 9
+
+
+def test_write_during_load_wins() -> None:
+    """Test that a write-through during an in-flight load is not overwritten"""
+    cache: TTLCache[str, str] = TTLCache(maxsize=4, ttl=60)
+
+    async def run() -> None:
+        started = asyncio.Event()
+
+        async def loader() -> str:
+            started.set()
+            await asyncio.sleep(0.01)
+            return "stale"
+
+        task = asyncio.create_task(cache.get_or_load("k", loader))
+        await started.wait()
+        cache.set("k", "fresh")
+        assert await task == "stale"
+
+    asyncio.run(run())
+    assert cache.get("k") == "fresh"
+
+
+def test_failed_load_propagates_to_followers() -> None:
+    """Test that a failing load raises for every waiting caller and caches nothing"""
+    cache: TTLCache[str, str] = TTLCache(maxsize=4, ttl=60)
+
+    async def loader() -> str:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run() -> list:
+        return await asyncio.gather(
+            *(cache.get_or_load("k", loader) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert "k" not in cache
+
+
+def test_none_is_not_cached_by_default() -> None:
+    """Test that None results are treated as misses"""
+    cache: TTLCache[str, None] = TTLCache(maxsize=4, ttl=60)
+    cache.set("k", None)
+    assert "k" not in cache
+
+    with pytest.raises(ValueError):
+        TTLCache(maxsize=0)
@@ -0,0 +1,260 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from src.db.local_backend import (
+    APIError,
+    APIResponse,
+    LatencyModel,
+    LocalSupabaseClient,
+    QueryBuilder,
+)
+
+
+def test_insert_select_filter_order_limit() -> None:
+    """Test that inserted rows come back filtered, ordered and limited"""
+
+    async def run() -> tuple[APIResponse, APIResponse]:
+        sb = LocalSupabaseClient()
+        await (
+            sb.table("project_scopes")
+            .insert(
+                [
+                    {
+                        "id": "a",
+                        "homeowner_id": "h1",
+                        "created_at": "2026-01-01",
+                        "budget_min_cents": 500,
+                    },
+                    {
+                        "id": "b",
+                        "homeowner_id": "h1",
+                        "created_at": "2026-02-01",
+                        "budget_min_cents": None,
+                    },
+                    {
+                        "id": "c",
+                        "homeowner_id": "h2",
+                        "created_at": "2026-03-01",
+                        "budget_min_cents": 900,
+                    },
+                ]
+            )
+            .execute()
+        )
+        newest = (
+            await sb.table("project_scopes")
+            .select("id")
+            .eq("homeowner_id", "h1")
+            .order("created_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        cheap = (
+            await sb.table("project_scopes")
+            .select("id", count="exact")
+            .lte("budget_min_cents", 600)
+            .execute()
+        )
+        return newest, cheap
+
+    newest, cheap = asyncio.run(run())
+    assert newest.data == [{"id": "b"}]
+    assert cheap.data == [{"id": "a"}] and cheap.count == 1
+
+
+def test_upsert_on_conflict_and_duplicate_insert() -> None:
+    """Test that upsert merges on the conflict columns and a duplicate insert raises 23505"""
+
+    async def run() -> tuple[Any, APIError]:
+        sb = LocalSupabaseClient()
+        facts = sb.table("project_scope_facts")
+        await facts.upsert(
+            [{"project_scope_id": "s", "fact_name": "color", "fact_value": "red"}],
+            on_conflict="project_scope_id,fact_name",
+        ).execute()
+        await (
+            sb.table("project_scope_facts")
+            .upsert(
+                [{"project_scope_id": "s", "fact_name": "color", "fact_value": "blue"}],
+                on_conflict="project_scope_id,fact_name",
+            )
+            .execute()
+        )
+        rows = (
+            await sb.table("project_scope_facts").select("fact_value").execute()
+        ).data
+        with pytest.raises(APIError) as excinfo:
+            await (
+                sb.table("project_scope_facts")
+                .insert({"project_scope_id": "s", "fact_name": "color"})
+                .execute()
+            )
+        return rows, excinfo.value
+
+    rows, error = asyncio.run(run())
+    assert rows == [{"fact_value": "blue"}]
+    assert error.code == "23505" and "duplicate" in str(error)
+
+
+def test_embedded_resources_and_or_filter() -> None:
+    """Test that aliased embeds, counts, foreign order/limit and or_ keyset filters work"""
+
+    async def run() -> APIResponse:
+        sb = LocalSupabaseClient()
+        await (
+            sb.table("project_scopes")
+            .insert(
+                [
+                    {"id": "1", "created_at": "2026-01-01"},
+                    {"id": "2", "created_at": "2026-01-01"},
+                    {"id": "3", "created_at": "2026-01-02"},
+                ]
+            )
+            .execute()
+        )
+        await (
+            sb.table("project_images")
+            .insert(
+                [
+                    {
+                        "project_scope_id": "3",
+                        "image_url": "u2",
+                        "created_at": "2026-01-03",
+                    },
+                    {
+                        "project_scope_id": "3",
+                        "image_url": "u1",
+                        "created_at": "2026-01-02",
+                    },
+                ]
+            )
+            .execute()
+        )
+        return await (
+            sb.table("project_scopes")
+            .select(
+                "id,images:project_images(image_url),image_count:project_images(count)"
+            )
+            .or_(
+                'created_at.lt."2026-01-02",and(created_at.eq."2026-01-02",id.lt.3),id.eq.3'
+            )
+            .order("created_at", foreign_table="images")
+            .limit(1, foreign_table="images")
+            .order("created_at", desc=True)
+            .order("id", desc=True)
+            .execute()
+        )
+
+    rows = asyncio.run(run()).data
+    assert [row["id"] for row in rows] == ["3", "2", "1"]
+    assert rows[0]["images"] == [{"image_url": "u1"}]
+    assert rows[0]["image_count"] == [{"count": 2}]
+
+
+def test_single_maybe_single_delete_and_rpc() -> None:
+    """Test single/maybe_single semantics, delete and the session merge RPC"""
+
+    async def run() -> tuple[Any, Any, Any, Any]:
+        sb = LocalSupabaseClient()
+
+        def sessions() -> QueryBuilder:
+            return sb.table("adk_sessions")
+
+        await (
+            sessions()
+            .upsert({"session_id": "s1", "state_data": {"a": 1, "b": 2}})
+            .execute()
+        )
+        merged = await sb.rpc(
+            "adk_sessions_merge_state",
+            {"p_session_id": "s1", "p_set": {"c": 3}, "p_unset": ["a"]},
+        ).execute()
+        missing = await sb.rpc(
+            "adk_sessions_merge_state",
+            {"p_session_id": "nope", "p_set": {}, "p_unset": []},
+        ).execute()
+        state = (
+            await sessions()
+            .select("state_data")
+            .eq("session_id", "s1")
+            .single()
+            .execute()
+        ).data
+        await sessions().delete().eq("session_id", "s1").execute()
+        gone = (
+            await sessions()
+            .select("state_data")
+            .eq("session_id", "s1")
+            .maybe_single()
+            .execute()
+        )
+        with pytest.raises(APIError):
+            await sessions().select("*").eq("session_id", "s1").single().execute()
+        return merged.data, missing.data, state, gone.data
+
+    merged, missing, state, gone = asyncio.run(run())
+    assert merged is True and missing is None
+    assert state == {"state_data": {"b": 2, "c": 3}}
+    assert gone is None
+
+
+def test_storage_and_sqlite_persistence(tmp_path: Path) -> None:
+    """Test that uploads refuse duplicates without upsert and rows and objects survive a reopen"""
+    path = str(tmp_path / "local.sqlite3")
+
+    async def write() -> tuple[str, APIError]:
+        sb = LocalSupabaseClient(path=path)
+        bucket = sb.storage.from_("project-images")
+        await bucket.upload(
+            "a/b.webp", b"data", {"content-type": "image/webp", "upsert": "false"}
+        )
+        with pytest.raises(APIError) as excinfo:
+            await bucket.upload("a/b.webp", b"data", {"upsert": "false"})
+        await sb.table("project_scopes").insert({"id": "p"}).execute()
+        url = await bucket.get_public_url("a/b.webp")
+        sb.close()
+        return url, excinfo.value
+
+    async def read() -> tuple[Any, bytes]:
+        sb = LocalSupabaseClient(path=path)
+        rows = (await sb.table("project_scopes").select("id").execute()).data
+        data = await sb.storage.from_("project-images").download("a/b.webp")
+        return rows, data
+
+    url, error = asyncio.run(write())
+    assert url.endswith("/storage/v1/object/public/project-images/a/b.webp")
+    assert "already exists" in str(error).lower()
+    assert asyncio.run(read()) == ([{"id": "p"}], b"data")
+
+
+def test_injected_latency_overlaps_across_requests() -> None:
+    """Test that each request waits for the injected latency without blocking others"""
+
+    async def run() -> tuple[float, int]:
+        sb = LocalSupabaseClient(latency=LatencyModel(latency_ms=50))
+        start = time.perf_counter()
+        await asyncio.gather(*(sb.table("t").select("*").execute() for _ in range(10)))
+        return time.perf_counter() - start, sb.requests
+
+    elapsed, requests = asyncio.run(run())
+    assert 0.05 <= elapsed < 0.25
+    assert requests == 10
@@ -0,0 +1,94 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import base64
+import logging
+
+import pytest
+
+from src.observability.log import LogSampler, log_sampled, redacted, sampler, summarize
+
+
+class _Part:
+    def __init__(self, data: bytes) -> None:
+        self.text = None
+        self.inline_data = {"mime_type": "image/jpeg", "data": data}
+
+
+class _State:
+    def __init__(self, values: dict) -> None:
+        self._values = values
+
+    def to_dict(self) -> dict:
+        return dict(self._values)
+
+
+def test_summarize_bounds_binary_and_large_fields() -> None:
+    """Test that bytes, base64, sensitive keys and long strings are summarized by size."""
+    image = bytes(range(256)) * 8192
+    state = _State(
+        {
+            "session_id": "abc",
+            "pending_image_data": base64.b64encode(image).decode(),
+            "upload": base64.b64encode(image).decode(),
+            "raw": image,
+            "notes": "word " * 2_000,
+            "parts": [_Part(image)],
+        }
+    )
+    text = summarize(state, max_field=32)
+    assert len(text) < 1000
+    assert "'session_id': 'abc'" in text
+    assert "<redacted str" in text
+    assert f"<base64 {len(base64.b64encode(image))} chars>" in text
+    assert f"<bytes {len(image)}>" in text
+    assert "...(+9968 chars)" in text
+    assert "'inline_data': <redacted dict" in text
+
+
+def test_redacted_renders_only_when_emitted(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that redacted() arguments are not rendered for records below the logger level."""
+    rendered: list[bool] = []
+
+    class _Probe:
+        def to_dict(self) -> dict:
+            rendered.append(True)
+            return {"key": "value"}
+
+    logger = logging.getLogger("test_observability.lazy")
+    with caplog.at_level(logging.INFO, logger=logger.name):
+        logger.debug("state: %s", redacted(_Probe()))
+        assert not rendered
+        logger.info("state: %s", redacted(_Probe()))
+    assert rendered == [True]
+    assert "state: _Probe('key': 'value')" in caplog.text
+
+
+def test_sampler_emits_first_then_every_nth(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that sampled events pass the first N, then one in every M with a suppressed count."""
+    local = LogSampler(first=2, every=5)
+    allowed = [local.allow("event") for _ in range(12)]
+    assert allowed[:2] == [0, 0]
+    assert allowed[6] == 4 and allowed[11] == 4
+    assert sum(1 for value in allowed if value is not None) == 4
+
+    sampler.reset()
+    logger = logging.getLogger("test_observability.sampled")
+    with caplog.at_level(logging.INFO, logger=logger.name):
+        for index in range(200):
+            log_sampled(logger, logging.INFO, "message", "message %d", index)
+    assert len(caplog.records) == 11
+    assert "(99 similar suppressed)" in caplog.records[-1].getMessage()
+    sampler.reset()
@@ -0,0 +1,140 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import inspect
+import urllib.request
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from src.db.local_backend import LocalSupabaseClient
+from src.observability.tool_metrics import (
+    PREFIX,
+    Histogram,
+    instrument_tool,
+    queue_wait,
+    registry,
+    serve_metrics,
+    start_metrics_server,
+    stop_metrics_server,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry() -> Iterator[None]:
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def _histogram(name: str, **labels: str) -> Histogram:
+    histogram = registry.histogram(name, **labels)
+    assert histogram is not None
+    return histogram
+
+
+def test_wrapper_keeps_signature_and_records_call() -> None:
+    """Test that an instrumented tool keeps its signature and records duration, bytes and DB round trips"""
+    sb = LocalSupabaseClient()
+
+    async def save_note(note: str, tool_context: Any = None) -> str:
+        """Saves a note."""
+        await sb.table("notes").insert({"note": note}).execute()
+        await sb.table("notes").select("*").execute()
+        with queue_wait("lock"):
+            await asyncio.sleep(0)
+        return "saved"
+
+    tool = instrument_tool(save_note)
+    assert inspect.iscoroutinefunction(tool)
+    assert list(inspect.signature(tool).parameters) == ["note", "tool_context"]
+    assert tool.__doc__ == "Saves a note."
+
+    assert asyncio.run(tool("hello", tool_context=object())) == "saved"
+    assert (
+        registry.counter(f"{PREFIX}_calls_total", tool="save_note", outcome="ok") == 1
+    )
+    assert _histogram(f"{PREFIX}_duration_seconds", tool="save_note").count == 1
+    assert _histogram(f"{PREFIX}_db_round_trips", tool="save_note").sum == 2
+    assert _histogram(f"{PREFIX}_request_bytes", tool="save_note").sum == len(
+        '{"note":"hello"}'
+    )
+    assert _histogram(f"{PREFIX}_response_bytes", tool="save_note").sum == len("saved")
+    assert (
+        _histogram(f"{PREFIX}_queue_wait_seconds", tool="save_note", queue="lock").count
+        == 1
+    )
+
+
+def test_errors_are_counted_and_reraised() -> None:
+    """Test that raised errors and returned error messages are told apart"""
+
+    @instrument_tool
+    def failing() -> str:
+        raise ValueError("boom")
+
+    @instrument_tool(name="soft_fail")
+    def soft() -> dict:
+        return {"error": "Database unavailable."}
+
+    with pytest.raises(ValueError):
+        failing()
+    soft()
+
+    assert (
+        registry.counter(f"{PREFIX}_calls_total", tool="failing", outcome="error") == 1
+    )
+    assert (
+        registry.counter(f"{PREFIX}_errors_total", tool="failing", error="ValueError")
+        == 1
+    )
+    assert (
+        registry.counter(
+            f"{PREFIX}_calls_total", tool="soft_fail", outcome="error_result"
+        )
+        == 1
+    )
+
+
+def test_metrics_endpoint_serves_prometheus_text() -> None:
+    """Test that /metrics serves the registry in Prometheus text format"""
+    instrument_tool(lambda: "ok", name="ping")()
+    server = start_metrics_server(port=0, host="127.0.0.1")
+    assert server is not None
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode()
+    finally:
+        stop_metrics_server()
+
+    assert f'{PREFIX}_calls_total{{outcome="ok",tool="ping"}} 1' in body
+    assert f'{PREFIX}_duration_seconds_bucket{{tool="ping",le="+Inf"}} 1' in body
+    assert f"# TYPE {PREFIX}_duration_seconds histogram" in body
+
+
+def test_agent_callback_starts_the_server_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that serve_metrics starts /metrics on the configured port and reuses it"""
+    monkeypatch.setenv("TOOL_METRICS_PORT", "0")
+    monkeypatch.setenv("TOOL_METRICS_HOST", "127.0.0.1")
+    try:
+        serve_metrics()
+        server = start_metrics_server()
+        assert server is not None
+        serve_metrics()
+        assert start_metrics_server() is server
+    finally:
+        stop_metrics_server()
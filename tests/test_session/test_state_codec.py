@@ -0,0 +1,121 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import base64
+import json
+import os
+from typing import Any
+
+import pytest
+
+from src.db.local_backend import APIResponse, LocalSupabaseClient
+from src.session.state_codec import (
+    ENVELOPE_KEY,
+    FORMAT_JSON_ZLIB,
+    CompressedStateCodec,
+    JsonStateCodec,
+    StateCodecError,
+    decode_state,
+    is_packed,
+)
+
+
+def _homeowner_state(image_kb: int = 64) -> dict:
+    return {
+        "session_id": "s1",
+        "current_homeowner_id": "h1",
+        "pending_image_handles": ["blob:abc"],
+        "conversation_summary": "Kitchen remodel with new cabinets. " * 200,
+        "legacy_upload": base64.b64encode(os.urandom(image_kb * 1024)).decode(),
+    }
+
+
+def test_legacy_rows_decode() -> None:
+    """Test that plain JSONB dicts and JSON text rows decode unchanged."""
+    state = {"session_id": "s1", "nested": {"a": [1, 2]}}
+    assert decode_state(state) is state
+    assert decode_state(json.dumps(state)) == state
+    assert JsonStateCodec().encode(state) is state
+    with pytest.raises(StateCodecError):
+        decode_state("{not json")
+    with pytest.raises(StateCodecError):
+        decode_state([1, 2])
+
+
+def test_compressed_codec_round_trip_and_threshold() -> None:
+    """Test that only states over the threshold are packed, and packed states round-trip."""
+    codec = CompressedStateCodec(threshold=1024, format=FORMAT_JSON_ZLIB)
+    small = {"session_id": "s1"}
+    assert codec.encode(small) is small
+
+    state = _homeowner_state()
+    packed = codec.encode(state)
+    assert is_packed(packed) and packed["format"] == FORMAT_JSON_ZLIB
+    assert len(json.dumps(packed)) < len(json.dumps(state))
+    assert codec.decode(packed) == state
+    # Rows written by one codec stay readable by the other.
+    assert JsonStateCodec().decode(json.dumps(packed)) == state
+
+
+def test_unknown_envelopes_are_rejected() -> None:
+    """Test that unsupported envelope versions and formats raise StateCodecError."""
+    packed = CompressedStateCodec(threshold=0, format=FORMAT_JSON_ZLIB).encode({"a": 1})
+    with pytest.raises(StateCodecError):
+        decode_state({**packed, ENVELOPE_KEY: 99})
+    with pytest.raises(StateCodecError):
+        decode_state({**packed, "format": "lz4"})
+    with pytest.raises(StateCodecError):
+        decode_state({**packed, "data": base64.b64encode(b"garbage").decode()})
+
+
+def test_merge_function_skips_packed_rows() -> None:
+    """Test that adk_sessions_merge_state leaves packed rows to a full write."""
+
+    async def run() -> tuple[APIResponse, APIResponse, APIResponse, dict[str, Any]]:
+        sb = LocalSupabaseClient()
+        packed = CompressedStateCodec(threshold=0, format=FORMAT_JSON_ZLIB).encode(
+            {"a": 1}
+        )
+        await (
+            sb.table("adk_sessions")
+            .insert(
+                [
+                    {"session_id": "plain", "state_data": {"a": 1}},
+                    {"session_id": "packed", "state_data": packed},
+                ]
+            )
+            .execute()
+        )
+        plain = await sb.rpc(
+            "adk_sessions_merge_state",
+            {"p_session_id": "plain", "p_set": {"b": 2}, "p_unset": []},
+        ).execute()
+        skipped = await sb.rpc(
+            "adk_sessions_merge_state",
+            {"p_session_id": "packed", "p_set": {"b": 2}, "p_unset": []},
+        ).execute()
+        row = (
+            await sb.table("adk_sessions")
+            .select("state_data")
+            .eq("session_id", "packed")
+            .single()
+            .execute()
+        )
+        return plain, skipped, row, packed
+
+    plain, skipped, row, packed = asyncio.run(run())
+    assert plain.data and not skipped.data
+    assert row.data["state_data"] == packed
@@ -0,0 +1,71 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from typing import Any
+
+from google.adk.sessions import State
+
+from src.session.state_tracking import clear_key, diff_items, persistable, split_delta
+
+
+def test_split_delta_separates_sets_and_deletes() -> None:
+    """Test that None values in an ADK state delta become deletions"""
+    to_set, to_delete = split_delta({"a": 1, "b": None, "temp:scratch": "x"})
+    assert to_set == {"a": 1}
+    assert to_delete == {"b"}
+
+
+def test_state_writes_are_recorded_in_the_delta() -> None:
+    """Test that changes made through ADK's State reach split_delta"""
+    value: dict[str, Any] = {"a": 1, "b": 2}
+    delta: dict[str, Any] = {}
+    state = State(value=value, delta=delta)
+    state["a"] = 10
+    clear_key(state, "b")
+    clear_key(state, "missing")
+
+    assert state.has_delta()
+    assert split_delta(delta) == ({"a": 10}, {"b"})
+    assert persistable(value) == {"a": 10}
+
+
+def test_diff_items_skips_unchanged_values() -> None:
+    """Test that equal scalars and equal nested values are not sent again"""
+    previous = {"a": 1, "scope": {"budget": "$10k"}, "images": ["x"]}
+    current = {"a": 1, "scope": {"budget": "$10k"}, "images": ["x"]}
+    assert diff_items(previous, current) == ({}, set())
+
+
+def test_diff_items_detects_in_place_nested_mutation() -> None:
+    """Test that a nested value changed without reassignment is sent"""
+    previous = {"scope": {"budget": "$10k"}, "name": "x"}
+    scope = {"budget": "$10k"}
+    current = {"scope": scope, "name": "x"}
+    scope["budget"] = "$20k"
+    assert diff_items(previous, current) == ({"scope": {"budget": "$20k"}}, set())
+
+
+def test_diff_items_deletes_missing_and_none_keys() -> None:
+    """Test that keys removed or set to None are deleted and temp: keys ignored"""
+    previous = {"a": 1, "b": 2, "c": [1]}
+    current = {"a": 1, "b": None, "d": "new", "temp:x": 1}
+    to_set, to_delete = diff_items(previous, current)
+    assert to_set == {"d": "new"}
+    assert to_delete == {"b", "c"}
+
+
+def test_diff_items_detects_type_changes() -> None:
+    """Test that a list replaced by an equal-looking scalar is sent"""
+    assert diff_items({"a": [1]}, {"a": "[1]"}) == ({"a": "[1]"}, set())
@@ -0,0 +1,280 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from collections.abc import Iterator
+from types import SimpleNamespace
+from typing import cast
+
+import pytest
+from google.adk.events import Event, EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.tools.tool_context import ToolContext
+
+from src.db.local_backend import (
+    LocalSupabaseClient,
+    get_local_client,
+    reset_local_client,
+)
+from src.session.state_codec import FORMAT_JSON_ZLIB, CompressedStateCodec, is_packed
+from src.session.supabase_session import SupabaseSessionService
+from src.tools.scope_write_buffer import scope_write_buffer
+from src.tools.supabase_tools import upsert_project_scope_implementation
+
+APP = "homeowner"
+
+
+@pytest.fixture
+def sb(monkeypatch: pytest.MonkeyPatch) -> Iterator[LocalSupabaseClient]:
+    monkeypatch.setenv("SUPABASE_BACKEND", "local")
+    reset_local_client()
+    yield get_local_client()
+    reset_local_client()
+
+
+def _event(**state_delta: object) -> Event:
+    return Event(
+        author="user",
+        invocation_id="inv",
+        actions=EventActions(state_delta=dict(state_delta)),
+    )
+
+
+def test_create_get_list_delete_round_trip(sb: LocalSupabaseClient) -> None:
+    """Test that sessions created through the ADK API can be read back, listed and deleted."""
+
+    async def run() -> None:
+        service = SupabaseSessionService()
+        created = await service.create_session(
+            app_name=APP, user_id="u1", state={"zip": "78701"}, session_id="s1"
+        )
+        await service.create_session(app_name=APP, user_id="u1")
+        await service.create_session(app_name=APP, user_id="u2")
+        assert created.id == "s1" and created.state == {"zip": "78701"}
+
+        await service.append_event(
+            created, _event(budget="$10k", **{"temp:scratch": 1})
+        )
+        await service.append_event(created, _event())
+        service.forget_session("s1")
+
+        loaded = await service.get_session(app_name=APP, user_id="u1", session_id="s1")
+        assert loaded is not None
+        assert loaded.state == {"zip": "78701", "budget": "$10k"}
+        assert [event.id for event in loaded.events] == [
+            event.id for event in created.events
+        ]
+        assert loaded.last_update_time == pytest.approx(created.events[-1].timestamp)
+
+        recent = await service.get_session(
+            app_name=APP,
+            user_id="u1",
+            session_id="s1",
+            config=GetSessionConfig(num_recent_events=1),
+        )
+        assert recent is not None and len(recent.events) == 1
+        assert (
+            await service.get_session(app_name=APP, user_id="u2", session_id="s1")
+            is None
+        )
+
+        listed = await service.list_sessions(app_name=APP, user_id="u1")
+        assert len(listed.sessions) == 2 and "s1" in {
+            session.id for session in listed.sessions
+        }
+
+        await service.delete_session(app_name=APP, user_id="u1", session_id="s1")
+        assert (
+            await service.get_session(app_name=APP, user_id="u1", session_id="s1")
+            is None
+        )
+        events = (
+            await sb.table("adk_session_events")
+            .select("id")
+            .eq("session_id", "s1")
+            .execute()
+        )
+        assert events.data == []
+
+    asyncio.run(run())
+
+
+def test_repeat_gets_are_served_from_the_cache(sb: LocalSupabaseClient) -> None:
+    """Test that gets after create and append do not reach the database."""
+
+    async def run() -> None:
+        service = SupabaseSessionService()
+        session = await service.create_session(
+            app_name=APP, user_id="u1", session_id="s1"
+        )
+        await service.append_event(session, _event(step=1))
+        before = sb.requests
+        for _ in range(3):
+            cached = await service.get_session(
+                app_name=APP, user_id="u1", session_id="s1"
+            )
+            assert (
+                cached is not None
+                and cached.state == {"step": 1}
+                and len(cached.events) == 1
+            )
+        assert sb.requests == before
+
+    asyncio.run(run())
+
+
+def test_cached_state_is_isolated_from_callers(sb: LocalSupabaseClient) -> None:
+    """Test that mutating a nested value of a returned session does not change the cache."""
+
+    async def run() -> None:
+        service = SupabaseSessionService()
+        await service.create_session(
+            app_name=APP,
+            user_id="u1",
+            state={"scope": {"rooms": ["kitchen"]}},
+            session_id="s1",
+        )
+        first = await service.get_session(app_name=APP, user_id="u1", session_id="s1")
+        assert first is not None
+        first.state["scope"]["rooms"].append("bath")
+
+        second = await service.get_session(app_name=APP, user_id="u1", session_id="s1")
+        assert second is not None and second.state == {"scope": {"rooms": ["kitchen"]}}
+
+    asyncio.run(run())
+
+
+def test_forget_session_invalidates_the_cache(sb: LocalSupabaseClient) -> None:
+    """Test that a session changed outside the service is re-read after forget_session."""
+
+    async def run() -> None:
+        service = SupabaseSessionService()
+        await service.create_session(
+            app_name=APP, user_id="u1", state={"step": 1}, session_id="s1"
+        )
+        await (
+            sb.table("adk_sessions")
+            .update({"state_data": {"step": 2}})
+            .eq("session_id", "s1")
+            .execute()
+        )
+
+        stale = await service.get_session(app_name=APP, user_id="u1", session_id="s1")
+        assert stale is not None and stale.state == {"step": 1}
+        service.forget_session("s1")
+        fresh = await service.get_session(app_name=APP, user_id="u1", session_id="s1")
+        assert fresh is not None and fresh.state == {"step": 2}
+
+    asyncio.run(run())
+
+
+def test_append_event_merges_only_changed_keys(sb: LocalSupabaseClient) -> None:
+    """Test that state changes are sent as a delta and None removes the key."""
+    merge = sb.functions["adk_sessions_merge_state"]
+    calls: list[dict[str, object]] = []
+
+    def recording_merge(db: object, **params: object) -> object:
+        calls.append(params)
+        return merge(db, **params)
+
+    sb.register_function("adk_sessions_merge_state", recording_merge)
+
+    async def run() -> None:
+        service = SupabaseSessionService()
+        session = await service.create_session(
+            app_name=APP,
+            user_id="u1",
+            state={"summary": "x" * 1000, "old": 1},
+            session_id="s1",
+        )
+        await service.append_event(session, _event(turn=1))
+        await service.append_event(session, _event(old=None))
+
+        assert calls == [
+            {"p_session_id": "s1", "p_set": {"turn": 1}, "p_unset": []},
+            {"p_session_id": "s1", "p_set": {}, "p_unset": ["old"]},
+        ]
+        reloaded = await SupabaseSessionService().get_session(
+            app_name=APP, user_id="u1", session_id="s1"
+        )
+        assert reloaded is not None
+        assert reloaded.state == {"summary": "x" * 1000, "turn": 1}
+
+    asyncio.run(run())
+
+
+def test_delete_session_flushes_staged_scope_writes(sb: LocalSupabaseClient) -> None:
+    """Test that deleting a session writes out the scope updates its tools staged."""
+
+    async def run() -> None:
+        service = SupabaseSessionService()
+        session = await service.create_session(
+            app_name=APP, user_id="u1", state={"session_id": "agent-key"}
+        )
+        context = cast(ToolContext, SimpleNamespace(state=session.state))
+        await upsert_project_scope_implementation(
+            context, {"project_summary": "New roof", "zip_code": "10001"}
+        )
+        scope_id = session.state["current_project_scope_id"]
+        assert scope_write_buffer.has_pending("agent-key")
+
+        # A fresh service reads the staging key from the stored row.
+        await SupabaseSessionService().delete_session(
+            app_name=APP, user_id="u1", session_id=session.id
+        )
+
+        assert not scope_write_buffer.has_pending("agent-key")
+        rows = await sb.table("project_scopes").select("id,zip_code").execute()
+        assert rows.data == [{"id": scope_id, "zip_code": "10001"}]
+
+    asyncio.run(run())
+
+
+def test_session_growing_past_threshold_is_packed(sb: LocalSupabaseClient) -> None:
+    """Test that a session created small switches to the packed envelope once it grows."""
+
+    async def run() -> None:
+        codec = CompressedStateCodec(threshold=1000, format=FORMAT_JSON_ZLIB)
+        service = SupabaseSessionService(codec=codec)
+        session = await service.create_session(
+            app_name=APP, user_id="u1", state={"turn": 0}, session_id="s1"
+        )
+        await service.append_event(session, _event(turn=1))
+        row = (
+            await sb.table("adk_sessions")
+            .select("state_data")
+            .eq("session_id", "s1")
+            .single()
+            .execute()
+        )
+        assert row.data["state_data"] == {"turn": 1}
+
+        await service.append_event(session, _event(summary="x" * 5000))
+        await service.append_event(session, _event(turn=2))
+        row = (
+            await sb.table("adk_sessions")
+            .select("state_data")
+            .eq("session_id", "s1")
+            .single()
+            .execute()
+        )
+        assert is_packed(row.data["state_data"])
+
+        reloaded = await SupabaseSessionService(codec=codec).get_session(
+            app_name=APP, user_id="u1", session_id="s1"
+        )
+        assert reloaded is not None
+        assert reloaded.state == {"turn": 2, "summary": "x" * 5000}
+
+    asyncio.run(run())
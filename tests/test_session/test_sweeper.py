@@ -0,0 +1,151 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import datetime
+
+import pytest
+
+from src.db.local_backend import LocalSupabaseClient, reset_local_client
+from src.session.supabase_session import SupabaseSessionService
+from src.session.sweeper import SessionSweeper
+
+
+class _Service:
+    def __init__(self) -> None:
+        self.forgotten: list[str] = []
+
+    def forget_session(self, session_id: str) -> None:
+        self.forgotten.append(session_id)
+
+
+def _ago(seconds: float) -> str:
+    return (
+        datetime.datetime.now(datetime.timezone.utc)
+        - datetime.timedelta(seconds=seconds)
+    ).isoformat()
+
+
+def _seed(sb: LocalSupabaseClient) -> None:
+    rows = [
+        {
+            "session_id": f"old{i}",
+            "state_data": {"session_id": f"old{i}"},
+            "last_updated_at": _ago(10 * 86400 + i),
+        }
+        for i in range(5)
+    ]
+    rows += [
+        {
+            "session_id": "stale",
+            "state_data": {
+                "session_id": "stale",
+                "pending_image_data": "A" * 5000,
+                "pending_image_handles": ["blob:x"],
+            },
+            "last_updated_at": _ago(2 * 3600),
+        },
+        {
+            "session_id": "active",
+            "state_data": {"session_id": "active", "pending_image_data": "A" * 5000},
+            "last_updated_at": _ago(60),
+        },
+    ]
+    asyncio.run(sb.table("adk_sessions").insert(rows).execute())
+
+
+def test_sweep_expires_idle_sessions_in_chunks() -> None:
+    """Test that idle sessions are deleted in batches and forgotten by the service."""
+    sb = LocalSupabaseClient()
+    _seed(sb)
+    service = _Service()
+    sweeper = SessionSweeper(
+        service,
+        ttl_seconds=7 * 86400,
+        transient_ttl_seconds=3600,
+        batch_size=2,
+        client=sb,
+    )
+    before = sb.requests
+    report = asyncio.run(sweeper.sweep_once())
+
+    assert report.expired_sessions == 5 and report.expired_bytes > 0
+    # 5 rows in chunks of 2 -> 3 deletes, plus one strip chunk.
+    assert sb.requests - before == 4
+    remaining = asyncio.run(
+        sb.table("adk_sessions").select("session_id").order("session_id").execute()
+    )
+    assert [row["session_id"] for row in remaining.data] == ["active", "stale"]
+    assert set(service.forgotten) == {f"old{i}" for i in range(5)} | {"stale"}
+
+
+def test_sweep_strips_transient_keys_from_stale_sessions_only() -> None:
+    """Test that transient keys are removed from sessions idle past the transient TTL, without touching last_updated_at."""
+    sb = LocalSupabaseClient()
+    _seed(sb)
+    stale_before = asyncio.run(
+        sb.table("adk_sessions")
+        .select("last_updated_at")
+        .eq("session_id", "stale")
+        .single()
+        .execute()
+    )
+    report = asyncio.run(
+        SessionSweeper(
+            ttl_seconds=7 * 86400, transient_ttl_seconds=3600, client=sb
+        ).sweep_once()
+    )
+
+    assert report.stripped_sessions == 1 and report.stripped_bytes > 5000
+    rows = asyncio.run(
+        sb.table("adk_sessions")
+        .select("session_id,state_data,last_updated_at")
+        .in_("session_id", ["stale", "active"])
+        .execute()
+    )
+    by_id = {row["session_id"]: row for row in rows.data}
+    assert by_id["stale"]["state_data"] == {"session_id": "stale"}
+    assert by_id["stale"]["last_updated_at"] == stale_before.data["last_updated_at"]
+    assert "pending_image_data" in by_id["active"]["state_data"]
+    assert "stripped transient keys from 1" in str(report)
+
+
+def test_service_starts_its_sweeper_on_first_use(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that the session service starts its sweeper when used and close() stops it."""
+    monkeypatch.setenv("SUPABASE_BACKEND", "local")
+    reset_local_client()
+    service = SupabaseSessionService(sweep_interval_seconds=3600)
+
+    async def run() -> None:
+        await service.get_session(app_name="app", user_id="u", session_id="missing")
+        task = service._sweeper._task
+        assert task is not None and not task.done()
+        await service.close()
+        assert task.cancelled()
+
+    asyncio.run(run())
+    reset_local_client()
+
+
+def test_zero_interval_leaves_sweeping_to_a_scheduled_job() -> None:
+    """Test that a sweeper with a zero interval never starts a background task."""
+    sweeper = SessionSweeper(client=LocalSupabaseClient(), interval_seconds=0)
+
+    async def run() -> None:
+        assert sweeper.start() is None
+
+    asyncio.run(run())
@@ -0,0 +1,75 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+from collections.abc import Iterator
+
+import pytest
+
+from src.db.local_backend import (
+    LocalSupabaseClient,
+    get_local_client,
+    reset_local_client,
+)
+from src.tools import bid_card_materializer as materializer_module
+from src.tools.bid_card_materializer import SNAPSHOT_TABLE, BidCardMaterializer
+
+
+@pytest.fixture
+def sb(monkeypatch: pytest.MonkeyPatch) -> Iterator[LocalSupabaseClient]:
+    monkeypatch.setenv("SUPABASE_BACKEND", "local")
+    reset_local_client()
+    yield get_local_client()
+    reset_local_client()
+
+
+def test_rebuilds_keep_only_the_latest_versions(
+    sb: LocalSupabaseClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that older snapshot versions are pruned after each rebuild"""
+    monkeypatch.setattr(materializer_module, "SNAPSHOT_KEEP", 2)
+
+    async def run() -> None:
+        await (
+            sb.table("project_scopes")
+            .insert({"id": "p1", "homeowner_id": "h1", "project_title": "Roof"})
+            .execute()
+        )
+        materializer = BidCardMaterializer()
+        for _ in range(4):
+            await materializer.rebuild("p1", "h1")
+
+        rows = (
+            await sb.table(SNAPSHOT_TABLE).select("version").order("version").execute()
+        )
+        assert [row["version"] for row in rows.data] == [3, 4]
+        latest = await materializer.latest_snapshot("p1")
+        assert latest is not None and latest["version"] == 4
+
+    asyncio.run(run())
+
+
+def test_latest_snapshot_without_client_returns_none(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that snapshot lookups return None when the database is unavailable"""
+
+    async def no_client() -> None:
+        return None
+
+    monkeypatch.setattr(materializer_module, "get_supabase_client", no_client)
+    materializer = BidCardMaterializer()
+    assert asyncio.run(materializer.latest_snapshot("p1")) is None
+    assert asyncio.run(materializer.latest_snapshot_for_homeowner("h1")) is None
@@ -0,0 +1,84 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import base64
+
+from src.session.state_tracking import persistable
+from src.tools.blob_store import (
+    MemoryBlobStore,
+    clear_pending_image,
+    get_blob_store,
+    pending_image_handles,
+    pending_image_view,
+    queue_pending_image,
+    upload_body,
+)
+
+
+def test_lru_eviction_stays_within_budget() -> None:
+    """Test that the least recently used blob is evicted to fit a new one"""
+    store = MemoryBlobStore(budget_bytes=10)
+    first = store.put(b"aaaa")
+    second = store.put(b"bbbb")
+    store.get(first)
+    third = store.put(b"cccc")
+
+    assert first in store and third in store
+    assert second not in store
+    assert store.used_bytes == 8
+
+
+def test_memory_store_reads_without_copying() -> None:
+    """Test that the upload body is the caller's original bytes object"""
+    data = b"x" * 1024
+    store = MemoryBlobStore()
+    handle = store.put(data)
+    view = store.get(handle)
+
+    assert view is not None
+    assert upload_body(view) is data
+
+
+def test_pending_queue_keeps_arrival_order() -> None:
+    """Test that queued images are kept in order and cleared one at a time"""
+    state: dict = {}
+    first = queue_pending_image(state, b"one", "image/jpeg")
+    second = queue_pending_image(state, b"two", "image/png")
+    assert pending_image_handles(state) == [first, second]
+    view = pending_image_view(state)
+    assert view is not None
+    assert bytes(view) == b"one"
+
+    clear_pending_image(state, first)
+    assert pending_image_handles(state) == [second]
+    assert first not in get_blob_store()
+
+    clear_pending_image(state)
+    # Cleared keys are set to None, which the session service removes.
+    assert persistable(state) == {}
+    assert second not in get_blob_store()
+
+
+def test_legacy_state_is_still_readable() -> None:
+    """Test that single-handle and base64 state from older sessions is read"""
+    legacy_handle = get_blob_store().put(b"old", "image/jpeg")
+    state = {"pending_image_handle": legacy_handle}
+    queued = queue_pending_image(state, b"new", "image/jpeg")
+    assert pending_image_handles(state) == [legacy_handle, queued]
+
+    base64_state = {"pending_image_data": base64.b64encode(b"raw").decode()}
+    legacy_view = pending_image_view(base64_state)
+    assert legacy_view is not None
+    assert bytes(legacy_view) == b"raw"
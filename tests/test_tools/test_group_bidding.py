@@ -0,0 +1,135 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from pathlib import Path
+
+import pytest
+
+from src.tools import group_bidding
+from src.tools.group_bidding import (
+    GroupBiddingEngine,
+    GroupScope,
+    ZipCentroids,
+    normalize_project_type,
+)
+
+# Two Austin-area zips ~10 miles apart and one in Dallas (~180 miles away).
+CENTROIDS = ZipCentroids.from_pairs(
+    [
+        (78701, 30.27, -97.74),
+        (78759, 30.40, -97.75),
+        (75201, 32.79, -96.80),
+    ]
+)
+
+
+def _engine(max_group_size: int = 25) -> GroupBiddingEngine:
+    return GroupBiddingEngine(
+        CENTROIDS, radius_miles=25, window_days=30, max_group_size=max_group_size
+    )
+
+
+def test_normalize_project_type() -> None:
+    """Test that free text maps to canonical project types"""
+    assert normalize_project_type("Replace asphalt shingles") == "roofing"
+    assert normalize_project_type("Roof", "clean the gutters too") == "gutters"
+    assert normalize_project_type(None, "Something unusual") == "other"
+
+
+def test_project_type_keywords_match_whole_words() -> None:
+    """Test that keywords inside longer words do not pick the project type"""
+    assert normalize_project_type("build an outdoor kitchen") == "kitchen"
+    assert (
+        normalize_project_type("install stainless steel kitchen appliances")
+        == "kitchen"
+    )
+    assert normalize_project_type("deckard") == "other"
+    assert normalize_project_type("repave the street") == "other"
+    assert normalize_project_type("trim two trees") == "landscaping"
+    assert normalize_project_type("new a/c unit") == "hvac"
+
+
+def test_rooms_take_precedence_over_materials() -> None:
+    """Test that room-level types win over the materials used in them"""
+    assert (
+        normalize_project_type("Bathroom remodel", "new floor tile and paint")
+        == "bathroom"
+    )
+    assert (
+        normalize_project_type("Kitchen refresh", "replace cabinet doors") == "kitchen"
+    )
+    assert normalize_project_type("Retile the entry floor") == "flooring"
+
+
+def test_nearby_scopes_with_same_type_and_window_are_grouped() -> None:
+    """Test that scopes are grouped only by type, window and distance"""
+    engine = _engine()
+    engine.add_many(
+        [
+            GroupScope("a", "78701", "roofing", 30),
+            GroupScope("b", "78759", "roofing", 45),
+            GroupScope("c", "75201", "roofing", 30),
+            GroupScope("d", "78701", "siding", 30),
+            GroupScope("e", "78701", "roofing", 90),
+        ]
+    )
+
+    groups = list(engine.groups())
+    assert [sorted(map(str, group.members)) for group in groups] == [["a", "b"]]
+    dallas = engine.group_of("c")
+    assert dallas is not None and dallas.members == ["c"]
+
+
+def test_incremental_add_joins_existing_group_and_reopens_after_remove() -> None:
+    """Test that new scopes slot into open groups and full groups close"""
+    engine = _engine(max_group_size=2)
+    first = engine.add(GroupScope("a", "78701", "roofing", 30))
+    assert engine.add(GroupScope("b", "78759", "roofing", 31)) == first
+    # Group is full, so the next scope seeds a new one.
+    assert engine.add(GroupScope("c", "78701", "roofing", 32)) != first
+
+    engine.remove("b")
+    second = engine.group_of("c")
+    assert second is not None
+    assert engine.add(GroupScope("d", "78759", "roofing", 33)) in (
+        first,
+        second.group_id,
+    )
+    assert engine.add(GroupScope("x", "00000", "roofing", 33)) is None
+    assert engine.unlocated == 1
+
+
+def test_centroid_table_round_trip(tmp_path: Path) -> None:
+    """Test that the compact centroid table saves and loads"""
+    path = str(tmp_path / "zips.bin")
+    CENTROIDS.save(path)
+    loaded = ZipCentroids.load(path)
+
+    assert len(loaded) == 3
+    located = loaded.get("78759")
+    assert located is not None
+    lat, lon = located
+    assert abs(lat - 30.40) < 1e-4 and abs(lon + 97.75) < 1e-4
+    assert loaded.get("12345") is None
+
+
+def test_missing_centroid_table_explains_how_to_build_it(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a missing centroid table fails with the command that builds it"""
+    monkeypatch.setattr(group_bidding, "_default_centroids", None)
+    monkeypatch.setenv("ZIP_CENTROIDS_PATH", str(tmp_path / "missing.bin"))
+    with pytest.raises(FileNotFoundError, match="make zip-centroids"):
+        GroupBiddingEngine()
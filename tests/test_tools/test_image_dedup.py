@@ -0,0 +1,157 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from src.tools.image_dedup import (
+    ImageUploadDeduplicator,
+    ImageUploadError,
+    content_hash,
+    content_path,
+)
+
+
+class FakeResponse:
+    status_code = 200
+
+
+class FakeBucket:
+    def __init__(self, storage: "FakeStorage", bucket: str) -> None:
+        self.storage = storage
+        self.bucket = bucket
+
+    async def upload(self, path: str, file: bytes, file_options: dict) -> FakeResponse:
+        await asyncio.sleep(0)
+        if self.storage.fail_with is not None:
+            raise self.storage.fail_with
+        if (self.bucket, path) in self.storage.objects:
+            # storage3 raises StorageException with the response JSON.
+            raise Exception(
+                {
+                    "statusCode": "409",
+                    "error": "Duplicate",
+                    "message": "The resource already exists",
+                }
+            )
+        self.storage.objects[(self.bucket, path)] = bytes(file)
+        self.storage.upload_calls += 1
+        return FakeResponse()
+
+    async def get_public_url(self, path: str) -> str:
+        return f"https://example.test/{self.bucket}/{path}"
+
+
+class FakeStorage:
+    def __init__(self) -> None:
+        self.objects: dict = {}
+        self.upload_calls = 0
+        self.fail_with: Exception | None = None
+
+    def from_(self, bucket: str) -> FakeBucket:
+        return FakeBucket(self, bucket)
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.storage = FakeStorage()
+
+
+def test_content_path_is_derived_from_hash() -> None:
+    """Test that the object path depends only on the bytes and extension"""
+    digest = content_hash(b"photo")
+    assert content_path(digest, "JPG") == f"sha256/{digest[:2]}/{digest}.jpg"
+    assert content_path(digest, ".png").endswith(f"{digest}.png")
+
+
+def test_repeat_upload_skips_network(tmp_path: Path) -> None:
+    """Test that the same bytes are uploaded once and then served from the LRU"""
+    client = FakeClient()
+    dedup = ImageUploadDeduplicator(index_path=str(tmp_path / "index.sqlite3"))
+
+    async def run() -> list:
+        first = await dedup.upload(
+            client, "project-images", b"photo", "image/jpeg", ".jpg"
+        )
+        second = await dedup.upload(
+            client, "project-images", b"photo", "image/jpeg", ".jpg"
+        )
+        return [first, second]
+
+    (url1, reused1), (url2, reused2) = asyncio.run(run())
+    assert url1 == url2
+    assert (reused1, reused2) == (False, True)
+    assert client.storage.upload_calls == 1
+    assert dedup.stats.memory_hits == 1
+
+
+def test_index_survives_restart(tmp_path: Path) -> None:
+    """Test that a new deduplicator answers from the persistent index"""
+    client = FakeClient()
+    index_path = str(tmp_path / "index.sqlite3")
+    asyncio.run(
+        ImageUploadDeduplicator(index_path=index_path).upload(
+            client, "b", b"x", "image/png", ".png"
+        )
+    )
+
+    restarted = ImageUploadDeduplicator(index_path=index_path)
+    url, reused = asyncio.run(restarted.upload(client, "b", b"x", "image/png", ".png"))
+    assert reused and url.startswith("https://example.test/b/")
+    assert restarted.stats.index_hits == 1
+    assert client.storage.upload_calls == 1
+
+
+def test_concurrent_uploads_share_one_request(tmp_path: Path) -> None:
+    """Test that concurrent uploads of the same bytes send one request"""
+    client = FakeClient()
+    dedup = ImageUploadDeduplicator(index_path=str(tmp_path / "index.sqlite3"))
+
+    async def run() -> list:
+        return await asyncio.gather(
+            *(dedup.upload(client, "b", b"same", "image/png", ".png") for _ in range(5))
+        )
+
+    results = asyncio.run(run())
+    assert len({url for url, _ in results}) == 1
+    assert client.storage.upload_calls == 1
+
+
+def test_existing_object_counts_as_uploaded(tmp_path: Path) -> None:
+    """Test that an object already in storage is accepted without re-sending"""
+    client = FakeClient()
+    digest = content_hash(b"shared")
+    client.storage.objects[("b", content_path(digest, ".png"))] = b"shared"
+    dedup = ImageUploadDeduplicator(index_path=str(tmp_path / "index.sqlite3"))
+
+    url, reused = asyncio.run(dedup.upload(client, "b", b"shared", "image/png", ".png"))
+    assert url.endswith(content_path(digest, ".png"))
+    assert not reused
+    assert dedup.stats.already_stored == 1
+
+
+def test_error_mentioning_409_is_not_a_duplicate(tmp_path: Path) -> None:
+    """Test that only the status or error code, not the message text, marks an object as existing"""
+    client = FakeClient()
+    client.storage.fail_with = Exception(
+        {"statusCode": "400", "error": "InvalidKey", "message": "Invalid key: 409.jpg"}
+    )
+    dedup = ImageUploadDeduplicator(index_path=str(tmp_path / "index.sqlite3"))
+
+    with pytest.raises(ImageUploadError):
+        asyncio.run(dedup.upload(client, "b", b"photo", "image/jpeg", ".jpg"))
+    assert dedup.stats.already_stored == 0
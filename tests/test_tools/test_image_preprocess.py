@@ -0,0 +1,88 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import io
+
+import pytest
+
+from src.tools.image_preprocess import PreprocessConfig, preprocess_image_bytes
+
+Image = pytest.importorskip("PIL.Image")
+
+CONFIG = PreprocessConfig(max_edge=400, thumbnail_edge=64)
+
+
+def _jpeg(size: tuple, orientation: int = 1, gps: bool = False) -> bytes:
+    exif = Image.Exif()
+    if orientation != 1:
+        exif[0x0112] = orientation
+    if gps:
+        exif[0x8825] = {1: "N", 2: (40.0, 44.0, 54.0)}
+    buffer = io.BytesIO()
+    options = {"exif": exif} if exif else {}
+    Image.new("RGB", size, "blue").save(buffer, "JPEG", **options)
+    return buffer.getvalue()
+
+
+def test_metadata_is_stripped_without_reencoding() -> None:
+    """Test that the stored original keeps only its orientation and its pixels"""
+    data = _jpeg((1200, 800), orientation=6, gps=True)
+    result = preprocess_image_bytes(data, "image/jpeg", CONFIG)
+
+    assert result.original_rewritten
+    assert result.original.size == (800, 1200)
+    with Image.open(io.BytesIO(result.original.data)) as original:
+        assert dict(original.getexif()) == {0x0112: 6}
+        with Image.open(io.BytesIO(data)) as source:
+            assert original.tobytes() == source.tobytes()
+
+
+def test_upright_original_drops_exif_entirely() -> None:
+    """Test that an upright photo with GPS data is stored without any EXIF"""
+    result = preprocess_image_bytes(_jpeg((600, 400), gps=True), "image/jpeg", CONFIG)
+
+    assert result.original_rewritten
+    with Image.open(io.BytesIO(result.original.data)) as original:
+        assert "exif" not in original.info
+        assert original.size == (600, 400)
+
+
+def test_model_and_thumbnail_are_downscaled() -> None:
+    """Test that the model and thumbnail renditions respect their max edge"""
+    result = preprocess_image_bytes(_jpeg((1200, 800)), "image/jpeg", CONFIG)
+
+    assert result.model.size == (400, 267)
+    assert result.model.mime_type == "image/webp"
+    assert result.thumbnail is not None
+    assert max(result.thumbnail.size) == 64
+    assert len(result.model.data) < result.source_bytes
+
+
+def test_clean_original_is_kept_byte_for_byte() -> None:
+    """Test that an upright image without metadata is not re-encoded"""
+    data = _jpeg((600, 600))
+    result = preprocess_image_bytes(data, "image/jpeg", CONFIG)
+
+    assert not result.original_rewritten
+    assert result.original.data == data
+
+
+def test_undecodable_bytes_pass_through() -> None:
+    """Test that bytes Pillow cannot read are used as sent"""
+    result = preprocess_image_bytes(b"not an image", "image/heic", CONFIG)
+
+    assert result.model.data == b"not an image"
+    assert result.original.mime_type == "image/heic"
+    assert result.thumbnail is None
@@ -0,0 +1,119 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import datetime
+
+from src.tools.scope_normalize import (
+    normalized_scope_columns,
+    parse_budget,
+    parse_timeline,
+    plan_backfill,
+)
+
+TODAY = datetime.date(2026, 10, 17)
+
+
+def test_parse_budget_ranges_and_bounds() -> None:
+    """Test that budget text parses to min/max cents"""
+    assert parse_budget("$20k-$25k") == (2_000_000, 2_500_000)
+    assert parse_budget("10-15k") == (1_000_000, 1_500_000)
+    assert parse_budget("3 windows, $2,000 - 3,500") == (200_000, 350_000)
+    assert parse_budget("under $10k") == (None, 1_000_000)
+    assert parse_budget("$50,000+") == (5_000_000, None)
+    assert parse_budget("not sure yet") == (None, None)
+
+
+def test_parse_budget_ignores_counts_without_a_dollar_sign() -> None:
+    """Test that bare numbers only count as amounts next to a budget word or suffix"""
+    assert parse_budget("3 rooms, budget 5k") == (500_000, 500_000)
+    assert parse_budget("2 bathrooms for 30000 dollars") == (3_000_000, 3_000_000)
+    assert parse_budget("budget 5 to 8 thousand") == (500_000, 800_000)
+    assert parse_budget("15000-20000") == (1_500_000, 2_000_000)
+    assert parse_budget("3 rooms") == (None, None)
+
+
+def test_parse_timeline_relative_to_write_date() -> None:
+    """Test that timeline text parses to start/end dates"""
+    assert parse_timeline("3 months", TODAY) == (TODAY, datetime.date(2027, 1, 15))
+    assert parse_timeline("ASAP", TODAY) == (TODAY, datetime.date(2026, 10, 31))
+    assert parse_timeline("next month", TODAY) == (
+        datetime.date(2026, 11, 1),
+        datetime.date(2026, 11, 30),
+    )
+    assert parse_timeline("by June", TODAY) == (TODAY, datetime.date(2027, 6, 30))
+    assert parse_timeline("flexible", TODAY) == (TODAY, None)
+    assert parse_timeline("when the kids are back", TODAY) == (None, None)
+
+
+def test_month_words_need_date_context() -> None:
+    """Test that "may", "mar" etc. only count as months next to a date word, day or year"""
+    assert parse_timeline("may take a while", TODAY) == (None, None)
+    assert parse_timeline("the dog may mar the floor", TODAY) == (None, None)
+    assert parse_timeline("Jan from next door recommended you", TODAY) == (None, None)
+    assert parse_timeline("we may start in June", TODAY) == (
+        datetime.date(2027, 6, 1),
+        datetime.date(2027, 6, 30),
+    )
+    assert parse_timeline("in May", TODAY) == (
+        datetime.date(2027, 5, 1),
+        datetime.date(2027, 5, 31),
+    )
+    assert parse_timeline("May 5th", TODAY) == (
+        datetime.date(2027, 5, 1),
+        datetime.date(2027, 5, 31),
+    )
+    assert parse_timeline("by Mar. 2028", TODAY) == (TODAY, datetime.date(2028, 3, 31))
+
+
+def test_normalized_columns_only_for_written_fields() -> None:
+    """Test that only fields present in the write produce columns, and unparseable text clears them"""
+    assert normalized_scope_columns({"zip_code": "78701"}) == {}
+    assert normalized_scope_columns({"timeline": "2 weeks"}, TODAY) == {
+        "timeline_start": "2026-10-17",
+        "timeline_end": "2026-10-31",
+    }
+    assert normalized_scope_columns({"budget_range": "?"}) == {
+        "budget_min_cents": None,
+        "budget_max_cents": None,
+    }
+
+
+def test_plan_backfill_groups_rows_with_equal_values() -> None:
+    """Test that the backfill issues one update per distinct normalized result"""
+    rows = [
+        {
+            "id": "a",
+            "budget_range": "$5k",
+            "timeline": "ASAP",
+            "created_at": "2026-10-17T10:00:00+00:00",
+        },
+        {
+            "id": "b",
+            "budget_range": "$5k",
+            "timeline": "ASAP",
+            "created_at": "2026-10-17T18:00:00+00:00",
+        },
+        {
+            "id": "c",
+            "budget_range": "$5k",
+            "timeline": "ASAP",
+            "created_at": "2026-09-01T00:00:00+00:00",
+        },
+    ]
+    plan = {tuple(ids): dict(values) for values, ids in plan_backfill(rows).items()}
+
+    assert set(plan) == {("a", "b"), ("c",)}
+    assert plan[("a", "b")]["budget_min_cents"] == 500_000
+    assert plan[("c",)]["timeline_start"] == "2026-09-01"
@@ -0,0 +1,165 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+from collections.abc import Iterator
+from types import SimpleNamespace
+from typing import Any, cast
+
+import pytest
+from google.adk.agents.callback_context import CallbackContext
+
+from src.agents.homeowner_live.agent import flush_scope_writes
+from src.db.local_backend import (
+    LocalSupabaseClient,
+    get_local_client,
+    reset_local_client,
+)
+from src.tools import scope_write_buffer as buffer_module
+from src.tools.scope_write_buffer import ScopeWriteBuffer, scope_write_buffer
+
+
+@pytest.fixture
+def sb(monkeypatch: pytest.MonkeyPatch) -> Iterator[LocalSupabaseClient]:
+    monkeypatch.setenv("SUPABASE_BACKEND", "local")
+    reset_local_client()
+    yield get_local_client()
+    reset_local_client()
+
+
+def _fail_first_writes(monkeypatch: pytest.MonkeyPatch, failures: int) -> None:
+    """Makes the next `failures` flushes find no database client."""
+    real = buffer_module.get_supabase_client
+    remaining = [failures]
+
+    async def flaky_client() -> Any:
+        if remaining[0] > 0:
+            remaining[0] -= 1
+            return None
+        return await real()
+
+    monkeypatch.setattr(buffer_module, "get_supabase_client", flaky_client)
+
+
+async def _scope(sb: LocalSupabaseClient, scope_id: str) -> dict[str, Any] | None:
+    resp = await sb.table("project_scopes").select("*").eq("id", scope_id).execute()
+    return resp.data[0] if resp.data else None
+
+
+def test_staged_calls_are_merged_into_one_write(sb: LocalSupabaseClient) -> None:
+    """Test that several staged updates are flushed as one insert and one facts upsert"""
+
+    async def run() -> None:
+        buffer = ScopeWriteBuffer(debounce_seconds=60)
+        buffer.stage("s1", "p1", "h1", {"budget_range": "$10k"}, is_new=True)
+        buffer.stage("s1", "p1", "h1", {"timeline": "May"}, facts={"color": "red"})
+        buffer.stage(
+            "s1", "p1", "h1", {"budget_range": "$12k"}, facts={"color": "blue"}
+        )
+
+        assert await buffer.flush_session("s1")
+        assert buffer.staged_calls == 3 and buffer.writes_issued == 2
+        row = await _scope(sb, "p1")
+        assert row is not None
+        assert (row["budget_range"], row["timeline"], row["status"]) == (
+            "$12k",
+            "May",
+            "new",
+        )
+        facts = await sb.table("project_scope_facts").select("fact_value").execute()
+        assert facts.data == [{"fact_value": "blue"}]
+
+    asyncio.run(run())
+
+
+def test_debounce_timer_flushes(sb: LocalSupabaseClient) -> None:
+    """Test that staged writes are flushed once the debounce delay passes"""
+
+    async def run() -> None:
+        buffer = ScopeWriteBuffer(debounce_seconds=0.01)
+        buffer.stage("s1", "p1", "h1", {"project_title": "Roof"}, is_new=True)
+        assert await _scope(sb, "p1") is None
+        await asyncio.sleep(0.1)
+        assert not buffer.has_pending("s1")
+        row = await _scope(sb, "p1")
+        assert row is not None and row["project_title"] == "Roof"
+
+    asyncio.run(run())
+
+
+def test_turn_end_callback_flushes(sb: LocalSupabaseClient) -> None:
+    """Test that the agent's after_agent_callback writes what the turn staged"""
+
+    async def run() -> None:
+        scope_write_buffer.stage(
+            "turn-s1", "p1", "h1", {"zip_code": "78701"}, is_new=True
+        )
+        context = cast(
+            CallbackContext, SimpleNamespace(state={"session_id": "turn-s1"})
+        )
+        await flush_scope_writes(context)
+        assert not scope_write_buffer.has_pending("turn-s1")
+        row = await _scope(sb, "p1")
+        assert row is not None and row["zip_code"] == "78701"
+        await scope_write_buffer.close_session("turn-s1")
+
+    asyncio.run(run())
+
+
+def test_failed_write_is_requeued_under_newer_values(
+    sb: LocalSupabaseClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a failed flush keeps its payload, reports it once and retries it"""
+    _fail_first_writes(monkeypatch, 1)
+
+    async def run() -> None:
+        buffer = ScopeWriteBuffer(debounce_seconds=60)
+        buffer.stage(
+            "s1", "p1", "h1", {"budget_range": "$10k", "timeline": "May"}, is_new=True
+        )
+        assert not await buffer.flush_session("s1")
+        assert buffer.has_pending("s1")
+        error = buffer.take_error("s1")
+        assert error is not None and "attempt 1 of" in error
+        assert buffer.take_error("s1") is None
+
+        buffer.stage("s1", "p1", "h1", {"budget_range": "$12k"})
+        assert await buffer.flush_session("s1")
+        row = await _scope(sb, "p1")
+        assert row is not None
+        assert (row["budget_range"], row["timeline"]) == ("$12k", "May")
+
+    asyncio.run(run())
+
+
+def test_closed_session_is_freed_after_max_attempts(
+    sb: LocalSupabaseClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a payload that keeps failing is dropped and its closed session forgotten"""
+    _fail_first_writes(monkeypatch, 10)
+
+    async def run() -> None:
+        buffer = ScopeWriteBuffer(debounce_seconds=0.01, max_attempts=3)
+        buffer.stage("s1", "p1", "h1", {"project_title": "Roof"}, is_new=True)
+        assert not await buffer.close_session("s1")
+        assert buffer.has_pending("s1")
+        # The remaining attempts run on the backoff timer.
+        await asyncio.sleep(0.3)
+        assert buffer.payloads_dropped == 1
+        assert not buffer.has_pending("s1")
+        assert buffer._sessions == {}
+        assert buffer.take_error("s1") is None
+
+    asyncio.run(run())
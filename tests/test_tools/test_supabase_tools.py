@@ -0,0 +1,94 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+from collections.abc import Iterator
+
+import pytest
+
+from src.db.local_backend import (
+    LocalSupabaseClient,
+    get_local_client,
+    reset_local_client,
+)
+from src.tools.scope_write_buffer import ScopeWriteBuffer
+from src.tools.supabase_tools import (
+    MAX_FACT_NAME_LENGTH,
+    _normalize_fact_name,
+    _normalize_fact_value,
+    normalize_scope_facts,
+)
+
+
+@pytest.fixture
+def sb(monkeypatch: pytest.MonkeyPatch) -> Iterator[LocalSupabaseClient]:
+    monkeypatch.setenv("SUPABASE_BACKEND", "local")
+    reset_local_client()
+    yield get_local_client()
+    reset_local_client()
+
+
+def test_normalize_fact_name() -> None:
+    """Test that fact names become lower snake_case and are truncated"""
+    assert _normalize_fact_name("Prefers Morning Work") == "prefers_morning_work"
+    assert _normalize_fact_name("  prefers-morning--work! ") == "prefers_morning_work"
+    assert _normalize_fact_name("!!!") == ""
+    assert len(_normalize_fact_name("x" * 100)) == MAX_FACT_NAME_LENGTH
+
+
+def test_normalize_fact_value() -> None:
+    """Test that fact values are stored as text and empty values are skipped"""
+    assert _normalize_fact_value(True) == "true"
+    assert _normalize_fact_value(" FALSE ") == "false"
+    assert _normalize_fact_value(3) == "3"
+    assert _normalize_fact_value(2.5) == "2.5"
+    assert _normalize_fact_value({"b": 1, "a": [1, 2]}) == '{"a":[1,2],"b":1}'
+    assert _normalize_fact_value("  tile roof ") == "tile roof"
+    empty_values: list[object] = [None, "", "   ", {}, []]
+    for empty in empty_values:
+        assert _normalize_fact_value(empty) is None
+
+
+def test_normalize_scope_facts_skips_empty_items() -> None:
+    """Test that names and values are normalized and empty items dropped"""
+    facts = normalize_scope_facts(
+        {"Roof Type": "Tile", "Has HOA": True, "notes": " ", "???": "x"}
+    )
+    assert facts == {"roof_type": "Tile", "has_hoa": "true"}
+
+
+def test_fact_upsert_replaces_instead_of_duplicating(sb: LocalSupabaseClient) -> None:
+    """Test that writing a fact again replaces its row via on_conflict"""
+
+    async def run() -> None:
+        buffer = ScopeWriteBuffer(debounce_seconds=60)
+        buffer.stage("s1", "p1", "h1", {}, is_new=True, facts={"roof_type": "tile"})
+        assert await buffer.flush_session("s1")
+        buffer.stage("s1", "p1", "h1", {}, facts={"roof_type": "metal", "stories": "2"})
+        assert await buffer.flush_session("s1")
+
+        rows = await (
+            sb.table("project_scope_facts")
+            .select("fact_name,fact_value")
+            .eq("project_scope_id", "p1")
+            .order("fact_name")
+            .execute()
+        )
+        assert rows.data == [
+            {"fact_name": "roof_type", "fact_value": "metal"},
+            {"fact_name": "stories", "fact_value": "2"},
+        ]
+
+    asyncio.run(run())